@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热力图归档 vs 逐文件 .raw/.json 基准测试
+
+生成一天的模拟检测数据，分别写成原来的每次检测两个文件的布局和
+np.memmap 归档，比较写入、全天统计和一小时时间片查询的耗时。
+
+用法: python benchmarks/bench_archive.py [事件数]
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import ANGLE_MAP, DetectionEvent, FileSink
+from maix_audio.archive import HeatmapArchive
+
+DAY_START = datetime(2026, 1, 1).timestamp()
+
+
+def make_events(count, seed=1):
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(DAY_START, DAY_START + 86400, count))
+    directions = rng.integers(0, 16, size=(count, 12), dtype=np.uint8)
+    maps = rng.integers(0, 256, size=(count, 16, 16), dtype=np.uint8)
+    events = []
+    for i in range(count):
+        dirs = directions[i].tolist()
+        intensity = max(dirs)
+        direction = dirs.index(intensity)
+        events.append(DetectionEvent(times[i], times[i], ANGLE_MAP[direction], intensity,
+                                     direction, dirs, i, None, maps[i].tobytes()))
+    return events
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def write_files(directory, events):
+    sink = FileSink(directory)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for event in events:
+            sink.on_detection(event)
+
+
+def write_archive(directory, events):
+    archive = HeatmapArchive(directory, mode='a')
+    for event in events:
+        archive.append(event)
+    archive.close()
+
+
+def files_stats(directory, start=None, end=None):
+    """原布局：glob 后逐个读取 .json 和 .raw"""
+    sums = np.zeros(12)
+    map_sum = np.zeros((16, 16))
+    count = 0
+    for meta_file in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if start is not None and not (start <= meta['timestamp'] < end):
+            continue
+        with open(meta_file[:-5] + '.raw', 'rb') as f:
+            audio = np.frombuffer(f.read(), dtype=np.uint8).reshape(16, 16)
+        sums += meta['all_directions']
+        map_sum += audio
+        count += 1
+    return sums / count, map_sum / count, count
+
+
+def archive_stats(directory, start=None, end=None):
+    archive = HeatmapArchive(directory)
+    view = archive.time_slice(start, end)
+    return view.direction_averages(), view.mean_map(), len(view)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workdir = tempfile.mkdtemp(prefix='maix_archive_')
+    files_dir = os.path.join(workdir, 'files')
+    archive_dir = os.path.join(workdir, 'archive')
+
+    try:
+        events = make_events(count)
+        _, files_write = timed(write_files, files_dir, events)
+        _, archive_write = timed(write_archive, archive_dir, events)
+
+        hour = (DAY_START + 12 * 3600, DAY_START + 13 * 3600)
+        (f_dirs, f_map, f_all), files_day = timed(files_stats, files_dir)
+        (a_dirs, a_map, a_all), archive_day = timed(archive_stats, archive_dir)
+        (_, _, f_hour), files_hour = timed(files_stats, files_dir, *hour)
+        (_, _, a_hour), archive_hour = timed(archive_stats, archive_dir, *hour)
+
+        assert f_all == a_all and f_hour == a_hour
+        assert np.allclose(f_dirs, a_dirs) and np.allclose(f_map, a_map)
+
+        print(f"事件数: {count} (一天)")
+        print("=" * 60)
+        print(f"{'操作':<18}{'逐文件':>12}{'归档':>12}{'加速':>10}")
+        for name, a, b in (("写入", files_write, archive_write),
+                           ("全天统计", files_day, archive_day),
+                           (f"一小时查询({a_hour}条)", files_hour, archive_hour)):
+            print(f"{name:<18}{a * 1000:>10.1f}ms{b * 1000:>10.1f}ms{a / b:>9.0f}x")
+        files_count = len(os.listdir(files_dir))
+        print(f"文件数: 逐文件 {files_count} 个, 归档 {len(os.listdir(archive_dir))} 个")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件分发测试
+
+虚拟设备（maix_audio.simulator，二进制帧，不限速）按峰值事件率发送，Receiver 带
+Broker 发布，若干订阅进程（Unix 套接字）接收。另有一个慢订阅方订阅 maps，
+每次读取后休眠，检查它只丢自己的消息，不拖慢串口读取和其他订阅方。
+
+统计: 设备发送 / 接收器收到（串口读取是否被拖慢）、接收线程CPU、
+每个订阅方收到的检测事件数（最少 / 平均）、发布到订阅方的延迟、慢订阅方丢弃数。
+
+用法: python benchmarks/bench_broker.py [--rate N] [--seconds S] [--subscribers 0,1,20]
+                                        [--tcp]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import Broker, MetricsSink, Receiver, Subscriber
+from maix_audio.simulator import VirtualDevice
+
+
+def subscribe(address, topics, slow, ready, results):
+    subscriber = Subscriber(address, topics).connect()
+    ready.release()
+    count = 0
+    latencies = []
+    while True:
+        events = subscriber.read()
+        if events is None:
+            break
+        now = time.time()
+        for event in events:
+            if event.audio_map is not None or 'detections' in topics:
+                count += 1
+                latencies.append(now - event.received)
+        if slow:
+            time.sleep(0.2)
+    subscriber.close()
+    latencies.sort()
+    results.put((slow, count, latencies[len(latencies) // 2] if latencies else 0.0,
+                 latencies[int(len(latencies) * 0.99)] if latencies else 0.0))
+
+
+def run_case(subscribers, args):
+    address = '127.0.0.1:9177' if args.tcp else 'unix:/tmp/maix_bench_broker.sock'
+    device = VirtualDevice(rate=args.rate, binary=True, baudrate=None, autostart=False)
+    device.start()
+    broker = Broker(address, max_queue=args.max_queue)
+    metrics = MetricsSink()
+    receiver = Receiver(device.port, binary=True, sinks=[metrics, broker], negotiate=False,
+                        clock_sync=False)
+    receiver.connect()
+
+    ctx = multiprocessing.get_context('fork')
+    ready = ctx.Semaphore(0)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=subscribe, args=(address, ('detections',), False, ready, results))
+             for _ in range(subscribers)]
+    if subscribers:
+        procs.append(ctx.Process(target=subscribe, args=(address, ('maps',), True, ready, results)))
+    for proc in procs:
+        proc.start()
+    for _ in procs:
+        ready.acquire()
+    time.sleep(0.2)  # 等订阅行到达
+
+    cpu = {}
+
+    def receive():
+        start = time.thread_time()
+        receiver.receive()
+        cpu['used'] = time.thread_time() - start
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    time.sleep(0.2)
+    device.start_script()
+    start = time.perf_counter()
+    time.sleep(args.seconds)
+    device.running_script = False
+    time.sleep(0.5)
+    elapsed = time.perf_counter() - start
+    receiver.stop()
+    thread.join()
+    snapshot = broker.snapshot()
+    time.sleep(1.0)  # 让订阅方读完
+    broker.close()
+    receiver.disconnect()
+    device.stop()
+
+    fast, slow = [], []
+    for _ in procs:
+        item = results.get(timeout=30)
+        (slow if item[0] else fast).append(item)
+    for proc in procs:
+        proc.join(5)
+    slow_dropped = sum(c['dropped'] for c in snapshot['clients'] if c['topics'] == ['maps'])
+    return {
+        "sent": device.sent,
+        "received": metrics.detections,
+        "cpu": cpu['used'] / elapsed * 100,
+        "min": min((c for _, c, _, _ in fast), default=0),
+        "avg": sum(c for _, c, _, _ in fast) / len(fast) if fast else 0,
+        "p50": max((p for _, _, p, _ in fast), default=0.0) * 1000,
+        "p99": max((p for _, _, _, p in fast), default=0.0) * 1000,
+        "slow": slow[0][1] if slow else 0,
+        "slow_dropped": slow_dropped,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description='事件分发测试')
+    ap.add_argument('--rate', type=float, default=2000.0, help='每秒检测事件数')
+    ap.add_argument('--seconds', type=float, default=5.0)
+    ap.add_argument('--subscribers', default='0,1,20')
+    ap.add_argument('--max-queue', type=int, default=256 * 1024)
+    ap.add_argument('--tcp', action='store_true', help='用本机 TCP 而不是 Unix 套接字')
+    args = ap.parse_args()
+
+    print(f"事件率: {args.rate:.0f}/秒 | 时长: {args.seconds}s | "
+          f"{'TCP' if args.tcp else 'Unix 套接字'} | 队列上限 {args.max_queue // 1024}KB")
+    print("=" * 100)
+    print(f"{'订阅方':>6}{'设备发送':>10}{'接收':>8}{'接收CPU':>9}{'订阅最少':>10}{'订阅平均':>10}"
+          f"{'延迟p50':>10}{'p99':>9}{'慢订阅收到':>12}{'慢订阅丢弃':>12}")
+    for count in (int(n) for n in args.subscribers.split(',')):
+        r = run_case(count, args)
+        print(f"{count:>6}{r['sent']:>10}{r['received']:>8}{r['cpu']:>8.1f}%{r['min']:>10}"
+              f"{r['avg']:>10.0f}{r['p50']:>8.1f}ms{r['p99']:>7.1f}ms{r['slow']:>12}"
+              f"{r['slow_dropped']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时钟同步精度测试
+
+用虚拟设备（maix_audio.simulator）模拟有漂移的设备时钟，Receiver 开启时钟同步，
+把每个检测事件换算后的 timestamp 与设备时钟的真实值
+（VirtualDevice.device_time_to_host）比较，统计误差分布，
+并与 ClockSync 给出的误差上界（error_at）、估计的漂移对照。
+
+用法: python benchmarks/bench_clock.py [--seconds S] [--drifts 0,50,-200]
+                                       [--rate N] [--interval S] [--baud N|0]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import Receiver, Sink
+from maix_audio.simulator import VirtualDevice
+
+
+class ErrorSink(Sink):
+    """记录换算后时间与真实时间之差"""
+
+    def __init__(self, device, clock):
+        self.device = device
+        self.clock = clock
+        self.errors = []
+        self.bounds = []
+
+    def on_detection(self, event):
+        if event.tick is None or not self.clock.synced:
+            return
+        truth = self.device.device_time_to_host(event.tick)
+        self.errors.append(event.timestamp - truth)
+        self.bounds.append(self.clock.error_at(event.tick))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def run_case(drift, args):
+    device = VirtualDevice(rate=args.rate, baudrate=args.baud or None, autostart=False,
+                           clock_drift=drift)
+    device.start()
+    receiver = Receiver(device.port, negotiate=False)
+    receiver.clock.interval = args.interval
+    sink = ErrorSink(device, receiver.clock)
+    receiver.add_sink(sink)
+    receiver.connect()
+    thread = threading.Thread(target=receiver.receive)
+    thread.start()
+    time.sleep(0.2)
+    device.start_script()
+    time.sleep(args.seconds)
+    device.running_script = False
+    time.sleep(0.3)
+    receiver.stop()
+    thread.join()
+    receiver.disconnect()
+    device.stop()
+
+    clock = receiver.clock
+    errors = [abs(e) for e in sink.errors]
+    if not errors:
+        return None
+    return {
+        "events": len(errors),
+        "p50": percentile(errors, 50) * 1000,
+        "p99": percentile(errors, 99) * 1000,
+        "max": max(errors) * 1000,
+        "bound": percentile(sink.bounds, 50) * 1000,
+        "within": sum(1 for e, b in zip(errors, sink.bounds) if e <= b) / len(errors),
+        "drift": clock.drift * 1e6,
+        "replies": clock.replies,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description='时钟同步精度测试')
+    ap.add_argument('--seconds', type=float, default=60.0)
+    ap.add_argument('--drifts', default='0,50,-150')
+    ap.add_argument('--rate', type=float, default=20.0, help='每秒检测事件数')
+    ap.add_argument('--interval', type=float, default=2.0, help='同步请求间隔（秒）')
+    ap.add_argument('--baud', type=int, default=115200, help='模拟波特率，0 表示不限速')
+    args = ap.parse_args()
+
+    print(f"事件率: {args.rate}/秒 | 同步间隔: {args.interval}s | 波特率: {args.baud or '不限'} | "
+          f"时长: {args.seconds}s")
+    print("=" * 90)
+    print(f"{'设定漂移':>10}{'估计漂移':>10}{'事件':>7}{'误差p50':>10}{'p99':>9}{'最大':>9}"
+          f"{'声称上界':>10}{'上界内':>8}{'回复':>6}")
+    for drift in (float(d) for d in args.drifts.split(',')):
+        r = run_case(drift, args)
+        if r is None:
+            print(f"{drift:>8.0f}ppm  未同步")
+            continue
+        print(f"{drift:>8.0f}ppm{r['drift']:>8.1f}ppm{r['events']:>7}{r['p50']:>8.2f}ms"
+              f"{r['p99']:>7.2f}ms{r['max']:>7.2f}ms{r['bound']:>8.2f}ms{r['within']:>8.1%}"
+              f"{r['replies']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多设备采集器基准测试
+
+为每个模拟设备创建一个 pty，串口路径是指向 pty 从端的符号链接；写线程按固定
+速率发送事件。第一个设备在中途“重启”（关闭旧 pty，链接指向新 pty），
+用来验证重连。最后检查合并输出的时间顺序和每个设备的事件数。
+
+用法: python benchmarks/bench_collector.py [设备数] [每设备事件/秒] [秒数] [--binary]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_protocol import make_events, text_event
+from maix_audio import DetectionEvent, MultiDeviceCollector, encode_frame
+
+
+class FakeDevice(threading.Thread):
+    """pty 上的模拟设备"""
+
+    def __init__(self, link, rate, duration, binary, restart_at=None):
+        super().__init__(daemon=True)
+        self.link = link
+        self.rate = rate
+        self.duration = duration
+        self.binary = binary
+        self.restart_at = restart_at
+        self.sent = 0
+        self.lost = 0
+        self.events = make_events(64, seed=hash(link) & 0xFFFF)
+        self.master = None
+        self.slave = None
+        self._open()
+
+    def _open(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        tmp = self.link + '.tmp'
+        os.symlink(os.ttyname(self.slave), tmp)
+        os.replace(tmp, self.link)
+
+    def _close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+    def run(self):
+        interval = 1.0 / self.rate
+        start = time.perf_counter()
+        next_send = start
+        restarted = False
+        while time.perf_counter() - start < self.duration:
+            if self.restart_at and not restarted and time.perf_counter() - start >= self.restart_at:
+                # 模拟设备重启：旧 pty 关闭，链接指向新 pty
+                self._close()
+                time.sleep(0.3)
+                self._open()
+                restarted = True
+            dirs, audio_map = self.events[self.sent % len(self.events)]
+            if self.binary:
+                data = encode_frame(self.sent, self.sent * 10, dirs, audio_map)
+            else:
+                data = text_event(dirs, audio_map, time.time())
+            try:
+                os.write(self.master, data)
+                self.sent += 1
+            except OSError:
+                self.lost += 1
+            next_send += interval
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+async def collect(collector, devices, duration):
+    received = []
+
+    async def consume():
+        async for event in collector.events():
+            if isinstance(event, DetectionEvent):
+                received.append(event)
+
+    consumer = asyncio.create_task(consume())
+    # 等采集器打开所有串口后再开始发送（pyserial 打开时会清空输入缓冲）
+    await asyncio.sleep(0.3)
+    for dev in devices.values():
+        dev.start()
+    await asyncio.sleep(duration + 0.5)
+    stats = collector.stats()
+    await collector.stop()
+    await consumer
+    return received, stats
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    count = int(args[0]) if len(args) > 0 else 4
+    rate = float(args[1]) if len(args) > 1 else 20
+    duration = float(args[2]) if len(args) > 2 else 5
+    binary = '--binary' in sys.argv
+
+    workdir = tempfile.mkdtemp(prefix='maix_collector_')
+    devices = {}
+    ports = {}
+    for i in range(count):
+        device = f"mic{i + 1}"
+        link = os.path.join(workdir, device)
+        devices[device] = FakeDevice(link, rate, duration, binary,
+                                     restart_at=duration / 2 if i == 0 else None)
+        ports[device] = link
+
+    collector = MultiDeviceCollector(ports, binary=binary, reconnect_delay=0.1)
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    received, stats = asyncio.run(collect(collector, devices, duration))
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    keys = [event.received for event in received]
+    ordered = all(a <= b for a, b in zip(keys, keys[1:]))
+
+    print(f"设备数: {count}, 每设备 {rate} 事件/秒, {duration} 秒, "
+          f"协议: {'二进制帧' if binary else '文本'}")
+    print("=" * 64)
+    print(f"{'设备':<8}{'发送':>8}{'接收':>8}{'重连':>6}{'字节':>12}")
+    for device, dev in devices.items():
+        got = sum(1 for event in received if event.device == device)
+        data = stats[device]
+        print(f"{device:<8}{dev.sent:>8}{got:>8}{data['reconnects']:>6}{data['bytes']:>12}")
+    print("=" * 64)
+    print(f"合并事件: {len(received)} | 时间有序: {'是' if ordered else '否'} | "
+          f"吞吐: {len(received) / wall:.0f} 事件/秒 | 采集进程CPU: {cpu / wall * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
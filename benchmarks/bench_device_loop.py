@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+设备主循环调度测试
+
+用 maix_audio.emulator 在主机上执行 hardware/demo_mic_array.py（虚拟时间，
+调用耗时见 emulator.COSTS），比较 LCD 刷新策略对检测帧率和发送延迟的影响:
+    每帧刷新        DISPLAY_INTERVAL_MS = 0, DISPLAY_ON_CHANGE = False（与原来的循环相同，
+                    只是 LCD 改在发送之后）
+    限速            DISPLAY_INTERVAL_MS = 200
+    限速 + 变化时   DISPLAY_INTERVAL_MS = 200, DISPLAY_ON_CHANGE = True（默认）
+    不刷新          DISPLAY_INTERVAL_MS 很大
+
+以及发送线程（TX_THREAD）在不同声音占比下的效果：串口阻塞时主循环是否还能
+按原来的频率调用 get_map()，链路跟不上时丢弃了多少。
+
+延迟为检测数据中的 tick（取得数据时）到写完串口的时间；LCD 占比为循环时间中
+resize / to_rainbow / lcd.display 所占的比例。
+
+用法: python benchmarks/bench_device_loop.py [--frames N] [--binary] [--baud N]
+                                             [--activity P] [--display-ms MS]
+                                             [--uart-blocks-cpu]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio.emulator import ScriptEmulator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'hardware', 'demo_mic_array.py')
+CASES = (
+    ("每帧刷新", {'DISPLAY_INTERVAL_MS': 0, 'DISPLAY_ON_CHANGE': False}),
+    ("限速", {'DISPLAY_INTERVAL_MS': 200, 'DISPLAY_ON_CHANGE': False}),
+    ("限速 + 变化时", {'DISPLAY_INTERVAL_MS': 200, 'DISPLAY_ON_CHANGE': True}),
+    ("不刷新", {'DISPLAY_INTERVAL_MS': 10 ** 9, 'DISPLAY_ON_CHANGE': False}),
+)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description='设备主循环调度测试')
+    ap.add_argument('--frames', type=int, default=3000)
+    ap.add_argument('--binary', action='store_true')
+    ap.add_argument('--baud', type=int, default=921600)
+    ap.add_argument('--activity', type=float, default=0.3, help='有声音的帧所占比例')
+    ap.add_argument('--display-ms', type=float, help='覆盖 lcd.display 的耗时（毫秒）')
+    ap.add_argument('--uart-blocks-cpu', action='store_true', help='串口发送时忙等，占用 CPU')
+    args = ap.parse_args()
+
+    costs = {'display': args.display_ms} if args.display_ms is not None else None
+    print(f"协议: {'二进制帧' if args.binary else '文本'} | 波特率: {args.baud} | "
+          f"帧数: {args.frames} | 有声音: {args.activity:.0%}")
+    print("=" * 84)
+    print(f"{'策略':<12}{'循环':>9}{'检测帧率':>10}{'LCD帧率':>9}{'LCD占比':>9}"
+          f"{'延迟p50':>10}{'p99':>9}{'TIMING行':>10}")
+    for name, overrides in CASES:
+        overrides = dict(overrides, BINARY_PROTOCOL=args.binary, CLOCK_SYNC=False,
+                         TX_THREAD=False)
+        emulator = ScriptEmulator(SCRIPT, frames=args.frames, overrides=overrides, costs=costs,
+                                  baudrate=args.baud, uart_blocks_cpu=args.uart_blocks_cpu,
+                                  activity=args.activity)
+        r = emulator.run()
+        lcd = sum(r.spent.get(k, 0.0) for k in ('resize', 'to_rainbow', 'display'))
+        print(f"{name:<12}{r.loop_ms:>7.1f}ms{r.frames / r.elapsed:>8.1f}/s{r.display_fps:>7.1f}/s"
+              f"{lcd / r.elapsed:>9.0%}{percentile(r.latencies, 50) * 1000:>8.1f}ms"
+              f"{percentile(r.latencies, 99) * 1000:>7.1f}ms{len(r.timings):>10}")
+
+    print()
+    print(f"{'发送':<8}{'有声音':>7}{'循环':>9}{'检测帧率':>10}{'发送/秒':>9}{'丢弃':>7}"
+          f"{'延迟p50':>10}{'p99':>9}")
+    for activity in (args.activity, 1.0):
+        for threaded in (False, True):
+            overrides = {'BINARY_PROTOCOL': args.binary, 'CLOCK_SYNC': False,
+                         'TX_THREAD': threaded}
+            emulator = ScriptEmulator(SCRIPT, frames=args.frames, overrides=overrides,
+                                      costs=costs, baudrate=args.baud,
+                                      uart_blocks_cpu=args.uart_blocks_cpu, activity=activity)
+            r = emulator.run()
+            dropped = r.timings[-1]['dropped'] if r.timings else 0
+            print(f"{'线程' if threaded else '主循环':<8}{activity:>7.0%}{r.loop_ms:>7.1f}ms"
+                  f"{r.frames / r.elapsed:>8.1f}/s{len(r.latencies) / r.elapsed:>7.1f}/s"
+                  f"{dropped:>7}{percentile(r.latencies, 50) * 1000:>8.1f}ms"
+                  f"{percentile(r.latencies, 99) * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
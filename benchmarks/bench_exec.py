@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+REPL 命令执行方式基准测试
+
+在虚拟设备（maix_audio.simulator，按波特率限速）上执行同一组查询命令，比较:
+    send_command    普通 REPL 逐条发送，按行读到 >>> 提示符（原来的方式）；
+                    提示符后没有换行，readline 要等串口超时，所以只测前 SLOW_LIMIT 条
+    RawRepl.exec_   原始 REPL 逐条发送，每条等待往返
+    ReplPipeline    原始 REPL 流水线，连续发送后按 Future 取回结果
+
+用法: python benchmarks/bench_exec.py [命令数] [--baud N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio.repl import RawRepl, ReplPipeline
+from maix_audio.simulator import VirtualDevice
+from maixpy_controller import MaixPyController
+
+QUERIES = (
+    "gc.mem_free()",
+    "gc.mem_alloc()",
+    "uos.listdir('/flash')",
+    "len(uos.listdir('/flash'))",
+)
+SLOW_LIMIT = 5
+
+
+def make_commands(count):
+    return [f"print({QUERIES[i % len(QUERIES)]})" for i in range(count)]
+
+
+def connect(device):
+    controller = MaixPyController(device.port)
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.connect()
+    return controller
+
+
+def by_send_command(controller, commands):
+    controller.send_command("import gc, uos")
+    start = time.perf_counter()
+    outputs = [controller.send_command(command) for command in commands[:SLOW_LIMIT]]
+    return time.perf_counter() - start, outputs
+
+
+def by_raw_repl(controller, commands):
+    repl = RawRepl(controller.ser)
+    repl.exec_("import gc, uos")
+    start = time.perf_counter()
+    outputs = [repl.exec_(command) for command in commands]
+    elapsed = time.perf_counter() - start
+    repl.exit()
+    repl.close()
+    return elapsed, outputs
+
+
+def by_pipeline(controller, commands):
+    pipeline = ReplPipeline(controller.ser).start()
+    pipeline.exec_("import gc, uos")
+    start = time.perf_counter()
+    futures = [pipeline.submit(command) for command in commands]
+    outputs = [future.result().check() for future in futures]
+    elapsed = time.perf_counter() - start
+    pipeline.close()
+    return elapsed, outputs
+
+
+def main():
+    ap = argparse.ArgumentParser(description='REPL 命令执行基准测试')
+    ap.add_argument('count', nargs='?', type=int, default=50)
+    ap.add_argument('--baud', type=int, default=115200)
+    args = ap.parse_args()
+
+    commands = make_commands(args.count)
+    print(f"命令: {args.count} 条 | 波特率: {args.baud}")
+    print("=" * 50)
+    print(f"{'方式':<16}{'总耗时':>10}{'每条':>12}")
+    cases = (
+        ("send_command", by_send_command),
+        ("RawRepl.exec_", by_raw_repl),
+        ("ReplPipeline", by_pipeline),
+    )
+    for name, run in cases:
+        device = VirtualDevice(baudrate=args.baud)
+        device.files['/flash/main.py'] = b'print(1)\n'
+        device.start()
+        controller = connect(device)
+        try:
+            elapsed, outputs = run(controller, commands)
+        finally:
+            with contextlib.redirect_stdout(io.StringIO()):
+                controller.disconnect()
+            device.stop()
+        note = f" （{len(outputs)} 条）" if len(outputs) < len(commands) else ""
+        print(f"{name:<16}{elapsed:>9.3f}s{elapsed / len(outputs) * 1000:>10.2f}ms{note}")
+
+
+if __name__ == "__main__":
+    main()
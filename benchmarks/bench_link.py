@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+波特率协商测试
+
+虚拟设备（maix_audio.simulator）开启 strict_baud：主机端串口的波特率与设备
+当前波特率不一致时双方都只收到乱码，所以只有握手真正成功时主机才能解析出事件。
+依次运行:
+    不协商                 设备不请求，保持 115200
+    协商 921600 / 1500000  设备请求，Receiver 响应
+    主机不响应             Receiver(negotiate=False)，设备等待图样超时后退回
+    超过主机上限           Receiver(max_baudrate=460800)，不响应，双方保持 115200
+    设备收不到图样         主机等待回送超时后退回
+
+统计协商结果、握手耗时和每秒接收的检测事件数（文本协议，带热力图）。
+
+用法: python benchmarks/bench_link.py [--seconds S] [--rate N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import MetricsSink, Receiver
+from maix_audio.simulator import VirtualDevice
+
+
+def run_case(args, link_baudrate, negotiate=True, max_baudrate=None, deaf=False):
+    device = VirtualDevice(rate=args.rate, link_baudrate=link_baudrate, strict_baud=True,
+                           tx_buffer=65536)
+    if deaf:
+        device._on_link_input = lambda data: None  # 切换后设备收不到主机的数据
+    device.start()
+    metrics = MetricsSink()
+    receiver = Receiver(device.port, sinks=[metrics], negotiate=negotiate,
+                        max_baudrate=max_baudrate)
+    ready = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        receiver.connect()
+        thread = threading.Thread(target=receiver.receive)
+        thread.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        device.start_script()
+        while device._link is not None and time.perf_counter() - start < 5:
+            time.sleep(0.005)
+        ready['link'] = time.perf_counter() - start
+        counted = metrics.detections
+        time.sleep(args.seconds)
+        received = metrics.detections - counted
+        receiver.stop()
+        thread.join()
+        receiver.disconnect()
+    device.stop()
+    return {
+        "host": receiver.baudrate,
+        "device": device.device_rate,
+        "handshake": ready['link'],
+        "rate": received / args.seconds,
+        "errors": receiver.parser.parse_errors,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description='波特率协商测试')
+    ap.add_argument('--seconds', type=float, default=2.0)
+    ap.add_argument('--rate', type=float, default=500.0, help='设备每秒产生的检测事件数')
+    args = ap.parse_args()
+
+    cases = (
+        ("不协商", dict(link_baudrate=None)),
+        ("协商 921600", dict(link_baudrate=921600)),
+        ("协商 1500000", dict(link_baudrate=1500000)),
+        ("主机不响应", dict(link_baudrate=921600, negotiate=False)),
+        ("超过主机上限", dict(link_baudrate=921600, max_baudrate=460800)),
+        ("设备收不到图样", dict(link_baudrate=921600, deaf=True)),
+    )
+    print(f"设备事件率: {args.rate:.0f}/秒 | 每种情况接收 {args.seconds:.0f} 秒")
+    print("=" * 72)
+    print(f"{'情况':<14}{'主机波特率':>12}{'设备波特率':>12}{'握手耗时':>10}{'事件/秒':>10}{'解析错误':>10}")
+    for name, kwargs in cases:
+        r = run_case(args, **kwargs)
+        print(f"{name:<14}{r['host']:>12}{r['device']:>12}{r['handshake']:>9.2f}s"
+              f"{r['rate']:>10.1f}{r['errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
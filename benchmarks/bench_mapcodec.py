@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热力图压缩（关键帧 + XOR 差分 + RLE）基准测试
+
+对一串连续热力图比较每帧字节数和 115200 波特率下的最大帧率，
+并经 StreamParser 解码验证往返一致，再模拟丢帧验证在下一个关键帧恢复。
+热力图默认是模拟数据（安静段全零，有声段为缓慢移动的声源），
+也可用 --store 读取 StoreSink 录制的真实数据。
+
+用法: python benchmarks/bench_mapcodec.py [帧数] [--store 目录] [--keyframe N]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import MapEncoder, SegmentStore, StreamParser, encode_frame
+
+BAUD_BYTES = 115200 / 10
+
+
+def synthetic_maps(count, seed=1):
+    """安静段和有声段交替，有声时声源绕阵列缓慢移动"""
+    rng = random.Random(seed)
+    maps = []
+    angle = 0.0
+    loud = False
+    for _ in range(count):
+        if rng.random() < 0.02:
+            loud = not loud
+        if not loud:
+            maps.append(bytes(256))
+            continue
+        angle += rng.uniform(-0.05, 0.15)
+        cx = 7.5 + 5 * math.cos(angle)
+        cy = 7.5 + 5 * math.sin(angle)
+        peak = rng.randint(20, 40)
+        data = bytearray(256)
+        for y in range(16):
+            for x in range(16):
+                d2 = (x - cx) ** 2 + (y - cy) ** 2
+                if d2 < 9:
+                    data[y * 16 + x] = int(peak * math.exp(-d2 / 4)) // 4 * 4
+        maps.append(bytes(data))
+    return maps
+
+
+def stored_maps(directory, count):
+    maps = []
+    for record in SegmentStore(directory).iter_records():
+        if record.audio_map:
+            maps.append(record.audio_map)
+            if len(maps) >= count:
+                break
+    return maps
+
+
+def encode_stream(maps, keyframe):
+    encoder = MapEncoder(keyframe)
+    frames = []
+    for seq, audio_map in enumerate(maps):
+        ftype, payload = encoder.encode(audio_map)
+        frames.append(encode_frame(seq, seq * 10, [5] * 12, payload, ftype))
+    return frames
+
+
+def decode_stream(frames):
+    parser = StreamParser(binary=True)
+    events = []
+    for frame in frames:
+        events.extend(parser.feed(frame))
+    return events, parser.maps
+
+
+def main():
+    ap = argparse.ArgumentParser(description='热力图压缩基准测试')
+    ap.add_argument('count', nargs='?', type=int, default=3000)
+    ap.add_argument('--store', help='StoreSink 数据目录')
+    ap.add_argument('--keyframe', type=int, default=30, help='关键帧间隔')
+    args = ap.parse_args()
+
+    maps = stored_maps(args.store, args.count) if args.store else synthetic_maps(args.count)
+    if not maps:
+        print("❌ 没有热力图数据")
+        return
+
+    raw_frames = [encode_frame(seq, seq * 10, [5] * 12, m) for seq, m in enumerate(maps)]
+    frames = encode_stream(maps, args.keyframe)
+
+    events, decoder = decode_stream(frames)
+    assert [e.audio_map for e in events] == maps, "往返解码不一致"
+
+    # 丢掉第 i 帧：之后的差分帧作废，直到下一个关键帧
+    lost = len(frames) // 2
+    events, lossy = decode_stream(frames[:lost] + frames[lost + 1:])
+    restored = [e for e in events if e.audio_map is not None]
+    for event in restored:
+        assert event.audio_map == maps[event.seq]
+    recovered = min((e.seq for e in restored if e.seq > lost), default=None)
+
+    raw_size = sum(map(len, raw_frames)) / len(maps)
+    size = sum(map(len, frames)) / len(maps)
+    quiet = sum(1 for m in maps if not any(m)) / len(maps)
+    print(f"热力图: {len(maps)} 帧 ({'录制' if args.store else '模拟'}，全零 {quiet:.0%})，"
+          f"关键帧间隔 {args.keyframe}")
+    print("=" * 60)
+    print(f"{'格式':<18}{'字节/帧':>10}{'帧/秒@115200':>16}")
+    print(f"{'文本 JSON+HEX':<18}{'~2000':>10}{BAUD_BYTES / 2000:>16.1f}")
+    print(f"{'二进制原图':<18}{raw_size:>10.1f}{BAUD_BYTES / raw_size:>16.1f}")
+    print(f"{'二进制压缩':<18}{size:>10.1f}{BAUD_BYTES / size:>16.1f}")
+    print(f"压缩比: {raw_size / size:.1f}x  关键帧 {decoder.keyframes}  差分 {decoder.deltas}")
+    print(f"往返一致 ✅  丢帧 #{lost} 后丢弃 {lossy.dropped} 个差分帧，在 #{recovered} 恢复")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热力图批量统计测试
+
+同一批检测事件（随机背景 + 一个亮点的 16x16 热力图）用几种方式求统计:
+
+    逐个 Python     ConsoleSink 原来的做法：对 bytes 求 min / max / sum
+    逐个 numpy      每个事件 np.frombuffer(...).reshape(16, 16) 后分别求 min / max / mean
+    逐个 numpy 全部 每个事件单独调用 batch_stats（与攒批相同的全部统计）
+    攒批 K          MapStatsStage(size=K)，K = 1 / 16 / 256
+
+统计: 每个事件的耗时、吞吐、与逐个计算的结果是否一致，以及在给定事件率下
+攒批带来的附加延迟上限 min((K-1)/事件率, max_wait)。
+
+用法: python benchmarks/bench_mapstats.py [--events N] [--rate R] [--max-wait S]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import DetectionEvent
+from maix_audio.mapstats import MapStatsStage, batch_stats, sector_matrix
+
+REPEAT = 5
+SIZES = (1, 16, 256)
+
+
+def make_events(count, seed=1):
+    rng = np.random.default_rng(seed)
+    maps = rng.integers(0, 40, (count, 16, 16), dtype=np.uint8)
+    rows = rng.integers(0, 16, count)
+    cols = rng.integers(0, 16, count)
+    maps[np.arange(count), rows, cols] = rng.integers(120, 256, count, dtype=np.uint8)
+    return [DetectionEvent(float(i), float(i), 0, 8, 0, [0] * 12, i, i * 20, maps[i].tobytes())
+            for i in range(count)]
+
+
+def python_stats(events):
+    for event in events:
+        audio_map = event.audio_map
+        min(audio_map), max(audio_map), sum(audio_map) / len(audio_map)
+
+
+def numpy_stats(events):
+    for event in events:
+        m = np.frombuffer(event.audio_map, dtype=np.uint8).reshape(16, 16)
+        m.min(), m.max(), m.mean()
+
+
+def numpy_full(events):
+    sectors = sector_matrix()
+    for event in events:
+        batch_stats(np.frombuffer(event.audio_map, dtype=np.uint8), sectors)
+
+
+def staged(size):
+    def run(events):
+        stage = MapStatsStage(size=size, max_wait=float('inf'))
+        for event in events:
+            for _ in stage.process(event):
+                pass
+        for _ in stage.flush():
+            pass
+    return run
+
+
+def best_time(func, events):
+    best = float('inf')
+    for _ in range(REPEAT):
+        for event in events:
+            event.map_stats = None
+        gc.collect()
+        start = time.perf_counter()
+        func(events)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check(events):
+    """攒批结果与逐个计算一致"""
+    sectors = sector_matrix()
+    for event in events:
+        expected = batch_stats(np.frombuffer(event.audio_map, dtype=np.uint8), sectors)
+        stats = event.map_stats
+        if stats is None:
+            return False
+        if (stats.min, stats.max, stats.background, stats.peak, stats.peak_row,
+                stats.peak_col) != tuple(int(expected[k][0]) for k in
+                                         ('min', 'max', 'background', 'peak', 'peak_row',
+                                          'peak_col')):
+            return False
+        if abs(stats.mean - expected['mean'][0]) > 1e-9:
+            return False
+        if not np.allclose(stats.energy, expected['energy'][0], rtol=1e-5):
+            return False
+    return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description='热力图批量统计测试')
+    ap.add_argument('--events', type=int, default=20000)
+    ap.add_argument('--rate', type=float, default=200, help='计算附加延迟用的事件率（个/秒）')
+    ap.add_argument('--max-wait', type=float, default=0.05, help='攒批最长等待（秒）')
+    args = ap.parse_args()
+
+    events = make_events(args.events)
+    cases = [("逐个 Python（min/max/均值）", python_stats, None),
+             ("逐个 numpy（min/max/均值）", numpy_stats, None),
+             ("逐个 numpy（全部统计）", numpy_full, None)]
+    cases += [(f"攒批 K={size}（全部统计）", staged(size), size) for size in SIZES]
+
+    print(f"事件: {args.events} | 附加延迟按 {args.rate:.0f} 个/秒、max_wait {args.max_wait * 1000:.0f}ms 计算")
+    print("=" * 84)
+    print(f"{'方式':<26}{'us/事件':>10}{'事件/秒':>12}{'相对逐个numpy全部':>16}{'附加延迟ms':>12}{'一致':>6}")
+    baseline = None
+    for name, func, size in cases:
+        elapsed = best_time(func, events)
+        per_event = elapsed / len(events)
+        if func is numpy_full:
+            baseline = per_event
+        speedup = f"{baseline / per_event:.1f}x" if baseline else "-"
+        if size is None:
+            delay = "-"
+            same = "-"
+        else:
+            delay = f"{min((size - 1) / args.rate, args.max_wait) * 1000:.1f}"
+            same = "是" if check(events) else "否"
+        print(f"{name:<26}{per_event * 1e6:>10.2f}{1 / per_event:>12.0f}{speedup:>16}"
+              f"{delay:>12}{same:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指标统计开销测试
+
+在合成的串口数据上运行 Receiver.process_chunk()（解析 + 分发给默认 sink 和
+MetricsSink / StoreSink），比较 metrics=None 与开启指标统计（解析耗时、采样的
+sink 耗时直方图）的吞吐，按计时次数估算的插桩开销（不受机器抖动影响），
+以及一次 /metrics 抓取（渲染 Prometheus 文本）的耗时。
+
+用法: python benchmarks/bench_metrics.py [--events N] [--binary] [--store]
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import MetricsSink, Receiver, StoreSink, encode_frame
+from maix_audio.metrics import Histogram
+from maix_audio.simulator import make_detections, text_event
+
+CHUNK = 4096
+REPEAT = 9
+
+
+def instrument_cost(count=100000):
+    """一次 perf_counter 计时加一次直方图记录的耗时（秒）"""
+    histogram = Histogram()
+    start = time.perf_counter()
+    for _ in range(count):
+        t = time.perf_counter()
+        histogram.observe(time.perf_counter() - t)
+    return (time.perf_counter() - start) / count
+
+
+def make_capture(count, binary):
+    out = bytearray()
+    events = make_detections(500)
+    for seq in range(count):
+        dirs, audio_map = events[seq % len(events)]
+        if binary:
+            out += encode_frame(seq, seq * 20, dirs, audio_map)
+        else:
+            out += text_event(dirs, audio_map, 1700000000.0 + seq * 0.02, seq, seq * 20)
+    return bytes(out)
+
+
+def run(capture, metrics, store_dir, binary):
+    sinks = [MetricsSink()]
+    if store_dir:
+        sinks.append(StoreSink(tempfile.mkdtemp(dir=store_dir)))
+    receiver = Receiver('unused', binary=binary, sinks=sinks, metrics=metrics)
+    gc.collect()
+    start = time.perf_counter()
+    for i in range(0, len(capture), CHUNK):
+        receiver.process_chunk(capture[i:i + CHUNK])
+    receiver.process_chunk(b'')
+    elapsed = time.perf_counter() - start
+    receiver.close_sinks()
+    return elapsed, receiver
+
+
+def main():
+    ap = argparse.ArgumentParser(description='指标统计开销测试')
+    ap.add_argument('--events', type=int, default=20000)
+    ap.add_argument('--binary', action='store_true')
+    ap.add_argument('--store', action='store_true', help='同时写段文件存储')
+    args = ap.parse_args()
+
+    capture = make_capture(args.events, args.binary)
+    store_dir = tempfile.mkdtemp() if args.store else None
+    best = {}
+    receiver = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(REPEAT):
+                # 交替先后顺序；不保留上一轮的接收器，避免垃圾回收压力偏向某一方
+                cases = (("关闭", None), ("开启", True))
+                for name, metrics in cases[::-1] if i % 2 else cases:
+                    receiver = None
+                    elapsed, receiver = run(capture, metrics, store_dir, args.binary)
+                    best[name] = min(best.get(name, elapsed), elapsed)
+                    if metrics is not None:
+                        last = receiver
+    finally:
+        if store_dir:
+            shutil.rmtree(store_dir)
+
+    print(f"协议: {'二进制帧' if args.binary else '文本'} | 事件: {args.events} | "
+          f"数据: {len(capture) / 1024:.0f}KB | sink: MetricsSink"
+          f"{' + StoreSink' if args.store else ''} | 取{REPEAT}次最快")
+    print("=" * 60)
+    base = best["关闭"]
+    for name in ("关闭", "开启"):
+        elapsed = best[name]
+        print(f"指标{name}: {elapsed * 1000:8.1f}ms  {args.events / elapsed:>10.0f} 事件/秒  "
+              f"开销 {(elapsed / base - 1) * 100:+.1f}%")
+
+    metrics = last.metrics
+    timings = metrics.parse_time.count * 2 + sum(h.count for h in metrics.sink_time.values())
+    estimate = timings * instrument_cost()
+    print(f"插桩估算: {timings} 次计时 ≈ {estimate * 1000:.1f}ms, 占 {estimate / base:.1%}")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        text = last.metrics.registry.render()
+    render = (time.perf_counter() - start) / 100
+    print(f"抓取一次: {render * 1000:.2f}ms, {len(text)} 字节, "
+          f"{sum(1 for line in text.splitlines() if not line.startswith('#'))} 个样本")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析器基准测试：在录制的串口数据上测量每秒解析事件数
+
+录制方法: Receiver(port, record='capture.bin') 会把原始串口字节追加写入文件。
+没有给出录制文件时，按 demo_mic_array.py 文本模式的输出合成一份。
+
+用法: python benchmarks/bench_parser.py [录制文件] [--binary]
+"""
+
+import binascii
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_protocol import make_events, text_event
+from maix_audio import DetectionEvent, StreamParser, encode_frame
+
+CHUNK = 4096
+REPEAT = 5
+
+
+def legacy_parse(capture):
+    """原脚本的写法：逐行 decode/strip，再按前缀解析"""
+    count = 0
+    current = None
+    for raw in capture.split(b'\n'):
+        line = raw.decode('utf-8', errors='ignore').strip()
+        if line.startswith('AUDIO_PACKET:'):
+            current = json.loads(line[13:])
+        elif line.startswith('RAW_AUDIO:'):
+            audio = binascii.unhexlify(line[10:])
+            if current and audio:
+                count += 1
+            current = None
+        elif line and not line.startswith(('AUDIO_', 'RAW_')):
+            pass
+    return count
+
+
+def parser_parse(capture, binary=False):
+    parser = StreamParser(binary=binary)
+    count = 0
+    for i in range(0, len(capture), CHUNK):
+        for event in parser.feed(capture[i:i + CHUNK]):
+            if isinstance(event, DetectionEvent):
+                count += 1
+    for event in parser.flush():
+        if isinstance(event, DetectionEvent):
+            count += 1
+    return count
+
+
+def best_rate(func, *args):
+    """多次运行取最快一次"""
+    best = None
+    count = 0
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        count = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, count / best
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    binary = '--binary' in sys.argv
+
+    if args:
+        with open(args[0], 'rb') as f:
+            capture = f.read()
+        print(f"录制文件: {args[0]} ({len(capture)} 字节)")
+    else:
+        events = make_events(2000)
+        if binary:
+            capture = b''.join(encode_frame(i, i * 100, d, m) for i, (d, m) in enumerate(events))
+        else:
+            capture = b''.join(text_event(d, m, 1700000000.0 + i * 0.1)
+                               for i, (d, m) in enumerate(events))
+        print(f"合成数据: {len(events)} 个事件 ({len(capture)} 字节)")
+
+    print("=" * 50)
+    if not binary:
+        count, rate = best_rate(legacy_parse, capture)
+        print(f"{'逐行 decode/strip':<20}{count:>8} 事件 {rate:>12.0f} 事件/秒")
+    count, rate = best_rate(parser_parse, capture, binary)
+    print(f"{'StreamParser':<20}{count:>8} 事件 {rate:>12.0f} 事件/秒")
+
+
+if __name__ == "__main__":
+    main()
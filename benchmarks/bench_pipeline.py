@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件处理流水线测试
+
+按固定事件率模拟接收循环，把事件交给三种处理方式:
+
+    直接分发    Receiver.dispatch 的做法：依次调用各 sink
+    流水线      Pipeline，各阶段都在接收线程中执行
+    线程写盘    Pipeline，写盘阶段用 ThreadedStage 放到工作线程
+
+写盘为 StoreSink（真实段文件）加模拟的存储卡卡顿（每 --stall-every 个事件
+阻塞 --stall-ms 毫秒，如 SD 卡落盘）。统计接收线程每个事件的处理耗时
+（p50 / p99 / 最大）、接收线程落后计划时间的最大值（相当于串口缓冲需要容纳的积压）、
+是否全部写入；另外测不限速时的吞吐，比较流水线本身的开销。
+
+用法: python benchmarks/bench_pipeline.py [--rate N] [--seconds S] [--stall-every N] [--stall-ms MS]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import DetectionEvent, Sink, StoreSink
+from maix_audio.pipeline import FilterStage, MapStage, Pipeline, ThreadedStage
+
+
+class StallSink(Sink):
+    """每 every 个事件阻塞 stall 秒"""
+
+    def __init__(self, every, stall):
+        self.every = every
+        self.stall = stall
+        self.count = 0
+
+    def on_detection(self, event):
+        self.count += 1
+        if self.count % self.every == 0:
+            time.sleep(self.stall)
+
+
+class CountSink(Sink):
+    def __init__(self):
+        self.count = 0
+
+    def on_detection(self, event):
+        self.count += 1
+
+
+def make_events(count):
+    audio_map = bytes(range(256))
+    return [DetectionEvent(float(i), float(i), 90, 8 + i % 8, 3, [i % 16] * 12, i, i * 20,
+                           audio_map) for i in range(count)]
+
+
+def tag(event):
+    event.bearing = float(event.angle)
+    return event
+
+
+def build(kind, directory, args, block=False):
+    """返回 (handle, idle, close, 写盘 sink)；block 为线程写盘阶段队列满时是否等待"""
+    store = StoreSink(directory)
+    disk = [StallSink(args.stall_every, args.stall_ms / 1000.0), store]
+    stages = [MapStage(tag), FilterStage(lambda e: e.intensity >= 0, name='filter'),
+              CountSink()]
+    if kind == "直接分发":
+        sinks = [CountSink()] + disk
+
+        def handle(event):
+            event = tag(event)
+            if event.intensity < 0:
+                return
+            for sink in sinks:
+                try:
+                    sink.handle(event)
+                except Exception as e:
+                    print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
+
+        def idle():
+            for sink in sinks:
+                sink.idle()
+
+        def close():
+            for sink in sinks:
+                sink.close()
+        return handle, idle, close, store
+    if kind == "流水线":
+        pipeline = Pipeline(stages + disk, report=False)
+    else:
+        pipeline = Pipeline(stages + [ThreadedStage(disk[0], maxsize=4096, block=block), disk[1]],
+                            report=False)
+    return pipeline.handle, pipeline.idle, pipeline.close, store
+
+
+def paced(kind, events, args):
+    directory = tempfile.mkdtemp(prefix='maix_pipeline_')
+    try:
+        handle, idle, close, store = build(kind, directory, args)
+        interval = 1.0 / args.rate
+        times = []
+        lag = 0.0
+        start = time.perf_counter()
+        for i, event in enumerate(events):
+            due = start + i * interval
+            now = time.perf_counter()
+            if now < due:
+                idle()
+                time.sleep(due - now)
+            else:
+                lag = max(lag, now - due)
+            t = time.perf_counter()
+            handle(event)
+            times.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        close()
+        drain = time.perf_counter() - t
+        times.sort()
+        return {
+            "p50": times[len(times) // 2],
+            "p99": times[int(len(times) * 0.99)],
+            "max": times[-1],
+            "lag": lag,
+            "drain": drain,
+            "saved": store.writer.records,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def throughput(kind, events, args):
+    """不限速、不卡顿时每秒处理的事件数"""
+    directory = tempfile.mkdtemp(prefix='maix_pipeline_')
+    stall_every = args.stall_every
+    args.stall_every = len(events) + 1
+    try:
+        # 比较处理开销，线程阶段等待而不丢弃
+        handle, idle, close, store = build(kind, directory, args, block=True)
+        start = time.perf_counter()
+        for event in events:
+            handle(event)
+        close()
+        return len(events) / (time.perf_counter() - start)
+    finally:
+        args.stall_every = stall_every
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='事件处理流水线测试')
+    ap.add_argument('--rate', type=float, default=500, help='事件率（个/秒）')
+    ap.add_argument('--seconds', type=float, default=6)
+    ap.add_argument('--stall-every', type=int, default=200, help='每多少个事件卡顿一次')
+    ap.add_argument('--stall-ms', type=float, default=80, help='每次卡顿的毫秒数')
+    args = ap.parse_args()
+
+    events = make_events(int(args.rate * args.seconds))
+    print(f"事件率: {args.rate:.0f}/s | {len(events)} 个事件 | "
+          f"写盘每 {args.stall_every} 个事件卡顿 {args.stall_ms:.0f}ms")
+    print("=" * 84)
+    print(f"{'方式':<8}{'p50 us':>10}{'p99 us':>10}{'最大 ms':>10}{'最大落后 ms':>13}"
+          f"{'关闭 ms':>10}{'写入':>9}{'吞吐/s':>12}")
+    for kind in ("直接分发", "流水线", "线程写盘"):
+        r = paced(kind, events, args)
+        rate = throughput(kind, make_events(50000), args)
+        print(f"{kind:<8}{r['p50'] * 1e6:>10.1f}{r['p99'] * 1e6:>10.1f}{r['max'] * 1000:>10.2f}"
+              f"{r['lag'] * 1000:>13.1f}{r['drain'] * 1000:>10.1f}{r['saved']:>9}{rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
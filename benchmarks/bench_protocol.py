@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本协议 vs 二进制帧协议 基准测试
+
+按设备实际输出构造每次检测的串口字节，计算固定波特率下的理论事件率，
+并测量主机端的解析速度。
+
+用法: python benchmarks/bench_protocol.py [波特率]
+"""
+
+import binascii
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import Frame, FrameDecoder, encode_frame
+from maix_audio.simulator import make_detections as make_events, text_event
+
+EVENTS = 2000
+
+
+def parse_text(stream):
+    """与接收器文本模式相同的解析"""
+    count = 0
+    for raw in stream.split(b'\n'):
+        line = raw.decode('utf-8', errors='ignore').strip()
+        if line.startswith('AUDIO_PACKET:'):
+            json.loads(line[13:])
+        elif line.startswith('RAW_AUDIO:'):
+            binascii.unhexlify(line[10:])
+            count += 1
+    return count
+
+
+def parse_binary(stream, chunk=4096):
+    decoder = FrameDecoder()
+    count = 0
+    for i in range(0, len(stream), chunk):
+        for item in decoder.feed(stream[i:i + chunk]):
+            if isinstance(item, Frame):
+                count += 1
+    return count
+
+
+def measure(func, stream):
+    start = time.perf_counter()
+    count = func(stream)
+    elapsed = time.perf_counter() - start
+    return count, elapsed
+
+
+def main():
+    baudrate = int(sys.argv[1]) if len(sys.argv) > 1 else 115200
+    bytes_per_second = baudrate / 10  # 8N1: 每字节10位
+
+    events = make_events(EVENTS)
+    streams = {
+        "文本 JSON+HEX": b''.join(text_event(d, m, 1700000000.0 + i * 0.1)
+                                  for i, (d, m) in enumerate(events)),
+        "二进制 带热力图": b''.join(encode_frame(i, i * 100, d, m)
+                                  for i, (d, m) in enumerate(events)),
+        "二进制 无热力图": b''.join(encode_frame(i, i * 100, d)
+                                  for i, (d, m) in enumerate(events)),
+    }
+    parsers = {
+        "文本 JSON+HEX": parse_text,
+        "二进制 带热力图": parse_binary,
+        "二进制 无热力图": parse_binary,
+    }
+
+    print(f"波特率: {baudrate} (8N1, {bytes_per_second:.0f} 字节/秒)")
+    print(f"事件数: {EVENTS}")
+    print("=" * 72)
+    print(f"{'协议':<16}{'字节/事件':>10}{'链路上限 事件/秒':>18}{'主机解析 事件/秒':>18}")
+    baseline = None
+    for name, stream in streams.items():
+        per_event = len(stream) / EVENTS
+        link_rate = bytes_per_second / per_event
+        count, elapsed = measure(parsers[name], stream)
+        assert count == EVENTS, f"{name}: 解析出 {count} 个事件"
+        if baseline is None:
+            baseline = link_rate
+        print(f"{name:<16}{per_event:>10.1f}{link_rate:>18.1f}{count / elapsed:>18.0f}"
+              f"   x{link_rate / baseline:.1f}")
+
+
+if __name__ == "__main__":
+    main()
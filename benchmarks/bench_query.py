@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检测事件查询测试
+
+生成合成检测事件（默认一百万条，分布在一天内），同一批事件分别保存为
+段文件（StoreSink）和旧版每条一个 .json + .raw 的文件（FileSink 格式），比较:
+
+    逐个解析  glob *.json，逐个解析并过滤，读取匹配的 .raw（原来的做法）
+    索引      EventIndex：建立索引一次，之后二分 + 位图查询，从段文件映射读取热力图
+
+统计: 建索引耗时、几种查询的匹配数和耗时（含读出全部匹配的热力图）、两种方式结果是否一致、追加一段新数据后的增量更新耗时。
+
+用法: python benchmarks/bench_query.py [--events N] [--naive N] [--keep DIR]
+      --naive 为旧版文件的条数（默认与 --events 相同），较小时逐个解析的耗时按条数线性外推
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import ANGLE_MAP, DetectionEvent, SegmentWriter
+from maix_audio.query import EventIndex, directions_between
+
+DAY_START = 1760659200.0   # 2025-10-17 00:00 UTC
+DAY = 86400.0
+HOUR = 3600.0
+
+
+def make_events(count, seed=1):
+    """
+    一天内的检测事件：方向偏向东侧（60~120度），强度 4~15，热力图为按序号取值的常量块
+
+    Yields:
+        DetectionEvent，按时间排序
+    """
+    rng = random.Random(seed)
+    times = sorted(rng.uniform(0, DAY) for _ in range(count))
+    maps = [bytes([level]) * 256 for level in range(256)]
+    for seq, offset in enumerate(times):
+        if rng.random() < 0.4:
+            direction = rng.choice((2, 3, 4))
+        else:
+            direction = rng.randrange(12)
+        dirs = [rng.randrange(4) for _ in range(12)]
+        dirs[direction] = rng.randrange(4, 16)
+        t = DAY_START + offset
+        yield DetectionEvent(t, t, ANGLE_MAP[direction], dirs[direction], direction, dirs,
+                             seq, seq * 20, maps[seq % 256])
+
+
+def write_store(directory, events):
+    writer = SegmentWriter(directory, max_age=HOUR)
+    count = 0
+    for event in events:
+        writer.append(event)
+        count += 1
+    writer.close()
+    return count
+
+
+def write_files(directory, events):
+    """FileSink 的格式（不打印）"""
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for event in events:
+        name = os.path.join(directory, f"audio_{count:07d}")
+        with open(name + '.raw', 'wb') as f:
+            f.write(event.audio_map)
+        with open(name + '.json', 'w') as f:
+            json.dump(event.to_dict(), f, indent=2, ensure_ascii=False)
+        count += 1
+    return count
+
+
+def naive_query(directory, start, end, directions, min_intensity):
+    """原来的做法：逐个解析 json，读取匹配的 raw"""
+    wanted = set(directions) if directions is not None else None
+    maps = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        with open(path) as f:
+            data = json.load(f)
+        t = data['timestamp']
+        if start is not None and t < start:
+            continue
+        if end is not None and t >= end:
+            continue
+        if wanted is not None and data['direction'] not in wanted:
+            continue
+        if min_intensity is not None and data['intensity'] < min_intensity:
+            continue
+        with open(path[:-5] + '.raw', 'rb') as f:
+            maps.append((t, f.read()))
+    maps.sort()
+    return maps
+
+
+QUERIES = (
+    ("02:00~03:00 东侧 强度>=10", DAY_START + 2 * HOUR, DAY_START + 3 * HOUR,
+     directions_between(60, 120), 10),
+    ("02:00~03:00 全部", DAY_START + 2 * HOUR, DAY_START + 3 * HOUR, None, None),
+    ("全天 西侧 强度>=14", None, None, directions_between(240, 300), 14),
+    ("全天 全部", None, None, None, None),
+)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='检测事件查询测试')
+    ap.add_argument('--events', type=int, default=1000000)
+    ap.add_argument('--naive', type=int, help='旧版文件条数，默认与 --events 相同')
+    ap.add_argument('--keep', help='数据目录（保留，重复运行时跳过生成）')
+    args = ap.parse_args()
+    naive_count = args.naive if args.naive is not None else args.events
+
+    root = args.keep or tempfile.mkdtemp(prefix='maix_query_')
+    store_dir = os.path.join(root, 'store')
+    files_dir = os.path.join(root, 'files')
+    try:
+        if not os.path.isdir(store_dir):
+            t = time.perf_counter()
+            write_store(store_dir, make_events(args.events))
+            print(f"生成段文件: {args.events} 条, {time.perf_counter() - t:.1f}s")
+        if not os.path.isdir(files_dir):
+            t = time.perf_counter()
+            write_files(files_dir, make_events(naive_count))
+            print(f"生成旧版文件: {naive_count} 条, {time.perf_counter() - t:.1f}s")
+
+        shutil.rmtree(os.path.join(store_dir, '.index'), ignore_errors=True)
+        t = time.perf_counter()
+        index = EventIndex(store_dir)
+        index.update()
+        build = time.perf_counter() - t
+
+        size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(store_dir, '.index', '*')))
+        print(f"建索引: {args.events} 条 {build:.2f}s | 索引大小 {size / 1024 / 1024:.1f}MB")
+
+        scale = args.events / naive_count
+        print("=" * 92)
+        print(f"{'查询':<24}{'匹配':>9}{'索引ms':>10}{'读热力图ms':>12}{'逐个解析ms':>13}"
+              f"{'加速':>9}{'一致':>6}")
+        for name, start, end, directions, min_intensity in QUERIES:
+            t = time.perf_counter()
+            rows = index.query(start, end, directions, min_intensity)
+            query_time = time.perf_counter() - t
+            t = time.perf_counter()
+            maps = np.concatenate([chunk['map'] for chunk in index.read(rows)] or
+                                  [np.zeros((0, 16, 16), np.uint8)])
+            read_time = time.perf_counter() - t
+
+            t = time.perf_counter()
+            naive = naive_query(files_dir, start, end, directions, min_intensity)
+            naive_time = (time.perf_counter() - t) * scale
+            # 只在两边数据相同时比较结果
+            if naive_count == args.events:
+                same = len(naive) == len(rows) and all(
+                    raw == m.tobytes() for (_, raw), m in zip(naive, maps))
+                same = "是" if same else "否"
+            else:
+                same = "-"
+            total = query_time + read_time
+            print(f"{name:<24}{len(rows):>9}{query_time * 1000:>10.2f}{read_time * 1000:>12.1f}"
+                  f"{naive_time * 1000:>13.0f}{naive_time / total:>8.0f}x{same:>6}")
+        if naive_count != args.events:
+            print(f"逐个解析按 {naive_count} 条实测耗时 x{scale:.1f} 外推")
+
+        # 追加一批更晚的新数据，增量更新
+        extra = make_events(max(args.events // 24, 1), seed=2)
+        extra = (DetectionEvent(e.timestamp + DAY, e.received + DAY, e.angle, e.intensity,
+                                e.direction, e.directions, e.seq, e.tick, e.audio_map)
+                 for e in extra)
+        added = write_store(store_dir, extra)
+        t = time.perf_counter()
+        index = EventIndex(store_dir)
+        index.update()
+        print(f"增量更新: 新增 {added} 条 {time.perf_counter() - t:.2f}s，共 {index.count} 条")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
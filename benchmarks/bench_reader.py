@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口读取方式 CPU占用与延迟 基准测试
+
+用 pty 对模拟串口：写线程按固定速率发送带发送时间戳的行，
+分别用原来的 in_waiting + sleep 轮询和 SerialReader 接收，
+统计接收线程的CPU占用和每行的 发送->解析 延迟。
+
+用法: python benchmarks/bench_reader.py [行/秒] [秒数]
+"""
+
+import os
+import sys
+import threading
+import time
+import tty
+
+import serial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import SerialReader
+
+
+def writer(fd, rate, duration, stop):
+    """按固定速率写入 AUDIO_PACKET 行，行内携带发送时间"""
+    interval = 1.0 / rate
+    deadline = time.perf_counter() + duration
+    next_send = time.perf_counter()
+    while time.perf_counter() < deadline and not stop.is_set():
+        line = 'AUDIO_PACKET:{"sent": %.9f, "angle": 90, "intensity": 12}\r\n' % time.perf_counter()
+        os.write(fd, line.encode())
+        next_send += interval
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def parse_sent(line):
+    start = line.index(b'"sent": ') + 8
+    return float(line[start:line.index(b',', start)])
+
+
+def poll_loop(ser, sleep, latencies, stop):
+    """原接收器的轮询写法"""
+    while not stop.is_set():
+        if ser.in_waiting > 0:
+            line = ser.readline()
+            if line.startswith(b'AUDIO_PACKET:'):
+                latencies.append(time.perf_counter() - parse_sent(line))
+        time.sleep(sleep)
+
+
+def reader_loop(ser, latencies, stop):
+    reader = SerialReader(ser, timeout=0.05)
+    while not stop.is_set():
+        for line in reader.poll() or ():
+            if line.startswith(b'AUDIO_PACKET:'):
+                latencies.append(time.perf_counter() - parse_sent(line))
+
+
+def run_case(name, target, rate, duration):
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    ser = serial.Serial(os.ttyname(slave), 115200, timeout=1)
+    latencies = []
+    stop = threading.Event()
+    cpu = {}
+
+    def receive():
+        start = time.thread_time()
+        target(ser, latencies, stop)
+        cpu['used'] = time.thread_time() - start
+
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    start = time.perf_counter()
+    writer(master, rate, duration, stop)
+    time.sleep(0.1)  # 等待最后几行被读走
+    stop.set()
+    receiver.join()
+    wall = time.perf_counter() - start
+
+    ser.close()
+    os.close(slave)
+    os.close(master)
+
+    latencies.sort()
+    count = len(latencies)
+    p50 = latencies[count // 2] * 1000 if count else 0
+    p99 = latencies[min(count - 1, int(count * 0.99))] * 1000 if count else 0
+    print(f"{name:<22}{count:>8}{cpu['used'] / wall * 100:>10.2f}%{p50:>12.3f}{p99:>12.3f}")
+
+
+def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    print(f"发送速率: {rate} 行/秒, 时长: {duration} 秒")
+    print("=" * 64)
+    print(f"{'接收方式':<18}{'行数':>8}{'CPU':>11}{'p50延迟ms':>12}{'p99延迟ms':>12}")
+    run_case("轮询 sleep(0.01)",
+             lambda ser, lat, stop: poll_loop(ser, 0.01, lat, stop), rate, duration)
+    run_case("轮询 sleep(0.001)",
+             lambda ser, lat, stop: poll_loop(ser, 0.001, lat, stop), rate, duration)
+    run_case("SerialReader", reader_loop, rate, duration)
+
+
+if __name__ == "__main__":
+    main()
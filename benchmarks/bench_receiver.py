@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接收器负载测试
+
+用虚拟设备（maix_audio.simulator）驱动 Receiver，逐级提高事件率，
+统计接收到的事件数、解析错误、设备端因主机来不及读取而丢弃的事件数
+和接收线程的CPU占用。可注入乱码、截断和突发。
+
+主机端按序列号统计的丢失应与设备端的溢出丢弃（加上被破坏无法解析的事件）一致；
+延迟为高出最小延迟的部分（见 maix_audio/streamstats.py），链路饱和时 p99 明显上升。
+
+用法: python benchmarks/bench_receiver.py [--binary] [--baud N|0] [--seconds S]
+                                          [--garble P] [--truncate P] [--rates 10,100,...]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import MetricsSink, Receiver
+from maix_audio.simulator import VirtualDevice
+
+
+def run_case(rate, args):
+    device = VirtualDevice(rate=rate, binary=args.binary, baudrate=args.baud or None,
+                           autostart=False, tx_buffer=args.tx_buffer, garble=args.garble,
+                           truncate=args.truncate, burst_every=args.burst_every,
+                           burst_size=args.burst_size)
+    device.start()
+    metrics = MetricsSink()
+    receiver = Receiver(device.port, binary=args.binary, sinks=[metrics])
+    receiver.connect()
+    cpu = {}
+
+    def receive():
+        start = time.thread_time()
+        receiver.receive()
+        cpu['used'] = time.thread_time() - start
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    time.sleep(0.2)  # 接收器打开串口后再开始发送
+    device.start_script()
+    start = time.perf_counter()
+    time.sleep(args.seconds)
+    device.running_script = False
+    deadline = time.perf_counter() + 10
+    while device.pending and time.perf_counter() < deadline:
+        time.sleep(0.05)  # 等待发送缓冲排空
+    time.sleep(0.3)
+    elapsed = time.perf_counter() - start
+    receiver.stop()
+    thread.join()
+    receiver.disconnect()
+    device.stop()
+
+    parser = receiver.parser
+    stream = receiver.stats.snapshot().get(None, {})
+    latency = stream.get("latency_ms", {})
+    return {
+        "lost": stream.get("lost", 0),
+        "p50": latency.get("p50", 0.0),
+        "p99": latency.get("p99", 0.0),
+        "sent": device.sent,
+        "overruns": device.overruns,
+        "faults": device.garbled + device.truncated,
+        "received": metrics.detections,
+        "parse_errors": parser.parse_errors + (parser.decoder.crc_errors if args.binary else 0),
+        "cpu": cpu['used'] / elapsed * 100,
+        "bytes": device.bytes_out,
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description='接收器负载测试')
+    ap.add_argument('--binary', action='store_true')
+    ap.add_argument('--baud', type=int, default=0, help='模拟波特率，0 表示不限速')
+    ap.add_argument('--seconds', type=float, default=3.0)
+    ap.add_argument('--garble', type=float, default=0.0)
+    ap.add_argument('--truncate', type=float, default=0.0)
+    ap.add_argument('--burst-every', type=float, default=None)
+    ap.add_argument('--burst-size', type=int, default=50)
+    ap.add_argument('--tx-buffer', type=int, default=65536)
+    ap.add_argument('--rates', default='10,100,500,1000,2000')
+    args = ap.parse_args()
+
+    print(f"协议: {'二进制帧' if args.binary else '文本'} | 波特率: {args.baud or '不限'} | "
+          f"乱码 {args.garble:.0%} 截断 {args.truncate:.0%}")
+    print("=" * 96)
+    print(f"{'事件/秒':>8}{'发送':>8}{'溢出丢弃':>10}{'注入故障':>10}{'接收':>8}"
+          f"{'解析错误':>10}{'主机丢失':>10}{'延迟p50':>9}{'p99':>9}{'吞吐 KB/s':>12}{'接收CPU':>9}")
+    for rate in (float(r) for r in args.rates.split(',')):
+        r = run_case(rate, args)
+        print(f"{rate:>8.0f}{r['sent']:>8}{r['overruns']:>10}{r['faults']:>10}{r['received']:>8}"
+              f"{r['parse_errors']:>10}{r['lost']:>10}{r['p50']:>7.1f}ms{r['p99']:>7.1f}ms"
+              f"{r['bytes'] / r['elapsed'] / 1024:>12.1f}{r['cpu']:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
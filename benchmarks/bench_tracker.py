@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+声源跟踪基准测试
+
+模拟一个人绕阵列走动（恒定角速度），第二个场景再加一个间歇出现的固定声源。
+检测角度按设备的做法量化到30度，偶尔落到相邻方向，另有一部分检测是随机方向的
+反射。比较原始检测和跟踪输出相对真实角度的误差、确认的轨迹数和吞吐量。
+
+用法: python benchmarks/bench_tracker.py [秒数]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import ANGLE_MAP, DetectionEvent
+from maix_audio.tracker import SourceTracker, TrackerSink, wrap_angle
+
+EVENT_RATE = 20.0     # 事件/秒
+REFLECTIONS = 0.1     # 反射比例
+NEIGHBOR_ERROR = 0.2  # 落到相邻方向的比例
+
+
+def make_trace(duration, sources=2, seed=1):
+    """
+    Returns:
+        (时间, 检测角度, 真实角度, 是否反射)
+    """
+    rng = np.random.default_rng(seed)
+    count = int(duration * EVENT_RATE)
+    t = np.sort(rng.uniform(0, duration, count))
+    truth = (20.0 * t) % 360.0
+    if sources > 1:
+        # 固定声源每20秒出现10秒，与走动的人交替发声
+        fixed = 200.0 + 5.0 * np.sin(t / 10.0)
+        use_fixed = (t % 20.0 < 10.0) & (rng.random(count) < 0.5)
+        truth = np.where(use_fixed, fixed, truth)
+
+    measured = np.round(truth / 30.0) % 12 * 30.0
+    neighbor = rng.random(count) < NEIGHBOR_ERROR
+    measured[neighbor] += rng.choice([-30.0, 30.0], neighbor.sum())
+    reflection = rng.random(count) < REFLECTIONS
+    measured[reflection] = rng.integers(0, 12, reflection.sum()) * 30.0
+    return t, measured % 360.0, truth, reflection
+
+
+def run(name, duration, sources):
+    t, measured, truth, reflection = make_trace(duration, sources)
+    tracker = SourceTracker()
+    start = time.perf_counter()
+    results = [tracker.update(a, ti) for a, ti in zip(measured.tolist(), t.tolist())]
+    elapsed = time.perf_counter() - start
+
+    tracked_err = []
+    votes = {}  # 每条轨迹中反射检测和真实检测的次数
+    for i, result in enumerate(results):
+        if result is None:
+            continue
+        counts = votes.setdefault(result[0], [0, 0])
+        counts[bool(reflection[i])] += 1
+        if not reflection[i]:
+            tracked_err.append(abs(wrap_angle(result[1] - truth[i])))
+    spurious = sum(1 for real, refl in votes.values() if refl > real)
+
+    raw_err = np.abs(wrap_angle(measured - truth))[~reflection]
+    tracked_err = np.array(tracked_err)
+    print(f"{name}: {len(t)} 次检测, 其中反射 {reflection.sum()}")
+    print(f"  原始检测   平均误差 {raw_err.mean():6.2f}°  p95 {np.percentile(raw_err, 95):6.2f}°")
+    print(f"  跟踪输出   平均误差 {tracked_err.mean():6.2f}°  p95 "
+          f"{np.percentile(tracked_err, 95):6.2f}°  (输出 {tracker.updates} 次)")
+    print(f"  确认的轨迹 {len(votes)} 条, 其中以反射为主 {spurious} 条")
+    print(f"  SourceTracker {len(t) / elapsed:,.0f} 事件/秒")
+    return t, measured
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 600.0
+    print(f"时长 {duration:.0f}s, 峰值事件率约 {EVENT_RATE:.0f}/秒")
+    print("=" * 60)
+    run("单声源（绕阵列走动）", duration, 1)
+    t, measured = run("双声源（走动 + 间歇固定声源）", duration, 2)
+
+    # 经 TrackerSink 处理 DetectionEvent
+    sink = TrackerSink()
+    events = [DetectionEvent(ti, ti, int(a), 10, ANGLE_MAP.index(int(a)), [10] * 12)
+              for a, ti in zip(measured.tolist(), t.tolist())]
+    start = time.perf_counter()
+    for event in events:
+        sink.handle(event)
+    elapsed = time.perf_counter() - start
+    print(f"TrackerSink: {len(events) / elapsed:,.0f} 事件/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多阵列定位测试
+
+在几种阵列布局中随机放置声源，按阵列朝向算出每个阵列的方位，加上误差后生成
+各设备的 DetectionEvent（时间带抖动，部分设备漏检），按时间顺序交给 Triangulator，
+与真实位置比较。
+
+方位误差: gauss 为高斯误差（主机端连续角度估计），device 为设备的30度量化
+（外加少量高斯误差）。
+
+统计: 定位比例、误差中位数 / p90、声称的均方根误差、真实位置落在声称的
+95% 误差椭圆内的比例、批量求解和流式对齐的吞吐。
+
+用法: python benchmarks/bench_triangulation.py [--sources N] [--dropout P] [--jitter S]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio import DetectionEvent
+from maix_audio.triangulation import DEVICE_SIGMA, Triangulator, triangulate
+
+GEOMETRIES = {
+    "两阵列": {'a': (0.0, 0.0, 0.0), 'b': (6.0, 0.0, 90.0)},
+    "三角形": {'a': (0.0, 0.0, 30.0), 'b': (6.0, 0.0, 150.0), 'c': (3.0, 5.0, 270.0)},
+    "正方形": {'a': (0.0, 0.0, 0.0), 'b': (8.0, 0.0, 90.0), 'c': (8.0, 8.0, 180.0),
+            'd': (0.0, 8.0, 270.0)},
+}
+NOISE = {"gauss": 3.0, "device": DEVICE_SIGMA}
+SPACING = 0.2       # 声音间隔（秒），大于对齐窗口
+CHI2_95 = 5.991     # 2自由度卡方分布的95%分位数
+
+
+def make_sources(arrays, count, rng):
+    poses = np.array(list(arrays.values()))
+    low = poses[:, :2].min(axis=0)
+    high = poses[:, :2].max(axis=0)
+    if (high - low).min() < 1.0:
+        high = np.maximum(high, low + 4.0)
+        low = np.minimum(low, high - 8.0)
+    # 两阵列时在基线一侧取点，离基线太近的方位线近乎平行
+    margin = 0.5
+    sources = rng.uniform(low + margin, high - margin, (count, 2))
+    if len(arrays) == 2:
+        sources[:, 1] = rng.uniform(1.0, 6.0, count)
+    return sources
+
+
+def make_events(arrays, sources, noise, dropout, jitter, rng):
+    events = []
+    for device, (x, y, rotation) in arrays.items():
+        truth = np.rad2deg(np.arctan2(sources[:, 1] - y, sources[:, 0] - x))
+        local = (truth - rotation) % 360.0
+        if noise == "device":
+            measured = np.round(local / 30.0) % 12 * 30.0
+            measured = measured + rng.normal(0, 1.0, len(local))
+        else:
+            measured = local + rng.normal(0, NOISE[noise], len(local))
+        measured %= 360.0
+        times = np.arange(len(sources)) * SPACING + rng.normal(0, jitter, len(sources))
+        heard = rng.random(len(sources)) >= dropout
+        for t, angle in zip(times[heard].tolist(), measured[heard].tolist()):
+            event = DetectionEvent(t, t, int(round(angle / 30.0)) % 12 * 30, 10, 0, [],
+                                   device=device)
+            event.bearing = angle
+            events.append(event)
+    events.sort(key=lambda e: e.timestamp)
+    return events
+
+
+def run_case(name, noise, args, rng):
+    arrays = GEOMETRIES[name]
+    sources = make_sources(arrays, args.sources, rng)
+    events = make_events(arrays, sources, noise, args.dropout, args.jitter, rng)
+    triangulator = Triangulator(arrays, window=0.05, latency=0.1, sigma=NOISE[noise])
+
+    start = time.perf_counter()
+    positions = []
+    for event in events:
+        positions.extend(triangulator.add(event))
+    positions.extend(triangulator.flush())
+    stream = time.perf_counter() - start
+
+    errors = []
+    claimed = []
+    inside = 0
+    for p in positions:
+        k = int(round(p.timestamp / SPACING))
+        if not 0 <= k < len(sources):
+            continue
+        d = np.array([p.x, p.y]) - sources[k]
+        cov = np.array([[p.var_x, p.cov_xy], [p.cov_xy, p.var_y]])
+        errors.append(float(np.hypot(*d)))
+        claimed.append(p.error)
+        inside += float(d @ np.linalg.solve(cov, d)) <= CHI2_95
+    errors = np.array(errors)
+    return {
+        "located": len(errors) / len(sources),
+        "p50": np.median(errors) if len(errors) else float('nan'),
+        "p90": np.percentile(errors, 90) if len(errors) else float('nan'),
+        "claimed": np.median(claimed) if claimed else float('nan'),
+        "inside": inside / max(len(errors), 1),
+        "stream": triangulator.groups / stream,
+    }
+
+
+def batch_throughput(count, rng):
+    """三角形布局下一次求解 count 组的速度（组/秒）"""
+    arrays = GEOMETRIES["三角形"]
+    poses = np.array(list(arrays.values()))
+    sources = make_sources(arrays, count, rng)
+    angles = np.rad2deg(np.arctan2(sources[:, None, 1] - poses[None, :, 1],
+                                   sources[:, None, 0] - poses[None, :, 0]))
+    angles += rng.normal(0, 3.0, angles.shape)
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        triangulate(poses[:, :2], angles, sigma=3.0)
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def main():
+    ap = argparse.ArgumentParser(description='多阵列定位测试')
+    ap.add_argument('--sources', type=int, default=2000, help='每种情况的声源数')
+    ap.add_argument('--dropout', type=float, default=0.1, help='每个阵列漏检的比例')
+    ap.add_argument('--jitter', type=float, default=0.005, help='检测时间抖动（秒）')
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"声源: {args.sources} | 漏检: {args.dropout:.0%} | 时间抖动: {args.jitter * 1000:.0f}ms")
+    print("=" * 86)
+    print(f"{'布局':<6}{'方位误差':<10}{'定位':>8}{'误差p50':>10}{'p90':>9}{'声称误差':>10}"
+          f"{'95%椭圆内':>11}{'流式组/秒':>12}")
+    for name in GEOMETRIES:
+        for noise in NOISE:
+            r = run_case(name, noise, args, rng)
+            print(f"{name:<6}{noise:<10}{r['located']:>8.1%}{r['p50']:>9.2f}m{r['p90']:>8.2f}m"
+                  f"{r['claimed']:>9.2f}m{r['inside']:>11.1%}{r['stream']:>12.0f}")
+    print(f"批量求解（三角形布局）: {batch_throughput(100000, rng):.0f} 组/秒")
+
+
+if __name__ == "__main__":
+    main()
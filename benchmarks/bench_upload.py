@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本上传方式基准测试
+
+在虚拟设备（maix_audio.simulator，按波特率限速）上比较:
+    逐行 f.write   MaixPyController.upload_script_by_lines（原来的方式）
+    原始 REPL      RawRepl.upload，base64 分块 + 每块应答
+    原始粘贴模式   同上，设备支持原始粘贴模式时使用窗口流控
+
+以及 RawRepl.sync 按内容同步（进入原始 REPL 到回到普通 REPL 的总耗时）:
+    首次上传 / 未变化 / 修改参数（长度不变）/ 插入一行（之后的块全部错位）/ 末尾追加
+测试脚本约300行，末尾附加含引号、反斜杠、\\r 和非ASCII字符的行，
+检查设备上的文件是否与原文一致。
+
+用法: python benchmarks/bench_upload.py [行数] [--baud N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maix_audio.repl import RawRepl
+from maix_audio.simulator import VirtualDevice
+from maixpy_controller import MaixPyController
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH = '/flash/bench.py'
+EDGE_CASES = (
+    "s1 = 'it\\'s'",
+    's2 = "C:\\\\maix\\\\new"',
+    "s3 = '''多行\r\n字符串'''",
+    "s4 = '\\\\' + \"\\\\n\"",
+)
+
+
+def make_script(lines):
+    with open(os.path.join(ROOT, 'hardware', 'demo_mic_array.py'), encoding='utf-8') as f:
+        source = f.read().split('\n')
+    body = []
+    while len(body) < lines - len(EDGE_CASES):
+        body.extend(source)
+    return '\n'.join(body[:lines - len(EDGE_CASES)] + list(EDGE_CASES)) + '\n'
+
+
+def by_lines(device, script):
+    controller = MaixPyController(device.port)
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.connect()
+        start = time.perf_counter()
+        controller.upload_script_by_lines(script, PATH)
+        elapsed = time.perf_counter() - start
+        controller.disconnect()
+    return elapsed
+
+
+def by_raw_repl(device, script):
+    controller = MaixPyController(device.port)
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.connect()
+    repl = RawRepl(controller.ser)
+    start = time.perf_counter()
+    repl.upload(PATH, script.encode('utf-8'))
+    elapsed = time.perf_counter() - start
+    repl.exit()
+    repl.close()
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.disconnect()
+    return elapsed
+
+
+def by_sync(device, script):
+    controller = MaixPyController(device.port)
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.connect()
+    repl = RawRepl(controller.ser)
+    start = time.perf_counter()
+    result = repl.sync(PATH, script.encode('utf-8'))
+    repl.exit()
+    elapsed = time.perf_counter() - start
+    repl.close()
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.disconnect()
+    return elapsed, result
+
+
+def sync_cases(script):
+    lines = script.split('\n')
+    middle = len(lines) // 2
+    inserted = lines[:middle] + ['THRESHOLD_OVERRIDE = 8'] + lines[middle:]
+    return (
+        ("首次上传", None, script),
+        ("未变化", script, script),
+        ("修改参数", script, script.replace('SOUND_THRESHOLD = 5', 'SOUND_THRESHOLD = 8', 1)),
+        ("插入一行", script, '\n'.join(inserted)),
+        ("末尾追加", script, script + 'print("done")\n'),
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description='脚本上传基准测试')
+    ap.add_argument('lines', nargs='?', type=int, default=300)
+    ap.add_argument('--baud', type=int, default=115200)
+    args = ap.parse_args()
+
+    script = make_script(args.lines)
+    data = script.encode('utf-8')
+    print(f"脚本: {args.lines} 行, {len(data)} 字节 | 波特率: {args.baud}")
+    print("=" * 60)
+    print(f"{'方式':<14}{'耗时':>10}{'字节/秒':>12}{'内容一致':>10}")
+    cases = (
+        ("逐行 f.write", by_lines, False),
+        ("原始 REPL", by_raw_repl, False),
+        ("原始粘贴模式", by_raw_repl, True),
+    )
+    for name, upload, raw_paste in cases:
+        device = VirtualDevice(baudrate=args.baud, raw_paste=raw_paste)
+        device.start()
+        try:
+            elapsed = upload(device, script)
+            ok = device.files.get(PATH) == data
+        finally:
+            device.stop()
+        print(f"{name:<14}{elapsed:>9.2f}s{len(data) / elapsed:>12.0f}{'是' if ok else '否':>10}")
+
+    print()
+    print(f"{'按内容同步':<14}{'耗时':>10}{'传输字节':>12}{'内容一致':>10}")
+    for name, existing, new in sync_cases(script):
+        device = VirtualDevice(baudrate=args.baud)
+        if existing is not None:
+            device.files[PATH] = existing.encode('utf-8')
+        device.start()
+        try:
+            elapsed, result = by_sync(device, new)
+            ok = device.files.get(PATH) == new.encode('utf-8') and PATH + '.tmp' not in device.files
+        finally:
+            device.stop()
+        print(f"{name:<14}{elapsed:>9.2f}s{result.sent:>12}{'是' if ok else '否':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热力图显示测试
+
+在 dummy 视频驱动下（不需要显示器）不限帧率地连续绘制热力图，比较:
+
+    整帧重画  每帧用查找表映射整张图，放大后 blit，重画极坐标面板，提交整个窗口
+              （与 network/demo_socket_pic_server.py 每帧重新载入整张图相同）
+    增量      HeatmapViewer：原地更新颜色数组，只填充并提交变化的格子，
+              极坐标面板只在方向强度变化时重画
+
+dummy 驱动下提交窗口几乎不花时间，真实显示器上的代价按每帧提交的像素数估计。
+热力图: blob 为缓慢移动的声源加少量噪声（大部分格子不变），random 为每格随机（最坏情况）。
+
+用法: python benchmarks/bench_viewer.py [--frames N] [--cell PX]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+
+from maix_audio import DetectionEvent
+from maix_audio.viewer import GRID, RAINBOW, HeatmapViewer
+
+REPEAT = 3
+
+
+def blob_maps(count, seed=1):
+    """缓慢绕圈移动的声源，背景为 0，边缘有少量量化噪声"""
+    rng = np.random.default_rng(seed)
+    coords = np.arange(GRID) - 7.5
+    y, x = np.meshgrid(coords, coords, indexing='ij')
+    maps = []
+    for i in range(count):
+        theta = i * 0.02
+        cx, cy = 5 * np.cos(theta), 5 * np.sin(theta)
+        level = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / 6.0) * 255
+        level += rng.normal(0, 2, level.shape)
+        level[level < 16] = 0
+        maps.append(np.clip(level, 0, 255).astype(np.uint8))
+    return maps
+
+
+def random_maps(count, seed=1):
+    rng = np.random.default_rng(seed)
+    return list(rng.integers(0, 256, (count, GRID, GRID), dtype=np.uint8))
+
+
+def make_events(maps):
+    events = []
+    for i, m in enumerate(maps):
+        # 方向强度每 4 帧变化一次
+        directions = [int(v) for v in np.roll(np.arange(12), i // 4)]
+        events.append(DetectionEvent(i, i, 0, max(directions), 0, directions, i, i,
+                                     m.tobytes()))
+    return events
+
+
+class FullRedrawViewer(HeatmapViewer):
+    """每帧整张重画并提交整个窗口"""
+
+    def update_map(self, audio_map):
+        values = np.frombuffer(audio_map, dtype=np.uint8).reshape(GRID, GRID)
+        pygame.surfarray.blit_array(self.small, RAINBOW[values].transpose(1, 0, 2))
+        pygame.transform.scale(self.small, self.map_rect.size, self.large)
+        self.screen.blit(self.large, self.map_rect)
+        self.cells_drawn += GRID * GRID
+        return GRID * GRID
+
+    def update_polar(self, directions, bearing=None):
+        self._directions = None
+        super().update_polar(directions, bearing)
+
+    def present(self):
+        self._dirty = [self.screen.get_rect()]
+        super().present()
+
+
+class CountingViewer(HeatmapViewer):
+    """统计每帧提交给 display.update() 的像素"""
+
+    pixels = 0
+
+    def present(self):
+        self.pixels += sum(rect.w * rect.h for rect in self._dirty)
+        super().present()
+
+
+def run(viewer_class, events, cell):
+    viewer = viewer_class(cell=cell, fps=0, headless=True)
+    viewer.pixels = 0
+    start = time.perf_counter()
+    for event in events:
+        viewer.on_detection(event)
+    elapsed = time.perf_counter() - start
+    if viewer_class is FullRedrawViewer:
+        viewer.pixels = viewer.screen.get_width() * viewer.screen.get_height() * len(events)
+    viewer.close()
+    return elapsed, viewer.cells_drawn, viewer.pixels
+
+
+def main():
+    ap = argparse.ArgumentParser(description='热力图显示测试')
+    ap.add_argument('--frames', type=int, default=3000)
+    ap.add_argument('--cell', type=int, default=20, help='格子边长（像素）')
+    args = ap.parse_args()
+
+    print(f"帧数: {args.frames} | 格子: {args.cell}px | "
+          f"窗口: {GRID * args.cell * 2}x{GRID * args.cell} | 视频驱动: dummy")
+    print("=" * 72)
+    print(f"{'热力图':<8}{'方式':<10}{'帧/秒':>10}{'每帧ms':>10}{'重画格子':>10}{'提交像素':>12}")
+    for name, maps in (("blob", blob_maps(args.frames)), ("random", random_maps(args.frames))):
+        events = make_events(maps)
+        for label, viewer_class in (("整帧重画", FullRedrawViewer), ("增量", CountingViewer)):
+            elapsed, cells, pixels = min(run(viewer_class, events, args.cell)
+                                         for _ in range(REPEAT))
+            print(f"{name:<8}{label:<10}{len(events) / elapsed:>10.0f}"
+                  f"{elapsed / len(events) * 1000:>10.3f}{cells / len(events):>10.1f}"
+                  f"{pixels / len(events):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import lcd
 import time
 import json
 import binascii
+import struct
 
 # 角度映射：12个LED对应的角度（度）
 ANGLE_MAP = [0, 30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330]
@@ -13,6 +14,346 @@ SOUND_THRESHOLD = 5
 # 是否传输原始音频数据
 SEND_RAW_AUDIO = True
 
+# 是否使用二进制帧协议（主机端需以 --binary 模式接收，格式见 maix_audio/protocol.py）
+# 文本模式每次检测约2KB，二进制模式带热力图282字节，不带26字节，压缩热力图见下
+BINARY_PROTOCOL = False
+
+# 二进制模式下压缩热力图：每 KEYFRAME_INTERVAL 帧一个关键帧（整图RLE），
+# 其余帧发送与上一张图的 XOR 差分再RLE，主机端解码见 maix_audio/mapcodec.py
+COMPRESS_MAPS = True
+KEYFRAME_INTERVAL = 30
+
+# 每次循环都发送热力图帧（不论是否超过阈值），用于主机端连续显示热力图
+STREAM_MAPS = False
+
+# 启动时与主机协商的REPL串口波特率（主机端 maix_audio/link.py），None 表示保持 115200
+# 主机没有响应或测试图样不一致时约1秒后退回 115200
+LINK_BAUDRATE = 921600
+
+# 每次循环检查主机的时钟同步请求 SYNC:<id>，回复 CLOCK:<id>:<收到时tick>:<回复时tick>
+# （主机端 maix_audio/clocksync.py），主机据此把事件的 tick 换算成主机时间
+CLOCK_SYNC = True
+
+# LCD 刷新与检测分开：检测和发送每次 get_map 都执行，LCD 最多每 DISPLAY_INTERVAL_MS
+# 刷新一次（0 表示每次循环都刷新），DISPLAY_ON_CHANGE 时热力图没有变化就不刷新
+DISPLAY_INTERVAL_MS = 200
+DISPLAY_ON_CHANGE = True
+
+# 每 TIMING_INTERVAL_MS 输出一行 TIMING:{json}，各阶段累计耗时（微秒）和循环次数，
+# None 表示不输出
+TIMING_INTERVAL_MS = 5000
+
+# 由单独的线程（_thread）格式化并发送检测数据：主循环只把数据复制到预先分配的
+# TX_BUFFERS 个缓冲中，串口阻塞时照常调用 get_map()；链路跟不上时丢弃最旧的
+# 未发送数据，TIMING 中的 dropped 为累计丢弃数，主机端表现为序列号缺口
+TX_THREAD = True
+TX_BUFFERS = 8
+
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_VERSION = 1
+FRAME_DETECTION = 1
+FRAME_MAP_KEY = 2
+FRAME_MAP_DELTA = 3
+
+
+def generate_crc16_table():
+    crc_table = []
+    for byte in range(256):
+        crc = 0x0000
+        for _ in range(8):
+            if (byte ^ crc) & 0x0001:
+                crc = (crc >> 1) ^ 0xa001
+            else:
+                crc >>= 1
+            byte >>= 1
+        crc_table.append(crc)
+    return crc_table
+
+
+def crc16(data, start, end):
+    crc = 0xFFFF
+    table = CRC16_TABLE
+    for i in range(start, end):
+        crc = (crc >> 8) ^ table[(crc ^ data[i]) & 0xFF]
+    return crc
+
+
+def encode_frame(seq, tick, directions, payload, ftype=FRAME_DETECTION):
+    # 帧头: 同步字, 版本, 类型, 序列号, tick, 12个方向强度, 负载长度
+    dirs = bytes([v if v < 255 else 255 for v in directions])
+    plen = len(payload) if payload else 0
+    body = struct.pack('<2sBBHI12sH', FRAME_SYNC, FRAME_VERSION, ftype,
+                       seq & 0xFFFF, tick & 0xFFFFFFFF, dirs, plen)
+    if plen:
+        body += bytes(payload)
+    return body + struct.pack('<H', crc16(body, 2, len(body)))
+
+
+def rle_encode(data):
+    # PackBits风格: c<128 后跟c+1个原样字节, c>=128 下一字节重复c-126次
+    out = bytearray()
+    n = len(data)
+    i = 0
+    while i < n:
+        value = data[i]
+        j = i + 1
+        while j < n and j - i < 129 and data[j] == value:
+            j += 1
+        if j - i >= 2:
+            out.append(j - i + 126)
+            out.append(value)
+            i = j
+            continue
+        j = i + 1
+        while j < n and j - i < 128 and not (j + 1 < n and data[j] == data[j + 1]):
+            j += 1
+        out.append(j - i - 1)
+        out.extend(data[i:j])
+        i = j
+    return out
+
+
+def wait_for(uart, expected, timeout_ms):
+    # 从串口读取直到收到 expected，超时返回 False
+    buf = b''
+    start = time.ticks_ms()
+    while time.ticks_diff(time.ticks_ms(), start) < timeout_ms:
+        data = uart.read()
+        if data:
+            buf += data
+            if expected in buf:
+                return True
+        else:
+            time.sleep_ms(5)
+    return False
+
+
+def negotiate_link(rate):
+    # 请求 -> 切换 -> 回送主机的测试图样 -> 等待 LINK_OK，失败时退回 115200
+    from machine import UART
+    uart = UART.repl_uart()
+    pattern = bytes([b for b in range(256) if b != 3])
+    print("LINK_BAUD:%d" % rate)
+    time.sleep_ms(100)  # 等请求发送完成、主机切换
+    uart.init(rate, 8, None, 1, read_buf_len=4096)
+    if wait_for(uart, pattern, 1000):
+        uart.write(pattern)
+        if wait_for(uart, b'LINK_OK', 500):
+            print("LINK_READY:%d" % rate)
+            return rate
+    uart.init(115200, 8, None, 1, read_buf_len=4096)
+    print("LINK_READY:115200")
+    return 115200
+
+
+sync_uart = None
+sync_buf = b''
+
+
+def poll_clock_sync():
+    # 不阻塞地读取串口，对每个完整的 SYNC 请求立即回复
+    global sync_uart, sync_buf
+    if sync_uart is None:
+        from machine import UART
+        sync_uart = UART.repl_uart()
+    data = sync_uart.read()
+    if not data:
+        return
+    t2 = time.ticks_ms()
+    sync_buf += data
+    while b'\n' in sync_buf:
+        line, sync_buf = sync_buf.split(b'\n', 1)
+        index = line.find(b'SYNC:')
+        if index >= 0:
+            # 回复时的 tick 在真正输出时才取（见 format_line）
+            emit_line((line[index + 5:].strip().decode(), t2))
+    if len(sync_buf) > 64:
+        sync_buf = b''
+
+
+def new_slot():
+    # 发送缓冲: [热力图, 12个方向强度, 序列号, tick, 时间戳, 是否带热力图]
+    return [bytearray(256), [0] * 12, 0, 0, 0.0, False]
+
+
+def fill_slot(slot, imga, directions, seq):
+    data = imga.data if SEND_RAW_AUDIO else None
+    if data:
+        slot[0][:] = data
+    slot[1][:] = directions
+    slot[2] = seq
+    slot[3] = time.ticks_ms()   # 取得数据时的 tick，而不是发送时
+    slot[4] = time.time()
+    slot[5] = bool(data)
+
+
+def send_slot(slot):
+    global last_sent_seq
+    audio_map, direction_intensities, seq, tick, timestamp, has_map = slot
+    if BINARY_PROTOCOL:
+        payload = audio_map if has_map else None
+        ftype = FRAME_DETECTION
+        if payload and COMPRESS_MAPS:
+            ftype, payload = encode_map(payload, seq)
+        frame_out.write(encode_frame(seq, tick, direction_intensities, payload, ftype))
+        last_sent_seq = seq
+        return
+
+    max_intensity = max(direction_intensities)
+    max_direction = direction_intensities.index(max_intensity)
+    max_angle = ANGLE_MAP[max_direction]
+    print("检测到声音! 角度: %d度 | 强度: %d | 方向: %d | 详细数据: %s" % (max_angle, max_intensity, max_direction, str(direction_intensities)))
+
+    # 准备传输数据
+    data_packet = {
+        "type": "audio_detection",
+        "timestamp": timestamp,
+        "seq": seq,         # 主机端据此统计丢失、重复和乱序
+        "tick": tick,       # 毫秒计时，主机端据此估计延迟（time.time() 没有RTC时不可靠）
+        "angle": max_angle,
+        "intensity": max_intensity,
+        "direction": max_direction,
+        "all_directions": direction_intensities,
+        "audio_map": list(audio_map) if has_map else None
+    }
+
+    # 通过串口发送JSON数据
+    json_str = json.dumps(data_packet)
+    print("AUDIO_PACKET:" + json_str)
+
+    # 如果需要发送原始音频数据（16x16字节数组）
+    if has_map:
+        # 将音频热力图数据转换为十六进制字符串
+        audio_hex = binascii.hexlify(audio_map).decode('ascii')
+        print("RAW_AUDIO:" + audio_hex)
+
+
+tx_lock = None
+tx_slots = []
+tx_free = []    # 空闲缓冲的下标
+tx_queue = []   # 等待发送的缓冲下标，按先后顺序
+tx_lines = []   # 主循环交给发送线程输出的文本行（TIMING、CLOCK 回复）
+TX_LINES_MAX = 16
+tx_dropped = 0
+tx_us = 0
+tx_running = True   # 脚本结束时置为 False，发送线程退出
+
+
+def queue_detection(imga, directions, seq):
+    # 采集线程：取一个空闲缓冲，没有空闲时丢弃最旧的未发送数据
+    global tx_dropped
+    tx_lock.acquire()
+    if tx_free:
+        index = tx_free.pop()
+    else:
+        # 丢弃后序列号不连续，发送线程会把下一张图发成关键帧（见 encode_map）
+        index = tx_queue.pop(0)
+        tx_dropped += 1
+    tx_lock.release()
+    fill_slot(tx_slots[index], imga, directions, seq)
+    tx_lock.acquire()
+    tx_queue.append(index)
+    tx_lock.release()
+
+
+def format_line(item):
+    # 文本行；时钟同步回复为 (请求id, 收到时tick)，回复时的 tick 取输出时刻
+    if isinstance(item, tuple):
+        return "CLOCK:%s:%d:%d" % (item[0], item[1], time.ticks_ms())
+    return item
+
+
+def emit_line(item):
+    # 主循环的文本输出。有发送线程时串口只由发送线程写：print 的内容和换行是两次写入，
+    # 两个线程同时输出会把行拆开，或插进 AUDIO_PACKET / RAW_AUDIO 之间、二进制帧之间
+    if not TX_THREAD:
+        print(format_line(item))
+        return
+    tx_lock.acquire()
+    if len(tx_lines) >= TX_LINES_MAX:
+        tx_lines.pop(0)
+    tx_lines.append(item)
+    tx_lock.release()
+
+
+def transmit_loop():
+    # 发送线程：先输出文本行，再按顺序取出缓冲，格式化后写串口，放回空闲列表
+    global tx_us
+    while tx_running:
+        tx_lock.acquire()
+        line = tx_lines.pop(0) if tx_lines else None
+        index = tx_queue.pop(0) if line is None and tx_queue else None
+        tx_lock.release()
+        if line is not None:
+            print(format_line(line))
+            continue
+        if index is None:
+            time.sleep_ms(1)
+            continue
+        start = time.ticks_us()
+        try:
+            send_slot(tx_slots[index])
+        except Exception as e:
+            print("发送失败:", e)
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        tx_lock.acquire()
+        tx_us += elapsed
+        tx_free.append(index)
+        tx_lock.release()
+
+
+map_reference = None
+frames_since_key = 0
+last_sent_seq = None    # 上一个已发送帧的序列号（只在发送线程中读写）
+
+
+def encode_map(audio_map, seq):
+    # 返回 (帧类型, 负载)，差分以上一张已发送的热力图为参考
+    # 与上一个已发送的帧序列号不连续（缓冲满丢弃了未发送的帧）时主机端无法还原差分，
+    # 直接发关键帧，否则要丢到下一个关键帧为止
+    global map_reference, frames_since_key
+    audio_map = bytes(audio_map)
+    gap = last_sent_seq is None or seq != last_sent_seq + 1
+    if map_reference is None or gap or frames_since_key >= KEYFRAME_INTERVAL:
+        payload = rle_encode(audio_map)
+        ftype = FRAME_MAP_KEY
+        if len(payload) >= len(audio_map):
+            payload = audio_map
+            ftype = FRAME_DETECTION
+        frames_since_key = 1
+    else:
+        ref = map_reference
+        payload = rle_encode(bytes([audio_map[i] ^ ref[i] for i in range(len(audio_map))]))
+        ftype = FRAME_MAP_DELTA
+        frames_since_key += 1
+    map_reference = audio_map
+    return ftype, payload
+
+
+if BINARY_PROTOCOL:
+    CRC16_TABLE = generate_crc16_table()
+    try:
+        # 直接写REPL串口，避免print的换行转换
+        from machine import UART
+        frame_out = UART.repl_uart()
+    except Exception:
+        import sys
+        frame_out = sys.stdout
+
+def restore_link():
+    # 脚本结束（Ctrl+C 或出错）时把REPL串口恢复到 115200，主机工具才能重新连接
+    if link_rate != 115200:
+        from machine import UART
+        UART.repl_uart().init(115200, 8, None, 1, read_buf_len=4096)
+
+
+link_rate = 115200
+if LINK_BAUDRATE and LINK_BAUDRATE != 115200:
+    try:
+        link_rate = negotiate_link(LINK_BAUDRATE)
+    except Exception as e:
+        print("波特率协商失败:", e)
+
 print("麦克风阵列初始化中...")
 lcd.init()
 mic.init()
@@ -25,50 +366,104 @@ print("声音强度阈值:", SOUND_THRESHOLD)
 print("等待声音输入...")
 print("=" * 50)
 
+if TX_THREAD:
+    import _thread
+    tx_lock = _thread.allocate_lock()
+    # 发送线程占用一个，至少还要有一个给采集线程
+    tx_slots = [new_slot() for _ in range(max(TX_BUFFERS, 2))]
+    tx_free = list(range(len(tx_slots)))
+    _thread.start_new_thread(transmit_loop, ())
+else:
+    tx_slots = [new_slot()]
+
 loop_count = 0
+frame_seq = 0
+
+# 阶段计时（微秒）: 取热力图, 方向, LED, 发送（TX_THREAD 时为放入缓冲）, LCD
+STAGE_NAMES = ("map", "dir", "led", "send", "display")
+stage_us = [0, 0, 0, 0, 0]
+display_count = 0
+display_skipped = 0
+last_display = None
+last_display_map = None
+timing_start = time.ticks_ms()
+timing_loops = 0
+
+try:
+    while True:
+        loop_count += 1
+        timing_loops += 1
+        t0 = time.ticks_us()
+        imga = mic.get_map()
+        t1 = time.ticks_us()
+        b = mic.get_dir(imga)  # b是包含12个方向强度值的元组
+        t2 = time.ticks_us()
+        a = mic.set_led(b,(0,0,255))
+        t3 = time.ticks_us()
+        stage_us[0] += time.ticks_diff(t1, t0)
+        stage_us[1] += time.ticks_diff(t2, t1)
+        stage_us[2] += time.ticks_diff(t3, t2)
+
+        # 分析声音方向和强度
+        if b:  # 确保有数据
+            direction_intensities = list(b)  # 转换为列表便于处理
+            max_intensity = max(direction_intensities)
+
+            # 当检测到声音强度超过阈值时记录日志和传输数据
+            if max_intensity > SOUND_THRESHOLD or (BINARY_PROTOCOL and STREAM_MAPS):
+                if TX_THREAD:
+                    queue_detection(imga, direction_intensities, frame_seq)
+                else:
+                    slot = tx_slots[0]
+                    fill_slot(slot, imga, direction_intensities, frame_seq)
+                    send_slot(slot)
+                frame_seq += 1
+        t4 = time.ticks_us()
+        stage_us[3] += time.ticks_diff(t4, t3)
+
+        # LCD 在检测和发送之后按间隔刷新
+        now = time.ticks_ms()
+        if last_display is None or time.ticks_diff(now, last_display) >= DISPLAY_INTERVAL_MS:
+            current = bytes(imga.data) if DISPLAY_ON_CHANGE else None
+            if current is None or current != last_display_map:
+                imgb = imga.resize(160,160)
+                imgc = imgb.to_rainbow(1)
+                a = lcd.display(imgc)
+                last_display_map = current
+                display_count += 1
+            else:
+                display_skipped += 1
+            last_display = now
+            stage_us[4] += time.ticks_diff(time.ticks_us(), t4)
+
+        if TIMING_INTERVAL_MS and time.ticks_diff(now, timing_start) >= TIMING_INTERVAL_MS:
+            if tx_lock:
+                tx_lock.acquire()
+            timing = {"ms": time.ticks_diff(now, timing_start), "loops": timing_loops,
+                      "displays": display_count, "skipped": display_skipped,
+                      "tx": tx_us, "dropped": tx_dropped, "queued": len(tx_queue)}
+            tx_us = 0
+            if tx_lock:
+                tx_lock.release()
+            for i in range(len(STAGE_NAMES)):
+                timing[STAGE_NAMES[i]] = stage_us[i]
+                stage_us[i] = 0
+            emit_line("TIMING:" + json.dumps(timing))
+            timing_start = now
+            timing_loops = 0
+            display_count = 0
+            display_skipped = 0
+
+        if CLOCK_SYNC:
+            try:
+                poll_clock_sync()
+            except Exception as e:
+                emit_line("时钟同步失败: %s" % e)
+                CLOCK_SYNC = False
 
-while True:
-    loop_count += 1
-    imga = mic.get_map()
-    b = mic.get_dir(imga)  # b是包含12个方向强度值的元组
-    a = mic.set_led(b,(0,0,255))
-    imgb = imga.resize(160,160)
-    imgc = imgb.to_rainbow(1)
-    a = lcd.display(imgc)
-
-    # 分析声音方向和强度
-    if b:  # 确保有数据
-        direction_intensities = list(b)  # 转换为列表便于处理
-        max_intensity = max(direction_intensities)
-        max_direction = direction_intensities.index(max_intensity)
-        max_angle = ANGLE_MAP[max_direction]
-
-        # 当检测到声音强度超过阈值时记录日志和传输数据
-        if max_intensity > SOUND_THRESHOLD:
-            timestamp = time.time()
-            print("检测到声音! 角度: %d度 | 强度: %d | 方向: %d | 详细数据: %s" % (max_angle, max_intensity, max_direction, str(direction_intensities)))
-
-            # 准备传输数据
-            data_packet = {
-                "type": "audio_detection",
-                "timestamp": timestamp,
-                "angle": max_angle,
-                "intensity": max_intensity,
-                "direction": max_direction,
-                "all_directions": direction_intensities,
-                "audio_map": list(imga.data) if SEND_RAW_AUDIO else None
-            }
-
-            # 通过串口发送JSON数据
-            json_str = json.dumps(data_packet)
-            print("AUDIO_PACKET:" + json_str)
-
-            # 如果需要发送原始音频数据（16x16字节数组）
-            if SEND_RAW_AUDIO and imga.data:
-                # 将音频热力图数据转换为十六进制字符串
-                audio_hex = binascii.hexlify(imga.data).decode('ascii')
-                print("RAW_AUDIO:" + audio_hex)
-
-    # 添加小延时避免日志刷屏
-    time.sleep(0.01)
-mic.deinit()
+        # 添加小延时避免日志刷屏
+        time.sleep(0.01)
+finally:
+    tx_running = False
+    mic.deinit()
+    restore_link()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+MaixPy 麦克风阵列主机端工具包
+"""
+
+from .protocol import (
+    ANGLE_MAP,
+    FRAME_DETECTION,
+    FRAME_MAP_DELTA,
+    FRAME_MAP_KEY,
+    Frame,
+    FrameDecoder,
+    crc16,
+    encode_frame,
+)
+from .reader import LineSplitter, SerialReader
+from .events import DetectionEvent, LogEvent, SourcePosition, TrackUpdate
+from .mapcodec import MapDecoder, MapEncoder, rle_decode, rle_encode
+from .parser import StreamParser
+from .sinks import ConsoleSink, FileSink, MetricsSink, NetworkSink, Sink
+from .receiver import Receiver
+from .collector import DeviceStats, MultiDeviceCollector
+from .store import Segment, SegmentStore, SegmentWriter, StoreSink
+from .clocksync import ClockSample, ClockSync
+from .broker import Broker, Subscriber
+from .streamstats import (
+    LatencyEstimator,
+    RollingHistogram,
+    SequenceTracker,
+    StreamStats,
+    StreamStatsSink,
+)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+基于 np.memmap 的热力图归档
+
+每个归档是一个目录，按列存放:
+
+    maps.u8         (N, 16, 16) uint8  热力图
+    time.f8         (N,)        float64 主机接收时间
+    angle.u2        (N,)        uint16  角度
+    intensity.u2    (N,)        uint16  最大强度
+    directions.u1   (N, 12)     uint8   12个方向强度
+    meta.json       记录数、容量
+
+文件按块预分配增长，打开时直接映射，不读取数据；时间列单调递增，
+时间范围查询用 np.searchsorted 二分，返回的是映射上的视图，统计全部向量化。
+需要 numpy（不在 maix_audio 包顶层导入）：
+
+    from maix_audio.archive import HeatmapArchive
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .sinks import Sink
+
+ARCHIVE_VERSION = 1
+
+COLUMNS = {
+    'maps': ('maps.u8', np.uint8, (16, 16)),
+    'time': ('time.f8', np.float64, ()),
+    'angle': ('angle.u2', np.uint16, ()),
+    'intensity': ('intensity.u2', np.uint16, ()),
+    'directions': ('directions.u1', np.uint8, (12,)),
+}
+
+
+class ArchiveView:
+    """归档中一段连续记录的视图（不复制数据）"""
+
+    def __init__(self, maps, time, angle, intensity, directions):
+        self.maps = maps
+        self.time = time
+        self.angle = angle
+        self.intensity = intensity
+        self.directions = directions
+
+    def __len__(self):
+        return len(self.time)
+
+    def direction_averages(self):
+        """12个方向的平均强度"""
+        if len(self) == 0:
+            return np.zeros(12)
+        return self.directions.mean(axis=0, dtype=np.float64)
+
+    def angle_histogram(self):
+        """各角度（每30度一个方向）的检测次数"""
+        return np.bincount(self.angle // 30, minlength=12)[:12]
+
+    def activity_histogram(self, bin_seconds=3600, start=None, end=None):
+        """
+        按时间分桶的检测次数
+
+        Returns:
+            (每桶次数, 桶边界)
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        start = self.time[0] if start is None else start
+        end = self.time[-1] if end is None else end
+        bins = max(int(np.ceil((end - start) / bin_seconds)), 1)
+        return np.histogram(self.time, bins=bins, range=(start, start + bins * bin_seconds))
+
+    def mean_map(self):
+        """平均热力图"""
+        if len(self) == 0:
+            return np.zeros((16, 16))
+        return self.maps.mean(axis=0, dtype=np.float64)
+
+    def map_stats(self):
+        """每张热力图的 (最小, 最大, 平均)"""
+        flat = self.maps.reshape(len(self), 256)
+        return flat.min(axis=1), flat.max(axis=1), flat.mean(axis=1, dtype=np.float64)
+
+
+class HeatmapArchive:
+    """
+    热力图归档
+
+    Args:
+        directory: 归档目录
+        mode: 'r' 只读，'a' 追加（不存在时创建）
+        chunk: 每次增长的记录数
+    """
+
+    def __init__(self, directory, mode='r', chunk=4096):
+        self.directory = directory
+        self.mode = mode
+        self.chunk = chunk
+        self.count = 0
+        self.capacity = 0
+        self._arrays = {}
+
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.count = meta['count']
+            self.capacity = meta['capacity']
+        elif mode == 'r':
+            raise FileNotFoundError(f"归档不存在: {directory}")
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        if mode == 'a' and self.capacity == 0:
+            self._grow(chunk)
+        else:
+            self._map()
+
+    def _path(self, name):
+        return os.path.join(self.directory, COLUMNS[name][0])
+
+    def _map(self):
+        self._arrays = {}
+        if self.capacity == 0:
+            return
+        file_mode = 'r' if self.mode == 'r' else 'r+'
+        for name, (_, dtype, shape) in COLUMNS.items():
+            self._arrays[name] = np.memmap(self._path(name), dtype=dtype, mode=file_mode,
+                                           shape=(self.capacity,) + shape)
+
+    def _grow(self, capacity):
+        """扩展所有列文件到新的容量"""
+        self._flush_arrays()
+        self._arrays = {}
+        for name, (_, dtype, shape) in COLUMNS.items():
+            size = capacity * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+            with open(self._path(name), 'ab') as f:
+                f.truncate(size)
+        self.capacity = capacity
+        self._map()
+        self._write_meta()
+
+    def _flush_arrays(self):
+        for array in self._arrays.values():
+            array.flush()
+
+    def _write_meta(self):
+        meta = {"version": ARCHIVE_VERSION, "count": self.count, "capacity": self.capacity}
+        tmp = os.path.join(self.directory, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.directory, 'meta.json'))
+
+    def __len__(self):
+        return self.count
+
+    def append(self, event):
+        """追加一个检测事件（没有热力图的事件记为全零）"""
+        if self.count >= self.capacity:
+            self._grow(self.capacity + self.chunk)
+        i = self.count
+        arrays = self._arrays
+        arrays['time'][i] = event.received
+        arrays['angle'][i] = event.angle
+        arrays['intensity'][i] = min(int(event.intensity), 0xFFFF)
+        dirs = event.directions
+        arrays['directions'][i] = np.clip(dirs, 0, 255) if len(dirs) == 12 else 0
+        if event.audio_map and len(event.audio_map) == 256:
+            arrays['maps'][i] = np.frombuffer(event.audio_map, dtype=np.uint8).reshape(16, 16)
+        else:
+            arrays['maps'][i] = 0
+        self.count += 1
+
+    def append_batch(self, time, maps, angle, intensity, directions):
+        """批量追加，参数为等长数组"""
+        n = len(time)
+        if self.count + n > self.capacity:
+            needed = self.count + n - self.capacity
+            self._grow(self.capacity + -(-needed // self.chunk) * self.chunk)
+        s = slice(self.count, self.count + n)
+        arrays = self._arrays
+        arrays['time'][s] = time
+        arrays['maps'][s] = maps
+        arrays['angle'][s] = angle
+        arrays['intensity'][s] = intensity
+        arrays['directions'][s] = directions
+        self.count += n
+
+    def flush(self):
+        if self.mode == 'r':
+            return
+        self._flush_arrays()
+        self._write_meta()
+
+    def close(self):
+        self.flush()
+        self._arrays = {}
+
+    def view(self, start=0, stop=None):
+        """记录号 [start, stop) 的视图"""
+        stop = self.count if stop is None else min(stop, self.count)
+        if not self._arrays:
+            empty = {name: np.zeros((0,) + shape, dtype=dtype)
+                     for name, (_, dtype, shape) in COLUMNS.items()}
+            return ArchiveView(**empty)
+        s = slice(start, stop)
+        arrays = self._arrays
+        return ArchiveView(arrays['maps'][s], arrays['time'][s], arrays['angle'][s],
+                           arrays['intensity'][s], arrays['directions'][s])
+
+    def time_slice(self, start=None, end=None):
+        """时间范围 [start, end) 的视图，对时间列二分查找"""
+        if not self._arrays:
+            return self.view(0, 0)
+        times = self._arrays['time'][:self.count]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = self.count if end is None else int(np.searchsorted(times, end, side='left'))
+        return self.view(lo, hi)
+
+
+def day_directory(root, timestamp):
+    """按日期划分的归档目录"""
+    return os.path.join(root, datetime.fromtimestamp(timestamp).strftime('%Y%m%d'))
+
+
+def open_day(root, day):
+    """
+    打开某一天的归档
+
+    Args:
+        root: 归档根目录
+        day: 'YYYYMMDD' 字符串或 datetime/date
+    """
+    if not isinstance(day, str):
+        day = day.strftime('%Y%m%d')
+    return HeatmapArchive(os.path.join(root, day), mode='r')
+
+
+class ArchiveSink(Sink):
+    """
+    按天把检测事件写入热力图归档
+
+    Args:
+        root: 归档根目录，每天一个子目录
+        flush_interval: 元数据落盘间隔（秒）
+    """
+
+    def __init__(self, root="maix_archive", flush_interval=1.0):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.archive = None
+        self._directory = None
+        self._last_flush = 0.0
+
+    def on_detection(self, event):
+        directory = day_directory(self.root, event.received)
+        if directory != self._directory:
+            if self.archive is not None:
+                self.archive.close()
+            self.archive = HeatmapArchive(directory, mode='a')
+            self._directory = directory
+        self.archive.append(event)
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.idle()
+
+    def idle(self):
+        if self.archive is not None:
+            self.archive.flush()
+        self._last_flush = time.time()
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
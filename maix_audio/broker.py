@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+本机事件分发（发布 / 订阅）
+
+串口只能被一个进程打开。Receiver 带上 Broker 后把解析好的事件通过 Unix 套接字
+或 TCP 发布出去，看板、录制、告警等程序各自用 Subscriber 订阅，互不争抢串口。
+
+连接后订阅方先发送一行 `SUB <主题>[,<主题>...]\\n`（`SUB *` 表示全部），之后只接收:
+
+    消息:  主题 uint8, 长度 uint32, 消息体
+    detections  检测事件（不含热力图）: 主机接收时间, 设备时间, 序列号, tick,
+                角度, 强度, 方向, 标志, 12个方向强度, 设备标识(32字节)，与段文件记录
+                （store.py）的前半部分相同
+    maps        检测事件 + 16x16热力图（256字节），即完整的段文件记录
+    tracks      轨迹: 时间, 轨迹号, 角度, 角速度, 置信度, 关联次数, 设备标识
+    logs        设备日志: 时间, 设备标识, 原始行
+
+每个事件只编码一次，再放入各订阅方的发送队列。发送由单独的线程用非阻塞套接字完成，
+串口读取线程从不等待订阅方；队列超过 max_queue 字节时丢弃最旧的整条消息并计数，
+慢的订阅方只会丢自己的消息。
+
+    broker = Broker('unix:/tmp/maix_audio.sock')
+    receiver = Receiver(port, sinks=[broker])
+
+    for event in Subscriber('unix:/tmp/maix_audio.sock', ('detections',)):
+        print(event.angle)
+"""
+
+import collections
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from .events import DetectionEvent, LogEvent, TrackUpdate
+from .sinks import Sink
+from .store import EMPTY_MAP, device_bytes, pack_record, unpack_record
+
+DEFAULT_ADDRESS = 'unix:/tmp/maix_audio.sock'
+
+TOPIC_DETECTIONS = 1
+TOPIC_MAPS = 2
+TOPIC_TRACKS = 3
+TOPIC_LOGS = 4
+TOPICS = {
+    'detections': TOPIC_DETECTIONS,
+    'maps': TOPIC_MAPS,
+    'tracks': TOPIC_TRACKS,
+    'logs': TOPIC_LOGS,
+}
+
+_message = struct.Struct('<BI')
+_track = struct.Struct('<dIfffI32s')
+_log = struct.Struct('<d32s')
+DETECTION_SIZE = struct.calcsize('<ddIIHHBB12s32s')
+
+
+def parse_address(address):
+    """
+    解析地址
+
+    Args:
+        address: 'unix:/path/to.sock'、'host:port' 或 (host, port)
+
+    Returns:
+        (套接字族, 地址)
+    """
+    if isinstance(address, tuple):
+        return socket.AF_INET, address
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def _device_text(raw):
+    return raw.rstrip(b'\x00').decode('utf-8', errors='ignore') or None
+
+
+def encode_messages(event):
+    """
+    编码事件
+
+    Returns:
+        [(主题, 消息字节)]；检测事件带热力图时同时产生 detections 和 maps 两条
+    """
+    if isinstance(event, DetectionEvent):
+        record = pack_record(event)
+        messages = [(TOPIC_DETECTIONS, _message.pack(TOPIC_DETECTIONS, DETECTION_SIZE)
+                     + record[:DETECTION_SIZE])]
+        if event.audio_map:
+            messages.append((TOPIC_MAPS, _message.pack(TOPIC_MAPS, len(record)) + record))
+        return messages
+    if isinstance(event, TrackUpdate):
+        body = _track.pack(event.timestamp, event.track_id, event.angle, event.velocity,
+                           event.confidence, event.hits, device_bytes(event.device))
+        return [(TOPIC_TRACKS, _message.pack(TOPIC_TRACKS, len(body)) + body)]
+    if not isinstance(event, LogEvent):
+        return []  # 其他事件（如 SourcePosition）没有对应的主题
+    body = _log.pack(event.timestamp, device_bytes(event.device)) + event.line
+    return [(TOPIC_LOGS, _message.pack(TOPIC_LOGS, len(body)) + body)]
+
+
+def decode_message(topic, body):
+    """把消息体解码为事件"""
+    if topic == TOPIC_DETECTIONS:
+        event = unpack_record(body + EMPTY_MAP)
+        event.audio_map = None
+        return event
+    if topic == TOPIC_MAPS:
+        return unpack_record(body)
+    if topic == TOPIC_TRACKS:
+        timestamp, track_id, angle, velocity, confidence, hits, device = _track.unpack(body)
+        return TrackUpdate(timestamp, track_id, angle, velocity, confidence, hits,
+                           _device_text(device))
+    if topic == TOPIC_LOGS:
+        timestamp, device = _log.unpack_from(body)
+        return LogEvent(timestamp, body[_log.size:], _device_text(device))
+    raise ValueError(f"未知主题: {topic}")
+
+
+class Client:
+    """一个订阅方连接"""
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.topics = None          # 收到订阅行之前为 None
+        self.handshake = b''
+        self.queue = collections.deque()
+        self.queued = 0             # 队列中的字节数
+        self.current = None         # 正在发送的消息（memoryview）
+        self.lock = threading.Lock()
+
+        # 统计
+        self.sent = 0
+        self.dropped = 0
+        self.connected_at = time.time()
+
+
+class Broker(Sink):
+    """
+    把事件发布给本机的订阅方
+
+    Args:
+        address: 监听地址，'unix:/path'、'host:port' 或 (host, port)
+        max_queue: 每个订阅方发送队列的上限（字节），超过时丢弃最旧的消息
+        start: 是否立即开始监听
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, max_queue=1024 * 1024, start=True):
+        self.address = address
+        self.max_queue = max_queue
+        self.clients = []
+        self.server = None
+        self.running = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._woken = False
+
+        # 统计
+        self.published = 0
+        self.dropped = 0        # 已断开订阅方的丢弃数也计入
+        self.disconnected = 0
+        if start:
+            self.start()
+
+    def start(self):
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.unlink(address)  # 上次未正常退出留下的套接字文件
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family != socket.AF_UNIX:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen(64)
+        self.server.setblocking(False)
+        self.running = True
+        self._thread = threading.Thread(target=self._serve, name='broker', daemon=True)
+        self._thread.start()
+
+    # ---- sink，在串口读取线程中调用 ----
+
+    def handle(self, event):
+        messages = encode_messages(event)
+        self.published += 1
+        with self._lock:
+            clients = list(self.clients)
+        wake = False
+        for client in clients:
+            topics = client.topics
+            if not topics:
+                continue
+            for topic, data in messages:
+                if topic in topics:
+                    self._enqueue(client, data)
+                    wake = True
+        if wake and not self._woken:
+            self._woken = True
+            try:
+                self._wake_w.send(b'\x00')
+            except (BlockingIOError, OSError):
+                pass
+
+    def _enqueue(self, client, data):
+        with client.lock:
+            client.queue.append(data)
+            client.queued += len(data)
+            while client.queued > self.max_queue and len(client.queue) > 1:
+                client.queued -= len(client.queue.popleft())
+                client.dropped += 1
+
+    # ---- 发送线程 ----
+
+    def _serve(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.server, selectors.EVENT_READ, None)
+        selector.register(self._wake_r, selectors.EVENT_READ, None)
+        registered = {}
+        try:
+            while self.running:
+                with self._lock:
+                    clients = list(self.clients)
+                for client in clients:
+                    events = selectors.EVENT_READ
+                    if client.current is not None or client.queue:
+                        events |= selectors.EVENT_WRITE
+                    if registered.get(client) != events:
+                        selector.modify(client.sock, events, client)
+                        registered[client] = events
+                for key, mask in selector.select(0.5):
+                    if key.fileobj is self.server:
+                        self._accept(selector, registered)
+                    elif key.fileobj is self._wake_r:
+                        try:
+                            self._wake_r.recv(4096)
+                        except (BlockingIOError, OSError):
+                            pass
+                        # 先取走唤醒字节再清标志，之后入队的消息会再次唤醒
+                        self._woken = False
+                    else:
+                        client = key.data
+                        if mask & selectors.EVENT_READ and not self._read(client):
+                            self._remove(selector, registered, client)
+                        elif mask & selectors.EVENT_WRITE and not self._write(client):
+                            self._remove(selector, registered, client)
+        finally:
+            selector.close()
+
+    def _accept(self, selector, registered):
+        try:
+            sock, address = self.server.accept()
+        except (BlockingIOError, OSError):
+            return
+        sock.setblocking(False)
+        client = Client(sock, address)
+        selector.register(sock, selectors.EVENT_READ, client)
+        registered[client] = selectors.EVENT_READ
+        with self._lock:
+            self.clients.append(client)
+
+    def _read(self, client):
+        """读取订阅行；之后订阅方不应再发送数据，读到 EOF 表示断开"""
+        try:
+            data = client.sock.recv(1024)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        if not data:
+            return False
+        if client.topics is None:
+            client.handshake += data
+            if b'\n' in client.handshake:
+                line = client.handshake.split(b'\n', 1)[0].decode('ascii', 'ignore').strip()
+                client.topics = self._parse_subscription(line)
+                client.handshake = b''
+            elif len(client.handshake) > 256:
+                return False
+        return True
+
+    @staticmethod
+    def _parse_subscription(line):
+        if not line.startswith('SUB'):
+            return set()
+        names = line[3:].strip()
+        if names in ('', '*'):
+            return set(TOPICS.values())
+        return {TOPICS[name.strip()] for name in names.split(',') if name.strip() in TOPICS}
+
+    def _write(self, client):
+        while True:
+            if client.current is None:
+                with client.lock:
+                    if not client.queue:
+                        return True
+                    data = client.queue.popleft()
+                    client.queued -= len(data)
+                client.current = memoryview(data)
+            try:
+                sent = client.sock.send(client.current)
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+            client.current = client.current[sent:]
+            if not client.current:
+                client.current = None
+                client.sent += 1
+
+    def _remove(self, selector, registered, client):
+        try:
+            selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        registered.pop(client, None)
+        client.sock.close()
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        self.dropped += client.dropped
+        self.disconnected += 1
+
+    # ----
+
+    def snapshot(self):
+        with self._lock:
+            clients = list(self.clients)
+        return {
+            "published": self.published,
+            "clients": [{"address": str(client.address) or 'unix',
+                         "topics": sorted(name for name, topic in TOPICS.items()
+                                          if client.topics and topic in client.topics),
+                         "sent": client.sent, "dropped": client.dropped,
+                         "queued": client.queued} for client in clients],
+            "dropped": self.dropped + sum(client.dropped for client in clients),
+            "disconnected": self.disconnected,
+        }
+
+    def report(self):
+        data = self.snapshot()
+        return (f"📡 发布: {data['published']} | 订阅方: {len(data['clients'])} | "
+                f"丢弃: {data['dropped']} | 已断开: {data['disconnected']}")
+
+    def close(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(2)
+        with self._lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.sock.close()
+        if self.server is not None:
+            self.server.close()
+            family, address = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(address):
+                os.unlink(address)
+        self._wake_r.close()
+        self._wake_w.close()
+
+
+class Subscriber:
+    """
+    订阅 Broker 发布的事件
+
+    Args:
+        address: Broker 地址
+        topics: 主题名称，见 TOPICS；None 表示全部
+        timeout: 连接超时（秒）
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, topics=None, timeout=5.0):
+        self.address = address
+        self.topics = list(topics) if topics else None
+        for name in self.topics or ():
+            if name not in TOPICS:
+                raise ValueError(f"未知主题: {name}，可选 {', '.join(TOPICS)}")
+        self.timeout = timeout
+        self.sock = None
+        self._buf = bytearray()
+        self.received = 0
+
+    def connect(self):
+        family, address = parse_address(self.address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(address)
+        names = ','.join(self.topics) if self.topics else '*'
+        self.sock.sendall(f"SUB {names}\n".encode('ascii'))
+        self.sock.settimeout(None)
+        return self
+
+    def read(self, timeout=None):
+        """
+        读取已到达的事件
+
+        Args:
+            timeout: 没有完整消息时最多等待的时间（秒），None 表示一直等待
+
+        Returns:
+            事件列表；Broker 关闭时返回 None
+        """
+        if self.sock is None:
+            self.connect()
+        events = self._decode()
+        if events:
+            return events
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(65536)
+        except socket.timeout:
+            return []
+        if not data:
+            return None
+        self._buf += data
+        return self._decode()
+
+    def _decode(self):
+        buf = self._buf
+        events = []
+        offset = 0
+        while len(buf) - offset >= _message.size:
+            topic, length = _message.unpack_from(buf, offset)
+            end = offset + _message.size + length
+            if end > len(buf):
+                break
+            events.append(decode_message(topic, bytes(buf[offset + _message.size:end])))
+            offset = end
+        del buf[:offset]
+        self.received += len(events)
+        return events
+
+    def __iter__(self):
+        while True:
+            events = self.read()
+            if events is None:
+                return
+            yield from events
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+主机 / 设备时钟同步
+
+设备没有 RTC，time.time() 每次上电从头计时，事件里的时间戳不能和其他设备、
+其他传感器对齐。这里在数据流之外用 NTP 式的一问一答估计设备 tick 与主机时间
+的关系，不需要暂停数据流:
+
+    主机 t1 发送   SYNC:<id>\\n
+    设备 t2 读到请求，t3 回复   CLOCK:<id>:<t2>:<t3>     （t2/t3 为 time.ticks_ms()）
+    主机 t4 收到回复
+
+    偏移 theta = ((t2 - t1) + (t3 - t4)) / 2     设备时间 - 主机时间
+    往返 delay = (t4 - t1) - (t3 - t2)
+
+真实偏移在 theta ± delay/2 之内。设备每个循环才读一次串口，请求在接收缓冲里
+等待的时间让单个样本偏差较大，所以只取最近样本中往返最短的一部分，对设备时间做
+最小二乘直线拟合，斜率即时钟漂移。ClockSync 作为 sink 放在最前面，把检测事件的
+timestamp 换成主机时间（同步之前用主机接收时间）。
+"""
+
+import re
+import time
+
+from .sinks import Sink
+
+SYNC_REQUEST = b'SYNC:'
+TICK_MODULUS = 1 << 32
+RE_REPLY = re.compile(rb'CLOCK:(\d+):(\d+):(\d+)')
+
+
+def unwrap_tick(tick, reference):
+    """以已展开的 reference 为参照，展开32位回绕的 tick（毫秒）"""
+    delta = (tick - reference) % TICK_MODULUS
+    if delta >= TICK_MODULUS // 2:
+        delta -= TICK_MODULUS
+    return reference + delta
+
+
+class ClockSample:
+    """一次同步交换"""
+
+    __slots__ = ('device', 'offset', 'delay', 'host')
+
+    def __init__(self, t1, t2, t3, t4):
+        d2 = t2 / 1000.0
+        d3 = t3 / 1000.0
+        self.device = (d2 + d3) / 2           # 设备时间（秒，已展开）
+        self.offset = ((d2 - t1) + (d3 - t4)) / 2
+        self.delay = (t4 - t1) - (d3 - d2)
+        self.host = t4
+
+
+class ClockSync(Sink):
+    """
+    时钟同步
+
+    Args:
+        write: 向设备发送请求的函数，如 ser.write；也可以之后用 attach() 设置
+        interval: 请求间隔（秒）
+        samples: 参与拟合的最近样本数
+        best: 拟合时使用往返最短的比例
+        timeout: 请求多久没有回复算丢失（秒）
+        max_unanswered: 连续这么多次没有回复则认为设备脚本不支持，停止发送
+        max_drift: 还不能估计漂移时假定的最大漂移（秒/秒），用于误差上界
+        clock: 主机时钟
+    """
+
+    def __init__(self, write=None, interval=2.0, samples=32, best=0.5, timeout=1.0,
+                 max_unanswered=5, max_drift=200e-6, clock=time.time):
+        self.write = write
+        self.interval = interval
+        self.max_samples = samples
+        self.best = best
+        self.timeout = timeout
+        self.max_unanswered = max_unanswered
+        self.max_drift = max_drift
+        self.clock = clock
+
+        self.samples = []
+        self.offset = None      # 拟合的偏移 a：theta(d) = a + drift * (d - reference)
+        self.drift = 0.0        # 设备时钟相对主机的漂移（秒/秒）
+        self.reference = 0.0
+        self.error = None       # 拟合点附近的换算误差上界估计（秒），见 error_at()
+        self.drift_error = max_drift  # 漂移估计的不确定度（秒/秒）
+        self.active = False     # 已经看到带 tick 的事件，设备脚本在运行
+        self.supported = None   # None 表示还没有收到过回复
+        self._tick = None       # 最近一次展开后的 tick
+        self._next_id = 1
+        self._next_request = 0.0
+        self._outstanding = {}
+
+        # 统计
+        self.requests = 0
+        self.replies = 0
+        self.lost = 0
+        self.resets = 0
+        self._unanswered = 0
+
+    def attach(self, write):
+        self.write = write
+
+    @property
+    def synced(self):
+        return self.offset is not None
+
+    # ---- 请求 ----
+
+    def poll(self, now=None):
+        """到时间则发送下一个请求，并清理超时的请求"""
+        now = self.clock() if now is None else now
+        for req_id, sent in list(self._outstanding.items()):
+            if now - sent > self.timeout:
+                del self._outstanding[req_id]
+                self.lost += 1
+                self._unanswered += 1
+        if self.write is None or not self.active or self.supported is False:
+            return
+        if self._unanswered >= self.max_unanswered and self.supported is None:
+            # 设备脚本没有回复过：旧版脚本，不再发送
+            self.supported = False
+            print("⚠️ 设备没有回复时钟同步请求，已停止同步")
+            return
+        if now < self._next_request:
+            return
+        req_id = self._next_id
+        self._next_id += 1
+        self._next_request = now + self.interval
+        t1 = self.clock()
+        self._outstanding[req_id] = t1
+        self.write(SYNC_REQUEST + str(req_id).encode('ascii') + b'\n')
+        self.requests += 1
+
+    # ---- sink ----
+
+    def on_detection(self, event):
+        if event.tick is not None:
+            self.active = True
+            if self.synced:
+                event.timestamp = self.to_host(event.tick)
+            else:
+                event.timestamp = event.received
+        self.poll(event.received)
+
+    def on_log(self, event):
+        match = RE_REPLY.search(event.line)
+        if match:
+            self._on_reply(int(match.group(1)), int(match.group(2)), int(match.group(3)),
+                           event.timestamp)
+        self.poll(event.timestamp)
+
+    def idle(self):
+        self.poll()
+
+    def _on_reply(self, req_id, t2, t3, t4):
+        t1 = self._outstanding.pop(req_id, None)
+        if t1 is None:
+            return  # 已超时或不是本机发出的请求
+        self.supported = True
+        self._unanswered = 0
+        self.replies += 1
+
+        reference = self._tick if self._tick is not None else t2
+        t2 = unwrap_tick(t2, reference)
+        t3 = unwrap_tick(t3, t2)
+        sample = ClockSample(t1, t2, t3, t4)
+        if self.samples and sample.device < self.samples[-1].device - 1.0:
+            # 设备时间大幅后退：设备重启，重新同步
+            self.samples = []
+            self.offset = None
+            self._tick = None
+            self.resets += 1
+        self._tick = t3 if self._tick is None else max(self._tick, t3)
+        self.samples.append(sample)
+        del self.samples[:-self.max_samples]
+        self._fit()
+
+    def _fit(self):
+        """对往返最短的样本做 theta = a + drift * (d - reference) 的最小二乘拟合"""
+        ranked = sorted(self.samples, key=lambda s: s.delay)
+        chosen = ranked[:max(1, int(len(ranked) * self.best))]
+        n = len(chosen)
+        mean_d = sum(s.device for s in chosen) / n
+        mean_o = sum(s.offset for s in chosen) / n
+        spread = sum((s.device - mean_d) ** 2 for s in chosen)
+        # 样本时间跨度太短时斜率不可靠，只估计偏移
+        if n >= 3 and spread / n > 25.0:
+            drift = sum((s.device - mean_d) * (s.offset - mean_o) for s in chosen) / spread
+        else:
+            drift = 0.0
+        residuals = [s.offset - (mean_o + drift * (s.device - mean_d)) for s in chosen]
+        if drift:
+            # 斜率的3倍标准误差
+            variance = sum(r * r for r in residuals) / max(n - 2, 1)
+            self.drift_error = 3 * (variance / spread) ** 0.5
+        else:
+            self.drift_error = self.max_drift
+        self.reference = mean_d
+        self.offset = mean_o
+        self.drift = drift
+        self.error = ranked[0].delay / 2 + max(abs(r) for r in residuals)
+
+    # ---- 换算 ----
+
+    def device_seconds(self, tick):
+        """展开回绕后的设备时间（秒）"""
+        if self._tick is None:
+            return tick / 1000.0
+        return unwrap_tick(tick, self._tick) / 1000.0
+
+    def to_host(self, tick):
+        """
+        把设备 tick（毫秒）换算为主机时间
+
+        Returns:
+            主机时间戳（秒），尚未同步时返回 None
+        """
+        if self.offset is None:
+            return None
+        d = self.device_seconds(tick)
+        return d - (self.offset + self.drift * (d - self.reference))
+
+    def error_at(self, tick):
+        """
+        换算 tick 时的误差上界估计：拟合误差加上离拟合中心越远越大的漂移误差
+
+        Returns:
+            秒，尚未同步时返回 None
+        """
+        if self.offset is None:
+            return None
+        return self.error + self.drift_error * abs(self.device_seconds(tick) - self.reference)
+
+    def snapshot(self):
+        return {
+            "synced": self.synced,
+            "offset": self.offset,
+            "drift_ppm": self.drift * 1e6,
+            "error_ms": self.error * 1000 if self.error is not None else None,
+            "samples": len(self.samples),
+            "requests": self.requests,
+            "replies": self.replies,
+            "lost": self.lost,
+            "resets": self.resets,
+        }
+
+    def report(self):
+        if not self.synced:
+            return f"🕐 时钟未同步 (请求 {self.requests}, 回复 {self.replies})"
+        return (f"🕐 时钟同步: 漂移 {self.drift * 1e6:+.1f}ppm | 误差 ±{self.error * 1000:.1f}ms | "
+                f"样本 {len(self.samples)} | 请求 {self.requests} 回复 {self.replies}")
+
+    def close(self):
+        if self.requests:
+            print(self.report())
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio 多设备采集器
+
+一个进程、一个事件循环同时接收多个麦克风阵列：每个串口的文件描述符用
+loop.add_reader() 注册，可读时整块读取并交给该设备自己的 StreamParser，
+所有设备的事件按时间合并成一个有序的输出流，并带上设备标识。
+串口断开后按指数退避自动重连。
+
+每个设备各有一个 ClockSync（见 clocksync.py），事件进入合并队列之前先经过它，
+检测事件的 timestamp 换成主机时间，不同设备的事件才能按同一时间轴对齐。
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+import serial
+
+from .clocksync import ClockSync
+from .events import DetectionEvent
+from .parser import StreamParser
+
+
+def received_time(event):
+    """默认排序键：主机接收时间"""
+    return getattr(event, 'received', event.timestamp)
+
+
+class DeviceStats:
+    """单个设备的吞吐统计"""
+
+    __slots__ = ('device', 'port', 'connected', 'bytes', 'events', 'detections',
+                 'reconnects', 'errors', 'started', 'last_data',
+                 '_last_time', '_last_bytes', '_last_events')
+
+    def __init__(self, device, port):
+        self.device = device
+        self.port = port
+        self.connected = False
+        self.bytes = 0
+        self.events = 0
+        self.detections = 0
+        self.reconnects = 0
+        self.errors = 0
+        self.started = time.time()
+        self.last_data = 0.0
+        self._last_time = self.started
+        self._last_bytes = 0
+        self._last_events = 0
+
+    def snapshot(self, now=None):
+        """
+        当前统计
+
+        Returns:
+            字典，rate 字段为距上次 snapshot() 的事件/秒与字节/秒
+        """
+        now = time.time() if now is None else now
+        elapsed = max(now - self._last_time, 1e-9)
+        data = {
+            "device": self.device,
+            "port": self.port,
+            "connected": self.connected,
+            "bytes": self.bytes,
+            "events": self.events,
+            "detections": self.detections,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+            "events_per_sec": (self.events - self._last_events) / elapsed,
+            "bytes_per_sec": (self.bytes - self._last_bytes) / elapsed,
+        }
+        self._last_time = now
+        self._last_bytes = self.bytes
+        self._last_events = self.events
+        return data
+
+
+class _Device:
+    """采集器内部的单设备状态"""
+
+    def __init__(self, device, port, baudrate, binary, clock_sync):
+        self.device = device
+        self.port = port
+        self.baudrate = baudrate
+        self.parser = StreamParser(binary=binary, device=device)
+        self.clock = ClockSync() if clock_sync else None
+        self.stats = DeviceStats(device, port)
+        self.ser = None
+        self.fd = None
+        self.closed = None
+
+
+class MultiDeviceCollector:
+    """
+    多设备采集器
+
+    Args:
+        ports: {设备标识: 串口路径}，pty 的从端路径同样可用
+        baudrate: 波特率
+        binary: 是否接收二进制帧
+        sinks: 合并后事件的 sink 列表（run() 使用）
+        window: 重排窗口（秒），事件至少等待这么久再输出，以便按时间合并
+        key: 排序键函数，默认按主机接收时间
+        reconnect_delay: 首次重连等待（秒），之后指数退避
+        max_reconnect_delay: 最长重连等待（秒）
+        flush_after: 设备空闲多久后输出暂存的 AUDIO_PACKET（秒）
+        clock_sync: 是否与每个设备同步时钟，把检测事件的 timestamp 换成主机时间
+    """
+
+    def __init__(self, ports, baudrate=115200, binary=False, sinks=None, window=0.05,
+                 key=received_time, reconnect_delay=0.5, max_reconnect_delay=10.0,
+                 flush_after=0.2, clock_sync=True):
+        self.devices = {device: _Device(device, port, baudrate, binary, clock_sync)
+                        for device, port in ports.items()}
+        self.sinks = list(sinks) if sinks else []
+        self.window = window
+        self.key = key
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.flush_after = flush_after
+        self.running = False
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._tasks = []
+
+    # ---- 设备连接 ----
+
+    def _open(self, dev):
+        dev.ser = serial.Serial(dev.port, dev.baudrate, timeout=0)
+        dev.fd = dev.ser.fileno()
+        dev.closed = asyncio.Event()
+        asyncio.get_running_loop().add_reader(dev.fd, self._on_readable, dev)
+        if dev.clock is not None:
+            dev.clock.attach(dev.ser.write)
+        dev.stats.connected = True
+
+    def _close(self, dev):
+        if dev.clock is not None:
+            dev.clock.attach(None)
+        if dev.fd is not None:
+            asyncio.get_running_loop().remove_reader(dev.fd)
+            dev.fd = None
+        if dev.ser is not None:
+            try:
+                dev.ser.close()
+            except Exception:
+                pass
+            dev.ser = None
+        dev.stats.connected = False
+        if dev.closed is not None:
+            dev.closed.set()
+
+    def _on_readable(self, dev):
+        try:
+            data = os.read(dev.fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            # 设备断开（pty 对端关闭时为 EIO）
+            dev.stats.errors += 1
+            self._close(dev)
+            self._push(dev, dev.parser.flush())
+            return
+        dev.stats.bytes += len(data)
+        dev.stats.last_data = time.time()
+        self._push(dev, dev.parser.feed(data))
+
+    def _push(self, dev, events):
+        if not events:
+            return
+        heap = self._heap
+        key = self.key
+        clock = dev.clock
+        for event in events:
+            if clock is not None:
+                # 换算 timestamp、处理 CLOCK 回复，必要时发送下一个同步请求
+                clock.handle(event)
+            heapq.heappush(heap, (key(event), next(self._counter), event))
+            dev.stats.events += 1
+            if isinstance(event, DetectionEvent):
+                dev.stats.detections += 1
+        self._wakeup.set()
+
+    async def _device_loop(self, dev):
+        """保持单个设备连接，断开后重连"""
+        delay = self.reconnect_delay
+        first = True
+        while self.running:
+            try:
+                self._open(dev)
+            except (OSError, serial.SerialException) as e:
+                dev.stats.errors += 1
+                if first:
+                    print(f"❌ [{dev.device}] 连接失败: {e}")
+                    first = False
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            print(f"✅ [{dev.device}] 已连接到设备: {dev.port}")
+            if not first:
+                dev.stats.reconnects += 1
+            first = False
+            delay = self.reconnect_delay
+            await dev.closed.wait()
+            if self.running:
+                print(f"🔌 [{dev.device}] 连接断开，等待重连...")
+
+    # ---- 合并输出 ----
+
+    def _flush_idle(self, now):
+        for dev in self.devices.values():
+            if dev.parser.has_pending and now - dev.stats.last_data >= self.flush_after:
+                self._push(dev, dev.parser.flush())
+            if dev.clock is not None:
+                dev.clock.poll(now)
+
+    async def events(self, idle=None):
+        """
+        按时间顺序产出所有设备的事件（异步生成器）
+
+        事件在重排窗口内等待，窗口之外的事件按排序键依次输出。
+
+        Args:
+            idle: 等待新数据超时时调用的函数，如 sink 的定时输出
+        """
+        if not self.running:
+            await self.start()
+        heap = self._heap
+        while self.running or heap:
+            now = time.time()
+            self._flush_idle(now)
+            deadline = now - self.window if self.running else float('inf')
+            while heap and heap[0][0] <= deadline:
+                yield heapq.heappop(heap)[2]
+
+            if not self.running:
+                continue
+            if heap:
+                timeout = max(heap[0][0] + self.window - now, 0.001)
+            else:
+                timeout = self.flush_after
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(timeout, self.flush_after))
+            except asyncio.TimeoutError:
+                if idle is not None:
+                    idle()
+
+    async def start(self):
+        """为每个设备启动连接任务"""
+        self.running = True
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._device_loop(dev))
+                       for dev in self.devices.values()]
+
+    async def stop(self):
+        """关闭所有设备，events() 输出剩余事件后结束"""
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for dev in self.devices.values():
+            self._close(dev)
+            self._push(dev, dev.parser.flush())
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self):
+        """各设备统计 {设备标识: 字典}"""
+        now = time.time()
+        stats = {}
+        for device, dev in self.devices.items():
+            data = dev.stats.snapshot(now)
+            if dev.clock is not None:
+                data["clock"] = dev.clock.snapshot()
+            stats[device] = data
+        return stats
+
+    def report(self):
+        lines = []
+        for data in self.stats().values():
+            state = "在线" if data["connected"] else "离线"
+            line = (f"📈 [{data['device']}] {state} | 事件: {data['events']} | "
+                    f"{data['events_per_sec']:.1f} 事件/秒 | {data['bytes_per_sec']:.0f} 字节/秒 | "
+                    f"重连: {data['reconnects']}")
+            clock = data.get("clock")
+            if clock and clock["synced"]:
+                line += f" | 时钟 {clock['drift_ppm']:+.1f}ppm ±{clock['error_ms']:.1f}ms"
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def idle_sinks(self):
+        """没有新事件时调用各 sink 的 idle()，如定位结果按时输出"""
+        for sink in self.sinks:
+            try:
+                sink.idle()
+            except Exception as e:
+                print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
+
+    async def run(self, report_interval=None):
+        """
+        把合并后的事件分发给 sinks，直到任务被取消
+
+        Args:
+            report_interval: 打印吞吐统计的间隔（秒）
+        """
+        last_report = time.time()
+        try:
+            async for event in self.events(idle=self.idle_sinks):
+                for sink in self.sinks:
+                    try:
+                        sink.handle(event)
+                    except Exception as e:
+                        print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
+                if report_interval and time.time() - last_report >= report_interval:
+                    last_report = time.time()
+                    print(self.report())
+        finally:
+            if self.running:
+                await self.stop()
+            for sink in self.sinks:
+                sink.close()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+主机端连续角度估计
+
+设备只取12个方向中强度最大的一个，分辨率是30度。这里根据12个方向强度
+（可选16x16热力图）估计连续角度，全部按批向量化，可直接用于归档中的
+directions 列；DirectionEstimator 同时是一个 sink，放在 sinks 列表最前面时
+给每个检测事件填上 event.bearing。
+
+方法:
+    argmax     设备原来的做法，每30度一档
+    mean       峰值附近 ±window 个方向的加权圆周平均
+    parabolic  峰值和左右两个方向的抛物线插值
+    map        热力图相对中心的强度质心方位
+
+需要 numpy（不在 maix_audio 包顶层导入）：
+
+    from maix_audio.direction import DirectionEstimator
+"""
+
+import numpy as np
+
+from .sinks import Sink
+
+SECTOR = 30.0
+SECTORS = 12
+
+METHODS = ('argmax', 'mean', 'parabolic', 'map')
+
+
+def _as_directions(directions):
+    d = np.asarray(directions, dtype=np.float64)
+    return d.reshape(-1, SECTORS)
+
+
+def argmax_angles(directions):
+    """每行强度最大方向的角度"""
+    d = _as_directions(directions)
+    return d.argmax(axis=1) * SECTOR
+
+
+def mean_angles(directions, window=2, floor=None):
+    """
+    峰值附近的加权圆周平均
+
+    Args:
+        window: 峰值两侧参与平均的方向数
+        floor: 权重扣除的背景强度，默认每行的中位数
+    """
+    d = _as_directions(directions)
+    n = len(d)
+    peak = d.argmax(axis=1)
+    offsets = np.arange(-window, window + 1)
+    idx = (peak[:, None] + offsets[None, :]) % SECTORS
+    values = d[np.arange(n)[:, None], idx]
+    background = np.median(d, axis=1) if floor is None else np.full(n, float(floor))
+    weights = np.clip(values - background[:, None], 0, None)
+    # 全部等于背景时退化为峰值方向
+    weights[weights.sum(axis=1) == 0, window] = 1.0
+    theta = np.deg2rad(idx * SECTOR)
+    angle = np.arctan2((weights * np.sin(theta)).sum(axis=1),
+                       (weights * np.cos(theta)).sum(axis=1))
+    return np.rad2deg(angle) % 360.0
+
+
+def parabolic_angles(directions):
+    """峰值和相邻两个方向拟合抛物线，取顶点位置"""
+    d = _as_directions(directions)
+    rows = np.arange(len(d))
+    peak = d.argmax(axis=1)
+    left = d[rows, (peak - 1) % SECTORS]
+    center = d[rows, peak]
+    right = d[rows, (peak + 1) % SECTORS]
+    denom = left - 2 * center + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(denom < 0, 0.5 * (left - right) / denom, 0.0)
+    offset = np.clip(offset, -0.5, 0.5)
+    return ((peak + offset) * SECTOR) % 360.0
+
+
+def map_angles(maps, rotation=0.0, clockwise=False, floor=None):
+    """
+    热力图强度质心相对图中心的方位
+
+    Args:
+        maps: (N, 16, 16) 或 (N, 256) 热力图
+        rotation: 图像坐标系与方向0之间的夹角（度），随阵列安装方式而定
+        clockwise: 方向编号是否按图像坐标顺时针增加
+        floor: 扣除的背景强度，默认每张图的平均值
+    """
+    m = np.asarray(maps, dtype=np.float64).reshape(-1, 16, 16)
+    background = m.mean(axis=(1, 2)) if floor is None else np.full(len(m), float(floor))
+    w = np.clip(m - background[:, None, None], 0, None)
+    coords = np.arange(16) - 7.5
+    x = (w.sum(axis=1) * coords).sum(axis=1)
+    y = (w.sum(axis=2) * coords).sum(axis=1)
+    angle = np.rad2deg(np.arctan2(y, x))
+    if clockwise:
+        angle = -angle
+    return (angle + rotation) % 360.0
+
+
+def estimate_angles(directions, method='parabolic', maps=None, **kwargs):
+    """
+    批量估计连续角度
+
+    Args:
+        directions: (N, 12) 方向强度
+        method: argmax / mean / parabolic / map
+        maps: method='map' 时的热力图
+
+    Returns:
+        (N,) 角度，0~360度
+    """
+    if method == 'argmax':
+        return argmax_angles(directions)
+    if method == 'mean':
+        return mean_angles(directions, **kwargs)
+    if method == 'parabolic':
+        return parabolic_angles(directions)
+    if method == 'map':
+        if maps is None:
+            raise ValueError("method='map' 需要热力图")
+        return map_angles(maps, **kwargs)
+    raise ValueError(f"未知的估计方法: {method}")
+
+
+def angle_error(a, b):
+    """两组角度之间的圆周误差（度，0~180）"""
+    diff = (np.asarray(a) - np.asarray(b)) % 360.0
+    return np.minimum(diff, 360.0 - diff)
+
+
+class DirectionEstimator(Sink):
+    """
+    给检测事件填上连续角度 event.bearing
+
+    Args:
+        method: 估计方法，见 estimate_angles
+        **kwargs: 传给估计函数的参数
+    """
+
+    def __init__(self, method='parabolic', **kwargs):
+        if method not in METHODS:
+            raise ValueError(f"未知的估计方法: {method}")
+        self.method = method
+        self.kwargs = kwargs
+
+    def estimate(self, directions, maps=None):
+        """批量估计"""
+        return estimate_angles(directions, self.method, maps, **self.kwargs)
+
+    def on_detection(self, event):
+        if self.method == 'map':
+            if not event.audio_map or len(event.audio_map) != 256:
+                return
+            maps = np.frombuffer(event.audio_map, dtype=np.uint8)
+        else:
+            if len(event.directions) != SECTORS:
+                return
+            maps = None
+        event.bearing = float(self.estimate(event.directions, maps)[0])
+
+    def enrich(self, events):
+        """批量处理一组事件，返回填上了角度的事件"""
+        events = [e for e in events if len(e.directions) == SECTORS]
+        if not events:
+            return events
+        maps = None
+        if self.method == 'map':
+            events = [e for e in events if e.audio_map and len(e.audio_map) == 256]
+            if not events:
+                return events
+            maps = np.frombuffer(b''.join(e.audio_map for e in events), dtype=np.uint8)
+        angles = self.estimate([e.directions for e in events], maps)
+        for event, angle in zip(events, angles.tolist()):
+            event.bearing = angle
+        return events
@@ -0,0 +1,573 @@
+# -*- coding: utf-8 -*-
+"""
+在主机上运行设备脚本
+
+simulator.py 在 pty 上模拟设备的串口行为；这里则直接执行 hardware/demo_mic_array.py
+本身，把 Maix.MIC_ARRAY、lcd、image、machine.UART、_thread 和 MicroPython 的 time
+换成模拟实现，用来检查脚本的调度逻辑（LCD 刷新间隔、发送线程、计时输出等）
+而不需要开发板。
+
+时间是虚拟的：每个模拟调用按 COSTS 中的耗时推进虚拟时钟（json.dumps 和
+binascii.hexlify 按数据长度），print 和串口写入按波特率计时（设备上 print 阻塞到
+数据写入串口），time.sleep 直接推进。线程按虚拟时间调度（见 VirtualClock），
+结果与主机速度无关，可以重复。
+
+    emulator = ScriptEmulator('hardware/demo_mic_array.py', frames=500,
+                              overrides={'DISPLAY_INTERVAL_MS': 0})
+    result = emulator.run()
+    print(result.loop_ms, result.displays, result.timings[-1])
+"""
+
+import binascii
+import builtins
+import heapq
+import importlib
+import json
+import random
+import re
+import struct
+import threading
+
+from .protocol import FRAME_SYNC
+
+# 各调用在设备上的耗时（毫秒），粗略估计，可按实测修改
+COSTS = {
+    'get_map': 8.0,
+    'get_dir': 0.5,
+    'set_led': 1.0,
+    'resize': 4.0,
+    'to_rainbow': 6.0,
+    'display': 18.0,
+    'json': 10.0,       # json.dumps，每 KB 输出
+    'hexlify': 1.0,     # binascii.hexlify，每 KB 输入
+}
+
+SCRIPT_MODULES = {
+    'struct': struct, 'ustruct': struct,
+}
+
+
+class StopScript(Exception):
+    """达到设定帧数，结束脚本"""
+
+
+class VirtualClock:
+    """
+    虚拟时钟（秒），同时记录各调用的次数和累计耗时
+
+    脚本用 _thread 启动的线程是真实线程，但同一时刻只有一个在执行：每次调用耗时
+    都让出执行权，由虚拟时间最早的线程继续（离散事件调度），结果仍可重复。
+    计算类调用占用 CPU（多个线程时排队），串口发送和 sleep 只等待时间，
+    等待期间其他线程可以使用 CPU。
+    """
+
+    def __init__(self, costs=None):
+        self.now = 0.0
+        self.costs = dict(COSTS)
+        if costs:
+            self.costs.update(costs)
+        self.calls = {}
+        self.spent = {}
+        self.cpu_free = 0.0     # CPU 空闲的时刻
+        self.stopped = False
+        self.errors = []        # 线程中未捕获的异常
+        self._cond = threading.Condition()
+        self._queue = []        # (唤醒时间, 顺序, 线程号)
+        self._order = 0
+        self._next_id = 1
+        self._running = 0       # 持有执行权的线程号，主线程为 0
+        self._local = threading.local()
+        self._threads = []
+
+    def advance(self, seconds):
+        """等待一段时间（不占用 CPU）"""
+        self._wait_until(self.now + seconds)
+
+    def charge(self, name, seconds=None, io=False):
+        """
+        记录一次调用并推进时间
+
+        Args:
+            name: 调用名称，seconds 为 None 时按 costs[name] 计时
+            io: 为 True 时只等待，不占用 CPU
+        """
+        if seconds is None:
+            seconds = self.costs.get(name, 0.0) / 1000.0
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.spent[name] = self.spent.get(name, 0.0) + seconds
+        if io:
+            self._wait_until(self.now + seconds)
+        else:
+            self.cpu_free = max(self.now, self.cpu_free) + seconds
+            self._wait_until(self.cpu_free)
+
+    def _tid(self):
+        return getattr(self._local, 'tid', 0)
+
+    def _wait_until(self, wake):
+        if not self._threads:
+            self.now = max(self.now, wake)
+            return
+        me = self._tid()
+        with self._cond:
+            heapq.heappush(self._queue, (wake, self._order, me))
+            self._order += 1
+            self._dispatch()
+            while self._running != me and not self.stopped:
+                self._cond.wait()
+        if self.stopped:
+            raise StopScript()
+
+    def _dispatch(self):
+        """把执行权交给虚拟时间最早的线程（调用时持有 _cond）"""
+        if not self._queue:
+            self._running = None
+            return
+        wake, _, tid = heapq.heappop(self._queue)
+        self.now = max(self.now, wake)
+        self._running = tid
+        self._cond.notify_all()
+
+    def spawn(self, func, args=(), kwargs=None):
+        """_thread.start_new_thread：新线程在当前线程下一次让出时开始执行"""
+        tid = self._next_id
+        self._next_id += 1
+
+        def body():
+            self._local.tid = tid
+            with self._cond:
+                while self._running != tid and not self.stopped:
+                    self._cond.wait()
+            if self.stopped:
+                return
+            try:
+                func(*args, **(kwargs or {}))
+            except StopScript:
+                return
+            except Exception as e:
+                self.errors.append(e)
+            with self._cond:
+                self._dispatch()
+
+        with self._cond:
+            heapq.heappush(self._queue, (self.now, self._order, tid))
+            self._order += 1
+        thread = threading.Thread(target=body, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return tid
+
+    def stop(self):
+        """主线程结束：让其他线程在下一次让出时退出"""
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(1)
+
+
+class EmuLock:
+    """_thread 的锁；线程只在调用耗时处切换，等锁时每次让出 10 微秒"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._locked = False
+
+    def acquire(self, waitflag=1, timeout=-1):
+        deadline = self._clock.now + timeout if timeout >= 0 else None
+        while self._locked:
+            if not waitflag or (deadline is not None and self._clock.now >= deadline):
+                return False
+            self._clock.advance(1e-5)
+        self._locked = True
+        return True
+
+    def release(self):
+        if not self._locked:
+            raise RuntimeError('release unlocked lock')
+        self._locked = False
+
+    def locked(self):
+        return self._locked
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class EmuThread:
+    """_thread 模块"""
+
+    def __init__(self, clock):
+        self._clock = clock
+
+    def start_new_thread(self, func, args, kwargs=None):
+        return self._clock.spawn(func, args, kwargs)
+
+    def allocate_lock(self):
+        return EmuLock(self._clock)
+
+    def get_ident(self):
+        return self._clock._tid()
+
+    def stack_size(self, size=0):
+        return 0
+
+
+class EmuJson:
+    """json 模块，dumps 按输出长度计 CPU 时间"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self.loads = json.loads
+
+    def dumps(self, obj):
+        text = json.dumps(obj)
+        self._clock.charge('json', self._clock.costs['json'] * len(text) / 1024000.0)
+        return text
+
+
+class EmuBinascii:
+    """binascii 模块，hexlify 按输入长度计 CPU 时间"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self.unhexlify = binascii.unhexlify
+        self.a2b_base64 = binascii.a2b_base64
+        self.b2a_base64 = binascii.b2a_base64
+
+    def hexlify(self, data):
+        self._clock.charge('hexlify', self._clock.costs['hexlify'] * len(data) / 1024000.0)
+        return binascii.hexlify(data)
+
+
+class EmuTime:
+    """MicroPython 的 time 模块"""
+
+    def __init__(self, clock, epoch=1600000000.0):
+        self._clock = clock
+        self._epoch = epoch
+
+    def time(self):
+        return self._epoch + self._clock.now
+
+    def ticks_ms(self):
+        return int(self._clock.now * 1000) & 0x3FFFFFFF
+
+    def ticks_us(self):
+        return int(self._clock.now * 1000000) & 0x3FFFFFFF
+
+    def ticks_diff(self, end, start):
+        # MicroPython 的 ticks 在 2^30 回绕
+        return ((end - start + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+    def ticks_add(self, ticks, delta):
+        return (ticks + delta) & 0x3FFFFFFF
+
+    def sleep(self, seconds):
+        self._clock.advance(seconds)
+
+    def sleep_ms(self, ms):
+        self._clock.advance(ms / 1000.0)
+
+    def sleep_us(self, us):
+        self._clock.advance(us / 1000000.0)
+
+
+class Image:
+    """image.Image 的最小实现：灰度数据和生成它的方向强度"""
+
+    def __init__(self, width, height, data, dirs=None):
+        self.width = width
+        self.height = height
+        self.data = data
+        self.dirs = dirs
+        self._clock = None
+
+    def resize(self, width, height):
+        self._clock.charge('resize')
+        img = Image(width, height, self.data, self.dirs)
+        img._clock = self._clock
+        return img
+
+    def to_rainbow(self, scale=1):
+        self._clock.charge('to_rainbow')
+        img = Image(self.width, self.height, self.data, self.dirs)
+        img._clock = self._clock
+        return img
+
+
+class ImageModule:
+    """image 模块"""
+
+    Image = Image
+
+
+class MicArray:
+    """
+    Maix.MIC_ARRAY
+
+    安静时 get_map() 返回不变的背景图；声音按段出现，段内每帧的热力图都不同。
+
+    Args:
+        clock: VirtualClock
+        frames: 返回这么多帧后 get_map() 抛出 StopScript，None 表示不限
+        activity: 有声音的帧所占比例
+        burst: 每段声音的平均帧数
+        seed: 随机种子
+    """
+
+    def __init__(self, clock, frames=None, activity=0.3, burst=20, seed=1):
+        self.clock = clock
+        self.frames = frames
+        self.activity = activity
+        self.burst = burst
+        self.rng = random.Random(seed)
+        self.count = 0
+        self.active_frames = 0
+        self.led_updates = 0
+        self._active = False
+        self._source = 0
+        self._quiet = bytes(256)
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
+
+    def get_map(self):
+        if self.frames is not None and self.count >= self.frames:
+            raise StopScript()
+        self.clock.charge('get_map')
+        self.count += 1
+        rng = self.rng
+        # 两状态切换，平均段长 burst 帧，有声音的比例为 activity
+        if self._active:
+            if rng.random() < 1.0 / self.burst:
+                self._active = False
+        elif rng.random() < self.activity / (self.burst * max(1.0 - self.activity, 1e-6)):
+            self._active = True
+            self._source = rng.randrange(12)
+        if not self._active:
+            img = Image(16, 16, self._quiet, (0,) * 12)
+        else:
+            self.active_frames += 1
+            dirs = [rng.randint(0, 3) for _ in range(12)]
+            dirs[self._source] = rng.randint(8, 15)
+            data = bytes(rng.randint(0, 255) for _ in range(256))
+            img = Image(16, 16, data, tuple(dirs))
+        img._clock = self.clock
+        return img
+
+    def get_dir(self, img):
+        self.clock.charge('get_dir')
+        return img.dirs
+
+    def set_led(self, dirs, color):
+        self.clock.charge('set_led')
+        self.led_updates += 1
+
+
+class LCD:
+    """lcd 模块，记录显示的帧"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.frames = 0
+        self.shown = []  # 每次显示的虚拟时间（秒）
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def display(self, img, *args, **kwargs):
+        self.clock.charge('display')
+        self.frames += 1
+        self.shown.append(self.clock.now)
+
+
+class EmuUART:
+    """REPL 串口：写入按波特率计时并记录，读取返回主机发来的数据（默认没有）"""
+
+    def __init__(self, serial):
+        self.serial = serial
+
+    def init(self, baudrate, *args, **kwargs):
+        self.serial.baudrate = baudrate
+
+    def read(self, n=-1):
+        data, self.serial.incoming = self.serial.incoming, b''
+        return data or None
+
+    def write(self, data):
+        self.serial.write(bytes(data))
+        return len(data)
+
+
+class EmuSerial:
+    """设备的串口输出"""
+
+    def __init__(self, clock, baudrate, on_write=None, blocks_cpu=False):
+        self.clock = clock
+        self.baudrate = baudrate
+        self.on_write = on_write
+        self.blocks_cpu = blocks_cpu
+        self.chunks = []       # (虚拟时间, bytes)
+        self.bytes_out = 0
+        self.incoming = b''
+
+    def write(self, data):
+        if self.baudrate:
+            self.clock.charge('uart', len(data) * 10.0 / self.baudrate, io=not self.blocks_cpu)
+        self.chunks.append((self.clock.now, data))
+        self.bytes_out += len(data)
+        if self.on_write is not None:
+            self.on_write(data)
+
+    def lines(self):
+        text = b''.join(data for _, data in self.chunks).decode('utf-8', 'replace')
+        return text.split('\r\n')
+
+
+class EmuMachine:
+    """machine 模块，只有 UART.repl_uart()"""
+
+    def __init__(self, serial):
+        uart = EmuUART(serial)
+
+        class UART:
+            @staticmethod
+            def repl_uart():
+                return uart
+
+        self.UART = UART
+
+
+class EmulationResult:
+    """一次运行的结果"""
+
+    def __init__(self, emulator):
+        clock = emulator.clock
+        self.elapsed = clock.now
+        self.frames = emulator.mic.count
+        self.active_frames = emulator.mic.active_frames
+        self.displays = emulator.lcd.frames
+        self.calls = dict(clock.calls)
+        self.spent = dict(clock.spent)
+        self.bytes_out = emulator.serial.bytes_out
+        self.lines = emulator.serial.lines()
+        # 二进制模式下 TIMING 行前面可能紧跟着二进制帧
+        self.timings = [json.loads(line[line.index('TIMING:') + len('TIMING:'):])
+                        for line in self.lines if 'TIMING:' in line]
+        self.latencies = emulator.latencies
+        self.errors = list(clock.errors)
+
+    @property
+    def loop_ms(self):
+        """平均每次循环（每帧）的耗时"""
+        return self.elapsed / self.frames * 1000 if self.frames else 0.0
+
+    @property
+    def display_fps(self):
+        return self.displays / self.elapsed if self.elapsed else 0.0
+
+
+class ScriptEmulator:
+    """
+    用模拟的设备模块执行设备脚本
+
+    Args:
+        path: 脚本路径
+        frames: 运行多少次 get_map() 后停止
+        overrides: 替换脚本中的顶层常量，如 {'DISPLAY_INTERVAL_MS': 0}
+        costs: 覆盖 COSTS 中的调用耗时（毫秒）
+        baudrate: 串口波特率，print 和串口写入按此计时；None 表示不计
+        uart_blocks_cpu: 串口发送是否占用 CPU（忙等），False 表示按中断/DMA 发送，
+                         发送期间其他线程可以运行
+        activity: 有声音的帧所占比例
+        seed: 随机种子
+    """
+
+    def __init__(self, path, frames=1000, overrides=None, costs=None, baudrate=921600,
+                 uart_blocks_cpu=False, activity=0.3, seed=1):
+        self.path = path
+        self.overrides = {'LINK_BAUDRATE': None}
+        if overrides:
+            self.overrides.update(overrides)
+        self.clock = VirtualClock(costs)
+        self.serial = EmuSerial(self.clock, baudrate, self._on_write, uart_blocks_cpu)
+        self.mic = MicArray(self.clock, frames, activity=activity, seed=seed)
+        self.lcd = LCD(self.clock)
+        self.time = EmuTime(self.clock)
+        self.latencies = []  # 检测数据中的 tick 到发送完的时间（秒）
+        self.modules = {
+            'Maix': type('Maix', (), {'MIC_ARRAY': self.mic}),
+            'lcd': self.lcd,
+            'image': ImageModule,
+            'machine': EmuMachine(self.serial),
+            'time': self.time, 'utime': self.time,
+            '_thread': EmuThread(self.clock),
+            'json': EmuJson(self.clock), 'ujson': EmuJson(self.clock),
+            'binascii': EmuBinascii(self.clock), 'ubinascii': EmuBinascii(self.clock),
+        }
+
+    def source(self):
+        with open(self.path, encoding='utf-8') as f:
+            text = f.read()
+        for name, value in self.overrides.items():
+            text, count = re.subn(rf'^{name}\s*=.*$', f'{name} = {value!r}', text,
+                                  count=1, flags=re.M)
+            if not count:
+                raise KeyError(f"脚本中没有常量 {name}")
+        return text
+
+    def run(self):
+        """
+        执行脚本直到达到设定帧数
+
+        Returns:
+            EmulationResult
+        """
+        names = dict(vars(builtins))
+        names['__import__'] = self._import
+        names['print'] = self._print
+        scope = {'__builtins__': names, '__name__': '__main__'}
+        try:
+            exec(compile(self.source(), self.path, 'exec'), scope)
+        except StopScript:
+            pass
+        finally:
+            self.clock.stop()
+        return EmulationResult(self)
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if name in self.modules:
+            return self.modules[name]
+        module = SCRIPT_MODULES.get(name)
+        if module is not None:
+            return module
+        if name == 'sys':
+            return importlib.import_module('sys')
+        raise ImportError(f"no module named '{name}'")
+
+    def _print(self, *args, sep=' ', end='\n', **kwargs):
+        # 与设备上相同，内容和行尾分两次写串口，其他线程可能在中间写入
+        text = sep.join(str(arg) for arg in args)
+        if text:
+            self.serial.write(text.replace('\n', '\r\n').encode('utf-8'))
+        if end:
+            self.serial.write(end.replace('\n', '\r\n').encode('utf-8'))
+
+    def _on_write(self, data):
+        # 检测数据（文本包或二进制帧）写完时，按其中的 tick 记录延迟
+        if data.startswith(b'AUDIO_PACKET:'):
+            tick = json.loads(data[len(b'AUDIO_PACKET:'):]).get('tick')
+        elif data.startswith(FRAME_SYNC) and len(data) >= 10:
+            tick = struct.unpack_from('<I', data, 6)[0]
+        else:
+            return
+        if tick is not None:
+            self.latencies.append(self.clock.now - tick / 1000.0)
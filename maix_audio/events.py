@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+接收器产生的事件类型
+"""
+
+from .protocol import ANGLE_MAP, FRAME_DETECTION
+
+
+class DetectionEvent:
+    """
+    一次声音检测
+
+    文本协议中由 AUDIO_PACKET 行和随后的 RAW_AUDIO 行合并而成，
+    二进制协议中对应一个检测帧。
+    """
+
+    __slots__ = ('timestamp', 'received', 'angle', 'intensity', 'direction',
+                 'directions', 'seq', 'tick', 'audio_map', 'device', 'bearing', 'map_stats')
+
+    def __init__(self, timestamp, received, angle, intensity, direction,
+                 directions, seq=None, tick=None, audio_map=None, device=None):
+        self.timestamp = timestamp    # 设备给出的时间，没有时等于 received
+        self.received = received      # 主机接收时间
+        self.angle = angle
+        self.intensity = intensity
+        self.direction = direction
+        self.directions = directions  # 12个方向强度
+        self.seq = seq
+        self.tick = tick
+        self.audio_map = audio_map    # 16x16热力图 bytes，可能为 None
+        self.device = device
+        self.bearing = None           # 主机端估计的连续角度（见 direction.py）
+        self.map_stats = None         # 热力图统计 MapStats（见 mapstats.py）
+
+    @classmethod
+    def from_packet(cls, data, received, device=None):
+        """由 AUDIO_PACKET 的 JSON 字典构造"""
+        directions = data.get('all_directions') or []
+        if directions:
+            intensity = max(directions)
+            direction = directions.index(intensity)
+        else:
+            intensity = 0
+            direction = 0
+        audio_map = data.get('audio_map')
+        return cls(
+            data.get('timestamp', received),
+            received,
+            data.get('angle', ANGLE_MAP[direction]),
+            data.get('intensity', intensity),
+            data.get('direction', direction),
+            directions,
+            data.get('seq'),
+            data.get('tick'),
+            bytes(audio_map) if audio_map else None,
+            device,
+        )
+
+    @classmethod
+    def from_frame(cls, frame, received, device=None, audio_map=None):
+        """
+        由二进制帧构造
+
+        Args:
+            audio_map: 已解码的热力图；压缩帧需先经 MapDecoder 解码
+        """
+        directions = list(frame.directions)
+        intensity = max(directions)
+        direction = directions.index(intensity)
+        if audio_map is None and frame.ftype == FRAME_DETECTION:
+            audio_map = frame.payload or None
+        return cls(received, received, ANGLE_MAP[direction], intensity, direction,
+                   directions, frame.seq, frame.tick, audio_map, device)
+
+    def to_dict(self):
+        """转换为与 AUDIO_PACKET 相同结构的字典（不含热力图）"""
+        data = {
+            "type": "audio_detection",
+            "timestamp": self.timestamp,
+            "angle": self.angle,
+            "intensity": self.intensity,
+            "direction": self.direction,
+            "all_directions": list(self.directions),
+        }
+        if self.seq is not None:
+            data["seq"] = self.seq
+        if self.tick is not None:
+            data["tick"] = self.tick
+        if self.device is not None:
+            data["device"] = self.device
+        if self.bearing is not None:
+            data["bearing"] = round(self.bearing, 1)
+        return data
+
+    def __repr__(self):
+        return (f"DetectionEvent(angle={self.angle}, intensity={self.intensity}, "
+                f"direction={self.direction}, seq={self.seq}, "
+                f"map={len(self.audio_map) if self.audio_map else 0}B)")
+
+
+class TrackUpdate:
+    """声源跟踪器输出的平滑轨迹（见 tracker.py）"""
+
+    __slots__ = ('timestamp', 'track_id', 'angle', 'velocity', 'confidence', 'hits',
+                 'device', 'detection')
+
+    def __init__(self, timestamp, track_id, angle, velocity, confidence, hits,
+                 device=None, detection=None):
+        self.timestamp = timestamp
+        self.track_id = track_id
+        self.angle = angle            # 平滑后的角度（度）
+        self.velocity = velocity      # 角速度（度/秒）
+        self.confidence = confidence  # 0~1
+        self.hits = hits              # 关联的检测次数
+        self.device = device
+        self.detection = detection    # 触发本次更新的检测事件
+
+    def to_dict(self):
+        data = {
+            "type": "track",
+            "timestamp": self.timestamp,
+            "track": self.track_id,
+            "angle": round(self.angle, 1),
+            "velocity": round(self.velocity, 1),
+            "confidence": round(self.confidence, 3),
+            "hits": self.hits,
+        }
+        if self.device is not None:
+            data["device"] = self.device
+        return data
+
+    def __repr__(self):
+        return (f"TrackUpdate(track={self.track_id}, angle={self.angle:.1f}, "
+                f"velocity={self.velocity:.1f}, confidence={self.confidence:.2f})")
+
+
+class SourcePosition:
+    """多个阵列方位求交得到的声源位置（见 triangulation.py）"""
+
+    __slots__ = ('timestamp', 'x', 'y', 'var_x', 'cov_xy', 'var_y', 'devices')
+
+    def __init__(self, timestamp, x, y, var_x, cov_xy, var_y, devices=()):
+        self.timestamp = timestamp
+        self.x = x
+        self.y = y
+        self.var_x = var_x            # 位置协方差，单位与阵列坐标相同
+        self.cov_xy = cov_xy
+        self.var_y = var_y
+        self.devices = devices        # 参与定位的设备
+
+    @property
+    def error(self):
+        """位置均方根误差"""
+        return (self.var_x + self.var_y) ** 0.5
+
+    def to_dict(self):
+        return {
+            "type": "position",
+            "timestamp": self.timestamp,
+            "x": round(self.x, 3),
+            "y": round(self.y, 3),
+            "error": round(self.error, 3),
+            "cov": [round(self.var_x, 6), round(self.cov_xy, 6), round(self.var_y, 6)],
+            "devices": list(self.devices),
+        }
+
+    def __repr__(self):
+        return (f"SourcePosition(x={self.x:.2f}, y={self.y:.2f}, error={self.error:.2f}, "
+                f"devices={len(self.devices)})")
+
+
+class LogEvent:
+    """设备的其他文本输出"""
+
+    __slots__ = ('timestamp', 'line', 'device')
+
+    def __init__(self, timestamp, line, device=None):
+        self.timestamp = timestamp
+        self.line = line  # 原始字节，按需解码
+        self.device = device
+
+    @property
+    def text(self):
+        return self.line.decode('utf-8', errors='ignore').strip()
+
+    @property
+    def is_prompt(self):
+        """REPL 提示符行"""
+        return self.line.startswith(b'>>>')
+
+    def __repr__(self):
+        return f"LogEvent({self.text!r})"
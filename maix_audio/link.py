@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+串口波特率协商
+
+设备脚本启动时（LINK_BAUDRATE 不为 None，见 hardware/demo_mic_array.py）:
+
+1. 设备在 115200 下输出一行 LINK_BAUD:<波特率>，100ms 后把 REPL 串口切换到该波特率
+2. 主机读到这一行后切换本端串口，发送测试图样 LINK_PATTERN
+3. 设备收到完整图样后原样回送；主机核对回送无误后发送 LINK_OK
+4. 设备收到 LINK_OK 后在新波特率下输出 LINK_READY:<波特率>，主机收到即协商完成
+
+任何一步超时或图样不一致，双方各自退回 115200，设备在 115200 下输出
+LINK_READY:115200。主机端没有启用协商时，设备等待图样超时后同样退回。
+
+    negotiator = LinkNegotiator(ser)
+    for event in parser.feed(data):
+        rate = parse_request(event)
+        if rate:
+            negotiator.handshake(rate, reader)
+            events += parser.feed(negotiator.take_leftover())
+"""
+
+import time
+
+from .events import LogEvent
+
+DEFAULT_BAUDRATE = 115200
+LINK_REQUEST = b'LINK_BAUD:'
+LINK_READY = b'LINK_READY:'
+LINK_CONFIRM = b'LINK_OK\n'
+# 测试图样：覆盖全部字节值以检查每一位，去掉会被设备当作 Ctrl-C 中断的 0x03
+LINK_PATTERN = bytes(b for b in range(256) if b != 0x03)
+
+
+def parse_request(event):
+    """
+    判断事件是否为设备的波特率切换请求
+
+    Returns:
+        请求的波特率，不是请求时返回 None
+    """
+    if not isinstance(event, LogEvent):
+        return None
+    # 行首可能还带着 REPL 提示符
+    line = event.line
+    index = line.find(LINK_REQUEST)
+    if index < 0:
+        return None
+    try:
+        return int(line[index + len(LINK_REQUEST):].strip())
+    except ValueError:
+        return None
+
+
+class LinkNegotiator:
+    """
+    主机端波特率协商
+
+    Args:
+        ser: 已打开的 serial.Serial
+        fallback: 协商失败时使用的波特率
+        settle: 收到请求后等待设备切换串口的时间（秒），设备端为100ms
+        timeout: 等待回送图样和 LINK_READY 的超时（秒）
+        max_baudrate: 主机端允许的最高波特率，设备请求更高时不响应，让设备超时退回
+    """
+
+    def __init__(self, ser, fallback=DEFAULT_BAUDRATE, settle=0.15, timeout=0.5,
+                 max_baudrate=None):
+        self.ser = ser
+        self.fallback = fallback
+        self.settle = settle
+        self.timeout = timeout
+        self.max_baudrate = max_baudrate
+        self.baudrate = ser.baudrate
+        self.leftover = b''  # 握手中读到的 LINK_READY 行及之后的数据
+
+        # 统计
+        self.switches = 0
+        self.failures = 0
+        self.last_error = None
+
+    def handshake(self, rate, reader):
+        """
+        设备请求切换到 rate 后执行主机端握手
+
+        Args:
+            rate: 设备请求的波特率
+            reader: 读取同一串口的 SerialReader（握手期间的数据不交给解析器）
+
+        Returns:
+            协商后的波特率，失败时为 fallback
+        """
+        if self.max_baudrate and rate > self.max_baudrate:
+            self.last_error = f"设备请求 {rate}，超过主机上限 {self.max_baudrate}"
+            self.failures += 1
+            return self.baudrate
+
+        time.sleep(self.settle)
+        try:
+            self.ser.baudrate = rate
+        except (ValueError, OSError) as e:
+            # 主机串口不支持这个波特率，不响应，设备超时后自行退回
+            self.last_error = f"主机串口不支持 {rate}: {e}"
+            self.failures += 1
+            self._set(self.fallback)
+            return self.baudrate
+
+        self.ser.write(LINK_PATTERN)
+        buf = bytearray()
+        error = None
+        if not self._read_until(reader, buf, LINK_PATTERN):
+            error = "设备没有回送测试图样"
+        else:
+            del buf[:buf.find(LINK_PATTERN) + len(LINK_PATTERN)]
+            self.ser.write(LINK_CONFIRM)
+            ready = LINK_READY + str(rate).encode('ascii')
+            if not self._read_until(reader, buf, ready):
+                error = "没有收到设备的 LINK_READY"
+
+        if error is None:
+            self.leftover = bytes(buf[buf.find(ready):])
+            self.baudrate = rate
+            self.switches += 1
+            self.last_error = None
+            return rate
+        self.last_error = error
+        self.failures += 1
+        self._set(self.fallback)
+        return self.baudrate
+
+    def take_leftover(self):
+        """取出握手成功后多读到的数据，应交给解析器"""
+        data, self.leftover = self.leftover, b''
+        return data
+
+    def _set(self, rate):
+        self.ser.baudrate = rate
+        self.baudrate = rate
+
+    def _read_until(self, reader, buf, expected):
+        deadline = time.monotonic() + self.timeout
+        while expected not in buf:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            data = reader.read_chunk(min(remaining, 0.05))
+            if data is None:
+                return False
+            buf += data
+        return True
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+热力图压缩编解码
+
+连续的 16x16 热力图大多相同或接近全零。设备端每隔若干帧发送一个关键帧
+（整图 RLE），其余帧发送与上一张已发送图的 XOR 差分再做 RLE。
+设备端实现见 hardware/demo_mic_array.py，这里是主机端的解码器和同格式的编码器。
+
+RLE 采用 PackBits 风格的控制字节:
+    c < 128   后面跟 c+1 个原样字节
+    c >= 128  下一个字节重复 c-126 次（2..129）
+
+差分帧依赖上一张图，序列号不连续（丢帧）时差分帧被丢弃，直到下一个关键帧。
+"""
+
+from .protocol import FRAME_DETECTION, FRAME_MAP_DELTA, FRAME_MAP_KEY, MAP_SIZE
+
+
+def rle_encode(data):
+    """PackBits 风格行程编码"""
+    out = bytearray()
+    n = len(data)
+    i = 0
+    while i < n:
+        value = data[i]
+        j = i + 1
+        while j < n and j - i < 129 and data[j] == value:
+            j += 1
+        if j - i >= 2:
+            out.append(j - i + 126)
+            out.append(value)
+            i = j
+            continue
+        # 原样字节，直到下一段重复或满128个
+        j = i + 1
+        while j < n and j - i < 128 and not (j + 1 < n and data[j] == data[j + 1]):
+            j += 1
+        out.append(j - i - 1)
+        out += data[i:j]
+        i = j
+    return bytes(out)
+
+
+def rle_decode(data, size=MAP_SIZE):
+    """
+    行程解码
+
+    Raises:
+        ValueError: 数据损坏或解码长度不等于 size
+    """
+    out = bytearray()
+    n = len(data)
+    i = 0
+    while i < n:
+        c = data[i]
+        i += 1
+        if c < 128:
+            end = i + c + 1
+            if end > n:
+                raise ValueError("RLE 原样段越界")
+            out += data[i:end]
+            i = end
+        else:
+            if i >= n:
+                raise ValueError("RLE 重复段缺少数据")
+            out += bytes((data[i],)) * (c - 126)
+            i += 1
+    if len(out) != size:
+        raise ValueError(f"RLE 解码长度错误: {len(out)}")
+    return bytes(out)
+
+
+def xor_bytes(a, b):
+    """两段等长字节按位异或"""
+    n = len(a)
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(n, 'little')
+
+
+class MapEncoder:
+    """
+    热力图编码器（与设备端逻辑相同，供模拟和测试使用）
+
+    Args:
+        keyframe_interval: 关键帧间隔（帧）
+    """
+
+    def __init__(self, keyframe_interval=30):
+        self.keyframe_interval = keyframe_interval
+        self.reference = None
+        self.since_key = 0
+
+    def encode(self, audio_map):
+        """
+        Returns:
+            (帧类型, 负载)
+        """
+        audio_map = bytes(audio_map)
+        if self.reference is None or self.since_key >= self.keyframe_interval:
+            payload = rle_encode(audio_map)
+            ftype = FRAME_MAP_KEY
+            if len(payload) >= len(audio_map):
+                # 无法压缩时直接发送原图，同样作为参考帧
+                payload = audio_map
+                ftype = FRAME_DETECTION
+            self.since_key = 1
+        else:
+            payload = rle_encode(xor_bytes(audio_map, self.reference))
+            ftype = FRAME_MAP_DELTA
+            self.since_key += 1
+        self.reference = audio_map
+        return ftype, payload
+
+
+class MapDecoder:
+    """热力图解码器，每个数据流一个实例"""
+
+    def __init__(self):
+        self.reference = None
+        self.last_seq = None
+        self.keyframes = 0
+        self.deltas = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def decode(self, frame):
+        """
+        解码一帧中的热力图
+
+        Returns:
+            256 字节热力图；帧中没有热力图或差分帧无法还原时返回 None
+        """
+        ftype = frame.ftype
+        in_order = self.last_seq is not None and frame.seq == (self.last_seq + 1) & 0xFFFF
+        self.last_seq = frame.seq
+        try:
+            if ftype == FRAME_MAP_KEY:
+                audio_map = rle_decode(frame.payload)
+                self.keyframes += 1
+            elif ftype == FRAME_MAP_DELTA:
+                if self.reference is None or not in_order:
+                    # 丢帧后差分无法还原，等待下一个关键帧
+                    self.reference = None
+                    self.dropped += 1
+                    return None
+                audio_map = xor_bytes(rle_decode(frame.payload), self.reference)
+                self.deltas += 1
+            elif len(frame.payload) == MAP_SIZE:
+                audio_map = frame.payload
+            else:
+                return frame.payload or None
+        except ValueError:
+            self.reference = None
+            self.errors += 1
+            return None
+        self.reference = audio_map
+        return audio_map
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+热力图批量统计
+
+每个检测事件单独 np.frombuffer 再分别求最小、最大、平均，开销主要在每次调用上。
+MapStatsStage 是流水线阶段（见 pipeline.py），把热力图攒到预分配的 (K, 16, 16)
+缓冲中，一批只调用一次向量化计算:
+
+    最小、最大、平均        每张图
+    背景                    每张图的中位数
+    峰值                    最大值减背景，以及所在的行、列
+    方向能量                扣除背景后按像素相对图中心的方位分到12个方向求和
+                            （一次矩阵乘法，方位约定与 direction.map_angles 相同）
+    背景图                  各像素的慢变背景，每批按指数平均更新一次
+
+结果写到 event.map_stats（MapStats），事件按原顺序往下传。攒满 size 个或第一个
+事件等待超过 max_wait 秒时计算（在下一个事件到达或读取空闲时检查），附加延迟
+不超过 max_wait（加上读取超时）。
+
+需要 numpy（不在 maix_audio 包顶层导入）：
+
+    from maix_audio.mapstats import MapStatsStage
+
+    pipeline = Pipeline([MapStatsStage(size=16, max_wait=0.05), ConsoleSink(verbose=True)])
+"""
+
+import time
+
+import numpy as np
+
+from .events import DetectionEvent
+from .metrics import Histogram
+from .pipeline import Stage
+
+GRID = 16
+PIXELS = GRID * GRID
+SECTORS = 12
+
+
+def sector_matrix(rotation=0.0, clockwise=False):
+    """
+    像素到方向的 (256, 12) 0/1 矩阵
+
+    方位按 direction.map_angles 的约定：x 为列、y 为行，相对图中心 (7.5, 7.5)。
+    """
+    coords = np.arange(GRID) - 7.5
+    y, x = np.meshgrid(coords, coords, indexing='ij')
+    angle = np.rad2deg(np.arctan2(y, x))
+    if clockwise:
+        angle = -angle
+    angle = (angle + rotation) % 360.0
+    sector = np.rint(angle / (360.0 / SECTORS)).astype(np.int64) % SECTORS
+    matrix = np.zeros((PIXELS, SECTORS), dtype=np.float32)
+    matrix[np.arange(PIXELS), sector.ravel()] = 1.0
+    return matrix
+
+
+def batch_stats(maps, sectors=None):
+    """
+    批量统计
+
+    Args:
+        maps: (N, 16, 16) 或 (N, 256) uint8 热力图
+        sectors: sector_matrix() 的结果，默认不旋转
+
+    Returns:
+        字典，各项为长度 N 的数组：min、max、mean、background、peak、peak_row、
+        peak_col，以及 (N, 12) 的 energy
+    """
+    flat = np.asarray(maps, dtype=np.uint8).reshape(-1, PIXELS)
+    if sectors is None:
+        sectors = sector_matrix()
+    low = flat.min(axis=1)
+    high = flat.max(axis=1)
+    mean = flat.sum(axis=1, dtype=np.uint32) / float(PIXELS)
+    # uint8 的稳定排序是基数排序，整批比 np.partition 快
+    background = np.sort(flat, axis=1, kind='stable')[:, PIXELS // 2]
+    peak_index = flat.argmax(axis=1)
+    excess = np.subtract(flat, background[:, None], dtype=np.float32)
+    np.maximum(excess, 0.0, out=excess)
+    return {
+        "min": low,
+        "max": high,
+        "mean": mean,
+        "background": background,
+        "peak": high - background,
+        "peak_row": peak_index // GRID,
+        "peak_col": peak_index % GRID,
+        "energy": excess @ sectors,
+    }
+
+
+class MapStats:
+    """一张热力图的统计"""
+
+    __slots__ = ('min', 'max', 'mean', 'background', 'peak', 'peak_row', 'peak_col',
+                 'energy')
+
+    def __init__(self, low, high, mean, background, peak, peak_row, peak_col, energy):
+        self.min = low
+        self.max = high
+        self.mean = mean
+        self.background = background  # 中位数
+        self.peak = peak              # 最大值减背景
+        self.peak_row = peak_row
+        self.peak_col = peak_col
+        self.energy = energy          # 12个方向扣除背景后的能量
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MapStatsStage(Stage):
+    """
+    攒批计算热力图统计的流水线阶段
+
+    Args:
+        size: 每批最多几张图（K）
+        max_wait: 第一个事件最多等待多少秒
+        rotation: 图像坐标系与方向0之间的夹角（度），见 direction.map_angles
+        clockwise: 方向编号是否按图像坐标顺时针增加
+        background_rate: 背景图每个事件的更新比例
+    """
+
+    def __init__(self, size=16, max_wait=0.05, rotation=0.0, clockwise=False,
+                 background_rate=0.01):
+        self.size = size
+        self.max_wait = max_wait
+        self.sectors = sector_matrix(rotation, clockwise)
+        self.background_rate = background_rate
+        # 热力图直接按字节拷进缓冲，不对每个事件调用 numpy
+        self._raw = bytearray(size * PIXELS)
+        self.maps = np.frombuffer(self._raw, dtype=np.uint8).reshape(size, GRID, GRID)
+        self._pending = []     # 按到达顺序的事件，带热力图的占用缓冲中的一格
+        self._count = 0        # 缓冲中的热力图数
+        self._started = 0.0
+        self.background_map = None
+        self.batches = 0
+        self.maps_done = 0
+        self.delay = Histogram()   # 每批第一个事件的附加延迟
+
+    def process(self, item):
+        if not self._pending:
+            self._started = time.monotonic()
+        self._pending.append(item)
+        audio_map = item.audio_map if isinstance(item, DetectionEvent) else None
+        if audio_map and len(audio_map) == PIXELS:
+            offset = self._count * PIXELS
+            self._raw[offset:offset + PIXELS] = audio_map
+            self._count += 1
+        if self._count >= self.size or time.monotonic() - self._started >= self.max_wait:
+            return self._emit()
+        return ()
+
+    def idle(self):
+        if self._pending and time.monotonic() - self._started >= self.max_wait:
+            return self._emit()
+        return ()
+
+    def flush(self):
+        return self._emit() if self._pending else ()
+
+    def _emit(self):
+        pending = self._pending
+        count = self._count
+        self._pending = []
+        self._count = 0
+        if count:
+            self._compute(pending, count)
+        self.delay.observe(time.monotonic() - self._started)
+        return pending
+
+    def _compute(self, pending, count):
+        maps = self.maps[:count]
+        stats = batch_stats(maps, self.sectors)
+        self._update_background(maps)
+        columns = zip(stats['min'].tolist(), stats['max'].tolist(), stats['mean'].tolist(),
+                      stats['background'].tolist(), stats['peak'].tolist(),
+                      stats['peak_row'].tolist(), stats['peak_col'].tolist(),
+                      stats['energy'].tolist())
+        for event in pending:
+            audio_map = event.audio_map if isinstance(event, DetectionEvent) else None
+            if audio_map and len(audio_map) == PIXELS:
+                event.map_stats = MapStats(*next(columns))
+        self.batches += 1
+        self.maps_done += count
+
+    def _update_background(self, maps):
+        """背景图按整批的平均图更新，相当于逐个事件指数平均 count 次"""
+        batch_mean = maps.mean(axis=0, dtype=np.float64)
+        if self.background_map is None:
+            self.background_map = batch_mean
+            return
+        rate = 1.0 - (1.0 - self.background_rate) ** len(maps)
+        self.background_map += rate * (batch_mean - self.background_map)
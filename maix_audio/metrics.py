@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+接收器运行指标（Prometheus 文本格式）和按需性能剖析
+
+计数类指标大多在解析器、读取器和各 sink 中本来就有（parser.bytes、writer.records
+等），抓取时才读取，不增加接收循环的开销。接收循环里统计每个读取块的解析耗时，
+每 SINK_SAMPLE 个读取块统计一次各 sink 的处理耗时；写文件耗时由 SegmentWriter.flush_time
+和 FileSink.write_time 记录；流水线（pipeline.py）各阶段的耗时和队列由 Pipeline 自己记录。
+
+    receiver = Receiver(port, metrics='127.0.0.1:9108')
+
+    curl http://127.0.0.1:9108/metrics
+    curl http://127.0.0.1:9108/profile?seconds=10     # 剖析接收线程10秒，返回 pstats 文本
+"""
+
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 耗时直方图的桶上界（秒）
+TIME_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+# 每多少个读取块统计一次 sink 耗时
+SINK_SAMPLE = 16
+
+
+class Histogram:
+    """
+    固定桶直方图
+
+    Args:
+        buckets: 桶上界（升序）
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """分位数所在桶的上界（落在最后一个桶时为 +Inf）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            if total >= target:
+                return bound
+        return float('inf')
+
+    def cumulative(self):
+        """[(上界, 累计个数)]，最后一项上界为 +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in sorted(labels.items())) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class Registry:
+    """
+    指标集合
+
+    指标由采集函数在抓取时给出：collector() 返回
+    [(名称, 类型, 说明, [(标签字典, 值)])]，类型为 counter / gauge / histogram，
+    histogram 的值为 Histogram。
+    """
+
+    def __init__(self):
+        self.collectors = []
+
+    def register(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        for collector in self.collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if kind == 'histogram':
+                        for bound, count in value.cumulative():
+                            bucket = dict(labels, le=_number(float(bound)))
+                            lines.append(f"{name}_bucket{_labels(bucket)} {count}")
+                        lines.append(f"{name}_sum{_labels(labels)} {_number(value.sum)}")
+                        lines.append(f"{name}_count{_labels(labels)} {value.count}")
+                    else:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    """
+    在接收线程内开关 cProfile
+
+    cProfile 只剖析调用 enable() 的线程，所以 HTTP 线程只设置请求标志，
+    接收循环每个读取块调用一次 sync() 完成实际的开关。
+    """
+
+    def __init__(self):
+        self.requested = False
+        self.profile = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def sync(self):
+        if self.requested:
+            if self.profile is None:
+                self.profile = cProfile.Profile()
+                self.profile.enable()
+        elif self.profile is not None:
+            self.profile.disable()
+            self._stopped.set()
+
+    def run(self, seconds, sort='cumulative', limit=40):
+        """
+        剖析接收线程 seconds 秒
+
+        Returns:
+            pstats 文本；接收线程没有响应时返回说明文字
+        """
+        with self._lock:
+            self.profile = None
+            self._stopped.clear()
+            self.requested = True
+            time.sleep(seconds)
+            self.requested = False
+            if not self._stopped.wait(max(1.0, seconds)):
+                return "接收线程没有响应（没有数据时每个读取超时才检查一次）\n"
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats(sort).print_stats(limit)
+            self.profile = None
+            return out.getvalue()
+
+
+class ReceiverMetrics:
+    """
+    Receiver 的指标：采集计数，记录解析和 sink 耗时，提供 HTTP 端点
+
+    Args:
+        receiver: Receiver
+        address: 'host:port'、端口号或 (host, port)；None 表示不开 HTTP 端点
+    """
+
+    def __init__(self, receiver, address=None):
+        self.receiver = receiver
+        self.address = address
+        self.registry = Registry()
+        self.registry.register(self.collect)
+        self.profiler = Profiler()
+        self.parse_time = Histogram()
+        self.sink_time = {}     # sink 类名 -> Histogram，按 SINK_SAMPLE 采样
+        self.chunks = 0
+        self.chunk_bytes = Histogram((64, 256, 1024, 4096, 16384, 65536))
+        self.started = time.time()
+        self.server = None
+        self._thread = None
+
+    def sink_histogram(self, sink):
+        name = type(sink).__name__
+        histogram = self.sink_time.get(name)
+        if histogram is None:
+            histogram = self.sink_time[name] = Histogram()
+        return histogram
+
+    def collect(self):
+        receiver = self.receiver
+        parser = receiver.parser
+        reader = receiver.reader
+        parse_errors = parser.parse_errors
+        buffered = len(parser._buf)
+        if parser.decoder is not None:
+            parse_errors += parser.decoder.crc_errors
+            buffered += len(parser.decoder._buf)
+        metrics = [
+            ("maix_bytes_total", "counter", "串口读到的字节数", [({}, parser.bytes)]),
+            ("maix_lines_total", "counter", "解析的文本行数", [({}, parser.lines)]),
+            ("maix_events_total", "counter", "检测事件数", [({}, parser.events)]),
+            ("maix_parse_errors_total", "counter", "解析错误（含 CRC 错误）",
+             [({}, parse_errors)]),
+            ("maix_reads_total", "counter", "串口读取次数",
+             [({}, reader.reads if reader is not None else 0)]),
+            ("maix_parser_buffer_bytes", "gauge", "解析器中未成行 / 未成帧的字节",
+             [({}, buffered)]),
+            ("maix_serial_waiting_bytes", "gauge", "串口驱动中等待读取的字节",
+             [({}, self._in_waiting())]),
+            ("maix_uptime_seconds", "gauge", "运行时间", [({}, time.time() - self.started)]),
+            ("maix_parse_seconds", "histogram", "每个读取块的解析耗时",
+             [({}, self.parse_time)]),
+            ("maix_chunk_bytes", "histogram", "每次读取的字节数", [({}, self.chunk_bytes)]),
+            ("maix_sink_seconds", "histogram", f"各 sink 处理一个事件的耗时（每{SINK_SAMPLE}个读取块采样）",
+             [({'sink': name}, histogram) for name, histogram in sorted(self.sink_time.items())]),
+        ]
+        metrics.extend(self._sink_metrics())
+        return metrics
+
+    def _in_waiting(self):
+        ser = self.receiver.ser
+        try:
+            return ser.in_waiting if ser is not None and ser.is_open else 0
+        except (OSError, AttributeError):
+            return 0
+
+    def _sink_metrics(self):
+        """各 sink 已有的计数"""
+        from .broker import Broker
+        from .pipeline import Pipeline
+        from .sinks import FileSink
+        from .store import StoreSink
+        from .streamstats import StreamStatsSink
+
+        saved = []
+        files = []
+        writes = []
+        lost = []
+        queued = []
+        stage_time = []
+        stage_wait = []
+        stage_queued = []
+        stage_dropped = []
+        sinks = []
+        for sink in self.receiver.sinks:
+            if isinstance(sink, Pipeline):
+                for stage, stats in zip(sink.stages, sink.stats):
+                    labels = {'stage': stats.name}
+                    stage_time.append((labels, stats.time))
+                    if stage.threaded:
+                        stage_wait.append((labels, stage.wait_time))
+                        stage_queued.append((labels, stage.queue.qsize()))
+                        stage_dropped.append((labels, stage.dropped))
+                sinks.extend(sink.sinks())
+            else:
+                sinks.append(sink)
+        for sink in sinks:
+            name = {'sink': type(sink).__name__}
+            if isinstance(sink, StoreSink):
+                saved.append((name, sink.writer.records))
+                files.append((name, sink.writer.segments))
+                writes.append((name, sink.writer.flush_time))
+            elif isinstance(sink, FileSink):
+                saved.append((name, sink.saved))
+                files.append((name, sink.saved * 2))  # 每次一个 .raw 和一个 .json
+                writes.append((name, sink.write_time))
+            elif isinstance(sink, StreamStatsSink):
+                for device, stats in sink.devices.items():
+                    labels = {'device': str(device)} if device is not None else {}
+                    lost.append((labels, stats.sequence.lost))
+            elif isinstance(sink, Broker):
+                for index, client in enumerate(list(sink.clients)):
+                    queued.append(({'client': str(index)}, client.queued))
+        result = []
+        if saved:
+            result.append(("maix_saved_total", "counter", "已保存的检测事件", saved))
+        if files:
+            result.append(("maix_files_total", "counter", "已创建的数据文件", files))
+        if writes:
+            result.append(("maix_write_seconds", "histogram", "写文件耗时（段文件为每次落盘）",
+                           writes))
+        if lost:
+            result.append(("maix_lost_events_total", "counter", "按序列号统计的丢失事件", lost))
+        if queued:
+            result.append(("maix_broker_queue_bytes", "gauge", "订阅方发送队列中的字节", queued))
+        if stage_time:
+            result.append(("maix_stage_seconds", "histogram", "流水线各阶段处理一项的耗时（不含后续阶段）",
+                           stage_time))
+        if stage_wait:
+            result.append(("maix_stage_queue_seconds", "histogram", "线程阶段的排队等待时间",
+                           stage_wait))
+            result.append(("maix_stage_queue_items", "gauge", "线程阶段队列中的项数", stage_queued))
+            result.append(("maix_stage_dropped_total", "counter", "线程阶段队列满时丢弃的项",
+                           stage_dropped))
+        return result
+
+    # ---- HTTP ----
+
+    def start(self):
+        if self.address is None or self.server is not None:
+            return
+        address = self.address
+        if isinstance(address, int):
+            address = ('127.0.0.1', address)
+        elif isinstance(address, str):
+            host, _, port = address.rpartition(':')
+            address = (host or '127.0.0.1', int(port))
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/metrics':
+                    body = metrics.registry.render().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif url.path == '/profile':
+                    query = parse_qs(url.query)
+                    seconds = float(query.get('seconds', ['10'])[0])
+                    sort = query.get('sort', ['cumulative'])[0]
+                    body = metrics.profiler.run(seconds, sort).encode('utf-8')
+                    content_type = 'text/plain; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(address, Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics',
+                                        daemon=True)
+        self._thread.start()
+        host, port = self.server.server_address[:2]
+        print(f"📊 指标: http://{host}:{port}/metrics")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+串口数据流解析器
+
+把串口读到的字节块直接解析为事件（DetectionEvent / LogEvent），
+文本协议和二进制协议共用同一个入口，取代各脚本中重复的前缀解析代码。
+
+文本模式在复用的 bytearray 中按位置切分行：前缀判断用
+bytearray.startswith(prefix, start, end)，RAW_AUDIO 的十六进制直接对
+memoryview 切片解码，不对每行做 decode()/strip()。
+"""
+
+import binascii
+import json
+import time
+
+from .events import DetectionEvent, LogEvent
+from .mapcodec import MapDecoder
+from .protocol import MAP_SIZE, Frame, FrameDecoder
+
+AUDIO_PREFIX = b'AUDIO_PACKET:'
+RAW_PREFIX = b'RAW_AUDIO:'
+MAP_KEY = b'"audio_map":'
+
+
+class StreamParser:
+    """
+    增量解析器
+
+    AUDIO_PACKET 行先暂存，等到紧随其后的 RAW_AUDIO 行把热力图补上再输出；
+    如果下一行不是 RAW_AUDIO（设备没有发送热力图），直接输出暂存的事件。
+    读取超时时调用 flush() 输出暂存的事件。
+
+    设备的 JSON 中 audio_map 是256个整数的列表，和 RAW_AUDIO 内容重复，
+    解析 JSON 时先跳过这个列表，只有没等到 RAW_AUDIO 时才解析它。
+
+    Args:
+        binary: 是否为二进制帧协议（帧与文本混合）
+        device: 设备标识，写入每个事件
+        clock: 主机时间函数
+        max_buffer: 无换行数据的最大缓存字节数
+    """
+
+    def __init__(self, binary=False, device=None, clock=time.time, max_buffer=65536):
+        self.binary = binary
+        self.device = device
+        self.clock = clock
+        self.max_buffer = max_buffer
+        self.decoder = FrameDecoder(max_buffer) if binary else None
+        self.maps = MapDecoder() if binary else None
+        self._buf = bytearray()
+        self._pending = None
+        self._pending_map = None
+
+        # 统计
+        self.bytes = 0
+        self.lines = 0
+        self.events = 0
+        self.parse_errors = 0
+
+    def feed(self, data):
+        """
+        输入新数据
+
+        Args:
+            data: 从串口读到的字节
+
+        Returns:
+            事件列表，保持到达顺序
+        """
+        self.bytes += len(data)
+        out = []
+
+        if self.decoder is not None:
+            now = self.clock()
+            for item in self.decoder.feed(data):
+                if isinstance(item, Frame):
+                    self._flush_pending(out)
+                    audio_map = self.maps.decode(item)
+                    out.append(DetectionEvent.from_frame(item, now, self.device, audio_map))
+                    self.events += 1
+                else:
+                    with memoryview(item) as view:
+                        self._parse_line(item, view, 0, len(item), out, now)
+            return out
+
+        buf = self._buf
+        buf += data
+        last = buf.rfind(b'\n')
+        if last < 0:
+            if len(buf) > self.max_buffer:
+                self.parse_errors += 1
+                del buf[:]
+            return out
+
+        now = self.clock()
+        start = 0
+        with memoryview(buf) as view:
+            while start <= last:
+                nl = buf.find(b'\n', start, last + 1)
+                stop = nl
+                if stop > start and buf[stop - 1] == 0x0D:
+                    stop -= 1
+                if stop > start:
+                    self._parse_line(buf, view, start, stop, out, now)
+                start = nl + 1
+        del buf[:last + 1]
+        return out
+
+    @property
+    def has_pending(self):
+        """是否有等待 RAW_AUDIO 的检测事件"""
+        return self._pending is not None
+
+    def flush(self):
+        """输出暂存的检测事件（读取超时或结束时调用）"""
+        out = []
+        self._flush_pending(out)
+        return out
+
+    def _flush_pending(self, out):
+        pending = self._pending
+        if pending is None:
+            return
+        if self._pending_map is not None:
+            # 没有 RAW_AUDIO 行，使用 JSON 中的热力图
+            try:
+                pending.audio_map = bytes(json.loads(self._pending_map)) or None
+            except (ValueError, TypeError):
+                self.parse_errors += 1
+            self._pending_map = None
+        out.append(pending)
+        self._pending = None
+        self.events += 1
+
+    def _parse_packet(self, buf, start, stop, now):
+        """解析 AUDIO_PACKET 的 JSON，audio_map 列表替换为 null 后再交给 json"""
+        key = buf.find(MAP_KEY, start, stop)
+        if key >= 0:
+            begin = key + len(MAP_KEY)
+            while begin < stop and buf[begin] == 0x20:
+                begin += 1
+            if begin < stop and buf[begin] == 0x5B:  # '['
+                end = buf.find(b']', begin, stop)
+                if end >= 0:
+                    data = json.loads(buf[start:begin] + b'null' + buf[end + 1:stop])
+                    event = DetectionEvent.from_packet(data, now, self.device)
+                    self._pending_map = buf[begin:end + 1]
+                    return event
+        return DetectionEvent.from_packet(json.loads(buf[start:stop]), now, self.device)
+
+    def _parse_line(self, buf, view, start, stop, out, now):
+        """解析 buf[start:stop] 一行"""
+        self.lines += 1
+
+        if buf.startswith(RAW_PREFIX, start, stop):
+            pending = self._pending
+            self._pending = None
+            try:
+                audio_map = binascii.unhexlify(view[start + len(RAW_PREFIX):stop])
+            except (binascii.Error, ValueError):
+                audio_map = None
+            if audio_map is not None and len(audio_map) != MAP_SIZE:
+                audio_map = None  # 行被截断，剩下偶数个十六进制字符
+            if audio_map is None:
+                self.parse_errors += 1
+            if pending is None:
+                # 没有配对的 AUDIO_PACKET
+                self.parse_errors += 1
+                return
+            if audio_map is not None:
+                pending.audio_map = audio_map
+                self._pending_map = None
+            else:
+                self._pending = pending
+                self._flush_pending(out)
+                return
+            out.append(pending)
+            self.events += 1
+            return
+
+        self._flush_pending(out)
+
+        if buf.startswith(AUDIO_PREFIX, start, stop):
+            try:
+                self._pending = self._parse_packet(buf, start + len(AUDIO_PREFIX), stop, now)
+            except (ValueError, TypeError, AttributeError):
+                self.parse_errors += 1
+            return
+
+        out.append(LogEvent(now, bytes(view[start:stop]), self.device))
@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+"""
+事件处理流水线
+
+把接收后的处理拆成一串阶段（解码、补充、过滤、分批、输出），每个阶段的
+process(item) 是生成器，对一个输入产出零个或多个输出，依次交给下一个阶段：
+
+    DecodeStage    串口数据块 -> 事件（离线回放时用；Receiver 自己解析）
+    MapStage       补充 / 修改事件，返回 None 表示丢弃
+    FilterStage    按条件保留
+    BatchStage     凑成列表，满 size 个或等待超过 max_wait 秒时输出
+    SinkStage      交给已有的 sink（handle / idle / close），事件原样往下传
+
+慢的阶段（写盘等）用 ThreadedStage 包起来，在线程池中运行，前面用有界队列隔开：
+接收线程只负责入队，这个阶段和它后面的阶段都在工作线程中执行。队列满时默认丢弃
+新的一项并计入 dropped，接收线程从不等待慢的阶段（否则串口缓冲会溢出，丢得更多）；
+block=True 时等待、不丢数据，只用于离线回放等没有实时输入的场合。workers 大于1时
+输出不再保序，后面的阶段要能在多个线程中同时调用。
+
+Pipeline 本身是 sink，加到 Receiver 的 sinks 中即可，新的分析步骤只需增加阶段，
+不用改接收循环。每个阶段记录处理一个输入的耗时（不含后续阶段），线程阶段另外记录
+排队等待时间和丢弃数，关闭时打印各阶段耗时，也在 /metrics 中输出（见 metrics.py）。
+
+    from maix_audio.pipeline import FilterStage, Pipeline, ThreadedStage
+
+    pipeline = Pipeline([
+        DirectionEstimator(),                            # sink 自动包成 SinkStage
+        FilterStage(lambda e: e.intensity >= 8),
+        ConsoleSink(),
+        ThreadedStage(StoreSink("maix_audio_data")),
+    ])
+    receiver = Receiver(port, sinks=[pipeline])
+"""
+
+import queue
+import threading
+import time
+
+from .metrics import Histogram
+from .sinks import Sink
+
+
+class Stage:
+    """
+    阶段基类
+
+    process / idle / flush 返回可迭代对象（通常写成生成器），其中的每一项交给下一个阶段。
+    """
+
+    threaded = False
+    # 出错时是否把输入原样交给下一个阶段（sink 出错不影响后面的 sink）
+    passthrough = False
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def process(self, item):
+        yield item
+
+    def idle(self):
+        """读取空闲时调用"""
+        return ()
+
+    def flush(self):
+        """关闭前调用，输出暂存的数据"""
+        return ()
+
+    def close(self):
+        pass
+
+
+class DecodeStage(Stage):
+    """
+    串口数据块 -> 事件
+
+    Args:
+        parser: StreamParser
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def process(self, item):
+        if item:
+            yield from self.parser.feed(item)
+        else:
+            # 空块表示读取超时，输出暂存的检测事件
+            yield from self.parser.flush()
+
+    def idle(self):
+        return self.parser.flush()
+
+    def flush(self):
+        return self.parser.flush()
+
+
+class MapStage(Stage):
+    """
+    用函数处理每一项
+
+    Args:
+        func: func(item) 返回新的一项，None 表示丢弃
+        name: 阶段名，默认为函数名
+    """
+
+    def __init__(self, func, name=None):
+        self.func = func
+        self._name = name or getattr(func, '__name__', type(self).__name__)
+
+    @property
+    def name(self):
+        return self._name
+
+    def process(self, item):
+        result = self.func(item)
+        if result is not None:
+            yield result
+
+
+class FilterStage(MapStage):
+    """
+    只保留 predicate(item) 为真的项
+
+    Args:
+        predicate: 判断函数
+        name: 阶段名
+    """
+
+    def process(self, item):
+        if self.func(item):
+            yield item
+
+
+class BatchStage(Stage):
+    """
+    把输入凑成列表
+
+    Args:
+        size: 每批最多几项
+        max_wait: 第一项进入后最多等待多少秒（在下一项到达或读取空闲时检查）
+    """
+
+    def __init__(self, size=64, max_wait=1.0):
+        self.size = size
+        self.max_wait = max_wait
+        self._batch = []
+        self._started = 0.0
+
+    def process(self, item):
+        if not self._batch:
+            self._started = time.monotonic()
+        self._batch.append(item)
+        if len(self._batch) >= self.size or time.monotonic() - self._started >= self.max_wait:
+            yield self._take()
+
+    def idle(self):
+        if self._batch and time.monotonic() - self._started >= self.max_wait:
+            return [self._take()]
+        return ()
+
+    def flush(self):
+        return [self._take()] if self._batch else ()
+
+    def _take(self):
+        batch = self._batch
+        self._batch = []
+        return batch
+
+
+class SinkStage(Stage):
+    """
+    把每一项交给 sink，原样往下传；输入为列表（BatchStage 之后）时逐个交给 sink
+
+    Args:
+        sink: Sink
+    """
+
+    passthrough = True
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    @property
+    def name(self):
+        return type(self.sink).__name__
+
+    def process(self, item):
+        if isinstance(item, list):
+            for event in item:
+                self.sink.handle(event)
+        else:
+            self.sink.handle(item)
+        yield item
+
+    def idle(self):
+        self.sink.idle()
+        return ()
+
+    def close(self):
+        self.sink.close()
+
+
+def as_stage(stage):
+    """Stage 原样返回，Sink 包成 SinkStage，函数包成 MapStage"""
+    if isinstance(stage, Stage):
+        return stage
+    if isinstance(stage, Sink):
+        return SinkStage(stage)
+    if callable(stage):
+        return MapStage(stage)
+    raise TypeError(f"不能作为流水线阶段: {stage!r}")
+
+
+_IDLE = object()
+_STOP = object()
+
+
+class ThreadedStage(Stage):
+    """
+    在工作线程中运行的阶段，前面是有界队列
+
+    Args:
+        stage: 阶段（或 sink、函数，见 as_stage）
+        workers: 工作线程数；有状态的阶段（写文件等）应为1
+        maxsize: 队列长度上限
+        block: 队列满时是否等待；默认 False，丢弃并计入 dropped
+    """
+
+    threaded = True
+
+    def __init__(self, stage, workers=1, maxsize=1024, block=False):
+        self.stage = as_stage(stage)
+        self.workers = workers
+        self.block = block
+        self.queue = queue.Queue(maxsize)
+        self.wait_time = Histogram()
+        self.dropped = 0
+        self.max_depth = 0
+        self.lock = threading.Lock()
+        self._threads = []
+
+    @property
+    def name(self):
+        return self.stage.name
+
+    @property
+    def passthrough(self):
+        return self.stage.passthrough
+
+    def start(self, handler):
+        """
+        启动工作线程
+
+        Args:
+            handler: handler(item) 在工作线程中处理一项（本阶段及后续阶段）；
+                     handler(_IDLE) 处理空闲
+        """
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(handler,),
+                                      name=f'stage-{self.name}-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, item):
+        try:
+            self.queue.put((time.perf_counter(), item), block=self.block)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def submit_idle(self):
+        try:
+            self.queue.put_nowait((None, _IDLE))
+        except queue.Full:
+            pass
+
+    def _work(self, handler):
+        while True:
+            queued, item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                if queued is not None:
+                    wait = time.perf_counter() - queued
+                    with self.lock:
+                        self.wait_time.observe(wait)
+                handler(item)
+            finally:
+                self.queue.task_done()
+
+    def process(self, item):
+        return self.stage.process(item)
+
+    def idle(self):
+        return self.stage.idle()
+
+    def flush(self):
+        return self.stage.flush()
+
+    def join(self):
+        """等待队列中的项处理完"""
+        self.queue.join()
+
+    def close(self):
+        for _ in self._threads:
+            self.queue.put((None, _STOP))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.stage.close()
+
+
+class StageStats:
+    """一个阶段的计数和耗时"""
+
+    def __init__(self, name):
+        self.name = name
+        self.time = Histogram()
+        self.items = 0
+        self.outputs = 0
+        self.errors = 0
+        self.max = 0.0
+
+
+class Pipeline(Sink):
+    """
+    由阶段组成的流水线，可以作为 sink 加到 Receiver
+
+    Args:
+        stages: 阶段列表（Stage、Sink 或函数，见 as_stage）
+        report: 关闭时是否打印各阶段耗时
+    """
+
+    def __init__(self, stages, report=True):
+        self.stages = [as_stage(stage) for stage in stages]
+        self.stats = [StageStats(stage.name) for stage in self.stages]
+        self.report_on_close = report
+        # 线程阶段及其后面的阶段在工作线程中执行，统计时用该线程阶段的锁
+        self._locks = []
+        lock = None
+        for index, stage in enumerate(self.stages):
+            if stage.threaded:
+                lock = stage.lock
+                stage.start(self._handler(index))
+            self._locks.append(lock)
+
+    def _handler(self, index):
+        def handle(item):
+            if item is _IDLE:
+                self._idle_from(index)
+                return
+            for output in self._step(index, item):
+                self._push(index + 1, output)
+        return handle
+
+    def _call(self, index, method):
+        """调用阶段的 idle / flush，出错时返回空列表"""
+        try:
+            return list(method())
+        except Exception as e:
+            return self._error(index, e)
+
+    def _error(self, index, error, item=None):
+        """记录错误；能原样往下传的阶段返回 [item]，否则返回空列表"""
+        stage = self.stages[index]
+        print(f"❌ 处理错误 ({stage.name}): {error}")
+        lock = self._locks[index]
+        if lock is None:
+            self.stats[index].errors += 1
+        else:
+            with lock:
+                self.stats[index].errors += 1
+        return [item] if item is not None and stage.passthrough else []
+
+    def _step(self, index, item):
+        """本阶段处理一项，返回输出列表"""
+        stage = self.stages[index]
+        start = time.perf_counter()
+        try:
+            outputs = list(stage.process(item))
+        except Exception as e:
+            outputs = self._error(index, e, item)
+        elapsed = time.perf_counter() - start
+        lock = self._locks[index]
+        if lock is None:
+            self._observe(self.stats[index], elapsed, len(outputs))
+        else:
+            with lock:
+                self._observe(self.stats[index], elapsed, len(outputs))
+        return outputs
+
+    @staticmethod
+    def _observe(stats, elapsed, outputs):
+        stats.time.observe(elapsed)
+        stats.items += 1
+        stats.outputs += outputs
+        if elapsed > stats.max:
+            stats.max = elapsed
+
+    def _push(self, index, item):
+        """从第 index 个阶段开始处理一项"""
+        stages = self.stages
+        while index < len(stages):
+            if stages[index].threaded:
+                stages[index].submit(item)
+                return
+            outputs = self._step(index, item)
+            if len(outputs) != 1:
+                for output in outputs:
+                    self._push(index + 1, output)
+                return
+            item = outputs[0]
+            index += 1
+
+    def _idle_from(self, index):
+        """从第 index 个阶段开始依次调用 idle，遇到下一个线程阶段时交给它的工作线程"""
+        for current in range(index, len(self.stages)):
+            stage = self.stages[current]
+            if stage.threaded and current != index:
+                stage.submit_idle()
+                return
+            for output in self._call(current, stage.idle):
+                self._push(current + 1, output)
+
+    def feed(self, item):
+        """输入一项"""
+        self._push(0, item)
+
+    def run(self, source):
+        """
+        处理一个可迭代的输入（如录制的串口数据块），结束后关闭流水线
+
+        Returns:
+            输入的项数
+        """
+        count = 0
+        try:
+            for item in source:
+                self._push(0, item)
+                count += 1
+        finally:
+            self.close()
+        return count
+
+    # ---- Sink 接口 ----
+
+    def handle(self, event):
+        self._push(0, event)
+
+    def idle(self):
+        # 线程阶段及其后面阶段的 idle 在工作线程中执行，不与 process 并发
+        if self.stages and self.stages[0].threaded:
+            self.stages[0].submit_idle()
+        else:
+            self._idle_from(0)
+
+    def close(self):
+        # 按顺序排空：前面阶段的剩余输出进入后面阶段的队列后，再等后面的阶段
+        for index, stage in enumerate(self.stages):
+            if stage.threaded:
+                stage.join()
+            for output in self._call(index, stage.flush):
+                self._push(index + 1, output)
+        for stage in self.stages:
+            try:
+                stage.close()
+            except Exception as e:
+                print(f"❌ 关闭输出错误 ({stage.name}): {e}")
+        if self.report_on_close and any(stats.items for stats in self.stats):
+            print(self.report())
+
+    # ---- 统计 ----
+
+    def sinks(self):
+        """流水线中的 sink（供指标采集）"""
+        result = []
+        for stage in self.stages:
+            inner = stage.stage if stage.threaded else stage
+            if isinstance(inner, SinkStage):
+                result.append(inner.sink)
+        return result
+
+    def snapshot(self):
+        result = []
+        for stage, stats in zip(self.stages, self.stats):
+            entry = {
+                "stage": stats.name,
+                "threaded": stage.threaded,
+                "items": stats.items,
+                "outputs": stats.outputs,
+                "errors": stats.errors,
+                "mean": stats.time.sum / stats.items if stats.items else 0.0,
+                "p99": stats.time.quantile(0.99),
+                "max": stats.max,
+            }
+            if stage.threaded:
+                wait = stage.wait_time
+                entry.update({
+                    "queued": stage.queue.qsize(),
+                    "max_queued": stage.max_depth,
+                    "dropped": stage.dropped,
+                    "wait_mean": wait.sum / wait.count if wait.count else 0.0,
+                    "wait_p99": wait.quantile(0.99),
+                })
+            result.append(entry)
+        return result
+
+    def report(self):
+        lines = ["📊 流水线各阶段耗时（不含后续阶段）:",
+                 f"   {'阶段':<20}{'输入':>8}{'平均ms':>9}{'p99≤ms':>9}{'最大ms':>9}"
+                 f"{'排队平均ms':>11}{'最大排队':>8}{'丢弃':>6}{'错误':>6}"]
+        for entry in self.snapshot():
+            name = entry['stage'] + (' [线程]' if entry['threaded'] else '')
+            if entry['threaded']:
+                queued = (f"{entry['wait_mean'] * 1000:>11.2f}{entry['max_queued']:>8}"
+                          f"{entry['dropped']:>6}")
+            else:
+                queued = f"{'-':>11}{'-':>8}{'-':>6}"
+            lines.append(f"   {name:<20}{entry['items']:>8}{entry['mean'] * 1000:>9.3f}"
+                         f"{entry['p99'] * 1000:>9.2f}{entry['max'] * 1000:>9.2f}"
+                         f"{queued}{entry['errors']:>6}")
+        return '\n'.join(lines)
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+麦克风阵列二进制帧协议（主机端）
+
+帧格式（小端）:
+
+    偏移  长度  字段
+    0     2     同步字 0xA5 0x5A
+    2     1     协议版本
+    3     1     帧类型
+    4     2     序列号 (uint16, 回绕)
+    6     4     设备 tick (time.ticks_ms(), uint32, 回绕)
+    10    12    12个方向强度 (uint8, 超过255截断)
+    22    2     负载长度 N
+    24    N     负载（检测帧为16x16热力图，可为空；压缩帧见 mapcodec.py）
+    24+N  2     CRC16/MODBUS，覆盖偏移2到24+N
+
+设备端编码器在 hardware/demo_mic_array.py 中，两边格式需保持一致。
+帧与普通文本输出混在同一个串口流中，解码器会把帧以外的字节按行还原为文本。
+"""
+
+import struct
+
+# 角度映射：12个LED对应的角度（度）
+ANGLE_MAP = [0, 30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330]
+
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_VERSION = 1
+
+# 帧类型
+FRAME_DETECTION = 1   # 负载为原始热力图或为空
+FRAME_MAP_KEY = 2     # 负载为 RLE 压缩的热力图（关键帧）
+FRAME_MAP_DELTA = 3   # 负载为与上一张图 XOR 后 RLE 压缩的差分
+
+HEADER_FORMAT = '<2sBBHI12sH'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+CRC_SIZE = 2
+MAP_SIZE = 256
+MAX_PAYLOAD = 1024
+
+_header = struct.Struct(HEADER_FORMAT)
+_crc = struct.Struct('<H')
+
+
+def _generate_crc16_table():
+    """生成CRC16/MODBUS查找表（与 basic/demo_crc16.py 相同）"""
+    table = []
+    for byte in range(256):
+        crc = 0x0000
+        for _ in range(8):
+            if (byte ^ crc) & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+            byte >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = _generate_crc16_table()
+
+
+def crc16(data, crc=0xFFFF):
+    """计算CRC16/MODBUS校验值"""
+    table = CRC16_TABLE
+    for char in data:
+        crc = (crc >> 8) ^ table[(crc ^ char) & 0xFF]
+    return crc
+
+
+class Frame:
+    """解码后的一帧数据"""
+
+    __slots__ = ('ftype', 'seq', 'tick', 'directions', 'payload')
+
+    def __init__(self, ftype, seq, tick, directions, payload):
+        self.ftype = ftype
+        self.seq = seq
+        self.tick = tick
+        self.directions = directions
+        self.payload = payload
+
+    @property
+    def direction(self):
+        """强度最大的方向编号"""
+        dirs = self.directions
+        return dirs.index(max(dirs))
+
+    @property
+    def intensity(self):
+        return max(self.directions)
+
+    @property
+    def angle(self):
+        return ANGLE_MAP[self.direction]
+
+    def to_packet(self, timestamp):
+        """
+        转换为与 AUDIO_PACKET JSON 相同结构的字典
+
+        Args:
+            timestamp: 主机接收时间（设备tick不是墙上时间）
+        """
+        return {
+            "type": "audio_detection",
+            "timestamp": timestamp,
+            "seq": self.seq,
+            "tick": self.tick,
+            "angle": self.angle,
+            "intensity": self.intensity,
+            "direction": self.direction,
+            "all_directions": list(self.directions),
+        }
+
+    def __repr__(self):
+        return (f"Frame(type={self.ftype}, seq={self.seq}, tick={self.tick}, "
+                f"directions={list(self.directions)}, payload={len(self.payload)}B)")
+
+
+def encode_frame(seq, tick, directions, payload=b'', ftype=FRAME_DETECTION):
+    """
+    编码一帧（主机端实现，用于模拟和测试，设备端实现见 demo_mic_array.py）
+
+    Args:
+        seq: 序列号
+        tick: 设备 tick（毫秒）
+        directions: 12个方向强度
+        payload: 负载字节，检测帧为256字节热力图
+        ftype: 帧类型
+
+    Returns:
+        完整帧字节
+    """
+    if len(directions) != 12:
+        raise ValueError("需要12个方向强度")
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"负载过长: {len(payload)}字节")
+    dirs = bytes(min(max(int(v), 0), 255) for v in directions)
+    body = _header.pack(FRAME_SYNC, FRAME_VERSION, ftype, seq & 0xFFFF,
+                        tick & 0xFFFFFFFF, dirs, len(payload)) + bytes(payload)
+    return body + _crc.pack(crc16(memoryview(body)[2:]))
+
+
+class FrameDecoder:
+    """
+    增量帧解码器
+
+    从串口读到的任意字节块喂给 feed()，返回其中完整的帧（Frame）和
+    文本行（去掉行尾的 bytes）。不完整的数据保留到下一次调用。
+    """
+
+    def __init__(self, max_buffer=65536):
+        self._buf = bytearray()
+        self.max_buffer = max_buffer
+        self.frames = 0
+        self.crc_errors = 0
+        self.dropped_bytes = 0
+
+    def _split_text(self, start, end, out, flush=False):
+        """把 [start, end) 的文本按行输出，返回消费到的位置"""
+        buf = self._buf
+        pos = start
+        while pos < end:
+            nl = buf.find(b'\n', pos, end)
+            if nl < 0:
+                if flush:
+                    line = bytes(buf[pos:end]).rstrip(b'\r')
+                    if line:
+                        out.append(line)
+                    return end
+                return pos
+            line = bytes(buf[pos:nl]).rstrip(b'\r')
+            if line:
+                out.append(line)
+            pos = nl + 1
+        return pos
+
+    def feed(self, data):
+        """
+        输入新数据
+
+        Args:
+            data: 从串口读到的字节
+
+        Returns:
+            Frame 和文本行(bytes)组成的列表，保持到达顺序
+        """
+        buf = self._buf
+        buf += data
+        out = []
+        pos = 0
+        n = len(buf)
+
+        while pos < n:
+            i = buf.find(FRAME_SYNC, pos)
+            if i < 0:
+                pos = self._split_text(pos, n, out)
+                break
+            if i > pos:
+                # 帧前面的文本（被帧打断的半行也一并输出）
+                pos = self._split_text(pos, i, out, flush=True)
+            if n - i < HEADER_SIZE:
+                break
+
+            _, version, ftype, seq, tick, dirs, plen = _header.unpack_from(buf, i)
+            if version != FRAME_VERSION or plen > MAX_PAYLOAD:
+                # 不是有效帧头，跳过同步字首字节重新搜索
+                self.crc_errors += 1
+                self.dropped_bytes += 1
+                pos = i + 1
+                continue
+            total = HEADER_SIZE + plen + CRC_SIZE
+            if n - i < total:
+                break
+
+            end = i + HEADER_SIZE + plen
+            crc, = _crc.unpack_from(buf, end)
+            if crc16(memoryview(buf)[i + 2:end]) != crc:
+                self.crc_errors += 1
+                self.dropped_bytes += 1
+                pos = i + 1
+                continue
+
+            out.append(Frame(ftype, seq, tick, tuple(dirs),
+                             bytes(buf[i + HEADER_SIZE:end])))
+            self.frames += 1
+            pos = end + CRC_SIZE
+
+        del buf[:pos]
+        if len(buf) > self.max_buffer:
+            # 长时间没有换行或帧尾，丢弃旧数据防止无限增长
+            drop = len(buf) - self.max_buffer
+            del buf[:drop]
+            self.dropped_bytes += drop
+        return out
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+已保存检测事件的索引查询
+
+对数据目录中的段文件（StoreSink）和旧版的 .json / .raw 文件（FileSink）建立
+紧凑的列式索引，放在 <数据目录>/.index 下:
+
+    time.f8         (N,)       float64 时间（段文件为主机接收时间，json 为 timestamp）
+    direction.u1    (N,)       uint8   方向（角度分档，0~11）
+    intensity.u2    (N,)       uint16  强度
+    file.u4         (N,)       uint32  所在文件在 meta.json 文件表中的序号
+    record.u4       (N,)       uint32  段文件中的记录号（json 为 0）
+    bitmap.u1       (12, N/8)  uint8   每个方向一张位图（np.packbits）
+    meta.json       行数、文件表（每个文件已索引的记录数）
+
+行按时间排序。update() 只读取新文件和段文件新追加的记录，新数据都比已有的晚时
+直接追加，否则整体重新排序。查询时时间范围用 np.searchsorted 二分得到行区间，
+方向用位图按区间取出后按位或，强度在区间内向量化比较；匹配的记录从段文件
+按记录号映射读取（np.memmap），分块产出。
+
+需要 numpy（不在 maix_audio 包顶层导入）：
+
+    from maix_audio.query import EventIndex
+
+    index = EventIndex("maix_audio_data")
+    index.update()
+    rows = index.query(start, end, directions=directions_between(60, 120), min_intensity=8)
+    for chunk in index.read(rows):
+        chunk['maps']    # (n, 16, 16) uint8
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from .protocol import ANGLE_MAP
+from .store import DEVICE_SIZE, HEADER_SIZE, RECORD_SIZE, SegmentStore
+
+INDEX_VERSION = 2
+SECTORS = 12
+
+COLUMNS = {
+    'time': ('time.f8', np.float64),
+    'direction': ('direction.u1', np.uint8),
+    'intensity': ('intensity.u2', np.uint16),
+    'file': ('file.u4', np.uint32),
+    'record': ('record.u4', np.uint32),
+}
+
+# 与 store.RECORD_FORMAT 相同的记录布局
+RECORD_DTYPE = np.dtype([
+    ('received', '<f8'), ('timestamp', '<f8'), ('seq', '<u4'), ('tick', '<u4'),
+    ('angle', '<u2'), ('intensity', '<u2'), ('direction', 'u1'), ('flags', 'u1'),
+    ('directions', 'u1', (12,)), ('device', 'S%d' % DEVICE_SIZE), ('map', 'u1', (16, 16)),
+])
+assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+KIND_SEGMENT = 'seg'
+KIND_JSON = 'json'
+
+
+def directions_between(low, high):
+    """
+    角度范围 [low, high]（度，可跨 0 度，如 330~30）内的方向编号
+    """
+    low %= 360
+    high %= 360
+    result = []
+    for direction, angle in enumerate(ANGLE_MAP):
+        if low <= high:
+            inside = low <= angle <= high
+        else:
+            inside = angle >= low or angle <= high
+        if inside:
+            result.append(direction)
+    return result
+
+
+def parse_time(text, date=None):
+    """
+    解析命令行时间
+
+    Args:
+        text: Unix 时间戳、'YYYY-MM-DD HH:MM[:SS]' 或 'HH:MM[:SS]'（日期取 date）
+        date: 只给时刻时使用的日期 'YYYY-MM-DD'，默认今天
+
+    Returns:
+        Unix 时间戳
+    """
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M'):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    day = date or datetime.now().strftime('%Y-%m-%d')
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            datetime.strptime(text, fmt)
+            return datetime.strptime(f"{day} {text}", f"%Y-%m-%d {fmt}").timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析的时间: {text}")
+
+
+class EventIndex:
+    """
+    数据目录的检测事件索引
+
+    Args:
+        data_dir: 数据目录（StoreSink / FileSink 的目录）
+        index_dir: 索引目录，默认 <data_dir>/.index
+    """
+
+    def __init__(self, data_dir="maix_audio_data", index_dir=None):
+        self.data_dir = data_dir
+        self.index_dir = index_dir or os.path.join(data_dir, '.index')
+        self.files = []        # [{'path', 'kind', 'records'}]
+        self.count = 0
+        self.columns = {}
+        self.bitmap = np.zeros((SECTORS, 0), dtype=np.uint8)
+        self._segments = {}    # 文件序号 -> 段文件记录映射
+        self._load()
+
+    # ---- 索引文件 ----
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _load(self):
+        meta_path = self._path('meta.json')
+        if not os.path.exists(meta_path):
+            self.columns = {name: np.zeros(0, dtype=dtype) for name, (_, dtype) in COLUMNS.items()}
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"索引版本不匹配: {meta.get('version')}")
+        self.files = meta['files']
+        self.count = meta['count']
+        for name, (filename, dtype) in COLUMNS.items():
+            self.columns[name] = self._map(filename, dtype, (self.count,))
+        self.bitmap = self._map('bitmap.u1', np.uint8, (SECTORS, (self.count + 7) // 8))
+
+    def _map(self, filename, dtype, shape):
+        if not shape[-1]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._path(filename), dtype=dtype, mode='r', shape=shape)
+
+    def _save(self, columns, append_from=None):
+        """
+        写入列文件和元数据
+
+        Args:
+            append_from: 只追加这一行之后的数据；None 表示整体重写
+        """
+        if not os.path.exists(self.index_dir):
+            os.makedirs(self.index_dir)
+        for name, (filename, dtype) in COLUMNS.items():
+            data = np.ascontiguousarray(columns[name], dtype=dtype)
+            if append_from is None:
+                data.tofile(self._path(filename))
+            else:
+                with open(self._path(filename), 'ab') as f:
+                    data[append_from:].tofile(f)
+        count = len(columns['time'])
+        bitmap = np.packbits(columns['direction'][None, :] == np.arange(SECTORS)[:, None], axis=1)
+        bitmap.tofile(self._path('bitmap.u1'))
+        meta = {"version": INDEX_VERSION, "count": count, "files": self.files}
+        tmp = self._path('meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path('meta.json'))
+        self.count = count
+        self._segments.clear()
+        for name, (filename, dtype) in COLUMNS.items():
+            self.columns[name] = self._map(filename, dtype, (count,))
+        self.bitmap = self._map('bitmap.u1', np.uint8, (SECTORS, (count + 7) // 8))
+
+    # ---- 增量更新 ----
+
+    def update(self):
+        """
+        索引新文件和段文件新追加的记录
+
+        Returns:
+            新增的行数
+        """
+        known = {entry['path']: number for number, entry in enumerate(self.files)}
+        parts = []
+        for segment in SegmentStore(self.data_dir).segments():
+            name = os.path.basename(segment.path)
+            number = known.get(name)
+            if number is None:
+                number = len(self.files)
+                self.files.append({'path': name, 'kind': KIND_SEGMENT, 'records': 0})
+            entry = self.files[number]
+            if segment.count > entry['records']:
+                parts.append(self._index_segment(segment.path, number, entry['records'],
+                                                 segment.count))
+                entry['records'] = segment.count
+
+        json_part = self._index_json(known)
+        if json_part is not None:
+            parts.append(json_part)
+        if not parts:
+            return 0
+
+        new = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        added = len(new['time'])
+        order = np.argsort(new['time'], kind='stable')
+        new = {name: values[order] for name, values in new.items()}
+        ordered = not self.count or new['time'][0] >= self.columns['time'][-1]
+        merged = {name: np.concatenate([self.columns[name], new[name]]) for name in COLUMNS}
+        if ordered:
+            self._save(merged, append_from=self.count)
+        else:
+            # 有比已索引数据更早的记录，整体重新排序
+            order = np.argsort(merged['time'], kind='stable')
+            self._save({name: values[order] for name, values in merged.items()})
+        return added
+
+    def _index_segment(self, path, number, first, count):
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE,
+                            shape=(count,))[first:count]
+        return {
+            'time': np.array(records['received']),
+            'direction': np.array(records['direction']),
+            'intensity': np.array(records['intensity']),
+            'file': np.full(len(records), number, dtype=np.uint32),
+            'record': np.arange(first, count, dtype=np.uint32),
+        }
+
+    def _index_json(self, known):
+        """FileSink 保存的 .json（每个文件一条检测）"""
+        rows = {name: [] for name in COLUMNS}
+        with os.scandir(self.data_dir) as entries:
+            names = sorted(entry.name for entry in entries
+                           if entry.name.endswith('.json') and entry.name not in known)
+        for name in names:
+            try:
+                with open(os.path.join(self.data_dir, name)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            directions = data.get('all_directions') or [0]
+            direction = data.get('direction', directions.index(max(directions)))
+            rows['time'].append(data.get('timestamp', 0.0))
+            rows['direction'].append(direction)
+            rows['intensity'].append(data.get('intensity', max(directions)))
+            rows['file'].append(len(self.files))
+            rows['record'].append(0)
+            self.files.append({'path': name, 'kind': KIND_JSON, 'records': 1})
+        if not rows['time']:
+            return None
+        return {name: np.asarray(values, dtype=COLUMNS[name][1]) for name, values in rows.items()}
+
+    # ---- 查询 ----
+
+    def query(self, start=None, end=None, directions=None, min_intensity=None,
+              max_intensity=None):
+        """
+        Args:
+            start: 起始时间（含），None 表示不限
+            end: 结束时间（不含），None 表示不限
+            directions: 方向编号列表，None 表示全部（见 directions_between）
+            min_intensity / max_intensity: 强度范围（含）
+
+        Returns:
+            匹配的行号（升序，即按时间排序）
+        """
+        times = self.columns['time']
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = self.count if end is None else int(np.searchsorted(times, end, side='left'))
+        if hi <= lo:
+            return np.zeros(0, dtype=np.int64)
+
+        if directions is not None and len(set(directions)) < SECTORS:
+            if not directions:
+                return np.zeros(0, dtype=np.int64)
+            first = lo // 8
+            last = (hi + 7) // 8
+            combined = np.bitwise_or.reduce(self.bitmap[sorted(set(directions)), first:last],
+                                            axis=0)
+            bits = np.unpackbits(combined)[lo - first * 8:hi - first * 8]
+            rows = np.flatnonzero(bits) + lo
+        else:
+            rows = np.arange(lo, hi)
+
+        if min_intensity is not None or max_intensity is not None:
+            intensity = self.columns['intensity'][rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if min_intensity is not None:
+                keep &= intensity >= min_intensity
+            if max_intensity is not None:
+                keep &= intensity <= max_intensity
+            rows = rows[keep]
+        return rows
+
+    def _segment_records(self, number):
+        records = self._segments.get(number)
+        if records is None:
+            path = os.path.join(self.data_dir, self.files[number]['path'])
+            count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+            records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE,
+                                shape=(count,))
+            self._segments[number] = records
+        return records
+
+    def _json_record(self, number):
+        """旧版 json + raw 文件读成一条记录"""
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        base = os.path.join(self.data_dir, self.files[number]['path'])[:-5]
+        with open(base + '.json') as f:
+            data = json.load(f)
+        directions = data.get('all_directions') or []
+        record['received'] = record['timestamp'] = data.get('timestamp', 0.0)
+        record['angle'] = data.get('angle', 0)
+        record['intensity'] = data.get('intensity', 0)
+        record['direction'] = data.get('direction', 0)
+        record['directions'][0, :len(directions)] = directions[:12]
+        record['device'] = str(data.get('device', '')).encode('utf-8')[:DEVICE_SIZE]
+        try:
+            with open(base + '.raw', 'rb') as f:
+                raw = f.read(256)
+            record['map'][0].flat[:len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+        except OSError:
+            pass
+        return record
+
+    def read(self, rows, chunk=4096):
+        """
+        分块读取匹配的记录
+
+        Yields:
+            记录数组（RECORD_DTYPE），索引时间即 'received' 字段
+            （FileSink 的 .json 记录为其中的 timestamp）
+        """
+        rows = np.asarray(rows)
+        files = self.columns['file']
+        numbers = self.columns['record']
+        for begin in range(0, len(rows), chunk):
+            part = rows[begin:begin + chunk]
+            file_ids = np.asarray(files[part])
+            record_ids = np.asarray(numbers[part])
+            out = np.empty(len(part), dtype=RECORD_DTYPE)
+            for number in np.unique(file_ids).tolist():
+                where = np.flatnonzero(file_ids == number)
+                if self.files[number]['kind'] == KIND_SEGMENT:
+                    out[where] = self._segment_records(number)[record_ids[where]]
+                else:
+                    for position in where.tolist():
+                        out[position] = self._json_record(number)[0]
+            yield out
+
+
+def write_npz(path, chunks):
+    """把 read() 的结果写成 NPZ（time, angle, intensity, direction, directions, maps, device）"""
+    parts = list(chunks)
+    records = np.concatenate(parts) if parts else np.zeros(0, dtype=RECORD_DTYPE)
+    np.savez_compressed(
+        path,
+        time=records['received'],
+        timestamp=records['timestamp'],
+        angle=records['angle'],
+        intensity=records['intensity'],
+        direction=records['direction'],
+        directions=records['directions'],
+        maps=records['map'],
+        device=records['device'],
+    )
+    return len(records)
+
+
+def write_csv(f, chunks):
+    """
+    把 read() 的结果逐块写成 CSV，热力图为 256 个字节的十六进制
+
+    Returns:
+        写出的行数
+    """
+    writer = csv.writer(f)
+    writer.writerow(['time', 'angle', 'intensity', 'direction', 'directions', 'device', 'map'])
+    count = 0
+    for records in chunks:
+        for record in records:
+            writer.writerow([
+                f"{record['received']:.6f}",
+                int(record['angle']),
+                int(record['intensity']),
+                int(record['direction']),
+                ' '.join(str(v) for v in record['directions'].tolist()),
+                record['device'].rstrip(b'\x00').decode('utf-8', errors='ignore'),
+                record['map'].tobytes().hex(),
+            ])
+        count += len(records)
+    return count
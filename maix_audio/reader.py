@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+事件驱动的串口读取核心
+
+替代各脚本中 `in_waiting` + `time.sleep()` 轮询 + 逐行 `readline()` 的写法：
+在串口文件描述符上用 selectors 等待可读，一次整块读取所有可用字节，
+再交给分帧器（LineSplitter 或 FrameDecoder）在复用的 bytearray 中增量切分。
+没有数据时线程阻塞在 select 上，不占用CPU。
+"""
+
+import errno
+import os
+import selectors
+
+
+class LineSplitter:
+    """
+    增量行切分器
+
+    接口与 FrameDecoder 相同：feed() 返回完整的行（去掉 \\r\\n 的 bytes），
+    不完整的尾部留在缓冲区等待下一块数据。
+    """
+
+    def __init__(self, max_buffer=65536):
+        self._buf = bytearray()
+        self.max_buffer = max_buffer
+        self.dropped_bytes = 0
+
+    def feed(self, data):
+        buf = self._buf
+        buf += data
+        end = buf.rfind(b'\n')
+        if end < 0:
+            if len(buf) > self.max_buffer:
+                # 超长且没有换行，丢弃防止无限增长
+                self.dropped_bytes += len(buf)
+                del buf[:]
+            return []
+        lines = bytes(buf[:end]).split(b'\n')
+        del buf[:end + 1]
+        return [line[:-1] if line.endswith(b'\r') else line
+                for line in lines if line and line != b'\r']
+
+
+class SerialReader:
+    """
+    串口读取器
+
+    Args:
+        source: serial.Serial 对象、带 fileno() 的文件对象或原始文件描述符（如pty）
+        decoder: 分帧器，默认 LineSplitter；二进制协议传入 FrameDecoder
+        chunk_size: 单次最大读取字节数
+        timeout: 每次等待可读的最长时间（秒），决定 stop() 的响应延迟
+
+    没有 fileno() 的对象（如 Windows 上的 pyserial）退回到带超时的阻塞读取。
+    """
+
+    def __init__(self, source, decoder=None, chunk_size=65536, timeout=0.2):
+        self.source = source
+        self.decoder = decoder if decoder is not None else LineSplitter()
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.running = True
+        self.closed = False
+        self.bytes_read = 0
+        self.reads = 0
+
+        if isinstance(source, int):
+            self.fd = source
+        else:
+            try:
+                self.fd = source.fileno()
+            except (AttributeError, OSError, NotImplementedError):
+                self.fd = None
+
+        self._selector = None
+        if self.fd is not None:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self.fd, selectors.EVENT_READ)
+
+    def read_chunk(self, timeout=None):
+        """
+        等待并读取一块数据
+
+        Returns:
+            读到的字节；超时返回 b''；连接关闭返回 None
+        """
+        if self.closed:
+            return None
+        if timeout is None:
+            timeout = self.timeout
+
+        if self._selector is None:
+            return self._read_blocking()
+
+        if not self._selector.select(timeout):
+            return b''
+        try:
+            data = os.read(self.fd, self.chunk_size)
+        except BlockingIOError:
+            return b''
+        except OSError as e:
+            # pty 对端关闭时 Linux 返回 EIO
+            if e.errno in (errno.EIO, errno.EBADF):
+                self.closed = True
+                return None
+            raise
+        if not data:
+            # 可读但没有数据：设备已断开
+            self.closed = True
+            return None
+        self.bytes_read += len(data)
+        self.reads += 1
+        return data
+
+    def _read_blocking(self):
+        source = self.source
+        data = source.read(max(1, source.in_waiting))
+        if data:
+            self.bytes_read += len(data)
+            self.reads += 1
+        return data
+
+    def poll(self, timeout=None):
+        """
+        读取一次并切分
+
+        Returns:
+            本次得到的行/帧列表；连接关闭返回 None
+        """
+        data = self.read_chunk(timeout)
+        if data is None:
+            return None
+        if not data:
+            # 超时：解析器可能暂存着等待后续行的事件
+            flush = getattr(self.decoder, 'flush', None)
+            return flush() if flush else []
+        return self.decoder.feed(data)
+
+    def __iter__(self):
+        """逐个产出行/帧，直到 stop() 或连接关闭"""
+        while self.running:
+            items = self.poll()
+            if items is None:
+                break
+            yield from items
+
+    def stop(self):
+        """停止迭代（最迟 timeout 秒后生效）"""
+        self.running = False
+
+    def close(self):
+        self.running = False
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        self.closed = True
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+通用接收器：串口 -> 解析器 -> sink
+"""
+
+import time
+
+import serial
+
+from .clocksync import ClockSync
+from .link import LinkNegotiator, parse_request
+from .metrics import SINK_SAMPLE, ReceiverMetrics
+from .parser import StreamParser
+from .reader import SerialReader
+from .streamstats import StreamStatsSink
+
+
+class Receiver:
+    """
+    从MaixPy设备接收数据并分发给各个sink
+
+    Args:
+        port: 串口设备路径
+        baudrate: 波特率
+        binary: 是否接收二进制帧（设备端需设置 BINARY_PROTOCOL = True）
+        sinks: sink 列表
+        device: 设备标识
+        record: 原始串口数据录制文件路径，可用于基准测试和回放
+        negotiate: 设备请求切换波特率（LINK_BAUD:）时是否响应协商，见 link.py
+        max_baudrate: 协商时主机端允许的最高波特率
+        stats_interval: 定期打印丢失和延迟统计的间隔（秒），None 表示只在关闭时打印；
+                        统计见 receiver.stats.snapshot()
+        clock_sync: 是否与设备同步时钟，把检测事件的 timestamp 换成主机时间（见 clocksync.py）
+        metrics: 指标 HTTP 端点地址（'host:port' 或端口号），提供 /metrics 和 /profile，
+                 见 metrics.py；True 表示只统计不开端点，None 表示不统计
+    """
+
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, binary=False,
+                 sinks=None, device=None, record=None, negotiate=True, max_baudrate=None,
+                 stats_interval=None, clock_sync=True, metrics=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.binary = binary
+        self.sinks = list(sinks) if sinks else []
+        # 放在最前面，后面的 sink 看到的 timestamp 都是主机时间
+        self.clock = ClockSync() if clock_sync else None
+        if self.clock is not None:
+            self.sinks.insert(0, self.clock)
+        self.stats = StreamStatsSink(stats_interval, clock=self.clock)
+        self.sinks.append(self.stats)
+        self.device = device
+        self.record = record
+        self.negotiate = negotiate
+        self.max_baudrate = max_baudrate
+        self.link = None
+        self.parser = StreamParser(binary=binary, device=device)
+        self.ser = None
+        self.reader = None
+        self.connected = False
+        self.running = False
+        self.metrics = None
+        if metrics is not None:
+            self.metrics = ReceiverMetrics(self, None if metrics is True else metrics)
+
+    def connect(self):
+        """连接串口设备"""
+        try:
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+            if self.negotiate:
+                self.link = LinkNegotiator(self.ser, max_baudrate=self.max_baudrate)
+            if self.clock is not None:
+                self.clock.attach(self.ser.write)
+            if self.metrics is not None:
+                self.metrics.start()
+            self.connected = True
+            print(f"✅ 已连接到设备: {self.port}")
+            return True
+        except Exception as e:
+            print(f"❌ 连接失败: {e}")
+            return False
+
+    def disconnect(self):
+        """断开连接"""
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+            self.connected = False
+            print("🔌 设备连接已断开")
+        if self.metrics is not None:
+            self.metrics.stop()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def dispatch(self, event):
+        """把事件交给所有sink，单个sink出错不影响接收"""
+        for sink in self.sinks:
+            try:
+                sink.handle(event)
+            except Exception as e:
+                print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
+
+    def _dispatch_timed(self, event, metrics):
+        """同 dispatch，并记录每个 sink 的耗时"""
+        for sink in self.sinks:
+            start = time.perf_counter()
+            try:
+                sink.handle(event)
+            except Exception as e:
+                print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
+            metrics.sink_histogram(sink).observe(time.perf_counter() - start)
+
+    def receive(self):
+        """接收循环，直到 stop() 或设备断开"""
+        self.running = True
+        self.reader = SerialReader(self.ser)
+        record = open(self.record, 'ab') if self.record else None
+        try:
+            while self.running:
+                data = self.reader.read_chunk()
+                if data is None:
+                    break
+                if data and record:
+                    record.write(data)
+                if self.metrics is not None:
+                    self.metrics.profiler.sync()
+                self.process_chunk(data)
+        finally:
+            for event in self.parser.flush():
+                self.dispatch(event)
+            if record:
+                record.close()
+
+    def process_chunk(self, data):
+        """解析一个读取块并分发事件；空块表示读取超时"""
+        metrics = self.metrics
+        dispatch = self.dispatch
+        if data:
+            if metrics is not None:
+                start = time.perf_counter()
+                events = self.parser.feed(data)
+                metrics.parse_time.observe(time.perf_counter() - start)
+                metrics.chunk_bytes.observe(len(data))
+                metrics.chunks += 1
+                if metrics.chunks % SINK_SAMPLE == 0:
+                    # 每 SINK_SAMPLE 个读取块统计一次各 sink 耗时，其余不增加逐事件开销
+                    dispatch = lambda event: self._dispatch_timed(event, metrics)
+            else:
+                events = self.parser.feed(data)
+        else:
+            # 读取超时，输出暂存的检测事件
+            events = self.parser.flush()
+            self.idle_sinks()
+        for event in events:
+            dispatch(event)
+            if self.link is not None:
+                request = parse_request(event)
+                if request:
+                    self.switch_baudrate(request)
+
+    def switch_baudrate(self, rate):
+        """响应设备的波特率切换请求，握手后多读到的数据照常解析分发"""
+        link = self.link
+        if link.handshake(rate, self.reader) == rate:
+            print(f"🔗 波特率已切换到 {rate}")
+        else:
+            print(f"⚠️ 波特率协商失败（{link.last_error}），使用 {link.baudrate}")
+        self.baudrate = link.baudrate
+        for event in self.parser.feed(link.take_leftover()):
+            self.dispatch(event)
+
+    def idle_sinks(self):
+        for sink in self.sinks:
+            try:
+                sink.idle()
+            except Exception as e:
+                print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
+
+    def stop(self):
+        """停止接收（最迟一个读取超时后生效）"""
+        self.running = False
+
+    def close_sinks(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"❌ 关闭输出错误 ({type(sink).__name__}): {e}")
+
+    def run(self):
+        """连接并接收，Ctrl+C 退出"""
+        if not self.connect():
+            return
+
+        print("👂 开始接收音频数据...")
+        print("按 Ctrl+C 停止接收")
+        print("=" * 50)
+
+        try:
+            self.receive()
+        except KeyboardInterrupt:
+            print("\n\n⏹️ 接收停止")
+        except Exception as e:
+            print(f"❌ 接收错误: {e}")
+        finally:
+            self.close_sinks()
+            self.disconnect()
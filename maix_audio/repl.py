@@ -0,0 +1,708 @@
+# -*- coding: utf-8 -*-
+"""
+MicroPython 原始 REPL 和脚本上传
+
+原来的上传方式是每行源码发送一条 f.write('...') 命令再等待10ms，300行的脚本要
+好几秒，且引号、反斜杠等转义边界情况会破坏文件。这里改为:
+
+1. Ctrl-C 打断运行中的程序，Ctrl-A 进入原始 REPL（不回显、不逐行解析）
+2. 设备端定义写入函数，文件内容按块 base64 编码后以 _w('...') 命令发送，
+   每块等待设备回 OK 和执行结果后再发下一块（请求-应答流控）；
+   设备支持原始粘贴模式（Ctrl-E A Ctrl-A）时使用其窗口流控
+3. 关闭文件后在设备上重新读出整个文件计算 sha256 和长度，与主机端比对
+4. Ctrl-B 回到普通 REPL，再用 exec(open(...).read()) 运行
+
+sync() 在上传前先让设备计算已有文件的 sha256 和每个固定大小块的摘要：
+整个文件一致时跳过上传；只有部分块不同时，在设备上用旧文件中未变的块和
+新发送的块拼出临时文件，再替换原文件，最后同样校验 sha256。
+
+    repl = RawRepl(ser)
+    result = repl.sync('/flash/main.py', script.encode())
+    print(result.cached, result.sent, result.rate)
+
+ReplPipeline 在原始 REPL 上连续发送多条命令而不等待每条的往返，
+后台线程按 OK / 标准输出 \\x04 / 错误输出 \\x04 / > 的顺序切分每条命令的结果：
+
+    pipeline = ReplPipeline(ser)
+    pipeline.start()
+    futures = [pipeline.submit(code) for code in commands]
+    free, files = pipeline.evaluate('gc.mem_free()', "uos.listdir('/flash')")
+    pipeline.close()
+"""
+
+import ast
+import base64
+import collections
+import hashlib
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from .reader import SerialReader
+
+RAW_BANNER = b'raw REPL; CTRL-B to exit\r\n>'
+
+# 设备端写入函数，_w() 每次解码一块 base64 写入文件
+UPLOAD_SETUP = """\
+try:
+    import ubinascii as _b
+except ImportError:
+    import binascii as _b
+_f = open(%r, 'wb')
+def _w(d):
+    _f.write(_b.a2b_base64(d))
+"""
+
+# 重新读出文件，输出 "长度 sha256"（调用前先关闭 _f）
+UPLOAD_VERIFY = """\
+try:
+    import uhashlib as _h
+except ImportError:
+    import hashlib as _h
+_s = _h.sha256()
+_n = 0
+_r = open(%r, 'rb')
+while True:
+    _d = _r.read(1024)
+    if not _d:
+        break
+    _s.update(_d)
+    _n += len(_d)
+_r.close()
+print(_n, _b.hexlify(_s.digest()).decode())
+del _f, _w, _s, _n, _r, _d
+"""
+
+# 设备上已有文件的摘要：第一行 "长度 sha256"，第二行每块 sha256 的前8字节；
+# 文件不存在时只输出 -1
+SYNC_PROBE = """\
+try:
+    import uhashlib as _h
+except ImportError:
+    import hashlib as _h
+try:
+    import ubinascii as _b
+except ImportError:
+    import binascii as _b
+try:
+    _r = open(%r, 'rb')
+except OSError:
+    _r = None
+if _r is None:
+    print(-1)
+else:
+    _s = _h.sha256()
+    _n = 0
+    _l = []
+    while True:
+        _d = _r.read(%d)
+        if not _d:
+            break
+        _s.update(_d)
+        _n += len(_d)
+        _l.append(_b.hexlify(_h.sha256(_d).digest()[:8]).decode())
+    _r.close()
+    print(_n, _b.hexlify(_s.digest()).decode())
+    print(' '.join(_l))
+    del _s, _n, _l, _d
+del _r
+"""
+
+# 块差分写入临时文件：_c(i, n) 从旧文件复制第 i 块起的 n 块，_w() 写入新数据
+SYNC_SETUP = """\
+try:
+    import ubinascii as _b
+except ImportError:
+    import binascii as _b
+_o = open(%r, 'rb')
+_f = open(%r, 'wb')
+def _w(d):
+    _f.write(_b.a2b_base64(d))
+def _c(i, n):
+    _o.seek(i * %d)
+    for _ in range(n):
+        _f.write(_o.read(%d))
+"""
+
+# 用临时文件替换原文件
+SYNC_FINISH = """\
+_f.close()
+_o.close()
+try:
+    import uos as _os
+except ImportError:
+    import os as _os
+_os.remove(%r)
+_os.rename(%r, %r)
+del _o, _c, _os
+"""
+
+
+class ReplError(Exception):
+    """REPL 无响应或设备执行出错"""
+
+
+class UploadResult:
+    """上传结果"""
+
+    def __init__(self, path, size, elapsed, chunks, digest, raw_paste, sent=None,
+                 cached=False):
+        self.path = path
+        self.size = size
+        self.elapsed = elapsed
+        self.chunks = chunks
+        self.digest = digest
+        self.raw_paste = raw_paste
+        self.sent = size if sent is None else sent  # 实际传输的文件字节数
+        self.cached = cached                        # 设备上已是相同文件，没有传输
+
+    @property
+    def rate(self):
+        """字节/秒"""
+        return self.size / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (f"UploadResult({self.path!r}, {self.size}B, {self.elapsed:.2f}s, "
+                f"{self.rate:.0f}B/s, chunks={self.chunks}, sent={self.sent}B, "
+                f"cached={self.cached})")
+
+
+class RawRepl:
+    """
+    MicroPython 原始 REPL 客户端
+
+    Args:
+        ser: 已打开的 serial.Serial
+        timeout: 等待设备响应的超时（秒）
+        block_size: 原始 REPL 下每次写入串口的字节数
+        block_delay: 每块之间的间隔（秒），避免设备串口接收缓冲溢出
+    """
+
+    def __init__(self, ser, timeout=5.0, block_size=256, block_delay=0.01):
+        self.ser = ser
+        self.timeout = timeout
+        self.block_size = block_size
+        self.block_delay = block_delay
+        self.reader = SerialReader(ser, timeout=0.05)
+        self.active = False
+        self.raw_paste = None  # None 表示尚未探测
+        self._buf = bytearray()
+
+    def read_until(self, ending, timeout=None):
+        """
+        读取直到出现 ending
+
+        Returns:
+            ending 之前的字节（不含 ending）
+
+        Raises:
+            ReplError: 超时或串口关闭
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        buf = self._buf
+        while True:
+            index = buf.find(ending)
+            if index >= 0:
+                data = bytes(buf[:index])
+                del buf[:index + len(ending)]
+                return data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ReplError(f"等待 {ending!r} 超时，已收到: {bytes(buf[-80:])!r}")
+            data = self.reader.read_chunk(min(remaining, 0.05))
+            if data is None:
+                raise ReplError("串口已关闭")
+            buf += data
+
+    def _read_exact(self, n, timeout=None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while len(self._buf) < n:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ReplError(f"等待 {n} 字节超时")
+            data = self.reader.read_chunk(min(remaining, 0.05))
+            if data is None:
+                raise ReplError("串口已关闭")
+            self._buf += data
+        data = bytes(self._buf[:n])
+        del self._buf[:n]
+        return data
+
+    def _drain(self, quiet=0.1):
+        """丢弃已收到的输出，直到 quiet 秒内没有新数据"""
+        del self._buf[:]
+        while True:
+            data = self.reader.read_chunk(quiet)
+            if not data:
+                return
+
+    def enter(self):
+        """打断运行中的程序并进入原始 REPL"""
+        self.ser.write(b'\r\x03\x03')
+        self._drain()
+        self.ser.write(b'\r\x01')
+        self.read_until(RAW_BANNER)
+        self.active = True
+
+    def exit(self):
+        """回到普通 REPL"""
+        self.ser.write(b'\r\x02')
+        self.read_until(b'>>> ')
+        self.active = False
+
+    def _probe_raw_paste(self):
+        """请求原始粘贴模式，返回流控窗口大小，不支持时返回 0"""
+        self.ser.write(b'\x05A\x01')
+        reply = self._read_exact(2)
+        if reply == b'R\x01':
+            window = struct.unpack('<H', self._read_exact(2))[0]
+            self._read_exact(1)  # 初始的 \x01
+            self.raw_paste = True
+            return window
+        if reply != b'R\x00':
+            # 不认识这个请求的旧固件会把它当作输入，回到提示符即可
+            self.read_until(b'>')
+        self.raw_paste = False
+        return 0
+
+    def _write_paste(self, code, window):
+        """原始粘贴模式：每发完一个窗口等设备回 \\x01"""
+        credit = window
+        pos = 0
+        while pos < len(code):
+            if credit == 0:
+                flag = self._read_exact(1)
+                if flag == b'\x04':
+                    raise ReplError("设备中止了原始粘贴")
+                credit += window
+                continue
+            n = min(credit, len(code) - pos)
+            self.ser.write(code[pos:pos + n])
+            pos += n
+            credit -= n
+        self.ser.write(b'\x04')
+        # 设备收完后回 \x04（之前可能还有未读的 \x01）
+        while self._read_exact(1) != b'\x04':
+            pass
+
+    def _write_raw(self, code):
+        for i in range(0, len(code), self.block_size):
+            self.ser.write(code[i:i + self.block_size])
+            if self.block_delay:
+                time.sleep(self.block_delay)
+        self.ser.write(b'\x04')
+        if self._read_exact(2) != b'OK':
+            raise ReplError("设备没有确认代码")
+
+    def exec_(self, code, timeout=None):
+        """
+        在原始 REPL 中执行代码
+
+        Returns:
+            标准输出 bytes
+
+        Raises:
+            ReplError: 设备端抛出异常（消息为设备的错误输出）或超时
+        """
+        if isinstance(code, str):
+            code = code.encode('utf-8')
+        if not self.active:
+            self.enter()
+        window = self._probe_raw_paste() if self.raw_paste is not False else 0
+        if window:
+            self._write_paste(code, window)
+        else:
+            self._write_raw(code)
+        out = self.read_until(b'\x04', timeout)
+        err = self.read_until(b'\x04', timeout)
+        self.read_until(b'>', timeout)
+        if err:
+            raise ReplError(err.decode('utf-8', errors='replace').strip())
+        return out
+
+    def upload(self, path, data, chunk_size=2048, progress=None):
+        """
+        上传文件并在设备上校验
+
+        Args:
+            path: 设备上的文件路径
+            data: 文件内容 bytes
+            chunk_size: 每条 _w() 命令携带的原始字节数
+            progress: 可选回调 progress(已发送字节, 总字节)
+
+        Returns:
+            UploadResult
+
+        Raises:
+            ReplError: 设备出错或校验不一致
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        start = time.perf_counter()
+        self.exec_(UPLOAD_SETUP % path)
+        chunks = 0
+        for i in range(0, len(data), chunk_size):
+            chunk = base64.b64encode(data[i:i + chunk_size]).decode('ascii')
+            self.exec_(f"_w('{chunk}')")
+            chunks += 1
+            if progress:
+                progress(min(i + chunk_size, len(data)), len(data))
+        self._verify(path, data, '_f.close()\n')
+        elapsed = time.perf_counter() - start
+        return UploadResult(path, len(data), elapsed, chunks, hashlib.sha256(data).hexdigest(),
+                            bool(self.raw_paste))
+
+    def _verify(self, path, data, before=''):
+        """在设备上重新读出文件，长度或 sha256 与 data 不一致时抛出 ReplError"""
+        reply = self.exec_(before + UPLOAD_VERIFY % path)
+        reply = reply.decode('ascii', errors='replace').split()
+        digest = hashlib.sha256(data).hexdigest()
+        if reply != [str(len(data)), digest]:
+            raise ReplError(f"校验失败: 设备 {reply}, 主机 {len(data)} {digest}")
+
+    def remote_digest(self, path, block_size=1024):
+        """
+        读取设备上文件的摘要
+
+        Returns:
+            (长度, sha256 十六进制, [每块 sha256 前16个十六进制字符])，文件不存在时返回 None
+        """
+        reply = self.exec_(SYNC_PROBE % (path, block_size)).decode('ascii', errors='replace')
+        fields = reply.split()
+        if not fields or fields[0] == '-1':
+            return None
+        try:
+            return int(fields[0]), fields[1], fields[2:]
+        except (IndexError, ValueError):
+            raise ReplError(f"无法解析设备摘要: {reply[:80]!r}")
+
+    def sync(self, path, data, block_size=1024, chunk_size=2048, progress=None):
+        """
+        按内容同步文件：设备上已是相同文件时跳过，否则只传输不同的块
+
+        Args:
+            path: 设备上的文件路径
+            data: 文件内容 bytes
+            block_size: 比较和复用的块大小（字节）
+            chunk_size: 每条命令携带的原始字节数上限
+            progress: 可选回调 progress(已处理字节, 总字节)
+
+        Returns:
+            UploadResult，cached 表示没有传输，sent 为实际传输的字节数
+
+        Raises:
+            ReplError: 设备出错或校验不一致
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        start = time.perf_counter()
+        digest = hashlib.sha256(data).hexdigest()
+        remote = self.remote_digest(path, block_size)
+        if remote is not None and remote[:2] == (len(data), digest):
+            return UploadResult(path, len(data), time.perf_counter() - start, 0, digest,
+                                bool(self.raw_paste), sent=0, cached=True)
+
+        blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)]
+        remote_blocks = remote[2] if remote else []
+        same = [i < len(remote_blocks)
+                and hashlib.sha256(block).hexdigest()[:16] == remote_blocks[i]
+                for i, block in enumerate(blocks)]
+        if not any(same):
+            result = self.upload(path, data, chunk_size, progress)
+            result.elapsed = time.perf_counter() - start
+            return result
+
+        # 连续相同的块合并成一次 _c()，连续不同的块按 chunk_size 分成多次 _w()
+        ops = []
+        sent = 0
+        i = 0
+        while i < len(blocks):
+            j = i
+            while j < len(blocks) and same[j] == same[i]:
+                j += 1
+            if same[i]:
+                ops.append((f"_c({i},{j - i})", j - i, 0))
+            else:
+                run = b''.join(blocks[i:j])
+                for k in range(0, len(run), chunk_size):
+                    chunk = run[k:k + chunk_size]
+                    ops.append((f"_w('{base64.b64encode(chunk).decode('ascii')}')", 0, len(chunk)))
+                    sent += len(chunk)
+            i = j
+
+        tmp = path + '.tmp'
+        self.exec_(SYNC_SETUP % (path, tmp, block_size, block_size))
+        chunks = 0
+        done = 0
+        batch = []
+        limit = chunk_size * 4 // 3 + 64
+        for n, (line, copied, written) in enumerate(ops):
+            batch.append(line)
+            done += copied * block_size + written
+            if n == len(ops) - 1 or sum(map(len, batch)) + len(ops[n + 1][0]) > limit:
+                self.exec_('\n'.join(batch))
+                chunks += 1
+                batch = []
+                if progress:
+                    progress(min(done, len(data)), len(data))
+        self._verify(path, data, SYNC_FINISH % (path, tmp, path))
+        return UploadResult(path, len(data), time.perf_counter() - start, chunks, digest,
+                            bool(self.raw_paste), sent=sent)
+
+    def close(self):
+        self.reader.close()
+
+
+class ExecResult:
+    """一条命令的执行结果"""
+
+    def __init__(self, code, stdout, stderr, elapsed):
+        self.code = code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.elapsed = elapsed  # 从发送到收到结束提示符（秒）
+
+    @property
+    def ok(self):
+        return not self.stderr
+
+    @property
+    def text(self):
+        """标准输出文本，去掉首尾空白"""
+        return self.stdout.decode('utf-8', errors='replace').strip()
+
+    def check(self):
+        """
+        Returns:
+            标准输出 bytes
+
+        Raises:
+            ReplError: 设备端抛出了异常
+        """
+        if self.stderr:
+            raise ReplError(self.stderr.decode('utf-8', errors='replace').strip())
+        return self.stdout
+
+    def __repr__(self):
+        return f"ExecResult(ok={self.ok}, stdout={self.stdout[:40]!r}, {self.elapsed * 1000:.1f}ms)"
+
+
+class ReplPipeline:
+    """
+    原始 REPL 流水线执行
+
+    原始 REPL 中设备执行完一条命令后才读取下一条，还没读取的命令留在设备的串口接收
+    缓冲里，所以可以不等往返连续发送。每条命令的回复依次为 OK、标准输出、\\x04、
+    错误输出、\\x04、>，后台线程按这个顺序逐字节切分并完成对应的 Future。
+    设备接收缓冲有限，已发送但设备还没读取（未回 OK）的字节数不超过 window。
+
+    Args:
+        ser: 已打开的 serial.Serial
+        window: 设备未读取的命令字节数上限
+        max_pending: 未完成的命令数上限
+        timeout: 单条命令从开始执行到结束的超时（秒），超时后所有未完成的命令失败
+    """
+
+    def __init__(self, ser, window=256, max_pending=16, timeout=5.0):
+        self.repl = RawRepl(ser, timeout)
+        self.window = window
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = collections.deque()  # (future, code, 大小, 发送时间)
+        self.unread = 0                     # 设备还没读取的字节数
+        self.error = None
+        self.running = False
+        self.submitted = 0
+        self.completed = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._state = 'ok'
+        self._stdout = b''
+        self._head_since = 0.0
+
+    def start(self):
+        """进入原始 REPL 并启动接收线程"""
+        if not self.repl.active:
+            self.repl.enter()
+        self.repl.raw_paste = False  # 原始粘贴模式需要逐条握手，不能流水线
+        self._buf = self.repl._buf
+        self.running = True
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, code):
+        """
+        发送一条命令，不等待结果
+
+        Returns:
+            concurrent.futures.Future，结果为 ExecResult
+
+        Raises:
+            ReplError: 流水线已关闭或之前超时
+            ValueError: 代码中含有控制字符 \\x03 / \\x04
+        """
+        if isinstance(code, str):
+            code = code.encode('utf-8')
+        if b'\x03' in code or b'\x04' in code:
+            raise ValueError("代码中不能含有 \\x03 或 \\x04")
+        frame = code + b'\x04'
+        future = Future()
+        with self._cond:
+            while True:
+                if self.error is not None:
+                    raise self.error
+                if not self.running:
+                    raise ReplError("流水线未启动或已关闭")
+                # 单条超过窗口的命令等前面的都被读取后单独发送
+                if not self.pending or (len(self.pending) < self.max_pending
+                                        and self.unread + len(frame) <= self.window):
+                    break
+                self._cond.wait(0.1)
+            if not self.pending:
+                self._head_since = time.monotonic()
+            self.pending.append((future, code, len(frame), time.perf_counter()))
+            self.unread += len(frame)
+            self.submitted += 1
+            self.repl.ser.write(frame)
+        return future
+
+    def exec_(self, code, timeout=None):
+        """
+        执行一条命令并等待结果
+
+        Returns:
+            标准输出 bytes
+
+        Raises:
+            ReplError: 设备端抛出异常或超时
+        """
+        return self._result(self.submit(code), timeout).check()
+
+    def map(self, codes, timeout=None):
+        """
+        流水线执行多条命令
+
+        Returns:
+            ExecResult 列表，顺序与 codes 相同
+        """
+        futures = [self.submit(code) for code in codes]
+        return [self._result(future, timeout) for future in futures]
+
+    def evaluate(self, *expressions, timeout=None):
+        """
+        在设备上求值多个表达式
+
+        Returns:
+            值列表：能用 ast.literal_eval 解析的返回 Python 值，否则返回 repr 字符串
+
+        Raises:
+            ReplError: 任一表达式出错
+        """
+        results = self.map([f"print(repr({expr}))" for expr in expressions], timeout)
+        values = []
+        for result in results:
+            text = result.check().decode('utf-8', errors='replace').strip()
+            try:
+                values.append(ast.literal_eval(text))
+            except (ValueError, SyntaxError):
+                values.append(text)
+        return values
+
+    def _result(self, future, timeout):
+        try:
+            return future.result(self.timeout * max(1, len(self.pending)) if timeout is None
+                                 else timeout)
+        except FutureTimeout:
+            raise ReplError("等待命令结果超时")
+
+    def _receive(self):
+        reader = self.repl.reader
+        while self.running:
+            with self._cond:
+                if self.pending and time.monotonic() - self._head_since > self.timeout:
+                    self._fail(ReplError(f"命令执行超时: {self.pending[0][1][:40]!r}"))
+            data = reader.read_chunk(0.05)
+            if data is None:
+                with self._cond:
+                    self._fail(ReplError("串口已关闭"))
+                return
+            if data:
+                self._buf += data
+                self._parse()
+
+    def _parse(self):
+        """按 OK / 输出 \\x04 / 错误 \\x04 / > 切分回复"""
+        buf = self._buf
+        while buf:
+            if self._state == 'ok':
+                index = buf.find(b'OK')
+                if index < 0:
+                    del buf[:-1]  # 保留可能是半个 OK 的最后一个字节
+                    return
+                del buf[:index + 2]
+                with self._cond:
+                    if self.pending:
+                        # 设备已读取这条命令，腾出窗口
+                        self.unread -= self.pending[0][2]
+                        self._cond.notify_all()
+                self._state = 'out'
+            elif self._state in ('out', 'err'):
+                index = buf.find(b'\x04')
+                if index < 0:
+                    return
+                part = bytes(buf[:index])
+                del buf[:index + 1]
+                if self._state == 'out':
+                    self._stdout = part
+                    self._state = 'err'
+                else:
+                    self._state = 'prompt'
+                    self._finish(part)
+            else:
+                if buf[:1] == b'>':
+                    del buf[:1]
+                self._state = 'ok'
+
+    def _finish(self, stderr):
+        with self._cond:
+            if not self.pending:
+                return
+            future, code, _, sent = self.pending.popleft()
+            self.completed += 1
+            self._head_since = time.monotonic()
+            self._cond.notify_all()
+        future.set_result(ExecResult(code, self._stdout, stderr, time.perf_counter() - sent))
+
+    def _fail(self, error):
+        """所有未完成的命令失败（调用时持有 _cond）"""
+        self.error = error
+        while self.pending:
+            future = self.pending.popleft()[0]
+            if not future.done():
+                future.set_exception(error)
+        self.unread = 0
+        self._cond.notify_all()
+
+    def close(self, exit=True):
+        """
+        停止接收线程
+
+        Args:
+            exit: 是否回到普通 REPL
+        """
+        deadline = time.monotonic() + self.timeout
+        while self.pending and self.error is None and time.monotonic() < deadline:
+            time.sleep(0.01)  # 已发送的命令仍会在设备上执行，等它们结束
+        self.running = False
+        if self._thread is not None:
+            self._thread.join()
+        with self._cond:
+            self._fail(ReplError("流水线已关闭"))
+        if exit and self.repl.active and not self.repl.reader.closed:
+            try:
+                self.repl.exit()
+            except ReplError:
+                pass
+        self.repl.close()
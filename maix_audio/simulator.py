@@ -0,0 +1,721 @@
+# -*- coding: utf-8 -*-
+"""
+pty 上的虚拟 MaixPy 设备
+
+没有开发板时用来测试 raspberry_pi_receiver.py、maixpy_controller.py 等主机端程序：
+创建一个 pty，从端路径当作串口交给主机程序，设备端线程在主端上
+
+- 模拟 REPL：回显输入，每行命令后输出 `>>> ` 提示符，Ctrl-C 打断运行中的脚本
+  （KeyboardInterrupt），Ctrl-D 软重启；Ctrl-A 进入原始 REPL（可选原始粘贴模式）。
+  代码在主机 Python 中执行，open() 指向 files 字典，只能导入少数设备上也有的模块；
+  exec(open(...).read()) 运行上传的脚本时开始发送检测数据
+- 按设定的事件率发送与 demo_mic_array.py 相同的文本行或二进制帧，
+  或循环回放 Receiver(record=...) 录制的原始串口数据
+- 按波特率限制收发速度；主机不读取时发送缓冲满后丢弃新事件（与 USB 串口芯片相同）
+- 故障注入：乱码行、截断的 RAW_AUDIO、突发（连续发送一批事件）
+- 设备时钟：tick 从启动开始计时，可设定漂移；运行脚本时按循环周期回复
+  时钟同步请求 SYNC:<id>（maix_audio/clocksync.py），device_time_to_host() 给出真实时间
+- 波特率协商（maix_audio/link.py）：脚本启动时请求切换到 link_baudrate；
+  strict_baud 时主机端串口波特率（pty 的 termios 设置）与设备不一致则收发乱码
+
+    device = VirtualDevice(rate=50, garble=0.01)
+    device.start()
+    receiver = Receiver(device.port)
+"""
+
+import binascii
+import builtins
+import errno
+import fcntl
+import functools
+import importlib
+import io
+import json
+import os
+import random
+import re
+import selectors
+import struct
+import termios
+import threading
+import time
+import tty
+
+from .link import DEFAULT_BAUDRATE, LINK_PATTERN, LINK_READY, LINK_REQUEST
+from .mapcodec import MapEncoder
+from .protocol import ANGLE_MAP, encode_frame
+
+BANNER = b"MicroPython v0.6.2 on 2021-01-01; Sipeed_M1 with kendryte-k210\r\n"
+PROMPT = b">>> "
+RAW_BANNER = b"raw REPL; CTRL-B to exit\r\n>"
+SCRIPT_STARTUP = ("麦克风阵列初始化中...", "开始声音检测和定位...", "等待声音输入...")
+
+# termios 速度常量 -> 波特率
+BAUD_CODES = {getattr(termios, f'B{rate}'): rate
+              for rate in (9600, 19200, 38400, 57600, 115200, 230400, 460800, 500000,
+                           576000, 921600, 1000000, 1152000, 1500000, 2000000, 3000000)
+              if hasattr(termios, f'B{rate}')}
+
+RE_EXEC = re.compile(r"^exec\(open\((['\"])(.+?)\1\)\.read\(\)\)$")
+
+# 设备上可导入的模块及其在主机上的对应
+DEVICE_MODULES = {
+    'binascii': 'binascii', 'ubinascii': 'binascii',
+    'hashlib': 'hashlib', 'uhashlib': 'hashlib',
+    'json': 'json', 'ujson': 'json',
+    'struct': 'struct', 'ustruct': 'struct',
+    'time': 'time', 'utime': 'time',
+    'sys': 'sys',
+}
+
+
+class DeviceOS:
+    """设备上的 uos 模块，操作 VirtualDevice.files"""
+
+    def __init__(self, files):
+        self.files = files
+
+    def listdir(self, path='/flash'):
+        prefix = path.rstrip('/') + '/'
+        return sorted(p[len(prefix):] for p in self.files
+                      if p.startswith(prefix) and '/' not in p[len(prefix):])
+
+    def stat(self, path):
+        if path not in self.files:
+            raise OSError(errno.ENOENT, 'ENOENT')
+        return (0x8000, 0, 0, 0, 0, 0, len(self.files[path]), 0, 0, 0)
+
+    def remove(self, path):
+        if self.files.pop(path, None) is None:
+            raise OSError(errno.ENOENT, 'ENOENT')
+
+    def rename(self, old, new):
+        if old not in self.files:
+            raise OSError(errno.ENOENT, 'ENOENT')
+        self.files[new] = self.files.pop(old)
+
+
+class DeviceGC:
+    """设备上的 gc 模块，按文件大小粗略模拟内存占用"""
+
+    HEAP = 512 * 1024
+
+    def __init__(self, files):
+        self.files = files
+
+    def collect(self):
+        pass
+
+    def mem_alloc(self):
+        return 48 * 1024 + sum(len(data) for data in self.files.values()) // 4
+
+    def mem_free(self):
+        return self.HEAP - self.mem_alloc()
+
+
+def make_detections(count, seed=1):
+    """生成模拟检测数据：(12个方向强度, 16x16热力图)"""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        dirs = [rng.randint(0, 15) for _ in range(12)]
+        audio_map = bytes(rng.randint(0, 255) for _ in range(256))
+        events.append((dirs, audio_map))
+    return events
+
+
+def text_event(dirs, audio_map, timestamp, seq=None, tick=None):
+    """与 demo_mic_array.py 文本模式相同的输出（seq/tick 为 None 时是旧版脚本的输出）"""
+    max_intensity = max(dirs)
+    max_direction = dirs.index(max_intensity)
+    max_angle = ANGLE_MAP[max_direction]
+    log = "检测到声音! 角度: %d度 | 强度: %d | 方向: %d | 详细数据: %s" % (
+        max_angle, max_intensity, max_direction, str(dirs))
+    packet = {
+        "type": "audio_detection",
+        "timestamp": timestamp,
+    }
+    if seq is not None:
+        packet["seq"] = seq
+        packet["tick"] = tick
+    packet.update({
+        "angle": max_angle,
+        "intensity": max_intensity,
+        "direction": max_direction,
+        "all_directions": dirs,
+        "audio_map": list(audio_map) if audio_map else None,
+    })
+    lines = [log, "AUDIO_PACKET:" + json.dumps(packet)]
+    if audio_map:
+        lines.append("RAW_AUDIO:" + binascii.hexlify(audio_map).decode('ascii'))
+    return ''.join(line + '\r\n' for line in lines).encode('utf-8')
+
+
+class VirtualDevice(threading.Thread):
+    """
+    虚拟 MaixPy 设备
+
+    Args:
+        rate: 运行脚本时每秒发送的检测事件数
+        binary: 发送二进制帧而不是文本行
+        compress: 二进制帧使用关键帧 + 差分压缩热力图
+        baudrate: 模拟的波特率，None 表示不限速
+        recording: 回放的原始串口录制文件，设置后忽略 rate
+        autostart: 启动后直接运行脚本（相当于 boot 后自动运行 main.py）
+        tx_buffer: 发送缓冲大小（字节），主机不读取时超出部分的事件被丢弃
+        garble: 每个事件被破坏（随机改写字节）的概率
+        truncate: 文本模式下 RAW_AUDIO 行被截断的概率
+        burst_every: 每隔多少秒来一次突发，None 表示没有
+        burst_size: 每次突发连续发送的事件数
+        raw_paste: 是否支持原始粘贴模式（MaixPy 固件基于较老的 MicroPython，默认不支持）
+        paste_window: 原始粘贴模式的流控窗口（字节）
+        clock_drift: 设备时钟漂移（ppm），正数表示比主机快
+        loop_period: 设备主循环周期（秒），时钟同步请求要等到下一次循环才被读取
+        link_baudrate: 脚本启动时请求协商的波特率，None 表示不协商
+        strict_baud: 主机端串口波特率与设备当前波特率不一致时输出乱码、丢弃输入
+        link: 可选的符号链接路径，指向 pty 从端
+        seed: 随机数种子
+    """
+
+    def __init__(self, rate=20.0, binary=False, compress=False, baudrate=115200,
+                 recording=None, autostart=False, tx_buffer=4096, garble=0.0,
+                 truncate=0.0, burst_every=None, burst_size=10, raw_paste=False,
+                 paste_window=128, clock_drift=0.0, loop_period=0.01, link_baudrate=None,
+                 strict_baud=False, link=None, seed=1):
+        super().__init__(daemon=True)
+        self.rate = rate
+        self.binary = binary
+        self.baudrate = baudrate
+        self.tx_buffer = tx_buffer
+        self.garble = garble
+        self.truncate = truncate
+        self.burst_every = burst_every
+        self.burst_size = burst_size
+        self.link = link
+        self.rng = random.Random(seed)
+        self.detections = make_detections(64, seed)
+        self.encoder = MapEncoder() if compress else None
+        self.recording = None
+        if recording:
+            with open(recording, 'rb') as f:
+                self.recording = f.read()
+        self._replay_pos = 0
+
+        self.files = {}        # 设备上的文件 {路径: bytes}
+        device_os = DeviceOS(self.files)
+        # 用模拟对象代替的设备模块（不能指向主机的 os、gc）
+        self.modules = {'os': device_os, 'uos': device_os, 'gc': DeviceGC(self.files)}
+        self.raw_paste = raw_paste
+        self.paste_window = paste_window
+        self.mode = 'friendly'  # friendly / raw / paste
+        self._globals = None   # REPL 全局变量，软重启时清空
+        self._paste_received = 0
+        self.running_script = autostart
+        self.link_baudrate = link_baudrate
+        self.strict_baud = strict_baud
+        self.device_rate = baudrate or DEFAULT_BAUDRATE  # 设备 REPL 串口当前的波特率
+        self._link = None      # 波特率协商状态
+        self.clock_drift = clock_drift
+        self.loop_period = loop_period
+        self._epoch = time.monotonic()
+        self._wall = time.time() - self._epoch  # 主机 monotonic -> time.time()
+        self._script_line = bytearray()
+        self._sync_replies = []  # (读取时间, 请求 id)
+        self.stopped = False
+
+        # 统计
+        self.generated = 0     # 产生的事件数（即序列号）
+        self.sent = 0          # 完整发送的事件数
+        self.overruns = 0      # 发送缓冲满被丢弃的事件数
+        self.garbled = 0
+        self.truncated = 0
+        self.bursts = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.baud_errors = 0   # 波特率不一致时收发的字节数
+        self.link_switches = 0
+        self.link_failures = 0
+        self.sync_requests = 0
+        self.commands = []     # 收到的 REPL 命令
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        flags = fcntl.fcntl(self.master, fcntl.F_GETFL)
+        fcntl.fcntl(self.master, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.port = os.ttyname(self.slave)
+        if link:
+            tmp = link + '.tmp'
+            os.symlink(self.port, tmp)
+            os.replace(tmp, link)
+            self.port = link
+
+        self._out = bytearray()
+        self._line = bytearray()
+        self._last_cr = False
+        self._lock = threading.Lock()
+
+    # ---- 输出 ----
+
+    def _emit(self, data):
+        with self._lock:
+            self._out += data
+
+    def _emit_event(self, data):
+        """发送一个事件，缓冲满时丢弃"""
+        with self._lock:
+            if len(self._out) + len(data) > self.tx_buffer:
+                self.overruns += 1
+                return
+            self._out += data
+        self.sent += 1
+
+    def _next_event(self):
+        seq = self.generated
+        self.generated += 1
+        tick = self.tick()
+        dirs, audio_map = self.detections[seq % len(self.detections)]
+        if self.binary:
+            ftype = 1
+            payload = audio_map
+            if self.encoder is not None:
+                ftype, payload = self.encoder.encode(audio_map)
+            data = encode_frame(seq, tick, dirs, payload, ftype)
+        else:
+            data = text_event(dirs, audio_map, time.time(), seq, tick)
+            if self.truncate and self.rng.random() < self.truncate:
+                # 截掉 RAW_AUDIO 行的后半段（仍以换行结束）
+                cut = data.rindex(b'RAW_AUDIO:') + 10 + self.rng.randint(0, 500)
+                data = data[:cut] + b'\r\n'
+                self.truncated += 1
+        if self.garble and self.rng.random() < self.garble:
+            data = bytearray(data)
+            for _ in range(self.rng.randint(1, 8)):
+                data[self.rng.randrange(len(data))] = self.rng.randrange(256)
+            data = bytes(data)
+            self.garbled += 1
+        return data
+
+    def _next_replay(self):
+        """回放录制数据，每次取约一个事件大小的一块"""
+        data = self.recording
+        end = min(self._replay_pos + 512, len(data))
+        chunk = data[self._replay_pos:end]
+        self._replay_pos = end if end < len(data) else 0
+        return chunk
+
+    def _flush(self, budget):
+        """写出最多 budget 字节，返回实际写出的字节数"""
+        with self._lock:
+            if not self._out:
+                return 0
+            n = len(self._out) if budget is None else min(len(self._out), budget)
+            if n <= 0:
+                return 0
+            data = self._out[:n]
+            if not self._baud_ok():
+                # 波特率不一致：主机收到的是乱码
+                data = bytes(self.rng.randrange(256) for _ in range(n))
+                self.baud_errors += n
+            try:
+                written = os.write(self.master, data)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return 0
+                raise
+            del self._out[:written]
+        self.bytes_out += written
+        return written
+
+    # ---- REPL ----
+
+    def _host_rate(self):
+        """主机端打开串口时设置的波特率，无法识别时返回 None"""
+        try:
+            return BAUD_CODES.get(termios.tcgetattr(self.slave)[5])
+        except termios.error:
+            return None
+
+    def _baud_ok(self):
+        return not self.strict_baud or self._host_rate() == self.device_rate
+
+    def _on_input(self, data):
+        self.bytes_in += len(data)
+        if not self._baud_ok():
+            self.baud_errors += len(data)  # 波特率不一致：设备收到的是帧错误
+            return
+        if self._link is not None:
+            self._on_link_input(data)
+            return
+        for byte in data:
+            if self.mode == 'paste':
+                self._on_paste(byte)
+            elif self.mode == 'raw':
+                self._on_raw(byte)
+            elif byte == 0x03:
+                self._interrupt()
+            elif byte == 0x04:
+                self._soft_reboot()
+            elif self.running_script:
+                self._on_script_input(byte)  # 脚本只读取时钟同步请求
+            elif byte == 0x01:
+                self.mode = 'raw'
+                del self._line[:]
+                self._emit(RAW_BANNER)
+            elif byte in (0x0D, 0x0A):
+                if byte == 0x0A and not self._line and self._last_cr:
+                    self._last_cr = False
+                    continue
+                self._last_cr = byte == 0x0D
+                line = self._line.decode('utf-8', errors='ignore')
+                del self._line[:]
+                self._emit(b'\r\n')
+                self._execute(line.strip())
+            else:
+                self._last_cr = False
+                self._line.append(byte)
+                self._emit(bytes((byte,)))
+
+    def _interrupt(self):
+        del self._line[:]
+        if self.running_script:
+            self.running_script = False
+            self._emit(b'Traceback (most recent call last):\r\n'
+                       b'  File "<stdin>", line 1, in <module>\r\n'
+                       b'KeyboardInterrupt: \r\n')
+        self._emit(b'\r\n' + PROMPT)
+
+    def _soft_reboot(self):
+        self._link = None
+        self.device_rate = self.baudrate or DEFAULT_BAUDRATE
+        self.running_script = False
+        self._globals = None
+        del self._line[:]
+        self._emit(b'MPY: soft reboot\r\n' + BANNER + PROMPT)
+
+    def _execute(self, line):
+        """在普通 REPL 中执行一行"""
+        if line:
+            self.commands.append(line)
+            m = RE_EXEC.match(line)
+            if m and m.group(2) in self.files:
+                # 运行上传的脚本：设备上是麦克风阵列检测循环
+                self.start_script()
+                return
+            out, err = self._run_code(line, single=True)
+            self._emit(out + err)
+        self._emit(PROMPT)
+
+    def _on_raw(self, byte):
+        """原始 REPL：收集代码直到 Ctrl-D"""
+        line = self._line
+        if byte == 0x01 and line == b'\x05A':
+            # 原始粘贴模式请求
+            del line[:]
+            if self.raw_paste:
+                self.mode = 'paste'
+                self._paste_received = 0
+                self._emit(b'R\x01' + struct.pack('<H', self.paste_window) + b'\x01')
+            else:
+                self._emit(b'R\x00')
+        elif byte == 0x02:
+            self.mode = 'friendly'
+            del line[:]
+            self._emit(b'\r\n' + BANNER + PROMPT)
+        elif byte == 0x01:
+            del line[:]
+            self._emit(RAW_BANNER)
+        elif byte == 0x03:
+            del line[:]
+        elif byte == 0x04:
+            if not line:
+                self._soft_reboot()
+                self._emit(RAW_BANNER)
+                return
+            code = line.decode('utf-8', errors='ignore')
+            del line[:]
+            self.commands.append(code)
+            self._emit(b'OK')
+            out, err = self._run_code(code)
+            self._emit(out + b'\x04' + err + b'\x04>')
+        else:
+            line.append(byte)
+
+    def _on_paste(self, byte):
+        """原始粘贴模式：按窗口流控接收，Ctrl-D 结束"""
+        if byte == 0x04:
+            self.mode = 'raw'
+            code = self._line.decode('utf-8', errors='ignore')
+            del self._line[:]
+            self.commands.append(code)
+            self._emit(b'\x04')
+            out, err = self._run_code(code)
+            self._emit(out + b'\x04' + err + b'\x04>')
+            return
+        self._line.append(byte)
+        self._paste_received += 1
+        if self._paste_received % self.paste_window == 0:
+            self._emit(b'\x01')
+
+    def _run_code(self, source, single=False):
+        """
+        执行一段代码，模拟设备上的 MicroPython
+
+        文件读写指向 files 字典，只能导入 DEVICE_MODULES 中的模块和模拟的 uos、gc。
+
+        Returns:
+            (标准输出, 错误输出) bytes
+        """
+        out = io.StringIO()
+        if self._globals is None:
+            self._globals = {'__builtins__': self._builtins(out), '__name__': '__main__'}
+        self._globals['__builtins__']['print'] = functools.partial(print, file=out)
+        try:
+            try:
+                code = compile(source, '<stdin>', 'eval' if single else 'exec')
+                value = eval(code, self._globals)
+                if value is not None:
+                    out.write(repr(value) + '\n')
+            except SyntaxError:
+                if not single:
+                    raise
+                exec(compile(source, '<stdin>', 'exec'), self._globals)
+            err = ''
+        except Exception as e:
+            err = ('Traceback (most recent call last):\n'
+                   '  File "<stdin>", line 1, in <module>\n'
+                   f'{type(e).__name__}: {e}\n')
+        return (out.getvalue().replace('\n', '\r\n').encode('utf-8'),
+                err.replace('\n', '\r\n').encode('utf-8'))
+
+    def _builtins(self, out):
+        names = dict(vars(builtins))
+        names['open'] = self._open
+        names['__import__'] = self._import
+        names['print'] = functools.partial(print, file=out)
+        return names
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if name in self.modules:
+            return self.modules[name]
+        module = DEVICE_MODULES.get(name)
+        if module is None:
+            raise ImportError(f"no module named '{name}'")
+        return importlib.import_module(module)
+
+    def _open(self, path, mode='r', *args, **kwargs):
+        """设备文件系统，内容保存在 files 字典"""
+        files = self.files
+        if 'r' in mode:
+            if path not in files:
+                raise OSError(2, 'ENOENT')
+            raw = io.BytesIO(files[path])
+        else:
+
+            class DeviceFile(io.BytesIO):
+                def close(inner):
+                    if not inner.closed:
+                        files[path] = inner.getvalue()
+                    super().close()
+
+            raw = DeviceFile(files.get(path, b'') if 'a' in mode else b'')
+            raw.seek(0, io.SEEK_END)
+            files[path] = raw.getvalue()
+        if 'b' in mode:
+            return raw
+        return io.TextIOWrapper(raw, encoding='utf-8', newline='', write_through=True)
+
+    def start_script(self):
+        """开始运行检测脚本"""
+        self.running_script = True
+        if self.link_baudrate:
+            # 与 demo_mic_array.py 的 negotiate_link() 相同：先请求，100ms 后切换
+            self._emit(LINK_REQUEST + str(self.link_baudrate).encode('ascii') + b'\r\n')
+            self._link = {'state': 'switch', 'at': time.perf_counter() + 0.1,
+                          'buf': bytearray()}
+            return
+        self._script_started()
+
+    def _script_started(self):
+        if not self.binary or self.recording is not None:
+            self._emit(''.join(line + '\r\n' for line in SCRIPT_STARTUP).encode('utf-8'))
+
+    # ---- 设备时钟 ----
+
+    def tick(self, now=None):
+        """设备的 time.ticks_ms()（32位回绕）"""
+        now = time.monotonic() if now is None else now
+        elapsed = (now - self._epoch) * (1 + self.clock_drift * 1e-6)
+        return int(elapsed * 1000) & 0xFFFFFFFF
+
+    def device_time_to_host(self, tick):
+        """设备时钟显示 tick 时的主机 time.time()（真实值，用于检验时钟同步）"""
+        return self._epoch + tick / 1000.0 / (1 + self.clock_drift * 1e-6) + self._wall
+
+    def _on_script_input(self, byte):
+        line = self._script_line
+        if byte != 0x0A:
+            if len(line) < 64:
+                line.append(byte)
+            return
+        if line.startswith(b'SYNC:'):
+            # 请求在接收缓冲里等到下一次循环才被读取
+            due = time.monotonic() + self.rng.uniform(0, self.loop_period)
+            self._sync_replies.append((due, bytes(line[5:]).strip()))
+            self.sync_requests += 1
+        del line[:]
+
+    def _answer_sync(self):
+        now = time.monotonic()
+        while self._sync_replies and self._sync_replies[0][0] <= now:
+            due, req_id = self._sync_replies.pop(0)
+            # 设备上 print 阻塞到前面的输出发送完，回复时的 tick 晚于读取请求时
+            queued = len(self._out) / (self.device_rate / 10.0) if self.baudrate else 0.0
+            self._emit(b'CLOCK:%s:%d:%d\r\n' % (req_id, self.tick(due),
+                                                 self.tick(max(due, now) + queued)))
+
+    # ---- 波特率协商 ----
+
+    def _on_link_input(self, data):
+        if 0x03 in data:
+            self._link = None
+            self._interrupt()
+            return
+        self._link['buf'] += data
+
+    def _step_link(self, now):
+        """推进协商状态：switch -> pattern -> confirm"""
+        link = self._link
+        state = link['state']
+        if state == 'switch':
+            if now >= link['at'] and not self._out:
+                self.device_rate = self.link_baudrate
+                link.update(state='pattern', at=now + 1.0)
+                del link['buf'][:]
+        elif state == 'pattern':
+            if LINK_PATTERN in link['buf']:
+                self._emit(LINK_PATTERN)
+                link.update(state='confirm', at=now + 0.5)
+                del link['buf'][:]
+            elif now >= link['at']:
+                self._finish_link(DEFAULT_BAUDRATE)
+        elif state == 'confirm':
+            if b'LINK_OK' in link['buf']:
+                self._finish_link(self.link_baudrate)
+            elif now >= link['at']:
+                self._finish_link(DEFAULT_BAUDRATE)
+
+    def _finish_link(self, rate):
+        self._link = None
+        self.device_rate = rate
+        if rate == self.link_baudrate:
+            self.link_switches += 1
+        else:
+            self.link_failures += 1
+        self._emit(LINK_READY + str(rate).encode('ascii') + b'\r\n')
+        self._script_started()
+
+    # ---- 主循环 ----
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.master, selectors.EVENT_READ)
+        interval = 1.0 / self.rate if self.rate else None
+        now = time.perf_counter()
+        next_event = now
+        next_burst = now + self.burst_every if self.burst_every else None
+        last_flush = now
+        credit = 0.0     # 发送方向可写字节
+        in_credit = 0.0  # 接收方向可读字节
+        throttled = False
+        self._emit(BANNER + PROMPT)
+
+        try:
+            while not self.stopped:
+                now = time.perf_counter()
+                bps = self.device_rate / 10.0 if self.baudrate else None
+                timeout = 0.05
+                if self._out or throttled:
+                    timeout = 0.001
+                elif self._link is not None or self._sync_replies:
+                    timeout = 0.001 if self._sync_replies else 0.005
+                elif self.running_script and interval is not None:
+                    timeout = max(min(next_event - now, timeout), 0)
+                throttled = False
+                for _key, _mask in selector.select(timeout):
+                    budget = 4096 if bps is None else min(int(in_credit), 4096)
+                    if budget <= 0:
+                        # 超过波特率的输入留在 pty 缓冲里，写满后主机端写入阻塞
+                        throttled = True
+                        continue
+                    try:
+                        data = os.read(self.master, budget)
+                        in_credit -= len(data)
+                    except OSError as e:
+                        if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                            continue
+                        return
+                    if data:
+                        self._on_input(data)
+
+                now = time.perf_counter()
+                if self._link is not None:
+                    self._step_link(now)
+                    next_event = now
+                elif self.running_script:
+                    if self._sync_replies:
+                        self._answer_sync()
+                    if self.recording is not None:
+                        if len(self._out) < self.tx_buffer // 2:
+                            self._emit(self._next_replay())
+                    elif interval is not None and now >= next_event:
+                        self._emit_event(self._next_event())
+                        next_event += interval
+                        if next_event < now - 1.0:
+                            next_event = now  # 落后太多时不追赶
+                    if next_burst is not None and now >= next_burst:
+                        for _ in range(self.burst_size):
+                            self._emit_event(self._next_event())
+                        self.bursts += 1
+                        next_burst += self.burst_every
+                else:
+                    next_event = now
+
+                if bps is None:
+                    self._flush(None)
+                else:
+                    burst = max(bps * 0.01, 64)
+                    credit = min(credit + (now - last_flush) * bps, burst)
+                    in_credit = min(in_credit + (now - last_flush) * bps, burst)
+                    credit -= self._flush(int(credit))
+                last_flush = now
+        finally:
+            selector.close()
+
+    def stop(self):
+        """停止设备线程并关闭 pty"""
+        self.stopped = True
+        if self.is_alive():
+            self.join(1)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+
+    @property
+    def pending(self):
+        """发送缓冲中还没写出的字节数"""
+        return len(self._out)
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "overruns": self.overruns,
+            "garbled": self.garbled,
+            "truncated": self.truncated,
+            "bursts": self.bursts,
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+        }
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+事件输出（sink）
+
+每个 sink 实现 on_detection() / on_log()（跟踪器输出另有 on_track()，多阵列定位输出另有
+on_position()），由 Receiver 按顺序分发事件。
+"""
+
+import json
+import os
+import socket
+import time
+from datetime import datetime
+
+from .events import DetectionEvent, SourcePosition, TrackUpdate
+from .metrics import Histogram
+
+
+class Sink:
+    """sink 基类"""
+
+    def handle(self, event):
+        if isinstance(event, DetectionEvent):
+            self.on_detection(event)
+        elif isinstance(event, TrackUpdate):
+            self.on_track(event)
+        elif isinstance(event, SourcePosition):
+            self.on_position(event)
+        else:
+            self.on_log(event)
+
+    def on_detection(self, event):
+        pass
+
+    def on_track(self, event):
+        pass
+
+    def on_position(self, event):
+        pass
+
+    def on_log(self, event):
+        pass
+
+    def idle(self):
+        """读取空闲时调用，可用于定时落盘"""
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink(Sink):
+    """
+    打印到终端
+
+    Args:
+        verbose: 是否显示所有方向强度、序列号和热力图统计
+        show_prompts: 是否显示 REPL 提示符行
+    """
+
+    def __init__(self, verbose=False, show_prompts=False):
+        self.verbose = verbose
+        self.show_prompts = show_prompts
+
+    def on_detection(self, event):
+        dt = datetime.fromtimestamp(event.timestamp)
+        source = f" [{event.device}]" if event.device is not None else ""
+        print(f"\n🔊 [{dt.strftime('%H:%M:%S')}]{source} 检测到声音!")
+        print(f"   角度: {event.angle}°")
+        if event.bearing is not None:
+            print(f"   估计角度: {event.bearing:.1f}°")
+        print(f"   强度: {event.intensity}")
+        print(f"   方向: {event.direction}")
+
+        if self.verbose:
+            if event.directions:
+                print(f"   详细强度: {list(event.directions)}")
+            if event.seq is not None:
+                print(f"   序列号: {event.seq} | 设备tick: {event.tick}")
+
+        audio_map = event.audio_map
+        if audio_map:
+            print(f"   📊 原始音频: {len(audio_map)}字节")
+            stats = event.map_stats
+            if self.verbose and stats is not None:
+                # 流水线中 MapStatsStage 已批量算好（见 mapstats.py）
+                print(f"   音频统计 - 最小: {stats.min}, 最大: {stats.max}, "
+                      f"平均: {stats.mean:.1f}, 背景: {stats.background}, 峰值: {stats.peak}")
+            elif self.verbose:
+                print(f"   音频统计 - 最小: {min(audio_map)}, 最大: {max(audio_map)}, "
+                      f"平均: {sum(audio_map) / len(audio_map):.1f}")
+
+    def on_track(self, event):
+        source = f" [{event.device}]" if event.device is not None else ""
+        print(f"🎯{source} 轨迹 {event.track_id}: {event.angle:.1f}° "
+              f"({event.velocity:+.1f}°/s, 置信度 {event.confidence:.2f})")
+
+    def on_position(self, event):
+        print(f"📍 声源位置: ({event.x:.2f}, {event.y:.2f}) ±{event.error:.2f} "
+              f"[{', '.join(str(d) for d in event.devices)}]")
+
+    def on_log(self, event):
+        if event.is_prompt and not self.show_prompts:
+            return
+        text = event.text
+        if text:
+            source = f"设备 {event.device}" if event.device is not None else "设备"
+            print(f"[{source}] {text}")
+
+
+class FileSink(Sink):
+    """
+    每次检测保存一个 .raw 热力图文件和一个 .json 元数据文件
+
+    Args:
+        data_dir: 保存目录
+    """
+
+    def __init__(self, data_dir="maix_audio_data"):
+        self.data_dir = data_dir
+        self.saved = 0
+        self.write_time = Histogram()
+        if not os.path.exists(self.data_dir):
+            os.makedirs(self.data_dir)
+
+    def on_detection(self, event):
+        if not event.audio_map:
+            return
+
+        start = time.perf_counter()
+        # 创建文件名
+        dt = datetime.fromtimestamp(event.timestamp)
+        filename = f"audio_{dt.strftime('%Y%m%d_%H%M%S_%f')}"
+
+        # 保存原始音频数据（二进制）
+        audio_file = os.path.join(self.data_dir, f"{filename}.raw")
+        with open(audio_file, 'wb') as f:
+            f.write(event.audio_map)
+
+        # 保存元数据（JSON）
+        meta_file = os.path.join(self.data_dir, f"{filename}.json")
+        with open(meta_file, 'w') as f:
+            json.dump(event.to_dict(), f, indent=2, ensure_ascii=False)
+
+        self.write_time.observe(time.perf_counter() - start)
+        self.saved += 1
+        print(f"音频数据已保存: {filename}")
+
+
+class NetworkSink(Sink):
+    """
+    以JSON行的形式转发检测事件和轨迹
+
+    Args:
+        host: 目标地址
+        port: 目标端口
+        protocol: 'udp' 或 'tcp'
+        include_map: 是否附带十六进制热力图
+    """
+
+    def __init__(self, host='127.0.0.1', port=9000, protocol='udp', include_map=False):
+        self.address = (host, port)
+        self.protocol = protocol
+        self.include_map = include_map
+        self.sock = None
+        self.sent = 0
+        self.errors = 0
+
+    def _connect(self):
+        if self.protocol == 'tcp':
+            self.sock = socket.create_connection(self.address, timeout=1)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def on_detection(self, event):
+        data = event.to_dict()
+        if self.include_map and event.audio_map:
+            data["raw_audio"] = event.audio_map.hex()
+        self._send(data)
+
+    def on_track(self, event):
+        self._send(event.to_dict())
+
+    def on_position(self, event):
+        self._send(event.to_dict())
+
+    def _send(self, data):
+        message = json.dumps(data).encode() + b'\n'
+
+        try:
+            if self.sock is None:
+                self._connect()
+            if self.protocol == 'tcp':
+                self.sock.sendall(message)
+            else:
+                self.sock.sendto(message, self.address)
+            self.sent += 1
+        except OSError:
+            # 对端不可用时丢弃，下次重新连接
+            self.errors += 1
+            self.close()
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class MetricsSink(Sink):
+    """
+    事件计数
+
+    Args:
+        interval: 定期打印统计的间隔（秒），None 表示只在关闭时打印
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self.detections = 0
+        self.maps = 0
+        self.logs = 0
+        self.start = time.time()
+        self._last_report = self.start
+
+    def on_detection(self, event):
+        self.detections += 1
+        if event.audio_map:
+            self.maps += 1
+        self._maybe_report()
+
+    def on_log(self, event):
+        self.logs += 1
+        self._maybe_report()
+
+    def rate(self):
+        """平均检测事件率（事件/秒）"""
+        elapsed = time.time() - self.start
+        return self.detections / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        return (f"📈 检测: {self.detections} (热力图 {self.maps}) | 日志: {self.logs} | "
+                f"速率: {self.rate():.1f} 事件/秒")
+
+    def _maybe_report(self):
+        if self.interval is None:
+            return
+        now = time.time()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            print(self.report())
+
+    def close(self):
+        print(self.report())
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+分段追加式事件存储
+
+取代每次检测保存一个 .raw 和一个 .json 的做法。检测事件以定长二进制
+记录追加到段文件（.seg）中，段文件按大小或时长轮换；每个段有一个
+稀疏时间索引（.idx），每隔若干条记录写一条 (时间, 记录号)。
+写入先进入内存缓冲，按时间间隔或缓冲大小批量落盘。
+
+段文件:  头部 16 字节 (魔数 b'MXAS', 版本, 记录长度, 创建时间) + 定长记录
+记录:    主机接收时间, 设备时间, 序列号, tick, 角度, 强度, 方向, 标志,
+         12个方向强度, 设备标识(UTF-8, 最长32字节), 16x16热力图(256字节)
+索引:    (时间 float64, 记录号 uint32) 序列
+
+读取时先按索引二分定位，再从段文件中分块顺序读取，不会整段载入内存。
+记录按主机接收时间追加，段内时间是单调的。
+"""
+
+import bisect
+import os
+import struct
+import time
+from datetime import datetime
+
+from .events import DetectionEvent
+from .metrics import Histogram
+from .sinks import Sink
+
+SEGMENT_MAGIC = b'MXAS'
+SEGMENT_VERSION = 2  # 版本1的设备标识只有8字节
+
+HEADER_FORMAT = '<4sHHd'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+DEVICE_SIZE = 32
+RECORD_FORMAT = '<ddIIHHBB12s32s256s'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+INDEX_FORMAT = '<dI'
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+
+FLAG_MAP = 0x01
+FLAG_SEQ = 0x02
+FLAG_TICK = 0x04
+
+NO_VALUE = 0xFFFFFFFF
+EMPTY_MAP = bytes(256)
+
+_header = struct.Struct(HEADER_FORMAT)
+_record = struct.Struct(RECORD_FORMAT)
+_index = struct.Struct(INDEX_FORMAT)
+
+
+def device_bytes(device):
+    """
+    设备标识编码为定长字段的内容
+
+    Raises:
+        ValueError: UTF-8 编码超过 DEVICE_SIZE 字节。截断会让 kitchen_mic1 和
+            kitchen_mic2 这样的标识变成同一个设备，因此直接拒绝
+    """
+    if device is None:
+        return b''
+    data = str(device).encode('utf-8')
+    if len(data) > DEVICE_SIZE:
+        raise ValueError(f"设备标识超过 {DEVICE_SIZE} 字节: {device!r}")
+    return data
+
+
+def pack_record(event):
+    """把检测事件打包为一条定长记录"""
+    flags = 0
+    audio_map = event.audio_map
+    if audio_map:
+        flags |= FLAG_MAP
+    if event.seq is not None:
+        flags |= FLAG_SEQ
+    if event.tick is not None:
+        flags |= FLAG_TICK
+    dirs = bytes(min(max(int(v), 0), 255) for v in event.directions[:12])
+    return _record.pack(
+        event.received,
+        event.timestamp,
+        event.seq & 0xFFFFFFFF if event.seq is not None else NO_VALUE,
+        event.tick & 0xFFFFFFFF if event.tick is not None else NO_VALUE,
+        event.angle,
+        min(int(event.intensity), 0xFFFF),
+        event.direction,
+        flags,
+        dirs,
+        device_bytes(event.device),
+        audio_map if audio_map else EMPTY_MAP,
+    )
+
+
+def unpack_record(data, offset=0):
+    """把一条记录解包为 DetectionEvent"""
+    (received, timestamp, seq, tick, angle, intensity, direction, flags,
+     dirs, device, audio_map) = _record.unpack_from(data, offset)
+    device = device.rstrip(b'\x00').decode('utf-8', errors='ignore') or None
+    return DetectionEvent(
+        timestamp, received, angle, intensity, direction, list(dirs),
+        seq if flags & FLAG_SEQ else None,
+        tick if flags & FLAG_TICK else None,
+        audio_map if flags & FLAG_MAP else None,
+        device,
+    )
+
+
+class SegmentWriter:
+    """
+    段文件写入器
+
+    Args:
+        directory: 存储目录
+        max_bytes: 单个段文件的最大字节数
+        max_age: 单个段文件的最长时间跨度（秒）
+        flush_interval: 缓冲落盘间隔（秒）
+        buffer_size: 缓冲达到该字节数时立即落盘
+        index_every: 每多少条记录写一条索引
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, max_age=3600,
+                 flush_interval=1.0, buffer_size=64 * 1024, index_every=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.index_every = index_every
+
+        self._seg = None
+        self._idx = None
+        self._buf = bytearray()
+        self._idx_buf = bytearray()
+        self._count = 0
+        self._created = 0.0
+        self._last_flush = time.time()
+
+        self.records = 0
+        self.segments = 0
+        self.flush_time = Histogram()
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _open_segment(self, now):
+        self._close_segment()
+        dt = datetime.fromtimestamp(now)
+        serial_no = len([name for name in os.listdir(self.directory) if name.endswith('.seg')])
+        base = os.path.join(self.directory, f"seg_{dt.strftime('%Y%m%d_%H%M%S')}_{serial_no:04d}")
+        self._seg = open(base + '.seg', 'wb')
+        self._idx = open(base + '.idx', 'wb')
+        self._seg.write(_header.pack(SEGMENT_MAGIC, SEGMENT_VERSION, RECORD_SIZE, now))
+        self._count = 0
+        self._created = now
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._seg is None:
+            return
+        self.flush()
+        self._seg.close()
+        self._idx.close()
+        self._seg = None
+        self._idx = None
+
+    def _need_rotate(self, now):
+        if self._seg is None:
+            return True
+        size = HEADER_SIZE + (self._count + 1) * RECORD_SIZE
+        return size > self.max_bytes or now - self._created >= self.max_age
+
+    def append(self, event):
+        """追加一条检测事件"""
+        received = event.received
+        if self._need_rotate(received):
+            self._open_segment(received)
+        if self._count % self.index_every == 0:
+            self._idx_buf += _index.pack(received, self._count)
+        self._buf += pack_record(event)
+        self._count += 1
+        self.records += 1
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        """缓冲超过大小或距上次落盘超过间隔时落盘"""
+        if len(self._buf) >= self.buffer_size or time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.time()
+        if self._seg is None or not self._buf:
+            return
+        start = time.perf_counter()
+        self._seg.write(self._buf)
+        self._seg.flush()
+        del self._buf[:]
+        if self._idx_buf:
+            self._idx.write(self._idx_buf)
+            self._idx.flush()
+            del self._idx_buf[:]
+        self.flush_time.observe(time.perf_counter() - start)
+
+    def close(self):
+        self._close_segment()
+
+
+class Segment:
+    """一个只读段文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path[:-4] + '.idx'
+        with open(path, 'rb') as f:
+            magic, version, record_size, created = _header.unpack(f.read(HEADER_SIZE))
+        if magic != SEGMENT_MAGIC or record_size != RECORD_SIZE:
+            raise ValueError(f"不是有效的段文件: {path}")
+        self.created = created
+        self.count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+        self._index = None
+
+    def index(self):
+        """读取稀疏索引 ([时间], [记录号])"""
+        if self._index is None:
+            times = []
+            numbers = []
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'rb') as f:
+                    data = f.read()
+                for offset in range(0, len(data) - INDEX_SIZE + 1, INDEX_SIZE):
+                    t, number = _index.unpack_from(data, offset)
+                    if number < self.count:
+                        times.append(t)
+                        numbers.append(number)
+            self._index = (times, numbers)
+        return self._index
+
+    def time_range(self):
+        """(第一条记录时间, 最后一条记录时间)，空段返回 None"""
+        if self.count == 0:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER_SIZE)
+            first = struct.unpack('<d', f.read(8))[0]
+            f.seek(HEADER_SIZE + (self.count - 1) * RECORD_SIZE)
+            last = struct.unpack('<d', f.read(8))[0]
+        return first, last
+
+    def start_record(self, start):
+        """时间 >= start 的记录最早可能出现的记录号"""
+        if start is None:
+            return 0
+        times, numbers = self.index()
+        pos = bisect.bisect_right(times, start) - 1
+        return numbers[pos] if pos >= 0 else 0
+
+    def iter_records(self, start=None, end=None, chunk=64):
+        """按时间范围 [start, end) 逐条产出记录"""
+        number = self.start_record(start)
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER_SIZE + number * RECORD_SIZE)
+            while number < self.count:
+                data = f.read(min(chunk, self.count - number) * RECORD_SIZE)
+                if not data:
+                    break
+                for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+                    received = struct.unpack_from('<d', data, offset)[0]
+                    if start is not None and received < start:
+                        continue
+                    if end is not None and received >= end:
+                        return
+                    yield unpack_record(data, offset)
+                number += len(data) // RECORD_SIZE
+
+
+class SegmentStore:
+    """
+    段文件存储的读取接口
+
+    Args:
+        directory: 存储目录
+    """
+
+    def __init__(self, directory="maix_audio_data"):
+        self.directory = directory
+
+    def segments(self):
+        """按时间顺序返回所有段"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith('.seg'))
+        result = []
+        for name in names:
+            try:
+                result.append(Segment(os.path.join(self.directory, name)))
+            except (ValueError, struct.error):
+                continue
+        return result
+
+    def iter_records(self, start=None, end=None):
+        """
+        按时间范围产出检测事件
+
+        Args:
+            start: 起始时间（含），None 表示不限
+            end: 结束时间（不含），None 表示不限
+        """
+        for segment in self.segments():
+            span = segment.time_range()
+            if span is None:
+                continue
+            if end is not None and span[0] >= end:
+                continue
+            if start is not None and span[1] < start:
+                continue
+            yield from segment.iter_records(start, end)
+
+    def count(self):
+        return sum(segment.count for segment in self.segments())
+
+
+class StoreSink(Sink):
+    """
+    把检测事件写入段文件存储
+
+    Args:
+        directory: 存储目录
+        其余参数传给 SegmentWriter
+    """
+
+    def __init__(self, directory="maix_audio_data", **options):
+        self.writer = SegmentWriter(directory, **options)
+
+    def on_detection(self, event):
+        self.writer.append(event)
+
+    def idle(self):
+        self.writer.flush_if_due()
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+检测流的丢包统计和端到端延迟
+
+设备在每个检测事件中带上序列号 seq 和 time.ticks_ms() 的 tick
+（文本协议为 AUDIO_PACKET 的 "seq" / "tick" 字段，二进制帧头本来就有）。
+
+- SequenceTracker 按序列号统计丢失、重复、乱序和设备重启
+- LatencyEstimator 把设备 tick 换算到主机时间：设备没有 RTC，两个时钟的偏移未知，
+  取滑动窗口内 (接收时间 - tick) 的最小值作为偏移，即假设窗口内最快的一个事件
+  只有固定的最小传输延迟。得到的是高出最小延迟的部分，链路饱和、发送缓冲排队时
+  明显上升。有外部校准（如时钟同步）时用 set_offset() 固定偏移，得到绝对延迟
+- RollingHistogram 保存最近一段时间的延迟，给出 p50/p95/p99
+
+StreamStatsSink 按设备汇总以上统计，Receiver 默认带一个（receiver.stats）。
+给定 ClockSync（clocksync.py）且已同步时，延迟直接按同步后的设备时间计算，是绝对延迟。
+"""
+
+import bisect
+import collections
+import time
+
+from .sinks import Sink
+
+SEQ_MODULUS = 0x10000   # 二进制帧头的序列号为16位
+TICK_MODULUS = 1 << 32  # 二进制帧头的 tick 为32位
+
+
+class SequenceTracker:
+    """
+    序列号跟踪
+
+    向前跳跃时中间的序列号计为丢失；之后迟到的计为乱序并从丢失中扣除；
+    已经收到过的计为重复；tick 大幅后退或序列号大幅后退视为设备重启，重新开始。
+
+    Args:
+        window: 记住最近多少个已收到 / 缺失的序列号，用于区分重复和乱序
+        reset_ticks: tick 后退超过这么多毫秒视为设备重启
+    """
+
+    def __init__(self, window=1024, reset_ticks=1000):
+        self.window = window
+        self.reset_ticks = reset_ticks
+        self.last = None
+        self.last_tick = None
+        self._seen = collections.deque()
+        self._seen_set = set()
+        self._missing = collections.deque()
+        self._missing_set = set()
+
+        # 统计
+        self.received = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+
+    def update(self, seq, tick=None):
+        """
+        记录一个序列号
+
+        Returns:
+            'first' / 'ok' / 'gap' / 'late' / 'duplicate' / 'reset'
+        """
+        seq %= SEQ_MODULUS
+        if self.last is None:
+            self._start(seq, tick)
+            return 'first'
+
+        diff = (seq - self.last + SEQ_MODULUS // 2) % SEQ_MODULUS - SEQ_MODULUS // 2
+        if diff <= 0 and self._restarted(diff, tick):
+            self.resets += 1
+            self._start(seq, tick)
+            return 'reset'
+
+        if diff > 0:
+            for missing in range(self.last + 1, self.last + diff):
+                self._remember(self._missing, self._missing_set, missing % SEQ_MODULUS)
+            self.lost += diff - 1
+            self.last = seq
+            self.last_tick = tick
+            status = 'gap' if diff > 1 else 'ok'
+        elif seq in self._missing_set:
+            self._missing_set.discard(seq)
+            self.lost -= 1
+            self.reordered += 1
+            status = 'late'
+        else:
+            self.duplicates += 1
+            return 'duplicate'
+        self.received += 1
+        self._remember(self._seen, self._seen_set, seq)
+        return status
+
+    def _restarted(self, diff, tick):
+        """序列号没有前进时判断是否为设备重启"""
+        if tick is not None and self.last_tick is not None:
+            back = (self.last_tick - tick) % TICK_MODULUS
+            if self.reset_ticks < back < TICK_MODULUS // 2:
+                return True
+        if -diff > self.window:
+            return True
+        # 窗口内既没收到过也不在缺失列表里：只能是重新开始计数
+        seq = (self.last + diff) % SEQ_MODULUS
+        return diff < 0 and seq not in self._seen_set and seq not in self._missing_set
+
+    def _start(self, seq, tick):
+        self.last = seq
+        self.last_tick = tick
+        self._seen.clear()
+        self._seen_set.clear()
+        self._missing.clear()
+        self._missing_set.clear()
+        self.received += 1
+        self._remember(self._seen, self._seen_set, seq)
+
+    def _remember(self, order, members, seq):
+        order.append(seq)
+        members.add(seq)
+        while len(order) > self.window:
+            members.discard(order.popleft())
+
+    @property
+    def loss_rate(self):
+        """丢失占应收事件的比例"""
+        expected = self.received + self.lost
+        return self.lost / expected if expected else 0.0
+
+
+class LatencyEstimator:
+    """
+    设备 tick -> 主机时间的偏移估计和延迟计算
+
+    Args:
+        window: 求最小偏移的滑动窗口（主机时间，秒），可跟上两个时钟的缓慢漂移
+        warmup: 校准所需的最少样本数，之前不输出延迟
+    """
+
+    def __init__(self, window=30.0, warmup=20):
+        self.window = window
+        self.warmup = warmup
+        self.offset = None        # 主机时间 - 设备时间（秒）
+        self.fixed = False        # 偏移由外部校准给定
+        self.samples = 0
+        self._last_tick = None
+        self._ticks = 0           # 展开回绕后的 tick
+        self._minimum = collections.deque()  # (接收时间, 偏移)，偏移单调递增
+
+    @property
+    def calibrated(self):
+        return self.fixed or self.samples >= self.warmup
+
+    def set_offset(self, offset):
+        """使用外部校准的时钟偏移（主机时间 - 设备时间，秒）"""
+        self.offset = offset
+        self.fixed = True
+
+    def reset(self):
+        """设备重启后 tick 重新计数，重新校准"""
+        self._last_tick = None
+        self._minimum.clear()
+        self.samples = 0
+        if not self.fixed:
+            self.offset = None
+
+    def device_time(self, tick):
+        """展开32位回绕后的设备时间（秒）"""
+        if self._last_tick is None:
+            self._ticks = tick
+        else:
+            delta = (tick - self._last_tick) % TICK_MODULUS
+            if delta >= TICK_MODULUS // 2:
+                delta -= TICK_MODULUS  # 乱序到达的旧事件
+            self._ticks += delta
+        self._last_tick = tick
+        return self._ticks / 1000.0
+
+    def update(self, tick, received):
+        """
+        Returns:
+            延迟（秒），校准完成前返回 None
+        """
+        device_time = self.device_time(tick)
+        if self.fixed:
+            return received - (device_time + self.offset)
+
+        sample = received - device_time
+        minimum = self._minimum
+        while minimum and minimum[-1][1] >= sample:
+            minimum.pop()
+        minimum.append((received, sample))
+        while minimum[0][0] < received - self.window:
+            minimum.popleft()
+        self.offset = minimum[0][1]
+        self.samples += 1
+        if not self.calibrated:
+            return None
+        return sample - self.offset
+
+
+class RollingHistogram:
+    """
+    最近 window 秒（最多 max_samples 个）的样本分布
+
+    Args:
+        window: 保留的时间范围（秒）
+        max_samples: 最多保留的样本数
+    """
+
+    def __init__(self, window=60.0, max_samples=10000):
+        self.window = window
+        self.samples = collections.deque(maxlen=max_samples)
+
+    def add(self, value, now=None):
+        self.samples.append((time.time() if now is None else now, value))
+
+    def _expire(self, now):
+        samples = self.samples
+        limit = (time.time() if now is None else now) - self.window
+        while samples and samples[0][0] < limit:
+            samples.popleft()
+
+    def values(self, now=None):
+        """窗口内的样本（已排序）"""
+        self._expire(now)
+        return sorted(value for _, value in self.samples)
+
+    def percentiles(self, points=(50, 95, 99), now=None):
+        """
+        Returns:
+            {百分位: 值}，没有样本时为空字典
+        """
+        values = self.values(now)
+        if not values:
+            return {}
+        last = len(values) - 1
+        return {p: values[min(last, int(round(p / 100.0 * last)))] for p in points}
+
+    def buckets(self, bounds, now=None):
+        """
+        按上界统计个数
+
+        Returns:
+            长度为 len(bounds) + 1 的计数列表，最后一项为超过最大上界的个数
+        """
+        values = self.values(now)
+        counts = []
+        previous = 0
+        for bound in bounds:
+            index = bisect.bisect_right(values, bound)
+            counts.append(index - previous)
+            previous = index
+        counts.append(len(values) - previous)
+        return counts
+
+
+class StreamStats:
+    """单个设备的序列号和延迟统计"""
+
+    def __init__(self, window=60.0, clock=None):
+        self.clock = clock
+        self.sequence = SequenceTracker()
+        self.latency = LatencyEstimator()
+        self.histogram = RollingHistogram(window)
+        self.events = 0
+        self.unsequenced = 0  # 没有 seq 的事件（旧版设备脚本）
+
+    def update(self, event):
+        self.events += 1
+        if event.seq is None:
+            self.unsequenced += 1
+            return
+        status = self.sequence.update(event.seq, event.tick)
+        if status == 'reset':
+            self.latency.reset()
+        if event.tick is not None and status != 'duplicate':
+            if self.clock is not None and self.clock.synced:
+                latency = event.received - self.clock.to_host(event.tick)
+            else:
+                latency = self.latency.update(event.tick, event.received)
+            if latency is not None:
+                self.histogram.add(latency, event.received)
+
+    def snapshot(self, now=None):
+        seq = self.sequence
+        percentiles = self.histogram.percentiles(now=now)
+        return {
+            "events": self.events,
+            "received": seq.received,
+            "lost": seq.lost,
+            "duplicates": seq.duplicates,
+            "reordered": seq.reordered,
+            "resets": seq.resets,
+            "loss_rate": seq.loss_rate,
+            "unsequenced": self.unsequenced,
+            "latency_ms": {f"p{p}": value * 1000 for p, value in percentiles.items()},
+            "calibrated": self.latency.calibrated or (self.clock is not None
+                                                      and self.clock.synced),
+        }
+
+
+class StreamStatsSink(Sink):
+    """
+    按设备统计丢失、重复、乱序和延迟分布
+
+    Args:
+        interval: 定期打印统计的间隔（秒），None 表示只在关闭时打印
+        window: 延迟直方图的时间窗口（秒）
+        clock: 可选的 ClockSync，同步后按绝对延迟统计
+    """
+
+    def __init__(self, interval=None, window=60.0, clock=None):
+        self.interval = interval
+        self.window = window
+        self.clock = clock
+        self.devices = {}
+        self._last_report = time.time()
+
+    def stats(self, device=None):
+        stats = self.devices.get(device)
+        if stats is None:
+            stats = self.devices[device] = StreamStats(self.window, self.clock)
+        return stats
+
+    def on_detection(self, event):
+        self.stats(event.device).update(event)
+        if self.interval is not None and event.received - self._last_report >= self.interval:
+            self._last_report = event.received
+            print(self.report())
+
+    def snapshot(self, now=None):
+        """
+        Returns:
+            {设备标识: 统计字典}
+        """
+        return {device: stats.snapshot(now) for device, stats in self.devices.items()}
+
+    def report(self):
+        lines = []
+        for device, data in self.snapshot().items():
+            source = f"[{device}] " if device is not None else ""
+            latency = data["latency_ms"]
+            text = (f"📶 {source}收到: {data['received']} | 丢失: {data['lost']} "
+                    f"({data['loss_rate']:.2%}) | 重复: {data['duplicates']} | "
+                    f"乱序: {data['reordered']}")
+            if latency:
+                text += (f" | 延迟 p50/p95/p99: {latency['p50']:.1f}/{latency['p95']:.1f}/"
+                         f"{latency['p99']:.1f}ms")
+            if data["unsequenced"]:
+                text += f" | 无序列号: {data['unsequenced']}"
+            lines.append(text)
+        return '\n'.join(lines) if lines else "📶 没有检测事件"
+
+    def close(self):
+        if self.devices:
+            print(self.report())
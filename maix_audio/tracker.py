@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+声源跟踪
+
+每个检测单独处理时，一个边走边说的人会产生一串30度跳变，反射还会带来零星的
+假方向。跟踪器维护固定数量的轨迹（角度、角速度、置信度），每个检测先按各轨迹
+的预测角度做圆周门限关联，再用 alpha-beta 滤波更新；关联不上的检测开启新轨迹。
+新轨迹只接收同一方向上的检测，命中 min_hits 次且置信度达到 min_confidence 后
+才确认并输出 TrackUpdate，随机方向的反射因此很难凑成轨迹；确认后门限放宽到
+覆盖量化和相邻方向误差。门限内有已确认轨迹时关联到命中最多的那条，同一声源
+的检测不会被分到两条轨迹上；噪声分裂出的轨迹靠近主轨迹时被合并。
+置信度随时间指数衰减，衰减到 drop_confidence 以下的轨迹被回收。
+
+所有轨迹状态是长度为 max_tracks 的 NumPy 数组，预测和关联对全部轨迹一次
+向量化完成，内存占用与事件数无关。需要 numpy（不在 maix_audio 包顶层导入）：
+
+    from maix_audio.tracker import TrackerSink
+"""
+
+import numpy as np
+
+from .events import TrackUpdate
+from .sinks import Sink
+
+
+def wrap_angle(angle):
+    """把角度差归一到 [-180, 180)"""
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+class SourceTracker:
+    """
+    单个麦克风阵列的多声源跟踪器
+
+    Args:
+        max_tracks: 最多同时跟踪的声源数
+        alpha: 角度修正增益
+        beta: 角速度修正增益
+        gate: 已确认轨迹的关联门限（度），需覆盖30度量化误差加上落到相邻方向的误差
+        tentative_gate: 未确认轨迹的关联门限（度），小于方向间隔，只接收同一方向的检测
+        merge: 两条轨迹相距小于此角度时合并，保留命中次数多的
+        gain: 每次命中时置信度向1靠近的比例
+        tau: 置信度衰减时间常数（秒）
+        min_hits: 确认需要的命中次数
+        min_confidence: 确认和输出需要的置信度（零星命中的反射轨迹达不到）
+        drop_confidence: 低于此置信度的轨迹被回收
+        max_speed: 角速度上限（度/秒）
+        min_interval: 角速度修正时使用的最小时间间隔（秒），
+                      避免两次检测挨得很近时角速度被放大
+    """
+
+    def __init__(self, max_tracks=8, alpha=0.15, beta=0.01, gate=60.0, tentative_gate=20.0,
+                 merge=30.0, gain=0.3, tau=2.0, min_hits=5, min_confidence=0.7,
+                 drop_confidence=0.05, max_speed=360.0, min_interval=0.1):
+        self.alpha = alpha
+        self.beta = beta
+        self.gate = gate
+        self.tentative_gate = tentative_gate
+        self.merge = merge
+        self.gain = gain
+        self.tau = tau
+        self.min_hits = min_hits
+        self.min_confidence = min_confidence
+        self.drop_confidence = drop_confidence
+        self.max_speed = max_speed
+        self.min_interval = min_interval
+
+        self.angle = np.zeros(max_tracks)
+        self.velocity = np.zeros(max_tracks)
+        self.confidence = np.zeros(max_tracks)  # 上次更新时的置信度
+        self.last = np.zeros(max_tracks)
+        self.hits = np.zeros(max_tracks, dtype=np.int64)
+        self.ids = np.full(max_tracks, -1, dtype=np.int64)  # -1 表示空闲
+        self.confirmed = np.zeros(max_tracks, dtype=bool)
+        self.next_id = 0
+        self.detections = 0
+        self.updates = 0
+
+    def _current_confidence(self, t):
+        dt = np.maximum(t - self.last, 0.0)
+        conf = self.confidence * np.exp(-dt / self.tau)
+        return np.where(self.ids >= 0, conf, 0.0), dt
+
+    def update(self, angle, t):
+        """
+        处理一个检测
+
+        Args:
+            angle: 检测角度（度）
+            t: 检测时间（秒）
+
+        Returns:
+            命中已确认轨迹时返回 (track_id, 角度, 角速度, 置信度, 命中次数)，否则 None
+        """
+        self.detections += 1
+        conf, dt = self._current_confidence(t)
+        alive = conf >= self.drop_confidence
+        self.ids[~alive] = -1
+
+        predicted = self.angle + self.velocity * dt
+        innovation = wrap_angle(angle - predicted)
+        distance = np.abs(innovation)
+        # 未确认的轨迹只接收同一方向上的检测，随机方向的反射难以凑够命中
+        gate = np.where(self.confirmed, self.gate, self.tentative_gate)
+        distance = np.where(alive & (distance <= gate), distance, np.inf)
+        # 门限内有已确认轨迹时交给命中最多的那条，避免反射开启的轨迹分走检测、
+        # 把主轨迹的角速度拖慢直至跟丢
+        confirmed = self.confirmed & np.isfinite(distance)
+        if confirmed.any():
+            k = int(np.where(confirmed, self.hits, -1).argmax())
+        else:
+            k = int(distance.argmin())
+
+        if np.isfinite(distance[k]):
+            r = innovation[k]
+            step = max(dt[k], self.min_interval)
+            self.angle[k] = (predicted[k] + self.alpha * r) % 360.0
+            self.velocity[k] = np.clip(self.velocity[k] + self.beta * r / step,
+                                       -self.max_speed, self.max_speed)
+            self.confidence[k] = conf[k] + (1.0 - conf[k]) * self.gain
+            self.hits[k] += 1
+            # 噪声产生的分裂轨迹追上主轨迹时合并
+            near = alive & (np.abs(wrap_angle(self.angle - self.angle[k])) < self.merge)
+            near[k] = False
+            for j in np.flatnonzero(near):
+                if self.hits[j] > self.hits[k]:
+                    self.ids[k] = self.ids[j]
+                    self.hits[k] = self.hits[j]
+                    self.confirmed[k] |= self.confirmed[j]
+                self.ids[j] = -1
+                self.confidence[j] = 0.0
+                self.confirmed[j] = False
+        else:
+            # 新轨迹占用空闲位置，没有时替换置信度最低的轨迹
+            k = int(conf.argmin())
+            self.ids[k] = self.next_id
+            self.next_id += 1
+            self.angle[k] = angle % 360.0
+            self.velocity[k] = 0.0
+            self.confidence[k] = self.gain
+            self.hits[k] = 1
+            self.confirmed[k] = False
+        self.last[k] = t
+
+        if self.hits[k] >= self.min_hits and self.confidence[k] >= self.min_confidence:
+            self.confirmed[k] = True
+        if not self.confirmed[k] or self.confidence[k] < self.min_confidence:
+            return None
+        self.updates += 1
+        return (int(self.ids[k]), float(self.angle[k]), float(self.velocity[k]),
+                float(self.confidence[k]), int(self.hits[k]))
+
+    def update_event(self, event):
+        """处理一个 DetectionEvent，优先使用主机端估计的 bearing"""
+        angle = event.bearing if event.bearing is not None else event.angle
+        result = self.update(angle, event.timestamp)
+        if result is None:
+            return None
+        return TrackUpdate(event.timestamp, *result, device=event.device, detection=event)
+
+    def tracks(self, t):
+        """时刻 t 仍存活且已确认的轨迹（角度按预测外推）"""
+        conf, dt = self._current_confidence(t)
+        live = (conf >= self.min_confidence) & self.confirmed & (self.ids >= 0)
+        out = []
+        for k in np.flatnonzero(live):
+            angle = (self.angle[k] + self.velocity[k] * dt[k]) % 360.0
+            out.append(TrackUpdate(t, int(self.ids[k]), float(angle), float(self.velocity[k]),
+                                   float(conf[k]), int(self.hits[k])))
+        return out
+
+
+class TrackerSink(Sink):
+    """
+    跟踪检测事件，把 TrackUpdate 交给下游 sink
+
+    每个设备一个跟踪器。
+
+    Args:
+        sinks: 接收 TrackUpdate 的 sink 列表（调用其 on_track）
+        **kwargs: SourceTracker 参数
+    """
+
+    def __init__(self, sinks=None, **kwargs):
+        self.sinks = list(sinks) if sinks else []
+        self.kwargs = kwargs
+        self.trackers = {}
+
+    def tracker(self, device=None):
+        tracker = self.trackers.get(device)
+        if tracker is None:
+            tracker = self.trackers[device] = SourceTracker(**self.kwargs)
+        return tracker
+
+    def on_detection(self, event):
+        update = self.tracker(event.device).update_event(event)
+        if update is None:
+            return
+        for sink in self.sinks:
+            try:
+                sink.handle(update)
+            except Exception as e:
+                print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
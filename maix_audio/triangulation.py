@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+多阵列声源定位
+
+每个麦克风阵列只给出声源的方位。几个位置已知的阵列同时检测到同一个声音时，
+把各自的方位线求交，得到二维位置：
+
+    1. 按时间对齐：各设备的检测按 timestamp（开启时钟同步后为主机时间）排序，
+       window 秒内来自不同设备的检测归为一组，同一设备取强度最大的一个；
+       一组最多等待 latency 秒，迟到的检测不再归入
+    2. 求交：点到各方位线距离的加权最小二乘，权重为 1 / (距离 x 角度误差)^2，
+       按上一轮的解重新计算距离再解一次；所有组一次向量化求解，2x2 方程闭式求逆
+    3. 不确定度：协方差为法方程矩阵的逆；多于两条方位线时按残差放大
+       （约化卡方大于1时），error 为位置均方根误差
+
+方向角换算到平面坐标：world = rotation + angle（clockwise 时为 rotation - angle），
+world 为从 x 轴正方向逆时针量的角度。
+
+需要 numpy（不在 maix_audio 包顶层导入）：
+
+    from maix_audio.triangulation import TriangulationSink
+
+    arrays = {'mic1': (0.0, 0.0, 0.0), 'mic2': (4.0, 0.0, 90.0), 'mic3': (0.0, 3.0, 0.0)}
+    sink = TriangulationSink(arrays, sinks=[ConsoleSink()])
+"""
+
+import bisect
+import threading
+import time
+
+import numpy as np
+
+from .events import SourcePosition
+from .sinks import Sink
+
+# 设备方向分辨率30度，量化误差的标准差约为 30/sqrt(12)
+DEVICE_SIGMA = 8.7
+
+
+def event_time(event):
+    """默认对齐时间：事件时间戳（时钟同步后为主机时间）"""
+    return event.timestamp
+
+
+def event_bearing(event):
+    """检测方位，优先使用主机端估计的 bearing"""
+    return event.bearing if event.bearing is not None else event.angle
+
+
+def _solve(normals, offsets, weights):
+    """
+    加权最小二乘 sum(w * (n . p - c)^2) 的闭式解
+
+    Returns:
+        (点 (N, 2), 法方程矩阵的逆 (N, 2, 2), 行列式 (N,), 迹 (N,))
+    """
+    wn = normals * weights[..., None]
+    a = np.einsum('nmi,nmj->nij', wn, normals)
+    b = np.einsum('nmi,nm->ni', wn, offsets)
+    det = a[:, 0, 0] * a[:, 1, 1] - a[:, 0, 1] * a[:, 1, 0]
+    safe = np.where(det > 0, det, 1.0)
+    inv = np.empty_like(a)
+    inv[:, 0, 0] = a[:, 1, 1] / safe
+    inv[:, 1, 1] = a[:, 0, 0] / safe
+    inv[:, 0, 1] = -a[:, 0, 1] / safe
+    inv[:, 1, 0] = -a[:, 1, 0] / safe
+    points = np.einsum('nij,nj->ni', inv, b)
+    return points, inv, det, a[:, 0, 0] + a[:, 1, 1]
+
+
+def triangulate(positions, angles, mask=None, sigma=DEVICE_SIGMA, iterations=2,
+                min_range=0.1, min_angle=2.0):
+    """
+    批量求方位线交点
+
+    Args:
+        positions: (M, 2) 阵列位置
+        angles: (N, M) 平面方位角（度，x 轴逆时针）
+        mask: (N, M) 哪些方位有效，默认全部有效
+        sigma: 方位误差标准差（度），标量或 (N, M)
+        iterations: 按距离重新加权的次数
+        min_range: 计算权重时距离的下限，避免声源贴近阵列时权重发散
+        min_angle: 方位线之间的最小夹角（度），更接近平行的组无解
+
+    Returns:
+        (points (N, 2), cov (N, 2, 2), valid (N,))；无解的组 points 为 nan
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    theta = np.deg2rad(np.asarray(angles, dtype=np.float64))
+    if theta.ndim == 1:
+        theta = theta[None, :]
+    mask = np.ones(theta.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    mask = mask & np.isfinite(theta)
+    theta = np.where(mask, theta, 0.0)
+    sigma = np.broadcast_to(np.deg2rad(np.asarray(sigma, dtype=np.float64)), theta.shape)
+
+    direction = np.stack([np.cos(theta), np.sin(theta)], axis=-1)          # (N, M, 2)
+    normals = np.stack([-direction[..., 1], direction[..., 0]], axis=-1)
+    offsets = np.einsum('nmi,mi->nm', normals, positions)
+
+    weights = mask.astype(np.float64)
+    points, inv, det, trace = _solve(normals, offsets, weights)
+    for _ in range(iterations):
+        ranges = np.linalg.norm(points[:, None, :] - positions[None, :, :], axis=-1)
+        ranges = np.maximum(np.nan_to_num(ranges, nan=min_range), min_range)
+        weights = mask / (ranges * sigma) ** 2
+        points, inv, det, trace = _solve(normals, offsets, weights)
+
+    # 2x2 法方程矩阵的 det / trace^2 = sin^2(夹角) / 4（两条等权方位线时），
+    # 多条线时反映最大夹角
+    count = mask.sum(axis=1)
+    conditioned = det > (trace ** 2) * np.sin(np.deg2rad(min_angle)) ** 2 / 4.0
+    # 交点必须在每个阵列的前方（反向延长线的交点是假解）
+    along = np.einsum('nmi,nmi->nm', points[:, None, :] - positions[None, :, :], direction)
+    ahead = np.all(~mask | (along > -min_range), axis=1)
+    valid = (count >= 2) & conditioned & ahead
+
+    # 残差按约化卡方放大协方差
+    residual = np.einsum('nmi,ni->nm', normals, points) - offsets
+    chi2 = (weights * residual ** 2).sum(axis=1)
+    dof = np.maximum(count - 2, 1)
+    scale = np.where(count > 2, np.maximum(chi2 / dof, 1.0), 1.0)
+    cov = inv * scale[:, None, None]
+
+    points[~valid] = np.nan
+    cov[~valid] = np.nan
+    return points, cov, valid
+
+
+class Triangulator:
+    """
+    多阵列检测的时间对齐和定位
+
+    Args:
+        arrays: {设备标识: (x, y, rotation)}，rotation 为方向0在平面上的角度（度）
+        window: 同一声音在不同设备上的检测时间差上限（秒）
+        latency: 一组检测最多等待多久（秒），之后输出
+        min_arrays: 至少几个设备的方位才定位
+        sigma: 方位误差标准差（度），用 bearing 估计时可以更小
+        clockwise: 方向编号是否顺时针增加
+        key: 对齐时间函数，默认 event.timestamp；没有时钟同步时用接收时间
+        **kwargs: 传给 triangulate 的参数
+    """
+
+    def __init__(self, arrays, window=0.05, latency=0.2, min_arrays=2, sigma=DEVICE_SIGMA,
+                 clockwise=False, key=event_time, **kwargs):
+        self.devices = list(arrays)
+        self.index = {device: i for i, device in enumerate(self.devices)}
+        poses = np.array([arrays[device] for device in self.devices], dtype=np.float64)
+        self.positions = poses[:, :2]
+        self.rotations = poses[:, 2] if poses.shape[1] > 2 else np.zeros(len(poses))
+        self.window = window
+        self.latency = latency
+        self.min_arrays = min_arrays
+        self.sigma = sigma
+        self.sign = -1.0 if clockwise else 1.0
+        self.key = key
+        self.kwargs = kwargs
+        self._pending = []    # [(时间, 设备序号, 方位, 强度)]，按时间排序
+        self.latest = None
+
+        self.detections = 0
+        self.ignored = 0      # 未知设备
+        self.groups = 0
+        self.unmatched = 0    # 设备数不足的组
+        self.located = 0
+        self.failed = 0       # 方位线平行或交在阵列后方
+
+    def add(self, event):
+        """加入一个检测事件；返回已能输出的 SourcePosition 列表"""
+        index = self.index.get(event.device)
+        if index is None:
+            self.ignored += 1
+            return []
+        t = self.key(event)
+        self.detections += 1
+        # 不同设备的检测不一定按时间到达，插入时保持有序，最早的一组才能按时关闭
+        bisect.insort(self._pending, (t, index, event_bearing(event), event.intensity))
+        if self.latest is None or t > self.latest:
+            self.latest = t
+        if self._pending[0][0] + self.window + self.latency > self.latest:
+            return []
+        return self.flush(self.latest)
+
+    def flush(self, now=None):
+        """
+        输出 now 之前已经关闭的组，now=None 时输出全部
+
+        Returns:
+            SourcePosition 列表
+        """
+        groups = self._close_groups(now)
+        if not groups:
+            return []
+        return self.locate(groups)
+
+    def _close_groups(self, now):
+        pending = self._pending
+        groups = []
+        start = 0
+        while start < len(pending):
+            t0 = pending[start][0]
+            if now is not None and t0 + self.window + self.latency > now:
+                break
+            end = start
+            best = {}
+            while end < len(pending) and pending[end][0] <= t0 + self.window:
+                item = pending[end]
+                current = best.get(item[1])
+                if current is None or item[3] > current[3]:
+                    best[item[1]] = item
+                end += 1
+            self.groups += 1
+            if len(best) >= self.min_arrays:
+                groups.append(list(best.values()))
+            else:
+                self.unmatched += 1
+            start = end
+        del pending[:start]
+        return groups
+
+    def locate(self, groups):
+        """
+        批量定位
+
+        Args:
+            groups: [[(时间, 设备序号, 方位, 强度)]]
+
+        Returns:
+            成功定位的 SourcePosition 列表
+        """
+        count = len(groups)
+        arrays = len(self.devices)
+        angles = np.zeros((count, arrays))
+        mask = np.zeros((count, arrays), dtype=bool)
+        times = np.zeros(count)
+        for row, group in enumerate(groups):
+            for t, index, bearing, _ in group:
+                angles[row, index] = bearing
+                mask[row, index] = True
+            times[row] = sum(item[0] for item in group) / len(group)
+        world = self.rotations[None, :] + self.sign * angles
+        points, cov, valid = triangulate(self.positions, world, mask, self.sigma, **self.kwargs)
+
+        results = []
+        for row in np.flatnonzero(valid).tolist():
+            c = cov[row]
+            results.append(SourcePosition(
+                float(times[row]), float(points[row, 0]), float(points[row, 1]),
+                float(c[0, 0]), float(c[0, 1]), float(c[1, 1]),
+                tuple(self.devices[item[1]] for item in groups[row])))
+        self.located += len(results)
+        self.failed += count - len(results)
+        return results
+
+    def snapshot(self):
+        return {
+            "detections": self.detections,
+            "ignored": self.ignored,
+            "groups": self.groups,
+            "unmatched": self.unmatched,
+            "located": self.located,
+            "failed": self.failed,
+            "pending": len(self._pending),
+        }
+
+
+class TriangulationSink(Sink):
+    """
+    把多个设备的检测交给 Triangulator，定位结果交给下游 sink
+
+    可以同时加到多个 Receiver（每个设备一个，在各自的线程中调用），
+    或 MultiDeviceCollector 的 sinks 中。
+
+    Args:
+        arrays: {设备标识: (x, y, rotation)}
+        sinks: 接收 SourcePosition 的 sink 列表（调用其 on_position）
+        **kwargs: Triangulator 参数
+    """
+
+    def __init__(self, arrays, sinks=None, **kwargs):
+        self.triangulator = Triangulator(arrays, **kwargs)
+        self.sinks = list(sinks) if sinks else []
+        self._lock = threading.Lock()
+
+    def on_detection(self, event):
+        with self._lock:
+            positions = self.triangulator.add(event)
+        self._emit(positions)
+
+    def idle(self):
+        # 对齐时间是主机时间，没有新检测时按当前时间关闭等待超时的组
+        with self._lock:
+            positions = self.triangulator.flush(time.time())
+        self._emit(positions)
+
+    def close(self):
+        with self._lock:
+            positions = self.triangulator.flush()
+        self._emit(positions)
+        snapshot = self.triangulator.snapshot()
+        print(f"📍 定位: {snapshot['located']} 个位置 | {snapshot['groups']} 组检测 | "
+              f"设备不足 {snapshot['unmatched']} | 无解 {snapshot['failed']}")
+
+    def _emit(self, positions):
+        for position in positions:
+            for sink in self.sinks:
+                try:
+                    sink.handle(position)
+                except Exception as e:
+                    print(f"❌ 输出错误 ({type(sink).__name__}): {e}")
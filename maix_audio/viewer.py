@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+16x16 热力图实时显示
+
+窗口左边是热力图，右边是12个方向强度的极坐标图。画面是常驻的 pygame 表面，
+每次只重画变化的部分：
+
+    - 热力图经预先算好的彩虹查找表（256x3）映射成颜色数组，只更新值变了的格子；
+      颜色数组写入常驻的 16x16 表面并放大，只把变化的格子（按行合并成矩形）
+      拷到屏幕并提交给 display.update()
+    - 极坐标图只在方向强度或估计角度变化时重画右侧面板
+
+检测事件可能比屏幕刷新快，HeatmapViewer 作为 sink 只保留最新一帧，
+最多每 1/fps 秒画一次；读取超时（idle）时把暂存的一帧画出来并处理窗口事件。
+
+需要 numpy 和 pygame（不在 maix_audio 包顶层导入）：
+
+    from maix_audio.viewer import HeatmapViewer
+
+没有显示器时设置 SDL_VIDEODRIVER=dummy（或 HeatmapViewer(headless=True)）。
+"""
+
+import math
+import os
+import time
+
+import numpy as np
+
+from .sinks import Sink
+
+GRID = 16
+SECTORS = 12
+BACKGROUND = (16, 16, 24)
+RING = (60, 60, 72)
+SPOKE = (110, 110, 130)
+PEAK = (255, 255, 255)
+BEARING = (255, 80, 80)
+
+
+def rainbow_lut(size=256):
+    """
+    彩虹查找表：0 为蓝，中间为绿，最大值为红（与设备端 to_rainbow 相近）
+
+    Returns:
+        (size, 3) uint8
+    """
+    # 色相 240° -> 0°，h 为色相 / 60°
+    h = (1.0 - np.arange(size) / (size - 1.0)) * 4.0
+    rgb = np.stack([np.abs(h - 3.0) - 1.0, 2.0 - np.abs(h - 2.0), 2.0 - np.abs(h - 4.0)], axis=1)
+    return np.round(np.clip(rgb, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+
+RAINBOW = rainbow_lut()
+
+
+class HeatmapViewer(Sink):
+    """
+    热力图和方向强度的实时窗口
+
+    Args:
+        cell: 每个热力图格子的边长（像素）
+        fps: 最高刷新率
+        rotation: 方向0在屏幕上的角度（度，0 为向右），随阵列安装方式而定
+        clockwise: 方向编号是否在屏幕上顺时针增加（与 direction.map_angles 一致）
+        headless: 不打开窗口（SDL_VIDEODRIVER=dummy），用于测试和性能测试
+        on_quit: 关闭窗口时调用，例如 receiver.stop
+        caption: 窗口标题
+    """
+
+    def __init__(self, cell=20, fps=60, rotation=0.0, clockwise=False, headless=False,
+                 on_quit=None, caption="MaixPy 声源热力图"):
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        import pygame
+        self.pygame = pygame
+        self.cell = cell
+        self.interval = 1.0 / fps if fps else 0.0
+        self.rotation = rotation
+        self.clockwise = clockwise
+        self.on_quit = on_quit
+
+        size = GRID * cell
+        self.map_rect = pygame.Rect(0, 0, size, size)
+        self.polar_rect = pygame.Rect(size, 0, size, size)
+        pygame.display.init()
+        pygame.display.set_caption(caption)
+        self.screen = pygame.display.set_mode((size * 2, size))
+        self.screen.fill(BACKGROUND)
+
+        self.values = np.zeros((GRID, GRID), dtype=np.uint8)
+        # 按 surfarray 的 (x, y) 顺序存放，即 colors[列, 行]
+        self.colors = np.empty((GRID, GRID, 3), dtype=np.uint8)
+        self.colors[:] = RAINBOW[0]
+        self.small = pygame.Surface((GRID, GRID)).convert()
+        self.large = pygame.Surface((size, size)).convert()
+        self.screen.fill(tuple(int(c) for c in RAINBOW[0]), self.map_rect)
+        self._directions = None
+        self._bearing = None
+        self._pending = None
+        self._dirty = [self.screen.get_rect()]
+        self._last_draw = 0.0
+
+        self.frames = 0
+        self.cells_drawn = 0
+        self.skipped = 0
+        self.closed = False
+
+    # ---- sink ----
+
+    def on_detection(self, event):
+        if self._pending is not None:
+            self.skipped += 1
+        self._pending = event
+        if time.perf_counter() - self._last_draw >= self.interval:
+            self.draw()
+
+    def idle(self):
+        if self._pending is not None:
+            self.draw()
+        self.poll()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.pygame.display.quit()
+
+    # ---- 绘制 ----
+
+    def draw(self):
+        """把暂存的最新事件画到屏幕上"""
+        event = self._pending
+        self._pending = None
+        if event is None or self.closed:
+            return
+        audio_map = event.audio_map
+        if audio_map and len(audio_map) == GRID * GRID:
+            self.update_map(audio_map)
+        self.update_polar(event.directions, event.bearing)
+        self.present()
+        self.poll()
+
+    def update_map(self, audio_map):
+        """
+        原地更新颜色数组，把变化的格子拷到屏幕
+
+        Returns:
+            变化的格子数
+        """
+        values = np.frombuffer(audio_map, dtype=np.uint8).reshape(GRID, GRID)
+        changed = values != self.values
+        rows, cols = np.nonzero(changed)
+        count = len(rows)
+        if not count:
+            return 0
+        self.values[rows, cols] = values[rows, cols]
+        self.colors[cols, rows] = RAINBOW[values[rows, cols]]
+
+        pygame = self.pygame
+        cell = self.cell
+        pygame.surfarray.blit_array(self.small, self.colors)
+        if count > GRID * GRID // 2:
+            pygame.transform.scale(self.small, self.map_rect.size, self.large)
+            self.screen.blit(self.large, self.map_rect)
+            self._dirty.append(self.map_rect)
+        else:
+            # 只放大变化格子的外接矩形
+            top, bottom = int(rows.min()), int(rows.max()) + 1
+            left, right = int(cols.min()), int(cols.max()) + 1
+            box = pygame.Rect(left, top, right - left, bottom - top)
+            large = pygame.Rect(box.x * cell, box.y * cell, box.w * cell, box.h * cell)
+            pygame.transform.scale(self.small.subsurface(box), large.size,
+                                   self.large.subsurface(large))
+            # 每行变化格子的最小 / 最大列合成一个矩形
+            left = changed.argmax(axis=1)
+            right = GRID - changed[:, ::-1].argmax(axis=1)
+            blit = self.screen.blit
+            for row in np.flatnonzero(changed.any(axis=1)).tolist():
+                x = int(left[row]) * cell
+                rect = pygame.Rect(x, row * cell, int(right[row]) * cell - x, cell)
+                blit(self.large, rect, rect)
+                self._dirty.append(rect)
+        self.cells_drawn += count
+        return count
+
+    def update_polar(self, directions, bearing=None):
+        """方向强度或估计角度变化时重画极坐标面板"""
+        directions = tuple(directions or ())
+        if directions == self._directions and bearing == self._bearing:
+            return
+        self._directions = directions
+        self._bearing = bearing
+
+        pygame = self.pygame
+        rect = self.polar_rect
+        screen = self.screen
+        screen.fill(BACKGROUND, rect)
+        center = rect.center
+        radius = rect.width // 2 - 8
+        pygame.draw.circle(screen, RING, center, radius, 1)
+        pygame.draw.circle(screen, RING, center, radius // 2, 1)
+        if len(directions) == SECTORS:
+            top = max(directions) or 1
+            peak = directions.index(max(directions))
+            for index, value in enumerate(directions):
+                length = radius * value / top
+                color = PEAK if index == peak and value else SPOKE
+                pygame.draw.line(screen, color, center, self._point(index * 30.0, length),
+                                 3 if color is PEAK else 2)
+        if bearing is not None:
+            pygame.draw.line(screen, BEARING, center, self._point(bearing, radius), 2)
+        self._dirty.append(rect)
+
+    def _point(self, angle, length):
+        """方向角对应的屏幕坐标"""
+        theta = math.radians(angle)
+        if self.clockwise:
+            theta = -theta
+        theta += math.radians(self.rotation)
+        x, y = self.polar_rect.center
+        return (x + length * math.cos(theta), y + length * math.sin(theta))
+
+    def present(self):
+        """提交变化的区域"""
+        if self._dirty:
+            self.pygame.display.update(self._dirty)
+            self._dirty = []
+        self.frames += 1
+        self._last_draw = time.perf_counter()
+
+    def poll(self):
+        """处理窗口事件，关闭窗口或按 Esc / q 时调用 on_quit"""
+        if self.closed:
+            return
+        pygame = self.pygame
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (
+                    event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_q)):
+                if self.on_quit is not None:
+                    self.on_quit()
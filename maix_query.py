@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询已保存的检测事件
+
+对数据目录建立索引（首次运行时建立，之后只索引新增的记录），按时间、角度、
+强度查询，把匹配的热力图导出为 NPZ 或 CSV。
+
+用法: python maix_query.py [数据目录] [--start T] [--end T] [--date YYYY-MM-DD]
+                           [--angle 60:120] [--min-intensity N] [--max-intensity N]
+                           [--npz out.npz | --csv out.csv] [--limit N] [--no-update]
+
+时间可以是 Unix 时间戳、'2026-10-17 02:00' 或 '02:00'（日期取 --date，默认今天）。
+例: 今天 02:00~03:00 东侧（60~120度）强度不低于 10 的检测
+    python maix_query.py --start 02:00 --end 03:00 --angle 60:120 --min-intensity 10 --csv -
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from maix_audio.protocol import ANGLE_MAP
+from maix_audio.query import EventIndex, directions_between, parse_time, write_csv, write_npz
+
+
+def main():
+    ap = argparse.ArgumentParser(description='查询已保存的检测事件')
+    ap.add_argument('data_dir', nargs='?', default='maix_audio_data')
+    ap.add_argument('--start', help='起始时间（含）')
+    ap.add_argument('--end', help='结束时间（不含）')
+    ap.add_argument('--date', help='只给时刻时使用的日期，默认今天')
+    ap.add_argument('--angle', help='角度范围 低:高（度），可跨0度如 330:30')
+    ap.add_argument('--min-intensity', type=int)
+    ap.add_argument('--max-intensity', type=int)
+    ap.add_argument('--npz', help='把匹配的记录写成 NPZ')
+    ap.add_argument('--csv', help='把匹配的记录写成 CSV，- 表示标准输出')
+    ap.add_argument('--limit', type=int, help='最多导出多少条')
+    ap.add_argument('--no-update', action='store_true', help='不更新索引')
+    args = ap.parse_args()
+
+    # 导出到标准输出时提示信息写到 stderr
+    log = sys.stderr if args.csv == '-' else sys.stdout
+    start = parse_time(args.start, args.date) if args.start else None
+    end = parse_time(args.end, args.date) if args.end else None
+    directions = None
+    if args.angle:
+        low, high = (float(v) for v in args.angle.split(':'))
+        directions = directions_between(low, high)
+
+    index = EventIndex(args.data_dir)
+    if not args.no_update:
+        t = time.perf_counter()
+        added = index.update()
+        print(f"🗂️ 索引: {index.count} 条（新增 {added}，{time.perf_counter() - t:.2f}s）", file=log)
+
+    t = time.perf_counter()
+    rows = index.query(start, end, directions, args.min_intensity, args.max_intensity)
+    elapsed = time.perf_counter() - t
+    print(f"🔍 匹配: {len(rows)} 条（查询 {elapsed * 1000:.1f}ms）", file=log)
+    if args.limit is not None:
+        rows = rows[:args.limit]
+
+    if args.npz:
+        count = write_npz(args.npz, index.read(rows))
+        print(f"💾 已写入 {args.npz}: {count} 条", file=log)
+    elif args.csv:
+        if args.csv == '-':
+            count = write_csv(sys.stdout, index.read(rows))
+        else:
+            with open(args.csv, 'w', newline='') as f:
+                count = write_csv(f, index.read(rows))
+            print(f"💾 已写入 {args.csv}: {count} 条", file=log)
+    elif len(rows):
+        times = index.columns['time'][rows]
+        first = datetime.fromtimestamp(float(times[0]))
+        last = datetime.fromtimestamp(float(times[-1]))
+        print(f"   时间: {first:%Y-%m-%d %H:%M:%S} ~ {last:%Y-%m-%d %H:%M:%S}")
+        counts = np.bincount(index.columns['direction'][rows], minlength=12)[:12]
+        print("   方向分布: " + ' '.join(f"{angle}°:{count}"
+                                      for angle, count in zip(ANGLE_MAP, counts.tolist()) if count))
+        intensity = index.columns['intensity'][rows]
+        print(f"   强度: 最小 {intensity.min()} | 平均 {intensity.mean():.1f} | 最大 {intensity.max()}")
+
+
+if __name__ == "__main__":
+    main()
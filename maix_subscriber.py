@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订阅接收器发布的事件
+
+接收器以 --broker 启动后（raspberry_pi_receiver.py --broker），任意多个程序可以
+同时订阅，不需要打开串口。
+
+用法: python maix_subscriber.py [地址] [--topics detections,maps,tracks,logs] [--verbose]
+地址默认为 unix:/tmp/maix_audio.sock，TCP 如 127.0.0.1:9100
+"""
+
+import argparse
+
+from maix_audio import ConsoleSink, Subscriber
+from maix_audio.broker import DEFAULT_ADDRESS, TOPICS
+
+
+def main():
+    ap = argparse.ArgumentParser(description='订阅接收器发布的事件')
+    ap.add_argument('address', nargs='?', default=DEFAULT_ADDRESS)
+    ap.add_argument('--topics', default='detections,tracks,logs',
+                    help=f"逗号分隔，可选 {','.join(TOPICS)}，* 表示全部")
+    ap.add_argument('--verbose', action='store_true')
+    args = ap.parse_args()
+
+    topics = None if args.topics == '*' else args.topics.split(',')
+    subscriber = Subscriber(args.address, topics)
+    console = ConsoleSink(verbose=args.verbose)
+    try:
+        subscriber.connect()
+    except OSError as e:
+        print(f"❌ 无法连接到 {args.address}: {e}")
+        return
+    print(f"📡 已订阅 {args.address}: {args.topics}")
+    try:
+        for event in subscriber:
+            console.handle(event)
+        print("🔌 接收器已关闭")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+
+
+if __name__ == "__main__":
+    main()
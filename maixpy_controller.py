@@ -5,27 +5,36 @@
 自动上传代码、执行脚本并接收数据
 """
 
+import os
 import serial
 import time
-import json
-import binascii
 import threading
-from datetime import datetime
+
+from maix_audio import ConsoleSink, SerialReader, StreamParser
+from maix_audio.link import LinkNegotiator, parse_request
+from maix_audio.repl import RawRepl, ReplError, ReplPipeline
+
+# 设备端脚本，与本文件在同一仓库中
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'hardware', 'demo_mic_array.py')
 
 class MaixPyController:
-    def __init__(self, port='/dev/ttyUSB0', baudrate=115200):
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, negotiate=True):
         """
         初始化MaixPy控制器
 
         Args:
             port: 串口设备路径
             baudrate: 波特率
+            negotiate: 脚本启动时设备请求切换波特率，是否响应协商
         """
         self.port = port
         self.baudrate = baudrate
+        self.negotiate = negotiate
         self.ser = None
         self.connected = False
         self.receiving = False
+        self.reader = None
 
     def connect(self):
         """连接到MaixPy设备"""
@@ -50,6 +59,8 @@ class MaixPyController:
     def disconnect(self):
         """断开连接"""
         self.receiving = False
+        if self.reader:
+            self.reader.stop()
         if self.ser and self.ser.is_open:
             self.ser.close()
             self.connected = False
@@ -88,8 +99,8 @@ class MaixPyController:
                     line = self.ser.readline().decode('utf-8', errors='ignore').strip()
                     if line:
                         response_lines.append(line)
-                        # 如果看到提示符，表示命令执行完成
-                        if line.endswith('>>> ') or '>>> ' in line:
+                        # 如果看到提示符，表示命令执行完成（行已去掉末尾空格）
+                        if line.endswith('>>>') or '>>> ' in line:
                             break
                 time.sleep(0.01)
 
@@ -99,16 +110,109 @@ class MaixPyController:
             print(f"❌ 发送命令错误: {e}")
             return None
 
-    def upload_and_run_script(self, script_content, filename='/flash/current_script.py'):
+    def exec_pipeline(self, commands, timeout=5):
+        """
+        通过原始 REPL 流水线执行多条命令，每条命令的标准输出和错误输出分开返回
+
+        与 send_command 不同，命令连续发送而不等待每条的往返，执行后回到普通 REPL
+
+        Args:
+            commands: Python 代码字符串列表
+            timeout: 单条命令的超时时间
+
+        Returns:
+            ExecResult 列表，失败时返回 None
+        """
+        if not self.connected:
+            print("❌ 设备未连接")
+            return None
+
+        pipeline = ReplPipeline(self.ser, timeout=timeout)
+        try:
+            pipeline.start()
+            return pipeline.map(commands)
+        except ReplError as e:
+            print(f"❌ 执行命令错误: {e}")
+            return None
+        finally:
+            pipeline.close()
+
+    def device_status(self):
+        """
+        查询设备状态（内存和 /flash 文件列表）
+
+        Returns:
+            {"mem_free", "mem_alloc", "files"}，失败时返回 None
+        """
+        results = self.exec_pipeline([
+            "import gc, uos",
+            "print(gc.mem_free())",
+            "print(gc.mem_alloc())",
+            "print(' '.join(uos.listdir('/flash')))",
+        ])
+        if results is None:
+            return None
+        for result in results:
+            if not result.ok:
+                print(f"❌ 设备错误: {result.stderr.decode('utf-8', errors='replace').strip()}")
+                return None
+        return {
+            "mem_free": int(results[1].text),
+            "mem_alloc": int(results[2].text),
+            "files": results[3].text.split(),
+        }
+
+    def upload_and_run_script(self, script_content, filename='/flash/current_script.py',
+                              cache=True):
         """
         上传并运行Python脚本
 
+        通过原始 REPL 分块传输，设备端校验 sha256 后再运行。
+        cache 为 True 时先比较设备上已有文件的 sha256，相同则跳过上传，
+        不同则只传输变化的块
+
         Args:
             script_content: 脚本内容
             filename: 在设备上保存的文件名
+            cache: 是否按内容跳过未变化的文件
+
+        Returns:
+            是否上传成功
         """
         print(f"📤 正在上传脚本到 {filename}...")
 
+        repl = RawRepl(self.ser)
+        data = script_content.encode('utf-8')
+        try:
+            result = repl.sync(filename, data) if cache else repl.upload(filename, data)
+            repl.exit()
+        except ReplError as e:
+            print(f"❌ 上传失败: {e}")
+            return False
+        finally:
+            repl.close()
+        if result.cached:
+            print(f"✓ 设备上的脚本未变化，跳过上传 ({result.elapsed:.2f}秒, "
+                  f"sha256 {result.digest[:12]})")
+        else:
+            print(f"✓ 脚本上传完成: {result.size}字节, 传输{result.sent}字节, "
+                  f"{result.elapsed:.2f}秒, sha256 {result.digest[:12]}")
+
+        # 运行脚本
+        print("🚀 正在运行脚本...")
+        self.send_command(f"exec(open('{filename}').read())", wait_for_response=False)
+        return True
+
+    def upload_script_by_lines(self, script_content, filename='/flash/current_script.py'):
+        """
+        逐行上传脚本（旧方式，每行一条 f.write 命令，仅用于对比测试）
+
+        Args:
+            script_content: 脚本内容
+            filename: 在设备上保存的文件名
+        """
+        print(f"📤 正在逐行上传脚本到 {filename}...")
+
         # 停止当前运行的程序
         self.send_command('\x03', wait_for_response=False)  # Ctrl+C
         time.sleep(0.5)
@@ -130,134 +234,50 @@ class MaixPyController:
         self.send_command("f.close()")
         print("✓ 脚本上传完成")
 
-        # 运行脚本
-        print("🚀 正在运行脚本...")
-        self.send_command(f"exec(open('{filename}').read())", wait_for_response=False)
-        time.sleep(1)
-
     def start_audio_monitoring(self):
         """开始音频监控"""
         self.receiving = True
+        parser = StreamParser()
+        self.reader = SerialReader(self.ser, parser)
+        console = ConsoleSink()
+        link = LinkNegotiator(self.ser) if self.negotiate else None
 
         def monitor_thread():
             print("👂 开始监听音频数据...")
-            while self.receiving:
-                try:
-                    if self.ser.in_waiting > 0:
-                        line = self.ser.readline().decode('utf-8', errors='ignore').strip()
-
-                        if line.startswith('AUDIO_PACKET:'):
-                            self.process_audio_packet(line[13:])
-                        elif line.startswith('RAW_AUDIO:'):
-                            self.process_raw_audio(line[10:])
-                        elif line and not line.startswith(('AUDIO_', 'RAW_', '>>>')):
-                            print(f"[设备] {line}")
-
-                    time.sleep(0.001)
-
-                except Exception as e:
-                    if self.receiving:
-                        print(f"❌ 监听错误: {e}")
-                    break
+            try:
+                for event in self.reader:
+                    console.handle(event)
+                    rate = parse_request(event) if link else None
+                    if rate:
+                        if link.handshake(rate, self.reader) == rate:
+                            print(f"🔗 波特率已切换到 {rate}")
+                        else:
+                            print(f"⚠️ 波特率协商失败（{link.last_error}），使用 {link.baudrate}")
+                        self.baudrate = link.baudrate
+                        for extra in parser.feed(link.take_leftover()):
+                            console.handle(extra)
+
+            except Exception as e:
+                if self.receiving:
+                    print(f"❌ 监听错误: {e}")
 
         # 启动监听线程
         self.monitor_thread = threading.Thread(target=monitor_thread, daemon=True)
         self.monitor_thread.start()
 
-    def process_audio_packet(self, packet_data):
-        """处理音频定位数据包"""
-        try:
-            data = json.loads(packet_data)
-            timestamp = data.get('timestamp', time.time())
-            dt = datetime.fromtimestamp(timestamp)
-
-            print(f"\n🔊 [{dt.strftime('%H:%M:%S')}] 检测到声音!")
-            print(f"   角度: {data.get('angle', 0)}°")
-            print(f"   强度: {data.get('intensity', 0)}")
-            print(f"   方向: {data.get('direction', 0)}")
-
-        except Exception as e:
-            print(f"❌ 解析音频数据包错误: {e}")
-
-    def process_raw_audio(self, hex_data):
-        """处理原始音频数据"""
-        try:
-            audio_bytes = binascii.unhexlify(hex_data)
-            print(f"   📊 原始音频: {len(audio_bytes)}字节")
-        except Exception as e:
-            print(f"❌ 解析原始音频数据错误: {e}")
-
     def stop_script(self):
         """停止当前运行的脚本"""
         print("⏹️ 停止脚本...")
         self.send_command('\x03', wait_for_response=False)  # Ctrl+C
         time.sleep(0.5)
         self.receiving = False
+        if self.reader:
+            self.reader.stop()
 
-def load_mic_array_script():
-    """加载麦克风阵列脚本内容"""
-    script_path = '/Users/yushuangyang/workspace/MaixPy-v1_scripts/hardware/demo_mic_array.py'
-    try:
-        with open(script_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        # 如果文件不存在，返回基础脚本
-        return '''
-from Maix import MIC_ARRAY as mic
-import lcd
-import time
-import json
-import binascii
-
-ANGLE_MAP = [0, 30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330]
-SOUND_THRESHOLD = 5
-SEND_RAW_AUDIO = True
-
-print("麦克风阵列初始化中...")
-lcd.init()
-mic.init()
-
-print("开始声音检测和定位...")
-print("声音强度阈值:", SOUND_THRESHOLD)
-print("等待声音输入...")
-
-while True:
-    imga = mic.get_map()
-    b = mic.get_dir(imga)
-    a = mic.set_led(b,(0,0,255))
-    imgb = imga.resize(160,160)
-    imgc = imgb.to_rainbow(1)
-    a = lcd.display(imgc)
-
-    if b:
-        direction_intensities = list(b)
-        max_intensity = max(direction_intensities)
-        max_direction = direction_intensities.index(max_intensity)
-        max_angle = ANGLE_MAP[max_direction]
-
-        if max_intensity > SOUND_THRESHOLD:
-            timestamp = time.time()
-            print("检测到声音! 角度: %d度 | 强度: %d | 方向: %d" % (max_angle, max_intensity, max_direction))
-
-            data_packet = {
-                "type": "audio_detection",
-                "timestamp": timestamp,
-                "angle": max_angle,
-                "intensity": max_intensity,
-                "direction": max_direction,
-                "all_directions": direction_intensities,
-                "audio_map": list(imga.data) if SEND_RAW_AUDIO else None
-            }
-
-            json_str = json.dumps(data_packet)
-            print("AUDIO_PACKET:" + json_str)
-
-            if SEND_RAW_AUDIO and imga.data:
-                audio_hex = binascii.hexlify(imga.data).decode('ascii')
-                print("RAW_AUDIO:" + audio_hex)
-
-    time.sleep(0.01)
-'''
+def load_mic_array_script(path=SCRIPT_PATH):
+    """加载麦克风阵列脚本内容（仓库中的 hardware/demo_mic_array.py）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
 
 def main():
     """主函数"""
@@ -274,7 +294,8 @@ def main():
 
         # 加载并上传脚本
         script_content = load_mic_array_script()
-        controller.upload_and_run_script(script_content)
+        if not controller.upload_and_run_script(script_content):
+            return
 
         # 开始音频监控
         controller.start_audio_monitoring()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多设备音频数据采集器
+一个进程同时接收多个MaixPy麦克风阵列，按时间合并输出
+
+用法: python multi_device_collector.py mic1=/dev/ttyUSB0 mic2=/dev/ttyUSB1 [--binary]
+                                       [--arrays=arrays.json]
+
+--arrays 指定各阵列的位置和朝向时，多个阵列同时检测到的声音会被定位:
+    {"mic1": [0, 0, 0], "mic2": [4, 0, 90]}    # 设备标识: [x, y, 方向0的角度]
+"""
+
+import asyncio
+import json
+import sys
+
+from maix_audio import ConsoleSink, MultiDeviceCollector
+
+def parse_ports(args):
+    """解析 设备标识=串口路径 参数，省略标识时按顺序编号"""
+    ports = {}
+    for index, arg in enumerate(args):
+        if '=' in arg:
+            device, port = arg.split('=', 1)
+        else:
+            device, port = f"mic{index + 1}", arg
+        ports[device] = port
+    return ports
+
+def main():
+    """主函数"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    binary = '--binary' in sys.argv
+    ports = parse_ports(args) or {"mic1": '/dev/ttyUSB0'}
+    arrays = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--arrays='):
+            with open(arg[len('--arrays='):]) as f:
+                arrays = json.load(f)
+
+    print("🎯 MaixPy多设备音频采集器")
+    for device, port in ports.items():
+        print(f"   {device}: {port}")
+    print(f"协议: {'二进制帧' if binary else '文本'}")
+    print("按 Ctrl+C 停止")
+    print("=" * 50)
+
+    console = ConsoleSink(verbose=True)
+    sinks = [console]
+    if arrays:
+        # 采集器与每个设备同步时钟，按换算后的 timestamp（主机时间）对齐
+        from maix_audio.triangulation import TriangulationSink
+        sinks.append(TriangulationSink(arrays, sinks=[console]))
+        print(f"定位: {len(arrays)} 个阵列")
+    collector = MultiDeviceCollector(ports, binary=binary, sinks=sinks)
+    try:
+        asyncio.run(collector.run(report_interval=10))
+    except KeyboardInterrupt:
+        print("\n\n⏹️ 采集停止")
+
+if __name__ == "__main__":
+    main()
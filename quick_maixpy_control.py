@@ -6,9 +6,13 @@
 
 import serial
 import time
-import json
-import binascii
-from datetime import datetime
+
+from maix_audio import ConsoleSink, SerialReader, StreamParser
+from maix_audio.link import LinkNegotiator, parse_request
+from maix_audio.repl import RawRepl
+from maixpy_controller import load_mic_array_script
+
+SCRIPT_FILE = '/flash/current_script.py'
 
 def connect_and_run():
     """连接设备并运行音频检测"""
@@ -32,78 +36,31 @@ def connect_and_run():
 
         print("📤 正在上传音频检测脚本...")
 
-        # 停止当前程序
-        ser.write(b'\x03')  # Ctrl+C
-        time.sleep(0.5)
-
-        # 简化的音频检测脚本
-        script_lines = [
-            "from Maix import MIC_ARRAY as mic",
-            "import lcd, time, json, binascii",
-            "",
-            "ANGLE_MAP = [0, 30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330]",
-            "SOUND_THRESHOLD = 5",
-            "",
-            "print('初始化麦克风阵列...')",
-            "lcd.init()",
-            "mic.init()",
-            "print('开始声音检测...')",
-            "",
-            "while True:",
-            "    imga = mic.get_map()",
-            "    b = mic.get_dir(imga)",
-            "    mic.set_led(b,(0,0,255))",
-            "    lcd.display(imga.resize(160,160).to_rainbow(1))",
-            "    ",
-            "    if b:",
-            "        intensities = list(b)",
-            "        max_intensity = max(intensities)",
-            "        if max_intensity > SOUND_THRESHOLD:",
-            "            max_dir = intensities.index(max_intensity)",
-            "            angle = ANGLE_MAP[max_dir]",
-            "            data = {'angle': angle, 'intensity': max_intensity, 'direction': max_dir, 'all_directions': intensities}",
-            "            print('AUDIO_PACKET:' + json.dumps(data))",
-            "            if imga.data:",
-            "                print('RAW_AUDIO:' + binascii.hexlify(imga.data).decode('ascii'))",
-            "    time.sleep(0.01)"
-        ]
-
-        # 逐行发送代码
-        for line in script_lines:
-            cmd = line + '\r\n'
-            ser.write(cmd.encode())
-            time.sleep(0.05)  # 等待设备处理
+        # 上传仓库中的设备脚本（内容未变时跳过传输）并运行
+        repl = RawRepl(ser)
+        result = repl.sync(SCRIPT_FILE, load_mic_array_script().encode('utf-8'))
+        repl.exit()
+        print(f"✓ 脚本已就绪: {result.size}字节, 传输{result.sent}字节")
+        ser.write(f"exec(open('{SCRIPT_FILE}').read())\r\n".encode())
 
         print("🚀 脚本已启动，开始监听音频数据...")
         print("=" * 50)
 
-        # 监听数据
-        while True:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8', errors='ignore').strip()
-
-                if line.startswith('AUDIO_PACKET:'):
-                    try:
-                        data = json.loads(line[13:])
-                        dt = datetime.now()
-                        print(f"\n🔊 [{dt.strftime('%H:%M:%S')}] 检测到声音!")
-                        print(f"   角度: {data.get('angle', 0)}°")
-                        print(f"   强度: {data.get('intensity', 0)}")
-                        print(f"   方向: {data.get('direction', 0)}")
-                    except:
-                        pass
-
-                elif line.startswith('RAW_AUDIO:'):
-                    try:
-                        audio_data = binascii.unhexlify(line[10:])
-                        print(f"   📊 原始音频: {len(audio_data)}字节")
-                    except:
-                        pass
-
-                elif line and not line.startswith(('>>>', 'AUDIO_', 'RAW_')):
-                    print(f"[设备] {line}")
-
-            time.sleep(0.001)
+        # 监听数据，设备请求切换波特率时完成协商
+        console = ConsoleSink()
+        parser = StreamParser()
+        reader = SerialReader(ser, parser)
+        link = LinkNegotiator(ser)
+        for event in reader:
+            console.handle(event)
+            rate = parse_request(event)
+            if rate:
+                if link.handshake(rate, reader) == rate:
+                    print(f"🔗 波特率已切换到 {rate}")
+                else:
+                    print(f"⚠️ 波特率协商失败（{link.last_error}），使用 {link.baudrate}")
+                for extra in parser.feed(link.take_leftover()):
+                    console.handle(extra)
 
     except KeyboardInterrupt:
         print("\n\n⏹️ 停止监听")
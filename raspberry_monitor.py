@@ -5,49 +5,32 @@
 假设MaixPy设备已运行音频检测脚本
 """
 
-import serial
 import time
-import json
-import binascii
-from datetime import datetime
 
-class MaixPyMonitor:
-    def __init__(self, port='/dev/ttyUSB0', baudrate=115200):
+from maix_audio import ConsoleSink, Receiver
+
+class MaixPyMonitor(Receiver):
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, binary=False):
         """
         初始化监控器
 
         Args:
             port: 串口设备路径
             baudrate: 波特率
+            binary: 是否接收二进制帧（设备端需设置 BINARY_PROTOCOL = True）
         """
-        self.port = port
-        self.baudrate = baudrate
-        self.ser = None
-        self.connected = False
+        super().__init__(port, baudrate, binary=binary, sinks=[ConsoleSink(verbose=True)])
 
     def connect(self):
-        """连接到MaixPy设备"""
-        try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(1)  # 等待连接稳定
-            self.connected = True
-            print(f"✅ 已连接到MaixPy设备: {self.port}")
-            return True
-
-        except Exception as e:
-            print(f"❌ 连接失败: {e}")
+        """连接到MaixPy设备（波特率协商和时钟同步由 Receiver.connect 设置）"""
+        if not super().connect():
             print("请检查:")
             print("1. 设备是否已连接")
             print("2. 串口路径是否正确")
             print("3. 权限设置: sudo usermod -a -G dialout $USER")
             return False
-
-    def disconnect(self):
-        """断开连接"""
-        if self.ser and self.ser.is_open:
-            self.ser.close()
-            self.connected = False
-            print("🔌 设备连接已断开")
+        time.sleep(1)  # 等待连接稳定
+        return True
 
     def send_simple_command(self, command):
         """发送简单命令（如停止脚本）"""
@@ -58,47 +41,6 @@ class MaixPyMonitor:
             except Exception as e:
                 print(f"❌ 发送命令失败: {e}")
 
-    def process_audio_packet(self, packet_data):
-        """处理音频定位数据包"""
-        try:
-            data = json.loads(packet_data)
-            timestamp = data.get('timestamp', time.time())
-            dt = datetime.fromtimestamp(timestamp)
-
-            print(f"\n🔊 [{dt.strftime('%H:%M:%S')}] 检测到声音!")
-            print(f"   角度: {data.get('angle', 0)}°")
-            print(f"   强度: {data.get('intensity', 0)}")
-            print(f"   方向: {data.get('direction', 0)}")
-
-            # 可选：显示所有方向的详细数据
-            all_dirs = data.get('all_directions', [])
-            if all_dirs:
-                print(f"   详细强度: {all_dirs}")
-
-            return data
-
-        except Exception as e:
-            print(f"❌ 解析音频数据包错误: {e}")
-            return None
-
-    def process_raw_audio(self, hex_data):
-        """处理原始音频数据"""
-        try:
-            audio_bytes = binascii.unhexlify(hex_data)
-            print(f"   📊 原始音频: {len(audio_bytes)}字节")
-
-            # 可选：显示音频数据统计
-            if len(audio_bytes) == 256:  # 16x16热力图
-                import numpy as np
-                audio_array = np.frombuffer(audio_bytes, dtype=np.uint8)
-                print(f"   音频统计 - 最小: {audio_array.min()}, 最大: {audio_array.max()}, 平均: {audio_array.mean():.1f}")
-
-            return audio_bytes
-
-        except Exception as e:
-            print(f"❌ 解析原始音频数据错误: {e}")
-            return None
-
     def monitor(self):
         """开始监控数据"""
         if not self.connected:
@@ -110,26 +52,7 @@ class MaixPyMonitor:
         print("=" * 50)
 
         try:
-            while True:
-                if self.ser.in_waiting > 0:
-                    line = self.ser.readline().decode('utf-8', errors='ignore').strip()
-
-                    if line.startswith('AUDIO_PACKET:'):
-                        # 处理音频定位数据
-                        packet_data = line[13:]
-                        self.process_audio_packet(packet_data)
-
-                    elif line.startswith('RAW_AUDIO:'):
-                        # 处理原始音频数据
-                        hex_data = line[10:]
-                        self.process_raw_audio(hex_data)
-
-                    elif line and not line.startswith(('AUDIO_', 'RAW_', '>>>')):
-                        # 显示设备其他输出
-                        if line.strip():
-                            print(f"[设备] {line}")
-
-                time.sleep(0.001)  # 短暂延时
+            self.receive()
 
         except KeyboardInterrupt:
             print("\n\n⏹️ 停止监听")
@@ -137,6 +60,10 @@ class MaixPyMonitor:
         except Exception as e:
             print(f"❌ 监听错误: {e}")
 
+        finally:
+            # 打印丢失 / 延迟 / 时钟同步的汇总
+            self.close_sinks()
+
     def stop_device_script(self):
         """发送停止信号到设备"""
         print("📤 发送停止信号到设备...")
@@ -152,15 +79,18 @@ def main():
 
     # 检查串口设备参数
     port = '/dev/ttyUSB0'
-    if len(sys.argv) > 1:
-        port = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if args:
+        port = args[0]
+    binary = '--binary' in sys.argv
 
     print(f"串口设备: {port}")
     print("波特率: 115200")
+    print(f"协议: {'二进制帧' if binary else '文本'}")
     print()
 
     # 创建监控器
-    monitor = MaixPyMonitor(port=port)
+    monitor = MaixPyMonitor(port=port, binary=binary)
 
     try:
         # 连接设备
@@ -185,4 +115,4 @@ def main():
         monitor.disconnect()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -5,168 +5,74 @@
 接收MaixPy设备传输的声音定位和原始音频数据
 """
 
-import serial
-import json
-import binascii
-import time
-import numpy as np
-from datetime import datetime
-import os
-
-class MaixAudioReceiver:
-    def __init__(self, port='/dev/ttyUSB0', baudrate=115200):
+from maix_audio import Broker, ConsoleSink, Receiver, StoreSink
+from maix_audio.broker import DEFAULT_ADDRESS
+from maix_audio.pipeline import Pipeline, ThreadedStage
+
+class MaixAudioReceiver(Receiver):
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, binary=False, save_audio=True,
+                 archive_dir=None, estimate=False, track=False, negotiate=True,
+                 stats_interval=None, clock_sync=True, broker=None, metrics=None,
+                 view=False, map_stats=False):
         """
         初始化音频接收器
 
         Args:
             port: 串口设备路径
             baudrate: 波特率
+            binary: 是否接收二进制帧（设备端需设置 BINARY_PROTOCOL = True）
+            save_audio: 是否保存音频数据（追加写入 data_dir 下的段文件，
+                        用 SegmentStore(data_dir).iter_records() 读取）
+            archive_dir: 热力图归档根目录（按天分目录，供 numpy 分析），None 表示不归档
+            estimate: 是否在主机端估计连续角度（需要 numpy）
+            track: 是否跟踪声源并打印平滑后的轨迹（需要 numpy）
+            negotiate: 设备脚本启动时请求切换波特率，是否响应协商
+            stats_interval: 定期打印丢失和延迟统计的间隔（秒），None 表示只在退出时打印
+            clock_sync: 是否与设备同步时钟，检测事件的时间戳换成主机时间
+            broker: 事件发布地址（如 unix:/tmp/maix_audio.sock），其他程序用
+                    maix_subscriber.py 订阅；None 表示不发布
+            metrics: 指标端点地址（如 127.0.0.1:9108），提供 Prometheus 格式的 /metrics
+                     和剖析接收线程的 /profile?seconds=N；None 表示不开启
+            view: 是否打开热力图实时窗口（需要 numpy 和 pygame），关闭窗口即停止接收
+            map_stats: 是否攒批计算热力图统计（背景、峰值、方向能量，需要 numpy），
+                       打印时显示
+
+        处理按流水线组织（见 maix_audio/pipeline.py）：热力图统计 -> 估计角度 -> 打印 -> 跟踪
+        -> 发布 -> 显示在接收线程中执行，写段文件和归档在工作线程中执行，不阻塞串口读取；
+        退出时打印各阶段耗时。
         """
-        self.port = port
-        self.baudrate = baudrate
-        self.ser = None
-        self.audio_data_buffer = []
-        self.save_audio = True  # 是否保存音频数据
-
-        # 创建数据保存目录
+        self.save_audio = save_audio
         self.data_dir = "maix_audio_data"
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-
-    def connect(self):
-        """连接串口设备"""
-        try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            print(f"已连接到设备: {self.port}")
-            return True
-        except Exception as e:
-            print(f"连接失败: {e}")
-            return False
-
-    def disconnect(self):
-        """断开连接"""
-        if self.ser and self.ser.is_open:
-            self.ser.close()
-            print("设备连接已断开")
-
-    def save_audio_data(self, timestamp, audio_data, metadata):
-        """保存音频数据到文件"""
-        if not self.save_audio:
-            return
-
-        # 创建文件名
-        dt = datetime.fromtimestamp(timestamp)
-        filename = f"audio_{dt.strftime('%Y%m%d_%H%M%S_%f')}"
-
-        # 保存原始音频数据（二进制）
-        audio_file = os.path.join(self.data_dir, f"{filename}.raw")
-        with open(audio_file, 'wb') as f:
-            f.write(audio_data)
-
-        # 保存元数据（JSON）
-        meta_file = os.path.join(self.data_dir, f"{filename}.json")
-        with open(meta_file, 'w') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
-
-        print(f"音频数据已保存: {filename}")
-
-    def process_audio_packet(self, packet_data):
-        """处理音频定位数据包"""
-        try:
-            data = json.loads(packet_data)
-
-            timestamp = data.get('timestamp', time.time())
-            angle = data.get('angle', 0)
-            intensity = data.get('intensity', 0)
-            direction = data.get('direction', 0)
-            all_directions = data.get('all_directions', [])
-
-            # 打印声音定位信息
-            dt = datetime.fromtimestamp(timestamp)
-            print(f"\n[{dt.strftime('%H:%M:%S.%f')[:-3]}] 声音检测")
-            print(f"  角度: {angle}度")
-            print(f"  强度: {intensity}")
-            print(f"  方向: {direction}")
-            print(f"  所有方向强度: {all_directions}")
-
-            # 返回数据用于后续处理
-            return data
-
-        except Exception as e:
-            print(f"解析音频数据包错误: {e}")
-            return None
-
-    def process_raw_audio(self, hex_data):
-        """处理原始音频数据"""
-        try:
-            # 将十六进制字符串转换为字节
-            audio_bytes = binascii.unhexlify(hex_data)
 
-            # 转换为numpy数组（16x16 = 256字节）
-            if len(audio_bytes) == 256:
-                audio_array = np.frombuffer(audio_bytes, dtype=np.uint8).reshape(16, 16)
-                print(f"  原始音频数据: {len(audio_bytes)}字节 (16x16热力图)")
-
-                # 显示音频强度统计
-                print(f"  音频强度 - 最小: {audio_array.min()}, 最大: {audio_array.max()}, 平均: {audio_array.mean():.1f}")
-
-                return audio_bytes
-            else:
-                print(f"  警告: 音频数据长度异常 ({len(audio_bytes)}字节)")
-                return audio_bytes
-
-        except Exception as e:
-            print(f"解析原始音频数据错误: {e}")
-            return None
-
-    def run(self):
-        """主运行循环"""
-        if not self.connect():
-            return
-
-        print("开始接收音频数据...")
-        print("按 Ctrl+C 停止接收")
-        print("=" * 50)
-
-        current_packet_data = None
-
-        try:
-            while True:
-                if self.ser.in_waiting > 0:
-                    line = self.ser.readline().decode('utf-8', errors='ignore').strip()
-
-                    if line.startswith('AUDIO_PACKET:'):
-                        # 处理音频定位数据包
-                        packet_json = line[13:]  # 移除前缀
-                        current_packet_data = self.process_audio_packet(packet_json)
-
-                    elif line.startswith('RAW_AUDIO:'):
-                        # 处理原始音频数据
-                        hex_data = line[10:]  # 移除前缀
-                        audio_data = self.process_raw_audio(hex_data)
-
-                        # 如果有配对的数据包，保存完整数据
-                        if current_packet_data and audio_data and self.save_audio:
-                            self.save_audio_data(
-                                current_packet_data['timestamp'],
-                                audio_data,
-                                current_packet_data
-                            )
-                        current_packet_data = None  # 重置
-
-                    elif line and not line.startswith('AUDIO_') and not line.startswith('RAW_'):
-                        # 显示其他日志信息
-                        if line.strip():
-                            print(f"[设备] {line}")
-
-                time.sleep(0.001)  # 短暂延时
-
-        except KeyboardInterrupt:
-            print("\n\n接收停止")
-        except Exception as e:
-            print(f"接收错误: {e}")
-        finally:
-            self.disconnect()
+        console = ConsoleSink(verbose=True, show_prompts=True)
+        stages = [console]
+        if estimate:
+            # 放在最前面，后面的阶段都能看到 event.bearing
+            from maix_audio.direction import DirectionEstimator
+            stages.insert(0, DirectionEstimator())
+        if map_stats:
+            # 每批最多16张图，最多等待50ms
+            from maix_audio.mapstats import MapStatsStage
+            stages.insert(0, MapStatsStage(size=16, max_wait=0.05))
+        if track:
+            from maix_audio.tracker import TrackerSink
+            stages.append(TrackerSink(sinks=[console]))
+        if broker:
+            stages.append(Broker(broker))
+        if view:
+            from maix_audio.viewer import HeatmapViewer
+            stages.append(HeatmapViewer(on_quit=self.stop))
+        # 写盘放在最后，在工作线程中执行
+        if save_audio:
+            stages.append(ThreadedStage(StoreSink(self.data_dir)))
+        if archive_dir:
+            from maix_audio.archive import ArchiveSink
+            stages.append(ThreadedStage(ArchiveSink(archive_dir)))
+        self.pipeline = Pipeline(stages)
+        sinks = [self.pipeline]
+        super().__init__(port, baudrate, binary=binary, sinks=sinks, negotiate=negotiate,
+                         stats_interval=stats_interval, clock_sync=clock_sync,
+                         metrics=metrics)
 
 def main():
     """主函数"""
@@ -174,15 +80,43 @@ def main():
 
     # 检查串口设备
     port = '/dev/ttyUSB0'  # 默认设备
-    if len(sys.argv) > 1:
-        port = sys.argv[1]
-
-    print(f"MaixPy音频数据接收器")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if args:
+        port = args[0]
+    binary = '--binary' in sys.argv
+    archive_dir = 'maix_archive' if '--archive' in sys.argv else None
+    estimate = '--estimate' in sys.argv
+    track = '--track' in sys.argv
+    negotiate = '--no-negotiate' not in sys.argv
+    stats_interval = 10 if '--stats' in sys.argv else None
+    clock_sync = '--no-clock-sync' not in sys.argv
+    view = '--view' in sys.argv
+    map_stats = '--map-stats' in sys.argv
+    broker = None
+    metrics = None
+    for arg in sys.argv[1:]:
+        if arg == '--broker':
+            broker = DEFAULT_ADDRESS
+        elif arg.startswith('--broker='):
+            broker = arg[len('--broker='):]
+        elif arg == '--metrics':
+            metrics = '127.0.0.1:9108'
+        elif arg.startswith('--metrics='):
+            metrics = arg[len('--metrics='):]
+
+    print("MaixPy音频数据接收器")
     print(f"串口设备: {port}")
-    print(f"波特率: 115200")
-
-    receiver = MaixAudioReceiver(port=port)
+    print(f"波特率: 115200{'（设备请求时协商更高波特率）' if negotiate else ''}")
+    print(f"协议: {'二进制帧' if binary else '文本'}")
+    if broker:
+        print(f"事件发布: {broker}")
+
+    receiver = MaixAudioReceiver(port=port, binary=binary, archive_dir=archive_dir,
+                                 estimate=estimate, track=track, negotiate=negotiate,
+                                 stats_interval=stats_interval, clock_sync=clock_sync,
+                                 broker=broker, metrics=metrics, view=view,
+                                 map_stats=map_stats)
     receiver.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
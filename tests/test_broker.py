@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""事件分发（broker.py）：按主题订阅，慢订阅方的有界发送队列"""
+
+import threading
+import time
+
+from maix_audio import Broker, DetectionEvent, LogEvent, Subscriber, TrackUpdate
+
+
+def detection(seq):
+    return DetectionEvent(seq * 0.01, seq * 0.01, 90, 300, 3, list(range(12)), seq=seq,
+                          tick=seq * 10, audio_map=bytes(range(256)), device='mic1')
+
+
+def wait_subscribed(broker, count):
+    """等待 count 个订阅方发来订阅行"""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        clients = broker.snapshot()['clients']
+        if len(clients) == count and all(c['topics'] for c in clients):
+            return
+        time.sleep(0.01)
+    raise AssertionError("订阅方没有连接")
+
+
+def read_all(subscriber, count, timeout=5):
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < count and time.monotonic() < deadline:
+        events += subscriber.read(0.1) or []
+    return events
+
+
+def test_topics_round_trip(tmp_path):
+    address = f"unix:{tmp_path / 'broker.sock'}"
+    broker = Broker(address)
+    tracks = Subscriber(address, ('tracks', 'logs')).connect()
+    maps = Subscriber(address, ('maps',)).connect()
+    try:
+        wait_subscribed(broker, 2)
+        broker.handle(detection(1))
+        broker.handle(TrackUpdate(0.5, 3, 45.0, 1.0, 0.9, 12, device='mic1'))
+        broker.handle(LogEvent(0.6, b'hello', 'mic1'))
+        first, second = read_all(tracks, 2)
+        assert (first.track_id, first.angle, first.device) == (3, 45.0, 'mic1')
+        assert second.line == b'hello'
+        (event,) = read_all(maps, 1)
+        assert (event.seq, event.tick, event.device) == (1, 10, 'mic1')
+        assert event.audio_map == bytes(range(256))
+        # 没有订阅的主题不发送
+        assert tracks.read(0.1) == [] and maps.read(0.1) == []
+    finally:
+        tracks.close()
+        maps.close()
+        broker.close()
+
+
+def test_slow_subscriber_drops_oldest(tmp_path):
+    address = f"unix:{tmp_path / 'broker.sock'}"
+    broker = Broker(address, max_queue=16 * 1024)
+    slow = Subscriber(address, ('maps',)).connect()
+    fast = Subscriber(address, ('detections',)).connect()
+    received = []
+    stop = threading.Event()
+
+    def consume():
+        while not stop.is_set():
+            received.extend(fast.read(0.05) or [])
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    try:
+        wait_subscribed(broker, 2)
+        start = time.perf_counter()
+        # 慢订阅方一直不读，套接字缓冲填满后消息留在队列里
+        for batch in range(50):
+            for seq in range(batch * 100, batch * 100 + 100):
+                broker.handle(detection(seq))
+            time.sleep(0.005)
+        # 发布方从不等待订阅方
+        assert time.perf_counter() - start < 2.0
+        deadline = time.monotonic() + 5
+        while len(received) < 5000 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [e.seq for e in received] == list(range(5000))
+
+        clients = {c['topics'][0]: c for c in broker.snapshot()['clients']}
+        assert clients['detections']['dropped'] == 0
+        assert clients['maps']['dropped'] > 0
+        assert clients['maps']['queued'] <= 16 * 1024
+
+        # 慢订阅方收到的序列号递增，丢的是最旧的消息，最新的一条一定收到
+        seqs = [e.seq for e in read_all(slow, 5000 - clients['maps']['dropped'])]
+        assert seqs == sorted(seqs) and seqs[-1] == 4999
+        assert len(seqs) + clients['maps']['dropped'] == 5000
+    finally:
+        stop.set()
+        thread.join()
+        slow.close()
+        fast.close()
+        broker.close()
+    assert broker.snapshot()['clients'] == []
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""时钟同步（clocksync.py）"""
+
+import asyncio
+import random
+import threading
+import time
+
+from maix_audio import (ClockSync, DetectionEvent, LogEvent, MultiDeviceCollector, Receiver,
+                        Sink)
+from maix_audio.clocksync import unwrap_tick
+from maix_audio.simulator import VirtualDevice
+
+
+class DriftingDevice:
+    """
+    按 VirtualDevice 的约定模拟设备时钟：tick = (主机时间 - epoch) * (1 + drift) 毫秒，
+    32位回绕；请求在接收缓冲里等到下一次循环才被读取
+    """
+
+    def __init__(self, drift_ppm, epoch=1000.0, start_tick=0, loop_period=0.01, seed=1):
+        self.rate = 1 + drift_ppm * 1e-6
+        self.epoch = epoch - start_tick / 1000.0 / self.rate
+        self.loop_period = loop_period
+        self.rng = random.Random(seed)
+
+    def tick(self, host):
+        return int((host - self.epoch) * self.rate * 1000) & 0xFFFFFFFF
+
+    def true_host(self, device_seconds):
+        return self.epoch + device_seconds / self.rate
+
+
+def run_exchanges(sync, device, start, count, interval=2.0):
+    """在假时钟上做 count 次 SYNC / CLOCK 交换，返回最后的主机时间"""
+    now = [start]
+    requests = []
+    sync.clock = lambda: now[0]
+    sync.attach(requests.append)
+    sync.interval = interval
+    for i in range(count):
+        host = start + i * interval
+        now[0] = host
+        tick = device.tick(host)
+        sync.on_detection(DetectionEvent(host, host, 0, 10, 0, [10] * 12, i, tick))
+        assert requests, "应发送同步请求"
+        req_id = requests.pop()[len(b'SYNC:'):].strip()
+        read = host + 0.0005 + device.rng.uniform(0, device.loop_period)
+        reply = read + device.rng.uniform(0, 0.002)
+        t4 = reply + 0.0005 + device.rng.uniform(0, 0.003)
+        now[0] = t4
+        line = b'CLOCK:%s:%d:%d' % (req_id, device.tick(read), device.tick(reply))
+        sync.on_log(LogEvent(t4, line))
+    return now[0]
+
+
+def test_unwrap_tick():
+    assert unwrap_tick(5, 0xFFFFFFF0) == 0x100000005
+    assert unwrap_tick(0xFFFFFFF0, 0x100000005) == 0xFFFFFFF0
+    assert unwrap_tick(1000, 900) == 1000
+
+
+def test_offset_and_drift():
+    device = DriftingDevice(drift_ppm=150)
+    sync = ClockSync(samples=32)
+    run_exchanges(sync, device, 5000.0, 40)
+    assert sync.synced and sync.replies == 40 and sync.lost == 0
+    # 真实漂移在估计值 ± 不确定度之内
+    assert abs(sync.drift - 150e-6) <= sync.drift_error < sync.max_drift
+    # 拟合范围内外的换算都接近真实主机时间
+    for host in (5010.0, 5040.0, 5078.0, 5120.0):
+        tick = device.tick(host)
+        error = abs(sync.to_host(tick) - device.true_host(sync.device_seconds(tick)))
+        assert error < 0.003
+        assert error <= sync.error_at(tick)
+    snapshot = sync.snapshot()
+    assert snapshot["synced"] and snapshot["samples"] == 32
+
+
+def test_short_span_estimates_offset_only():
+    device = DriftingDevice(drift_ppm=-80)
+    sync = ClockSync()
+    run_exchanges(sync, device, 1100.0, 4, interval=1.0)
+    assert sync.synced
+    assert sync.drift == 0.0 and sync.drift_error == sync.max_drift
+    tick = device.tick(1102.0)
+    assert abs(sync.to_host(tick) - device.true_host(sync.device_seconds(tick))) < 0.003
+
+
+def test_tick_wraparound():
+    # 交换过程中 ticks_ms 从 2^32 回绕到 0
+    device = DriftingDevice(drift_ppm=50, start_tick=0xFFFFFFFF - 30000)
+    sync = ClockSync()
+    run_exchanges(sync, device, 1000.0, 30)
+    assert sync.resets == 0 and sync.synced
+    assert abs(sync.drift - 50e-6) <= sync.drift_error
+    tick = device.tick(1059.0)
+    assert tick < 0x10000000
+    assert abs(sync.to_host(tick) - device.true_host(sync.device_seconds(tick))) < 0.003
+
+
+def test_device_reboot_resets():
+    sync = ClockSync()
+    end = run_exchanges(sync, DriftingDevice(drift_ppm=0, epoch=0.0, start_tick=600000),
+                        0.0, 10)
+    run_exchanges(sync, DriftingDevice(drift_ppm=0, epoch=end + 2.0), end + 2.0, 5)
+    assert sync.resets == 1
+    assert len(sync.samples) == 5
+
+
+def test_unsupported_script_stops_requests():
+    now = [0.0]
+    sync = ClockSync(write=lambda data: None, interval=0.1, timeout=0.05, max_unanswered=3,
+                     clock=lambda: now[0])
+    sync.on_detection(DetectionEvent(0.0, 0.0, 0, 10, 0, [10] * 12, 0, 0))
+    for i in range(1, 10):
+        now[0] = i * 0.2
+        sync.poll()
+    assert sync.supported is False
+    assert sync.requests == 3
+
+
+class TickSink(Sink):
+    def __init__(self):
+        self.events = []
+
+    def on_detection(self, event):
+        self.events.append(event)
+
+
+def test_virtual_device():
+    device = VirtualDevice(rate=20, clock_drift=300, autostart=True)
+    device.start()
+    sink = TickSink()
+    receiver = Receiver(port=device.port, sinks=[sink], negotiate=False)
+    receiver.clock.interval = 0.05
+    try:
+        assert receiver.connect()
+        thread = threading.Thread(target=receiver.receive, daemon=True)
+        thread.start()
+        time.sleep(1.5)
+        receiver.stop()
+        thread.join(2)
+    finally:
+        receiver.disconnect()
+        device.stop()
+    sync = receiver.clock
+    assert device.sync_requests >= 10 and sync.replies >= 10
+    assert sync.synced
+    synced = [e for e in sink.events if e.timestamp != e.received]
+    assert synced
+    for event in synced:
+        truth = device.device_time_to_host(event.tick)
+        assert abs(event.timestamp - truth) < 0.005
+        assert abs(event.timestamp - truth) <= sync.error_at(event.tick) + 0.001
+
+
+def test_collector_syncs_each_device():
+    devices = {'a': VirtualDevice(rate=20, clock_drift=300, autostart=True, seed=1),
+               'b': VirtualDevice(rate=20, clock_drift=-300, autostart=True, seed=2)}
+    for device in devices.values():
+        device.start()
+    collector = MultiDeviceCollector({name: d.port for name, d in devices.items()})
+    for dev in collector.devices.values():
+        dev.clock.interval = 0.05
+    events = []
+
+    async def collect():
+        async def consume():
+            async for event in collector.events():
+                events.append(event)
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(1.5)
+        await collector.stop()
+        await task
+
+    try:
+        asyncio.run(collect())
+    finally:
+        for device in devices.values():
+            device.stop()
+    for name, device in devices.items():
+        sync = collector.devices[name].clock
+        assert device.sync_requests >= 10 and sync.synced
+        synced = [e for e in events if isinstance(e, DetectionEvent) and e.device == name
+                  and e.timestamp != e.received]
+        assert synced
+        for event in synced:
+            assert abs(event.timestamp - device.device_time_to_host(event.tick)) < 0.005
+    assert collector.stats()['a']['clock']['synced']
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""多设备采集（collector.py）：pty 上的 VirtualDevice 合并、互不阻塞和重连"""
+
+import asyncio
+import os
+
+from maix_audio import DetectionEvent, MultiDeviceCollector
+from maix_audio.collector import received_time
+from maix_audio.simulator import VirtualDevice
+
+
+def collect(collector, seconds, during=None):
+    """
+    消费 collector.events() seconds 秒
+
+    Args:
+        during: during(elapsed) 协程，与采集同时运行（如断开、切换设备）
+    """
+    events = []
+
+    async def main():
+        async def consume():
+            async for event in collector.events():
+                events.append(event)
+        task = asyncio.ensure_future(consume())
+        if during is not None:
+            await during()
+        await asyncio.sleep(seconds)
+        await collector.stop()
+        await task
+
+    asyncio.run(main())
+    return events
+
+
+def test_merges_devices_in_time_order():
+    # 事件率在 115200 波特率的容量之内，设备端不丢弃
+    devices = {'a': VirtualDevice(rate=25, binary=True, autostart=True, seed=1),
+               'b': VirtualDevice(rate=20, binary=True, autostart=True, seed=2),
+               'quiet': VirtualDevice(rate=25, binary=True, seed=3)}
+    for device in devices.values():
+        device.start()
+    collector = MultiDeviceCollector({name: d.port for name, d in devices.items()},
+                                     binary=True, clock_sync=False)
+    try:
+        events = collect(collector, 1.5)
+    finally:
+        for device in devices.values():
+            device.stop()
+    detections = [e for e in events if isinstance(e, DetectionEvent)]
+    # 合并后按接收时间排序
+    received = [received_time(e) for e in events]
+    assert received == sorted(received)
+    stats = collector.stats()
+    for name in ('a', 'b'):
+        mine = [e for e in detections if e.device == name]
+        assert len(mine) >= 20
+        # 每个设备的序列号连续，没有丢失
+        assert devices[name].overruns == 0
+        assert [e.seq for e in mine] == list(range(len(mine)))
+        assert stats[name]['detections'] == len(mine)
+        assert stats[name]['bytes'] > 0 and stats[name]['reconnects'] == 0
+    # 不发送数据的设备不影响其他设备
+    assert stats['quiet']['errors'] == 0 and stats['quiet']['detections'] == 0
+    assert not any(e.device == 'quiet' for e in detections)
+
+
+def test_reconnects_after_device_disappears(tmp_path):
+    # 串口路径是符号链接，切换到新的 pty 模拟拔出后重新插入
+    link = str(tmp_path / 'ttyMAIX')
+    first = VirtualDevice(rate=50, binary=True, autostart=True, seed=1)
+    second = VirtualDevice(rate=50, binary=True, autostart=True, seed=2)
+    first.start()
+    os.symlink(first.port, link)
+    collector = MultiDeviceCollector({'mic': link}, binary=True, clock_sync=False,
+                                     reconnect_delay=0.05)
+    seen = {}
+
+    async def unplug():
+        await asyncio.sleep(0.5)
+        seen['before'] = collector.stats()['mic']['detections']
+        os.remove(link)
+        first.stop()
+        await asyncio.sleep(0.3)
+        seen['offline'] = collector.stats()['mic']['connected']
+        second.start()
+        os.symlink(second.port, link)
+
+    try:
+        events = collect(collector, 1.0, during=unplug)
+    finally:
+        first.stop()
+        second.stop()
+    stats = collector.stats()['mic']
+    assert seen['before'] > 5 and seen['offline'] is False
+    assert stats['reconnects'] == 1 and stats['errors'] >= 1
+    assert stats['detections'] > seen['before'] + 5
+    assert all(e.device == 'mic' for e in events)
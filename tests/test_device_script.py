@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""在模拟环境中运行 hardware/demo_mic_array.py（maix_audio/emulator.py）"""
+
+import json
+import os
+import re
+
+from maix_audio import DetectionEvent, StreamParser
+from maix_audio.link import LINK_CONFIRM, LINK_PATTERN
+from maix_audio.emulator import ScriptEmulator
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'hardware', 'demo_mic_array.py')
+
+
+def run_binary(**overrides):
+    options = {'BINARY_PROTOCOL': True, 'CLOCK_SYNC': False, 'TX_THREAD': True,
+               'STREAM_MAPS': True, 'DISPLAY_INTERVAL_MS': 0}
+    options.update(overrides)
+    # 低波特率下发送跟不上采集，发送缓冲满时丢弃最旧的帧
+    emulator = ScriptEmulator(SCRIPT, frames=400, overrides=options, baudrate=57600,
+                              activity=1.0)
+    result = emulator.run()
+    assert not result.errors
+    parser = StreamParser(binary=True)
+    data = b''.join(chunk for _, chunk in emulator.serial.chunks)
+    events = [e for e in parser.feed(data) + parser.flush() if isinstance(e, DetectionEvent)]
+    return events, parser
+
+
+def test_dropped_slots_force_keyframe():
+    events, parser = run_binary(TX_BUFFERS=2)
+    seqs = [e.seq for e in events]
+    gaps = sum(1 for a, b in zip(seqs, seqs[1:]) if b != a + 1)
+    assert gaps > 0
+    # 丢帧后的下一张图是关键帧，所有收到的热力图都能还原
+    assert parser.maps.dropped == 0
+    assert all(e.audio_map and len(e.audio_map) == 256 for e in events)
+
+
+def test_maps_match_uncompressed():
+    compressed, _ = run_binary(TX_BUFFERS=2)
+    plain, _ = run_binary(TX_BUFFERS=2, COMPRESS_MAPS=False)
+    plain = {e.seq: e.audio_map for e in plain}
+    common = [e for e in compressed if e.seq in plain]
+    assert common
+    assert all(e.audio_map == plain[e.seq] for e in common)
+
+
+def test_link_restored_when_script_stops():
+    emulator = ScriptEmulator(SCRIPT, frames=50, overrides={'LINK_BAUDRATE': 921600},
+                              baudrate=115200)
+    serial = emulator.serial
+    rates = []
+
+    def host(data):
+        # 主机端握手：收到请求后发送测试图样，收到回送后确认
+        rates.append(serial.baudrate)
+        if data.startswith(b'LINK_BAUD:'):
+            serial.incoming = LINK_PATTERN
+        elif data == LINK_PATTERN:
+            serial.incoming = LINK_CONFIRM
+
+    serial.on_write = host
+    result = emulator.run()
+    assert not result.errors
+    assert any(line.endswith('LINK_READY:921600') for line in result.lines)
+    assert 921600 in rates
+    # get_map() 结束脚本后 finally 把 REPL 串口恢复到 115200
+    assert serial.baudrate == 115200
+
+
+def test_output_lines_not_interleaved():
+    # 文本协议、发送线程、时钟同步和频繁的 TIMING 输出同时进行
+    emulator = ScriptEmulator(SCRIPT, frames=400, baudrate=115200, activity=0.6,
+                              overrides={'CLOCK_SYNC': True, 'TIMING_INTERVAL_MS': 100,
+                                         'DISPLAY_INTERVAL_MS': 0})
+    serial = emulator.serial
+    sent = []
+
+    def host(data):
+        # 每 50ms 发一个同步请求，设备在下一次循环读取
+        if not sent or emulator.clock.now - sent[-1] >= 0.05:
+            sent.append(emulator.clock.now)
+            serial.incoming += b'SYNC:%d\n' % len(sent)
+
+    serial.on_write = host
+    result = emulator.run()
+    assert not result.errors
+    lines = [line for line in result.lines if line]
+    assert len(result.timings) >= 5
+    replies = [line for line in lines if line.startswith('CLOCK:')]
+    assert len(replies) >= 20
+    for line in lines:
+        if line.startswith('CLOCK:'):
+            assert re.fullmatch(r'CLOCK:\d+:\d+:\d+', line)
+        elif line.startswith('TIMING:'):
+            json.loads(line[len('TIMING:'):])
+        elif line.startswith('AUDIO_PACKET:'):
+            json.loads(line[len('AUDIO_PACKET:'):])
+        elif line.startswith('RAW_AUDIO:'):
+            assert len(line) == len('RAW_AUDIO:') + 512
+    # 每个 AUDIO_PACKET 后面紧跟着它的 RAW_AUDIO
+    for i, line in enumerate(lines):
+        if line.startswith('AUDIO_PACKET:'):
+            assert lines[i + 1].startswith('RAW_AUDIO:')
+    parser = StreamParser()
+    events = parser.feed(b''.join(chunk for _, chunk in serial.chunks)) + parser.flush()
+    assert parser.parse_errors == 0
+    detections = [e for e in events if isinstance(e, DetectionEvent)]
+    assert detections and all(e.audio_map for e in detections)
+
+
+def test_binary_frames_not_split_by_lines():
+    emulator = ScriptEmulator(SCRIPT, frames=400, baudrate=115200, activity=1.0,
+                              overrides={'BINARY_PROTOCOL': True, 'STREAM_MAPS': True,
+                                         'CLOCK_SYNC': True, 'TIMING_INTERVAL_MS': 100,
+                                         'DISPLAY_INTERVAL_MS': 0})
+    serial = emulator.serial
+    sent = []
+
+    def host(data):
+        if not sent or emulator.clock.now - sent[-1] >= 0.05:
+            sent.append(emulator.clock.now)
+            serial.incoming += b'SYNC:%d\n' % len(sent)
+
+    serial.on_write = host
+    assert not emulator.run().errors
+    parser = StreamParser(binary=True)
+    events = parser.feed(b''.join(chunk for _, chunk in serial.chunks)) + parser.flush()
+    assert parser.decoder.crc_errors == 0 and parser.maps.dropped == 0
+    texts = [e.text for e in events if not isinstance(e, DetectionEvent)]
+    clock = [t for t in texts if t.startswith('CLOCK:')]
+    assert len(clock) >= 20 and all(re.fullmatch(r'CLOCK:\d+:\d+:\d+', t) for t in clock)
+    assert sum(t.startswith('TIMING:') for t in texts) >= 5
+
+
+def record_maps(emulator):
+    """记录每次 get_map() 的虚拟时间和热力图"""
+    maps = []
+    get_map = emulator.mic.get_map
+
+    def wrapper():
+        img = get_map()
+        maps.append((emulator.clock.now, bytes(img.data)))
+        return img
+
+    emulator.mic.get_map = wrapper
+    return maps
+
+
+def test_display_interval_does_not_slow_detection():
+    emulator = ScriptEmulator(SCRIPT, frames=300, activity=1.0,
+                              overrides={'BINARY_PROTOCOL': True, 'STREAM_MAPS': True,
+                                         'CLOCK_SYNC': False, 'TX_BUFFERS': 16,
+                                         'DISPLAY_INTERVAL_MS': 200})
+    maps = record_maps(emulator)
+    result = emulator.run()
+    assert not result.errors
+    # 检测、LED 和发送每次循环都执行
+    assert result.frames == len(maps) == 300
+    assert result.calls['get_dir'] == result.calls['set_led'] == 300
+    parser = StreamParser(binary=True)
+    events = parser.feed(b''.join(chunk for _, chunk in emulator.serial.chunks)) + parser.flush()
+    assert [e.seq for e in events if isinstance(e, DetectionEvent)] == list(range(300))
+    # 热力图每帧都变，LCD 仍按 DISPLAY_INTERVAL_MS 刷新
+    shown = emulator.lcd.shown
+    gaps = [b - a for a, b in zip(shown, shown[1:])]
+    assert min(gaps) >= 0.199 and max(gaps) < 0.3
+    assert len(shown) < result.elapsed / 0.2 + 1
+    # 两次刷新之间有多次检测
+    loops = [sum(1 for t, _ in maps if a <= t < b) for a, b in zip(shown, shown[1:])]
+    assert min(loops) >= 5
+
+
+def test_display_only_on_map_change():
+    emulator = ScriptEmulator(SCRIPT, frames=300, activity=0.3,
+                              overrides={'DISPLAY_INTERVAL_MS': 0, 'CLOCK_SYNC': False,
+                                         'TIMING_INTERVAL_MS': 1000})
+    maps = record_maps(emulator)
+    result = emulator.run()
+    assert not result.errors
+    assert result.calls['get_dir'] == 300
+    # 间隔为0时每次循环都检查，只有热力图与上次显示的不同时才刷新
+    changes = sum(1 for i, (_, data) in enumerate(maps) if i == 0 or data != maps[i - 1][1])
+    assert 0 < result.active_frames < 300
+    assert result.displays == changes < 300
+    timing = result.timings[0]
+    assert timing['displays'] + timing['skipped'] == timing['loops']
+
+    # 关闭 DISPLAY_ON_CHANGE：每次循环都刷新
+    emulator = ScriptEmulator(SCRIPT, frames=300, activity=0.3,
+                              overrides={'DISPLAY_INTERVAL_MS': 0, 'DISPLAY_ON_CHANGE': False,
+                                         'CLOCK_SYNC': False})
+    assert emulator.run().displays == 300
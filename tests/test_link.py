@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""波特率协商（link.py）：主机端与 VirtualDevice 的 LINK_BAUD -> LINK_OK -> LINK_READY"""
+
+import threading
+import time
+
+import pytest
+import serial
+
+from maix_audio import DetectionEvent, LogEvent, Receiver, SerialReader, Sink
+from maix_audio.link import DEFAULT_BAUDRATE, LinkNegotiator, parse_request
+from maix_audio.simulator import VirtualDevice
+
+LINK_RATE = 230400
+
+
+class ListSink(Sink):
+    def __init__(self):
+        self.events = []
+
+    def handle(self, event):
+        self.events.append(event)
+
+    def detections_after(self, text):
+        """text 这一行之后收到的检测事件"""
+        for i, event in enumerate(self.events):
+            if isinstance(event, LogEvent) and event.text == text:
+                return [e for e in self.events[i:] if isinstance(e, DetectionEvent)]
+        return []
+
+
+@pytest.fixture
+def device():
+    # strict_baud: 两端波特率不一致时设备输出乱码、丢弃输入
+    dev = VirtualDevice(rate=50, link_baudrate=LINK_RATE, strict_baud=True)
+    dev.start()
+    yield dev
+    dev.stop()
+
+
+def run_receiver(dev, seconds, **options):
+    sink = ListSink()
+    receiver = Receiver(port=dev.port, sinks=[sink], clock_sync=False, **options)
+    assert receiver.connect()
+    thread = threading.Thread(target=receiver.receive, daemon=True)
+    thread.start()
+    dev.start_script()
+    time.sleep(seconds)
+    receiver.stop()
+    thread.join(2)
+    receiver.disconnect()
+    return receiver, sink
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_parse_request():
+    assert parse_request(LogEvent(0.0, b'LINK_BAUD:921600')) == 921600
+    assert parse_request(LogEvent(0.0, b'>>> LINK_BAUD:230400\r')) == 230400
+    assert parse_request(LogEvent(0.0, b'LINK_BAUD:fast')) is None
+    assert parse_request(LogEvent(0.0, b'LINK_READY:230400')) is None
+    assert parse_request(DetectionEvent(0.0, 0.0, 0, 10, 0, [10] * 12)) is None
+
+
+def test_switch(device):
+    receiver, sink = run_receiver(device, 1.0)
+    assert receiver.baudrate == LINK_RATE
+    assert receiver.link.switches == 1 and receiver.link.failures == 0
+    assert device.link_switches == 1 and device.device_rate == LINK_RATE
+    # LINK_READY 行在握手中读到，之后照常交给解析器
+    assert len(sink.detections_after(f'LINK_READY:{LINK_RATE}')) >= 3
+    assert device.baud_errors == 0
+
+
+def test_device_times_out_without_host(device):
+    # 主机不响应：设备等不到测试图样，1 秒后退回默认波特率
+    receiver, sink = run_receiver(device, 2.0, negotiate=False)
+    assert device.link_failures == 1 and device.link_switches == 0
+    assert device.device_rate == DEFAULT_BAUDRATE
+    assert len(sink.detections_after(f'LINK_READY:{DEFAULT_BAUDRATE}')) >= 3
+
+
+def test_request_above_host_limit(device):
+    receiver, sink = run_receiver(device, 2.0, max_baudrate=DEFAULT_BAUDRATE)
+    assert receiver.baudrate == DEFAULT_BAUDRATE
+    assert receiver.link.failures == 1
+    assert '超过主机上限' in receiver.link.last_error
+    assert device.link_failures == 1
+    assert len(sink.detections_after(f'LINK_READY:{DEFAULT_BAUDRATE}')) >= 3
+
+
+def test_fallback_when_pattern_lost(device):
+    # settle=0：设备还没切换就发送测试图样，设备收不到，两端都退回默认波特率
+    ser = serial.Serial(device.port, DEFAULT_BAUDRATE, timeout=1)
+    try:
+        reader = SerialReader(ser)
+        link = LinkNegotiator(ser, settle=0.0, timeout=0.3)
+        device.start_script()
+        data = bytearray()
+        assert wait_for(lambda: data.extend(reader.read_chunk(0.05) or b'') or
+                        b'LINK_BAUD' in data)
+        assert link.handshake(LINK_RATE, reader) == DEFAULT_BAUDRATE
+        assert link.failures == 1 and link.last_error == "设备没有回送测试图样"
+        assert ser.baudrate == DEFAULT_BAUDRATE
+        assert wait_for(lambda: device.link_failures == 1)
+        assert device.device_rate == DEFAULT_BAUDRATE
+        # 退回后数据照常收发
+        del data[:]
+        assert wait_for(lambda: data.extend(reader.read_chunk(0.05) or b'') or
+                        b'AUDIO_PACKET:' in data)
+    finally:
+        ser.close()
+
+
+def test_monitor_negotiates(device):
+    from raspberry_monitor import MaixPyMonitor
+
+    monitor = MaixPyMonitor(port=device.port)
+    assert monitor.connect()
+    assert monitor.link is not None
+    thread = threading.Thread(target=monitor.receive, daemon=True)
+    thread.start()
+    device.start_script()
+    try:
+        assert wait_for(lambda: monitor.baudrate == LINK_RATE)
+    finally:
+        monitor.stop()
+        thread.join(2)
+        monitor.disconnect()
+    assert device.link_switches == 1 and device.link_failures == 0
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""热力图压缩编解码（mapcodec.py）"""
+
+import random
+
+import pytest
+
+from maix_audio.mapcodec import MapDecoder, MapEncoder, rle_decode, rle_encode, xor_bytes
+from maix_audio.protocol import (FRAME_DETECTION, FRAME_MAP_DELTA, FRAME_MAP_KEY, MAP_SIZE,
+                                 Frame)
+
+
+def random_map(rng, spots=8):
+    """接近全零、带几个亮点的热力图"""
+    data = bytearray(MAP_SIZE)
+    for _ in range(spots):
+        data[rng.randrange(MAP_SIZE)] = rng.randrange(1, 256)
+    return bytes(data)
+
+
+def frames(maps, encoder, first_seq=0):
+    for i, audio_map in enumerate(maps):
+        ftype, payload = encoder.encode(audio_map)
+        yield Frame(ftype, (first_seq + i) & 0xFFFF, i, [0] * 12, payload)
+
+
+@pytest.mark.parametrize("data", [
+    bytes(MAP_SIZE),                              # 全部相同
+    bytes([7]) * MAP_SIZE,
+    bytes(range(256)),                            # 全部不同
+    bytes([1]) * 128 + bytes([2]) * 128,          # 重复段正好 128
+    bytes([1]) * 129 + bytes([2]) * 127,          # 重复段上限 129
+    bytes([1]) * 130 + bytes([2]) * 126,          # 超过上限，拆成两段
+    bytes([3]) + bytes([4]) * 255,                # 单个原样字节接重复段
+    bytes(range(128)) + bytes(128),               # 原样段正好 128
+    bytes(range(129)) + bytes(127),               # 原样段超过 128
+    bytes(range(127)) + bytes([9, 9]) + bytes(range(127)),
+])
+def test_rle_round_trip(data):
+    encoded = rle_encode(data)
+    assert rle_decode(encoded) == data
+
+
+def test_rle_control_bytes():
+    # 256 个相同字节: 129 + 127
+    assert rle_encode(bytes(MAP_SIZE)) == bytes([255, 0, 253, 0])
+    # 全部不同: 两个 128 字节的原样段
+    encoded = rle_encode(bytes(range(256)))
+    assert len(encoded) == 258
+    assert encoded[0] == 127 and encoded[129] == 127
+
+
+def test_rle_random_round_trip():
+    rng = random.Random(1)
+    for _ in range(500):
+        data = bytes(rng.choice((0, 0, 0, 1, rng.randrange(256))) for _ in range(MAP_SIZE))
+        assert rle_decode(rle_encode(data)) == data
+
+
+@pytest.mark.parametrize("data", [
+    bytes([5, 1, 2]),             # 原样段越界
+    bytes([200]),                 # 重复段缺少数据
+    bytes([255, 0]),              # 长度不足 256
+    bytes([255, 0, 255, 0, 255, 0]),
+])
+def test_rle_decode_rejects_corrupt(data):
+    with pytest.raises(ValueError):
+        rle_decode(data)
+
+
+def test_xor_bytes():
+    a = bytes(range(256))
+    b = bytes(reversed(range(256)))
+    assert xor_bytes(xor_bytes(a, b), b) == a
+    assert xor_bytes(a, a) == bytes(MAP_SIZE)
+
+
+def test_delta_reconstruction():
+    rng = random.Random(2)
+    maps = [random_map(rng) for _ in range(100)]
+    decoder = MapDecoder()
+    out = [decoder.decode(frame) for frame in frames(maps, MapEncoder(keyframe_interval=30))]
+    assert out == maps
+    assert decoder.keyframes == 4
+    assert decoder.deltas == 96
+    assert decoder.dropped == 0
+
+
+def test_delta_across_seq_wrap():
+    rng = random.Random(3)
+    maps = [random_map(rng) for _ in range(10)]
+    decoder = MapDecoder()
+    out = [decoder.decode(frame) for frame in frames(maps, MapEncoder(), first_seq=0xFFFB)]
+    assert out == maps
+    assert decoder.dropped == 0
+
+
+def test_uncompressible_keyframe_is_reference():
+    rng = random.Random(4)
+    noisy = bytes(rng.randrange(256) for _ in range(MAP_SIZE))
+    maps = [noisy, noisy[:-1] + b'\x00', noisy]
+    encoded = list(frames(maps, MapEncoder()))
+    assert encoded[0].ftype == FRAME_DETECTION
+    assert encoded[1].ftype == FRAME_MAP_DELTA
+    decoder = MapDecoder()
+    assert [decoder.decode(frame) for frame in encoded] == maps
+
+
+def test_gap_drops_deltas_until_keyframe():
+    rng = random.Random(5)
+    maps = [random_map(rng) for _ in range(20)]
+    encoded = list(frames(maps, MapEncoder(keyframe_interval=10)))
+    assert encoded[10].ftype == FRAME_MAP_KEY
+    del encoded[4]                    # 丢失 seq 4
+    decoder = MapDecoder()
+    out = {frame.seq: decoder.decode(frame) for frame in encoded}
+    # 丢帧之前正常
+    assert [out[seq] for seq in range(4)] == maps[:4]
+    # 之后的差分帧无法还原
+    assert all(out[seq] is None for seq in range(5, 10))
+    assert decoder.dropped == 5
+    # 下一个关键帧恢复，随后的差分帧也正常
+    assert [out[seq] for seq in range(10, 20)] == maps[10:]
+    assert decoder.reference == maps[-1]
+
+
+def test_corrupt_delta_resets_reference():
+    rng = random.Random(6)
+    maps = [random_map(rng) for _ in range(12)]
+    encoded = list(frames(maps, MapEncoder(keyframe_interval=6)))
+    bad = encoded[2]
+    encoded[2] = Frame(bad.ftype, bad.seq, bad.tick, bad.directions, bad.payload[:-1])
+    decoder = MapDecoder()
+    out = [decoder.decode(frame) for frame in encoded]
+    assert out[2] is None and decoder.errors == 1
+    assert out[3:6] == [None] * 3
+    assert out[6:] == maps[6:]
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""热力图批量统计（mapstats.py）：与逐张计算的结果一致，事件顺序不变"""
+
+import math
+import random
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from maix_audio import DetectionEvent, LogEvent
+from maix_audio.mapstats import GRID, MapStatsStage, batch_stats, sector_matrix
+
+
+def make_map(rng):
+    data = [rng.randrange(20, 40) for _ in range(GRID * GRID)]
+    # 一个声源：峰值附近一片高亮
+    row, col = rng.randrange(GRID), rng.randrange(GRID)
+    for r in range(max(0, row - 1), min(GRID, row + 2)):
+        for c in range(max(0, col - 1), min(GRID, col + 2)):
+            data[r * GRID + c] = rng.randrange(100, 256)
+    return bytes(data)
+
+
+def reference(audio_map, rotation=0.0, clockwise=False):
+    """逐张图用纯 Python 计算"""
+    values = list(audio_map)
+    background = sorted(values)[len(values) // 2]
+    peak_index = values.index(max(values))
+    energy = [0.0] * 12
+    for index, value in enumerate(values):
+        row, col = divmod(index, GRID)
+        angle = math.degrees(math.atan2(row - 7.5, col - 7.5))
+        if clockwise:
+            angle = -angle
+        energy[round(((angle + rotation) % 360.0) / 30.0) % 12] += max(value - background, 0)
+    return {
+        "min": min(values),
+        "max": max(values),
+        "mean": sum(values) / len(values),
+        "background": background,
+        "peak": max(values) - background,
+        "peak_row": peak_index // GRID,
+        "peak_col": peak_index % GRID,
+        "energy": energy,
+    }
+
+
+def check(stats, audio_map, **kwargs):
+    expected = reference(audio_map, **kwargs)
+    energy = expected.pop("energy")
+    assert {name: stats[name] for name in expected} == pytest.approx(expected)
+    assert stats["energy"] == pytest.approx(energy)
+
+
+@pytest.mark.parametrize("rotation, clockwise", [(0.0, False), (90.0, True)])
+def test_batch_matches_per_map(rotation, clockwise):
+    rng = random.Random(1)
+    maps = [make_map(rng) for _ in range(40)] + [bytes(256), bytes([255]) * 256]
+    batch = np.frombuffer(b''.join(maps), dtype=np.uint8).reshape(-1, GRID, GRID)
+    stats = batch_stats(batch, sector_matrix(rotation, clockwise))
+    assert stats["energy"].shape == (len(maps), 12)
+    for i, audio_map in enumerate(maps):
+        row = {name: values[i].tolist() for name, values in stats.items()}
+        check(row, audio_map, rotation=rotation, clockwise=clockwise)
+
+
+def test_stage_batches_in_order():
+    rng = random.Random(2)
+    stage = MapStatsStage(size=4, max_wait=60.0)
+    items = []
+    for i in range(10):
+        items.append(DetectionEvent(i, i, 0, 10, 0, [0] * 12, seq=i, audio_map=make_map(rng)))
+        if i % 3 == 0:
+            items.append(LogEvent(i, b'log'))
+        if i == 5:
+            items.append(DetectionEvent(i, i, 0, 10, 0, [0] * 12, seq=100))  # 没有热力图
+    out = []
+    for item in items:
+        out.extend(stage.process(item))
+    # 攒满 4 张图才输出
+    assert stage.batches == 2 and stage.maps_done == 8
+    out.extend(stage.flush())
+    assert out == items and stage.batches == 3 and stage.maps_done == 10
+    for item in out:
+        if isinstance(item, DetectionEvent) and item.audio_map:
+            check(item.map_stats.to_dict(), item.audio_map)
+        elif isinstance(item, DetectionEvent):
+            assert item.map_stats is None
+
+    # 背景图是所有图的平均（第一批初始化，之后按批指数平均）
+    maps = np.frombuffer(b''.join(e.audio_map for e in items
+                                  if isinstance(e, DetectionEvent) and e.audio_map),
+                         dtype=np.uint8).reshape(-1, GRID, GRID).astype(np.float64)
+    background = maps[:4].mean(axis=0)
+    for batch in (maps[4:8], maps[8:]):
+        background += (1 - 0.99 ** len(batch)) * (batch.mean(axis=0) - background)
+    assert np.allclose(stage.background_map, background)
+
+
+def test_stage_max_wait():
+    stage = MapStatsStage(size=16, max_wait=0.02)
+    event = DetectionEvent(0, 0, 0, 10, 0, [0] * 12, audio_map=bytes(range(256)))
+    assert list(stage.process(event)) == [] and list(stage.idle()) == []
+    time.sleep(0.03)
+    assert list(stage.idle()) == [event]
+    assert event.map_stats.max == 255 and stage.batches == 1
+    assert list(stage.flush()) == []
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""串口数据流解析（parser.py）：任意切分的读取块、损坏的行和帧"""
+
+import random
+
+import pytest
+
+from maix_audio import DetectionEvent, LogEvent, StreamParser
+from maix_audio.mapcodec import MapEncoder
+from maix_audio.protocol import encode_frame
+from maix_audio.simulator import make_detections, text_event
+
+DETECTIONS = make_detections(20, seed=3)
+
+
+def text_stream():
+    return b''.join(text_event(dirs, audio_map, 100.0 + i, seq=i, tick=i * 50)
+                    for i, (dirs, audio_map) in enumerate(DETECTIONS))
+
+
+def binary_stream(compress=False):
+    encoder = MapEncoder(keyframe_interval=5)
+    frames = []
+    for i, (dirs, audio_map) in enumerate(DETECTIONS):
+        # 热力图接近全零时才能压缩，差分帧才有意义
+        audio_map = bytes(v if v > 200 else 0 for v in audio_map)
+        ftype, payload = encoder.encode(audio_map) if compress else (1, audio_map)
+        frames.append(encode_frame(i, i * 50, dirs, payload, ftype))
+        if i % 4 == 0:
+            frames.append(b'log line %d\r\n' % i)
+    return frames
+
+
+def split(data, rng, largest):
+    """按随机长度切分，模拟串口读取块"""
+    chunks = []
+    pos = 0
+    while pos < len(data):
+        n = rng.randint(1, largest)
+        chunks.append(data[pos:pos + n])
+        pos += n
+    return chunks
+
+
+def parse(parser, chunks):
+    out = []
+    for chunk in chunks:
+        out += parser.feed(chunk)
+    return out + parser.flush()
+
+
+def summary(events):
+    return [(e.seq, tuple(e.directions), e.audio_map) if isinstance(e, DetectionEvent)
+            else e.text for e in events]
+
+
+@pytest.mark.parametrize("largest", [1, 2, 7, 64, 1000])
+def test_text_split_chunks(largest):
+    data = text_stream()
+    expected = summary(parse(StreamParser(), [data]))
+    assert sum(isinstance(e, tuple) for e in expected) == len(DETECTIONS)
+    parser = StreamParser()
+    assert summary(parse(parser, split(data, random.Random(largest), largest))) == expected
+    assert parser.parse_errors == 0
+
+
+def test_text_maps_and_fields():
+    events = [e for e in parse(StreamParser(device='a'), [text_stream()])
+              if isinstance(e, DetectionEvent)]
+    for i, event in enumerate(events):
+        dirs, audio_map = DETECTIONS[i]
+        assert event.seq == i and event.tick == i * 50
+        assert list(event.directions) == dirs
+        assert event.audio_map == audio_map
+        assert event.device == 'a'
+
+
+def test_crlf_split_between_cr_and_lf():
+    parser = StreamParser()
+    assert parser.feed(b'hello\r') == []
+    events = parser.feed(b'\nworld\r\n')
+    assert [e.text for e in events] == ['hello', 'world']
+    assert [e.line for e in events] == [b'hello', b'world']
+
+
+def test_packet_without_raw_audio_uses_json_map():
+    audio_map = bytes(range(256))
+    line = text_event([1] * 12, audio_map, 1.0, seq=1, tick=2).split(b'\r\n')[1]
+    parser = StreamParser()
+    assert parser.feed(line + b'\r\n') == []
+    assert parser.has_pending
+    events = parser.flush()
+    assert events[0].audio_map == audio_map
+    # 下一行不是 RAW_AUDIO 时同样立即输出
+    parser.feed(line + b'\r\n')
+    events = parser.feed(b'other\r\n')
+    assert isinstance(events[0], DetectionEvent) and isinstance(events[1], LogEvent)
+
+
+def test_text_errors():
+    dirs, audio_map = DETECTIONS[0]
+    log, packet, raw = text_event(dirs, audio_map, 1.0, seq=0, tick=0).split(b'\r\n')[:3]
+    parser = StreamParser()
+    # RAW_AUDIO 十六进制损坏：仍输出事件，热力图来自 JSON
+    events = parser.feed(packet + b'\r\n' + raw[:-3] + b'zz\r\n')
+    assert parser.parse_errors == 1
+    assert events[0].audio_map == audio_map
+    # 没有配对的 RAW_AUDIO
+    assert parser.feed(raw + b'\r\n') == []
+    assert parser.parse_errors == 2
+    # JSON 损坏
+    assert parser.feed(b'AUDIO_PACKET:{"angle": \r\n') + parser.flush() == []
+    assert parser.parse_errors == 3
+    # 之后照常解析
+    events = parser.feed(log + b'\r\n' + packet + b'\r\n' + raw + b'\r\n')
+    assert [type(e) for e in events] == [LogEvent, DetectionEvent]
+    # RAW_AUDIO 截断后剩下偶数个十六进制字符：长度不对，同样使用 JSON
+    events = parser.feed(packet + b'\r\n' + raw[:-100] + b'\r\n')
+    assert parser.parse_errors == 4
+    assert events[0].audio_map == audio_map
+
+
+def test_text_buffer_limit():
+    parser = StreamParser(max_buffer=1024)
+    parser.feed(b'x' * 2000)
+    assert parser.parse_errors == 1
+    assert [e.text for e in parser.feed(b'\r\nok\r\n')] == ['ok']
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("largest", [1, 5, 64, 4096])
+def test_binary_split_chunks(compress, largest):
+    data = b''.join(binary_stream(compress))
+    expected = summary(parse(StreamParser(binary=True), [data]))
+    assert sum(isinstance(e, tuple) for e in expected) == len(DETECTIONS)
+    assert all(e[2] and len(e[2]) == 256 for e in expected if isinstance(e, tuple))
+    parser = StreamParser(binary=True)
+    assert summary(parse(parser, split(data, random.Random(largest), largest))) == expected
+    assert parser.decoder.crc_errors == 0
+    if compress:
+        assert parser.maps.deltas > 0 and parser.maps.dropped == 0
+
+
+def test_binary_crc_errors():
+    frames = binary_stream()
+    # 改写第3帧负载中的一个字节
+    index = [i for i, item in enumerate(frames) if item.startswith(b'\xa5\x5a')][2]
+    bad = bytearray(frames[index])
+    bad[40] ^= 0xFF
+    frames[index] = bytes(bad)
+    parser = StreamParser(binary=True)
+    events = parse(parser, split(b''.join(frames), random.Random(1), 16))
+    seqs = [e.seq for e in events if isinstance(e, DetectionEvent)]
+    assert seqs == [i for i in range(len(DETECTIONS)) if i != 2]
+    assert parser.decoder.crc_errors >= 1
+    assert 'log line 0' in [e.text for e in events if isinstance(e, LogEvent)]
+
+
+def test_binary_crc_error_drops_deltas_until_keyframe():
+    frames = binary_stream(compress=True)
+    index = [i for i, item in enumerate(frames) if item.startswith(b'\xa5\x5a')][2]
+    bad = bytearray(frames[index])
+    bad[-1] ^= 0xFF   # CRC 本身损坏
+    frames[index] = bytes(bad)
+    parser = StreamParser(binary=True)
+    events = [e for e in parse(parser, [b''.join(frames)]) if isinstance(e, DetectionEvent)]
+    maps = {e.seq: e.audio_map for e in events}
+    assert 2 not in maps
+    # seq 3、4 为差分帧，缺少 seq 2 无法还原；seq 5 为关键帧
+    assert maps[3] is None and maps[4] is None
+    assert all(maps[seq] for seq in range(5, len(DETECTIONS)))
+    assert parser.maps.dropped == 2
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""事件处理流水线（pipeline.py）：线程阶段的有界队列"""
+
+import threading
+import time
+
+from maix_audio import Sink
+from maix_audio.pipeline import FilterStage, Pipeline, ThreadedStage
+
+
+class GatedSink(Sink):
+    """gate 打开之前每一项都阻塞，模拟卡住的存储卡"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.items = []
+
+    def handle(self, event):
+        self.gate.wait(5)
+        self.items.append(event)
+
+
+def test_full_queue_drops_by_default():
+    sink = GatedSink()
+    stage = ThreadedStage(sink, maxsize=4)
+    assert stage.block is False
+    pipeline = Pipeline([FilterStage(lambda item: item % 2 == 0), stage], report=False)
+    start = time.perf_counter()
+    for item in range(100):
+        pipeline.handle(item)
+    # 接收线程不等待卡住的阶段
+    assert time.perf_counter() - start < 1.0
+    # 工作线程手里一项，队列里 maxsize 项，其余丢弃
+    assert stage.dropped >= 50 - 5
+    sink.gate.set()
+    pipeline.close()
+    assert len(sink.items) + stage.dropped == 50
+    assert sink.items == sorted(sink.items)
+    (entry,) = [e for e in pipeline.snapshot() if e['threaded']]
+    assert entry['dropped'] == stage.dropped and entry['max_queued'] <= 4
+
+
+def test_blocking_is_opt_in():
+    sink = GatedSink()
+    stage = ThreadedStage(sink, maxsize=2, block=True)
+    pipeline = Pipeline([stage], report=False)
+    done = threading.Event()
+
+    def feed():
+        for item in range(20):
+            pipeline.handle(item)
+        done.set()
+
+    thread = threading.Thread(target=feed, daemon=True)
+    thread.start()
+    # 队列满后输入线程等待
+    assert not done.wait(0.3)
+    sink.gate.set()
+    assert done.wait(5)
+    pipeline.close()
+    assert sink.items == list(range(20)) and stage.dropped == 0
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""事件索引（query.py）：增量更新和按时间、方向、强度查询"""
+
+import json
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from maix_audio import DetectionEvent, SegmentWriter
+from maix_audio.query import EventIndex, directions_between
+
+BASE = 1700000000.0
+
+
+def make_events(start, count, seed):
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        t = BASE + start + i * 0.5
+        direction = rng.randrange(12)
+        directions = [rng.randrange(50) for _ in range(12)]
+        events.append(DetectionEvent(t - 0.1, t, direction * 30, rng.randrange(1000), direction,
+                                     directions, seq=start * 2 + i, tick=i,
+                                     audio_map=bytes([i % 256]) * 256))
+    return events
+
+
+def write(directory, events):
+    writer = SegmentWriter(str(directory), max_age=60, flush_interval=0)
+    for event in events:
+        writer.append(event)
+    writer.close()
+
+
+def expected(events, start=None, end=None, directions=None, min_intensity=None):
+    return sorted(e.received for e in events
+                  if (start is None or e.received >= start)
+                  and (end is None or e.received < end)
+                  and (directions is None or e.direction in directions)
+                  and (min_intensity is None or e.intensity >= min_intensity))
+
+
+def times(index, rows):
+    return [float(t) for t in index.columns['time'][rows]]
+
+
+def check_queries(index, events):
+    cases = [
+        {},
+        {'start': BASE + 37.0, 'end': BASE + 151.5},
+        {'directions': directions_between(60, 120)},
+        {'directions': directions_between(330, 30), 'min_intensity': 500},
+        {'start': BASE + 10.25, 'end': BASE + 80.0, 'directions': [0, 5, 11],
+         'min_intensity': 200},
+        {'directions': []},
+        {'start': BASE + 500.0},
+    ]
+    for case in cases:
+        assert times(index, index.query(**case)) == expected(events, **case), case
+
+
+def test_incremental_update(tmp_path):
+    first = make_events(0, 300, seed=1)
+    write(tmp_path, first)
+    index = EventIndex(str(tmp_path))
+    assert index.update() == 300 and index.count == 300
+    assert len(index.files) == 3     # max_age=60 秒，每段 120 条
+    check_queries(index, first)
+    assert index.update() == 0
+
+    # 更晚的新段：只追加
+    later = make_events(200, 100, seed=2)
+    write(tmp_path, later)
+    assert index.update() == 100
+    check_queries(index, first + later)
+
+    # 旧版 FileSink 的 json 比已有数据早：整体重新排序
+    legacy = DetectionEvent(BASE - 5.0, BASE - 5.0, 90, 777, 3, [1] * 12)
+    with open(tmp_path / 'audio_20231114.json', 'w') as f:
+        json.dump({'timestamp': legacy.received, 'angle': 90, 'intensity': 777,
+                   'direction': 3, 'all_directions': [1] * 12}, f)
+    assert index.update() == 1
+    everything = first + later + [legacy]
+    check_queries(index, everything)
+    assert float(index.columns['time'][0]) == BASE - 5.0
+
+    # 重新打开：从磁盘上的索引读取
+    reopened = EventIndex(str(tmp_path))
+    assert reopened.count == 401 and reopened.update() == 0
+    check_queries(reopened, everything)
+
+
+def test_read_matching_records(tmp_path):
+    events = make_events(0, 300, seed=3)
+    write(tmp_path, events)
+    index = EventIndex(str(tmp_path))
+    index.update()
+    rows = index.query(BASE + 20.0, BASE + 120.0, directions=[2, 3, 4])
+    wanted = [e for e in events
+              if BASE + 20.0 <= e.received < BASE + 120.0 and e.direction in (2, 3, 4)]
+    chunks = list(index.read(rows, chunk=16))
+    assert len(chunks) == -(-len(rows) // 16)
+    records = np.concatenate(chunks)
+    assert records['received'].tolist() == [e.received for e in wanted]
+    assert records['seq'].tolist() == [e.seq for e in wanted]
+    assert records['directions'].tolist() == [e.directions for e in wanted]
+    assert [bytes(m.ravel()) for m in records['map']] == [e.audio_map for e in wanted]
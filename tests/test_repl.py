@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""原始 REPL（repl.py）：在 pty 虚拟设备上上传脚本并校验 sha256"""
+
+import base64
+import hashlib
+
+import pytest
+import serial
+
+from maix_audio.repl import RawRepl, ReplError
+from maix_audio.simulator import VirtualDevice
+
+PATH = '/flash/main.py'
+# 逐行 f.write 上传会破坏的内容：引号、反斜杠、\r 和非ASCII字符
+SCRIPT = ("s1 = 'it\\'s'\n"
+          's2 = "C:\\\\maix\\\\new"\n'
+          "s3 = '''多行\r\n字符串'''\n"
+          "s4 = '\\\\' + \"\\\\n\"\n").encode('utf-8') * 40 + bytes(range(256))
+
+
+@pytest.fixture(params=[False, True], ids=['raw', 'raw_paste'])
+def device(request):
+    device = VirtualDevice(baudrate=None, raw_paste=request.param)
+    device.start()
+    yield device
+    device.stop()
+
+
+@pytest.fixture
+def repl(device):
+    ser = serial.Serial(device.port, 115200, timeout=1)
+    repl = RawRepl(ser)
+    yield repl
+    repl.close()
+    ser.close()
+
+
+def test_upload_round_trip(device, repl):
+    progress = []
+    result = repl.upload(PATH, SCRIPT, chunk_size=512,
+                         progress=lambda done, total: progress.append((done, total)))
+    assert device.files[PATH] == SCRIPT
+    assert result.digest == hashlib.sha256(SCRIPT).hexdigest()
+    assert result.size == result.sent == len(SCRIPT) and not result.cached
+    assert result.chunks == -(-len(SCRIPT) // 512)
+    assert result.raw_paste is device.raw_paste
+    assert progress[-1] == (len(SCRIPT), len(SCRIPT))
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    repl.exit()
+    assert device.mode == 'friendly'
+
+
+def test_upload_str_and_empty(device, repl):
+    repl.upload(PATH, '# 空白\n')
+    assert device.files[PATH] == '# 空白\n'.encode('utf-8')
+    result = repl.upload(PATH, b'')
+    assert device.files[PATH] == b'' and result.chunks == 0
+
+
+def test_corrupted_chunk_fails_verify(device, repl, monkeypatch):
+    exec_ = repl.exec_
+
+    def corrupt(code, timeout=None):
+        # 第一块在传输中丢了一个字节
+        if code.startswith("_w('") and not corrupt.done:
+            corrupt.done = True
+            data = base64.b64decode(code[4:-2])[1:]
+            code = f"_w('{base64.b64encode(data).decode('ascii')}')"
+        return exec_(code, timeout)
+
+    corrupt.done = False
+    monkeypatch.setattr(repl, 'exec_', corrupt)
+    with pytest.raises(ReplError, match='校验失败'):
+        repl.upload(PATH, SCRIPT, chunk_size=512)
+    assert len(device.files[PATH]) == len(SCRIPT) - 1
+
+
+def test_device_error_raises(repl):
+    with pytest.raises(ReplError, match='ZeroDivisionError'):
+        repl.exec_('1 / 0')
+    # 出错后仍可继续执行
+    assert repl.exec_('print(6 * 7)').strip() == b'42'
+
+
+def test_sync_skips_identical_file(device, repl):
+    first = repl.sync(PATH, SCRIPT, block_size=256)
+    assert device.files[PATH] == SCRIPT and first.sent == len(SCRIPT)
+    commands = len(device.commands)
+    result = repl.sync(PATH, SCRIPT, block_size=256)
+    assert result.cached and result.sent == 0 and result.chunks == 0
+    assert result.digest == hashlib.sha256(SCRIPT).hexdigest()
+    # 只执行了一次摘要查询
+    assert len(device.commands) == commands + 1
+
+
+def test_sync_sends_only_changed_blocks(device, repl):
+    repl.upload(PATH, SCRIPT)
+    # 长度不变，只改第 2 块和最后一块
+    data = bytearray(SCRIPT)
+    data[2 * 256 + 10] ^= 0xff
+    data[-1] ^= 0xff
+    data = bytes(data)
+    result = repl.sync(PATH, data, block_size=256)
+    assert device.files[PATH] == data and not result.cached
+    assert result.sent == 256 + (len(SCRIPT) - 1) % 256 + 1
+    assert PATH + '.tmp' not in device.files
+    # 末尾追加：原有块全部复用
+    appended = data + b'# tail\n' * 20
+    result = repl.sync(PATH, appended, block_size=256)
+    assert device.files[PATH] == appended
+    assert result.sent <= len(appended) - len(data) + 256
+
+
+def test_sync_uploads_missing_or_shifted_file(device, repl):
+    result = repl.sync(PATH, SCRIPT, block_size=256)
+    assert device.files[PATH] == SCRIPT and result.sent == len(SCRIPT)
+    # 开头插入一行：之后的块全部错位，整体重新上传
+    shifted = b'import gc\n' + SCRIPT
+    result = repl.sync(PATH, shifted, block_size=256)
+    assert device.files[PATH] == shifted and result.sent == len(shifted)
+
+
+def test_pipeline_results_in_order(device):
+    from maix_audio.repl import ReplPipeline
+
+    ser = serial.Serial(device.port, 115200, timeout=1)
+    pipeline = ReplPipeline(ser, window=64, max_pending=4).start()
+    try:
+        futures = [pipeline.submit(f"print({i} * {i})") for i in range(20)]
+        # 窗口和未完成数限制了已发送未读取的命令
+        assert pipeline.unread <= 64 and len(pipeline.pending) <= 4
+        assert [f.result(5).text for f in futures] == [str(i * i) for i in range(20)]
+
+        results = pipeline.map(["x = 6", "print(x * 7)", "1 / 0", "print('after')"])
+        assert [r.ok for r in results] == [True, True, False, True]
+        assert results[1].stdout.strip() == b'42' and results[1].stderr == b''
+        assert results[2].stdout == b'' and b'ZeroDivisionError' in results[2].stderr
+        assert results[3].text == 'after'
+        with pytest.raises(ReplError, match='ZeroDivisionError'):
+            results[2].check()
+
+        assert pipeline.evaluate('x + 1', "'a' * 3", 'object') == [7, 'aaa', "<class 'object'>"]
+        with pytest.raises(ValueError):
+            pipeline.submit('print(1)\x04')
+        assert pipeline.submitted == pipeline.completed == 27
+    finally:
+        pipeline.close()
+        ser.close()
+    assert device.mode == 'friendly'
+    with pytest.raises(ReplError):
+        pipeline.submit('print(1)')
+
+
+def test_controller_exec_pipeline(device):
+    from maixpy_controller import MaixPyController
+
+    controller = MaixPyController(port=device.port)
+    # connect() 固定等待2秒，这里直接打开串口
+    controller.ser = serial.Serial(device.port, 115200, timeout=1)
+    controller.connected = True
+    try:
+        device.files['/flash/main.py'] = b'pass\n'
+        status = controller.device_status()
+        assert status['files'] == ['main.py'] and status['mem_free'] > 0
+        results = controller.exec_pipeline(["print('a')", "raise OSError(5)"])
+        assert results[0].text == 'a' and not results[1].ok
+    finally:
+        controller.ser.close()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""pty 虚拟设备（simulator.py）：REPL 应答、波特率限速和故障注入"""
+
+import time
+
+import serial
+
+from maix_audio import DetectionEvent, StreamParser
+from maix_audio.simulator import VirtualDevice, make_detections
+
+
+def read_port(device, seconds):
+    """从设备串口读取 seconds 秒"""
+    ser = serial.Serial(device.port, 115200, timeout=0.05)
+    data = bytearray()
+    try:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            data += ser.read(4096)
+    finally:
+        ser.close()
+        device.stop()
+    return bytes(data)
+
+
+def detections(data, binary):
+    parser = StreamParser(binary=binary)
+    events = parser.feed(data) + parser.flush()
+    return [e for e in events if isinstance(e, DetectionEvent)], parser
+
+
+def test_repl_prompt_and_interrupt():
+    from maixpy_controller import MaixPyController
+
+    device = VirtualDevice()
+    device.start()
+    controller = MaixPyController(port=device.port)
+    # connect() 固定等待2秒，这里直接打开串口
+    controller.ser = serial.Serial(device.port, 115200, timeout=1)
+    controller.connected = True
+    try:
+        controller.ser.reset_input_buffer()
+        time.sleep(0.1)
+        controller.ser.reset_input_buffer()
+        response = controller.send_command('print(6 * 7)', timeout=2)
+        assert '42' in response.split('\n') and response.endswith('>>>')
+        assert device.commands == ['print(6 * 7)']
+
+        device.start_script()
+        time.sleep(0.2)
+        controller.ser.write(b'\x03')
+        response = controller.send_command('', timeout=2)
+        assert 'KeyboardInterrupt:' in response
+        assert not device.running_script
+    finally:
+        controller.ser.close()
+        device.stop()
+
+
+def test_baud_rate_limits_throughput():
+    # 文本协议每个事件约 1KB，200 事件/秒远超 115200 波特率
+    device = VirtualDevice(rate=200, autostart=True, tx_buffer=1 << 20)
+    device.start()
+    start = time.monotonic()
+    data = read_port(device, 1.5)
+    rate = len(data) / (time.monotonic() - start)
+    assert 0.7 * 11520 < rate < 1.1 * 11520
+
+
+def test_garbled_frames_fail_crc():
+    device = VirtualDevice(rate=100, binary=True, baudrate=None, autostart=True, garble=0.3)
+    device.start()
+    events, parser = detections(read_port(device, 1.0), binary=True)
+    assert device.garbled > 10 and parser.decoder.crc_errors > 10
+    assert len(events) >= device.sent - 2 * device.garbled
+    # 收到的帧内容都完好
+    originals = make_detections(64, 1)
+    for event in events:
+        dirs, audio_map = originals[event.seq % 64]
+        assert list(event.directions) == dirs and event.audio_map == audio_map
+
+
+def test_truncated_raw_audio():
+    device = VirtualDevice(rate=50, baudrate=None, autostart=True, truncate=0.5)
+    device.start()
+    events, parser = detections(read_port(device, 1.0), binary=False)
+    assert device.truncated > 5
+    assert parser.parse_errors >= device.truncated
+    # RAW_AUDIO 截断时仍输出事件，热力图来自 AUDIO_PACKET 中的 JSON
+    assert [e.seq for e in events] == list(range(len(events)))
+    assert len(events) >= device.sent - 1
+    originals = make_detections(64, 1)
+    assert all(e.audio_map == originals[e.seq % 64][1] for e in events)
+
+
+def test_bursts_overrun_transmit_buffer():
+    device = VirtualDevice(rate=20, binary=True, autostart=True, burst_every=0.3,
+                           burst_size=30, tx_buffer=2048)
+    device.start()
+    events, _ = detections(read_port(device, 1.5), binary=True)
+    assert device.bursts >= 3 and device.overruns > 0
+    # 主机端看到的序列号缺口就是发送缓冲满时丢弃的事件
+    seqs = [e.seq for e in events]
+    assert seqs == sorted(seqs)
+    missing = set(range(seqs[-1] + 1)) - set(seqs)
+    assert missing and len(missing) <= device.overruns
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""分段存储（store.py）和分发消息（broker.py）中的设备标识"""
+
+import pytest
+
+from maix_audio import DetectionEvent, LogEvent, SegmentStore, SegmentWriter, TrackUpdate
+from maix_audio.broker import decode_message, encode_messages
+from maix_audio.store import DEVICE_SIZE, device_bytes, pack_record, unpack_record
+
+DEVICES = ['kitchen_mic1', 'kitchen_mic2', '客厅阵列', 'x' * DEVICE_SIZE]
+
+
+def detection(t, device):
+    return DetectionEvent(t, t + 0.5, 90, 300, 3, list(range(12)), seq=7, tick=1234,
+                          audio_map=bytes(range(256)), device=device)
+
+
+def test_device_bytes():
+    assert device_bytes(None) == b''
+    assert device_bytes('客厅阵列') == '客厅阵列'.encode('utf-8')
+    assert len(device_bytes('x' * DEVICE_SIZE)) == DEVICE_SIZE
+    with pytest.raises(ValueError):
+        device_bytes('x' * (DEVICE_SIZE + 1))
+    # 按编码后的字节数计算
+    with pytest.raises(ValueError):
+        device_bytes('阵' * 11)
+
+
+def test_record_keeps_distinct_devices():
+    for device in DEVICES + [None]:
+        event = unpack_record(pack_record(detection(1.0, device)))
+        assert event.device == device
+        assert (event.timestamp, event.received, event.seq, event.tick) == (1.0, 1.5, 7, 1234)
+        assert event.audio_map == bytes(range(256))
+    with pytest.raises(ValueError):
+        pack_record(detection(1.0, 'a_very_long_device_name_that_does_not_fit'))
+
+
+def test_segments_keep_distinct_devices(tmp_path):
+    writer = SegmentWriter(str(tmp_path), flush_interval=0)
+    for i in range(40):
+        writer.append(detection(100.0 + i, DEVICES[i % len(DEVICES)]))
+    writer.close()
+    events = list(SegmentStore(str(tmp_path)).iter_records())
+    assert [e.device for e in events] == [DEVICES[i % len(DEVICES)] for i in range(40)]
+    assert len({e.device for e in events}) == len(DEVICES)
+
+
+def test_broker_messages_keep_distinct_devices():
+    for device in DEVICES:
+        for topic, message in encode_messages(detection(2.0, device)):
+            assert decode_message(topic, message[5:]).device == device
+        track = TrackUpdate(2.0, 3, 45.0, 1.0, 0.9, 12, device=device)
+        ((topic, message),) = encode_messages(track)
+        assert decode_message(topic, message[5:]).device == device
+        ((topic, message),) = encode_messages(LogEvent(2.0, b'hello', device))
+        log = decode_message(topic, message[5:])
+        assert log.device == device and log.line == b'hello'
+    with pytest.raises(ValueError):
+        encode_messages(LogEvent(2.0, b'hello', 'y' * (DEVICE_SIZE + 1)))
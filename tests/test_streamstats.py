@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""丢包统计（streamstats.py）：序列号缺口、重复、乱序和设备重启"""
+
+from maix_audio import DetectionEvent
+from maix_audio.streamstats import (SEQ_MODULUS, LatencyEstimator, RollingHistogram,
+                                    SequenceTracker, StreamStatsSink)
+
+
+def feed(tracker, seqs, tick_step=50):
+    return [tracker.update(seq, 1000 + i * tick_step) for i, seq in enumerate(seqs)]
+
+
+def test_gaps_duplicates_and_late():
+    tracker = SequenceTracker()
+    status = feed(tracker, [0, 1, 2, 5, 3, 6, 6, 4, 3, 7])
+    assert status == ['first', 'ok', 'ok', 'gap', 'late', 'ok', 'duplicate', 'late',
+                      'duplicate', 'ok']
+    assert (tracker.received, tracker.lost, tracker.duplicates, tracker.reordered) == (8, 0, 2, 2)
+    assert tracker.loss_rate == 0.0
+
+    feed(tracker, [10, 20])
+    assert tracker.lost == 2 + 9 and tracker.received == 10
+    assert tracker.loss_rate == 11 / 21
+
+
+def test_sequence_wraps_around():
+    tracker = SequenceTracker()
+    seqs = [(SEQ_MODULUS - 3 + i) % SEQ_MODULUS for i in range(6)]
+    del seqs[3]
+    assert feed(tracker, seqs) == ['first', 'ok', 'ok', 'gap', 'ok']
+    assert tracker.lost == 1 and tracker.resets == 0
+    # 回绕之后迟到的 0
+    assert tracker.update(0, 1300) == 'late' and tracker.lost == 0
+
+
+def test_device_restart():
+    tracker = SequenceTracker()
+    feed(tracker, range(100))
+    # tick 大幅后退：设备重启后序列号从 0 重新开始
+    assert tracker.update(0, 10) == 'reset'
+    assert tracker.resets == 1 and tracker.update(1, 60) == 'ok'
+    # 没有 tick 时，不在窗口里的旧序列号也视为重启
+    tracker = SequenceTracker(window=16)
+    feed(tracker, range(50))
+    assert tracker.update(5, None) == 'reset' and tracker.resets == 1
+    assert tracker.lost == 0 and tracker.duplicates == 0
+
+
+def test_latency_offset_from_minimum():
+    estimator = LatencyEstimator(window=30.0, warmup=3)
+    # 设备 tick 与主机时间相差 100 秒，传输延迟 10~40ms
+    delays = [0.04, 0.01, 0.03, 0.02]
+    results = [estimator.update(i * 100, 100 + i * 0.1 + d) for i, d in enumerate(delays)]
+    assert results[:2] == [None, None]
+    assert abs(estimator.offset - 100.01) < 1e-9
+    assert abs(results[2] - 0.02) < 1e-9 and abs(results[3] - 0.01) < 1e-9
+    estimator.reset()
+    assert estimator.offset is None and not estimator.calibrated
+
+
+def test_histogram_percentiles_and_window():
+    histogram = RollingHistogram(window=10.0)
+    for i in range(100):
+        histogram.add(i / 1000.0, now=float(i))
+    # 只保留最近 10 秒
+    assert histogram.values(now=99.0) == [i / 1000.0 for i in range(89, 100)]
+    assert histogram.percentiles(now=99.0) == {50: 0.094, 95: 0.099, 99: 0.099}
+    assert histogram.buckets([0.090, 0.095], now=99.0) == [2, 5, 4]
+
+
+def test_sink_per_device():
+    sink = StreamStatsSink()
+    for device, seqs in (('a', [0, 1, 3, 2]), ('b', [0, 0, 1]), ('a', [4])):
+        for seq in seqs:
+            sink.on_detection(DetectionEvent(seq, seq, 0, 10, 0, [0] * 12, seq=seq,
+                                             tick=seq * 50, device=device))
+    sink.on_detection(DetectionEvent(0, 0, 0, 10, 0, [0] * 12, device='a'))
+    stats = sink.snapshot()
+    assert (stats['a']['received'], stats['a']['reordered'], stats['a']['lost']) == (5, 1, 0)
+    assert stats['a']['unsequenced'] == 1 and stats['a']['events'] == 6
+    assert stats['b']['duplicates'] == 1 and stats['b']['received'] == 2
+    assert '[a]' in sink.report() and '无序列号: 1' in sink.report()
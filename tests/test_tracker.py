@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""声源跟踪（tracker.py）：量化、相邻方向误差和反射下的轨迹保持"""
+
+import numpy as np
+import pytest
+
+from maix_audio import ANGLE_MAP, DetectionEvent, Sink
+from maix_audio.tracker import SourceTracker, TrackerSink, wrap_angle
+
+
+def walking_trace(duration, rate=20.0, speed=20.0, reflections=0.1, neighbor=0.2, seed=1):
+    """
+    绕阵列走动的单个声源，检测按设备的做法量化到30度
+
+    Returns:
+        (时间, 检测角度, 真实角度, 是否反射)
+    """
+    rng = np.random.default_rng(seed)
+    count = int(duration * rate)
+    t = np.sort(rng.uniform(0, duration, count))
+    truth = (speed * t) % 360.0
+    measured = np.round(truth / 30.0) % 12 * 30.0
+    wrong = rng.random(count) < neighbor
+    measured[wrong] += rng.choice([-30.0, 30.0], wrong.sum())
+    reflection = rng.random(count) < reflections
+    measured[reflection] = rng.integers(0, 12, reflection.sum()) * 30.0
+    return t, measured % 360.0, truth, reflection
+
+
+def detection(angle, t, received=None):
+    angle = int(angle)
+    return DetectionEvent(t, t if received is None else received, angle, 10,
+                          ANGLE_MAP.index(angle), [10] * 12)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_walking_source_keeps_one_id(seed):
+    t, measured, truth, reflection = walking_trace(300.0, seed=seed)
+    tracker = SourceTracker()
+    results = [tracker.update(a, ti) for a, ti in zip(measured.tolist(), t.tolist())]
+    ids = {r[0] for r in results if r is not None}
+    assert len(ids) == 1
+    real = [(r, truth[i]) for i, r in enumerate(results) if r is not None and not reflection[i]]
+    # 几乎每个真实检测都有输出，平滑后的误差明显小于30度量化
+    assert len(real) > 0.95 * (~reflection).sum()
+    errors = np.array([abs(wrap_angle(r[1] - angle)) for r, angle in real])
+    assert errors.mean() < 8.0
+    assert abs(np.median([r[2] for r, _ in real]) - 20.0) < 5.0
+
+
+def test_two_separated_sources_keep_their_ids():
+    rng = np.random.default_rng(4)
+    t = np.sort(rng.uniform(0, 60.0, 1200))
+    angles = np.where(rng.random(1200) < 0.5, 60.0, 240.0)
+    tracker = SourceTracker()
+    ids = {}
+    for angle, ti in zip(angles.tolist(), t.tolist()):
+        result = tracker.update(angle, ti)
+        if result is not None:
+            ids.setdefault(angle, set()).add(result[0])
+    assert len(ids[60.0]) == 1 and len(ids[240.0]) == 1
+    assert ids[60.0] != ids[240.0]
+    assert len(tracker.tracks(t[-1])) == 2
+
+
+def test_reflections_alone_not_confirmed():
+    # 20事件/秒中10%为反射：随机方向，每秒2次
+    rng = np.random.default_rng(5)
+    t = np.sort(rng.uniform(0, 300.0, 300 * 2))
+    tracker = SourceTracker()
+    results = [tracker.update(a, ti) for a, ti in
+               zip((rng.integers(0, 12, t.size) * 30.0).tolist(), t.tolist())]
+    assert all(r is None for r in results)
+
+
+def test_track_expires():
+    tracker = SourceTracker()
+    for i in range(20):
+        tracker.update(90.0, i * 0.05)
+    assert [u.angle for u in tracker.tracks(1.0)] == [pytest.approx(90.0)]
+    assert tracker.tracks(3.0) == []
+    # 置信度衰减后回收，同一方向重新出现时是新轨迹
+    results = [tracker.update(90.0, 20.0 + i * 0.05) for i in range(10)]
+    assert {r[0] for r in results if r is not None} == {1}
+
+
+class TrackList(Sink):
+    def __init__(self):
+        self.updates = []
+
+    def on_track(self, event):
+        self.updates.append(event)
+
+
+def test_sink_uses_event_timestamp():
+    out = TrackList()
+    sink = TrackerSink(sinks=[out])
+    # 接收时间全部相同（一次读取块里解析出来），timestamp 为设备时钟换算的主机时间
+    for i in range(40):
+        event = detection(90, 100.0 + i * 0.05, received=200.0)
+        event.device = 'mic1'
+        sink.handle(event)
+    assert out.updates
+    assert [u.timestamp for u in out.updates] == [u.detection.timestamp for u in out.updates]
+    assert all(u.device == 'mic1' for u in out.updates)
+    assert out.updates[-1].timestamp == pytest.approx(101.95)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""多阵列声源定位（triangulation.py）：已知几何下的求交、分组和按时输出"""
+
+import asyncio
+import math
+import time
+
+import numpy as np
+
+from maix_audio import DetectionEvent, MultiDeviceCollector, Sink
+from maix_audio.triangulation import TriangulationSink, Triangulator, triangulate
+
+# 设备标识: (x, y, 方向0的角度)
+ARRAYS = {'mic1': (0.0, 0.0, 0.0), 'mic2': (4.0, 0.0, 90.0), 'mic3': (0.0, 3.0, -90.0)}
+POSITIONS = np.array([pose[:2] for pose in ARRAYS.values()])
+
+
+def world_angle(source, position):
+    return math.degrees(math.atan2(source[1] - position[1], source[0] - position[0]))
+
+
+def detection(device, source, t, clockwise=False):
+    """device 看到 source 时的检测事件，bearing 为设备坐标下的精确方位"""
+    x, y, rotation = ARRAYS[device]
+    relative = world_angle(source, (x, y)) - rotation
+    if clockwise:
+        relative = -relative
+    event = DetectionEvent(t, t, 0, 10, 0, [10] * 12, device=device)
+    event.bearing = relative % 360.0
+    return event
+
+
+class PositionSink(Sink):
+    def __init__(self):
+        self.positions = []
+        self.idles = 0
+
+    def on_position(self, event):
+        self.positions.append(event)
+
+    def idle(self):
+        self.idles += 1
+
+
+def test_triangulate_exact_bearings():
+    sources = np.array([[2.0, 2.0], [1.0, 0.5], [3.5, 2.8]])
+    angles = np.array([[world_angle(s, p) for p in POSITIONS] for s in sources])
+    points, cov, valid = triangulate(POSITIONS, angles)
+    assert valid.all()
+    assert np.allclose(points, sources, atol=1e-9)
+    assert np.all(np.isfinite(cov))
+    # 两个阵列也能定位，缺失的方位用 mask 排除
+    mask = np.array([[True, True, False]] * 3)
+    points, _, valid = triangulate(POSITIONS, angles, mask)
+    assert valid.all() and np.allclose(points, sources, atol=1e-9)
+
+
+def test_triangulate_rejects_bad_geometry():
+    positions = POSITIONS[:2]
+    # 平行方位线
+    _, _, valid = triangulate(positions, [[90.0, 90.0]])
+    assert not valid[0]
+    # 交点在阵列后方
+    _, _, valid = triangulate(positions, [[135.0, 45.0]])
+    assert not valid[0]
+    # 只有一个方位
+    points, _, valid = triangulate(POSITIONS, [[45.0, 0.0, 0.0]], [[True, False, False]])
+    assert not valid[0] and np.isnan(points[0]).all()
+
+
+def test_noisy_bearings_error_estimate():
+    rng = np.random.default_rng(1)
+    source = np.array([2.0, 1.5])
+    truth = np.array([world_angle(source, p) for p in POSITIONS])
+    angles = truth + rng.normal(0.0, 3.0, (500, 3))
+    points, cov, valid = triangulate(POSITIONS, angles, sigma=3.0)
+    assert valid.mean() > 0.99
+    errors = np.linalg.norm(points[valid] - source, axis=1)
+    predicted = np.sqrt(cov[valid, 0, 0] + cov[valid, 1, 1])
+    # 报告的均方根误差与实际误差同一量级
+    rms = np.sqrt(np.mean(errors ** 2))
+    assert 0.5 < rms / np.sqrt(np.mean(predicted ** 2)) < 2.0
+
+
+def test_triangulator_rotation_and_grouping():
+    source = (2.5, 1.0)
+    for clockwise in (False, True):
+        tri = Triangulator(ARRAYS, window=0.05, latency=0.2, clockwise=clockwise, sigma=1.0)
+        out = []
+        out += tri.add(detection('mic1', source, 10.00, clockwise))
+        out += tri.add(detection('mic2', source, 10.02, clockwise))
+        out += tri.add(detection('mic3', source, 10.04, clockwise))
+        assert out == []
+        # 下一个检测的时间超过 window + latency，上一组关闭
+        out += tri.add(detection('mic1', source, 10.5, clockwise))
+        assert len(out) == 1
+        position = out[0]
+        assert math.isclose(position.x, source[0], abs_tol=1e-6)
+        assert math.isclose(position.y, source[1], abs_tol=1e-6)
+        assert sorted(position.devices) == ['mic1', 'mic2', 'mic3']
+        assert math.isclose(position.timestamp, 10.02)
+        assert tri.flush() == [] and tri.snapshot()["unmatched"] == 1
+
+
+def test_same_device_keeps_strongest():
+    tri = Triangulator(ARRAYS, sigma=1.0)
+    source = (2.0, 2.0)
+    wrong = detection('mic1', (3.0, 0.2), 0.0)
+    wrong.intensity = 5
+    tri.add(wrong)
+    tri.add(detection('mic1', source, 0.01))
+    tri.add(detection('mic2', source, 0.02))
+    (position,) = tri.flush()
+    assert math.isclose(position.x, 2.0, abs_tol=1e-6)
+    assert math.isclose(position.y, 2.0, abs_tol=1e-6)
+
+
+def test_out_of_order_detection_flushes_on_time():
+    tri = Triangulator(ARRAYS, window=0.05, latency=0.2)
+    source = (2.0, 2.0)
+    tri.add(detection('mic1', source, 10.0))
+    # 另一个设备较早的检测晚到
+    tri.add(detection('mic2', source, 9.0))
+    # 9.0 的组在 9.25 已经可以关闭，不必等 10.0 那一组
+    tri.add(detection('mic3', source, 10.2))
+    assert tri.groups == 1 and tri.unmatched == 1
+    assert [item[0] for item in tri._pending] == [10.0, 10.2]
+
+
+def test_sink_idle_emits_isolated_source():
+    downstream = PositionSink()
+    sink = TriangulationSink(ARRAYS, sinks=[downstream], sigma=1.0)
+    source = (1.5, 2.0)
+    t = time.time() - 1.0
+    sink.handle(detection('mic1', source, t))
+    sink.handle(detection('mic2', source, t + 0.01))
+    assert downstream.positions == []
+    # 没有后续检测：读取空闲时按主机时间关闭
+    sink.idle()
+    assert len(downstream.positions) == 1
+    assert math.isclose(downstream.positions[0].x, 1.5, abs_tol=1e-6)
+
+
+def test_collector_run_calls_idle():
+    sink = PositionSink()
+    collector = MultiDeviceCollector({}, sinks=[sink], flush_after=0.05)
+
+    async def run():
+        task = asyncio.ensure_future(collector.run())
+        await asyncio.sleep(0.4)
+        await collector.stop()
+        await task
+
+    asyncio.run(run())
+    assert sink.idles >= 3
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""热力图窗口（viewer.py）：只重画变化的格子和面板"""
+
+import pytest
+
+pytest.importorskip("pygame")
+
+from maix_audio import DetectionEvent
+from maix_audio.viewer import GRID, RAINBOW, HeatmapViewer
+
+CELL = 4
+
+
+@pytest.fixture
+def viewer():
+    view = HeatmapViewer(cell=CELL, fps=0, headless=True)
+    view.present()   # 提交初始整屏
+    yield view
+    view.close()
+
+
+def make_map(cells, base=0):
+    data = bytearray([base] * (GRID * GRID))
+    for (row, col), value in cells.items():
+        data[row * GRID + col] = value
+    return bytes(data)
+
+
+def pixel(view, row, col):
+    """格子中心在屏幕上的颜色"""
+    color = view.screen.get_at((col * CELL + CELL // 2, row * CELL + CELL // 2))
+    return (color.r, color.g, color.b)
+
+
+def test_update_map_dirty_rows(viewer):
+    assert viewer._dirty == []
+    first = make_map({(2, 3): 200, (2, 9): 120, (7, 5): 255})
+    assert viewer.update_map(first) == 3
+    # 每行一个矩形，从该行最左到最右的变化格子
+    assert sorted(tuple(r) for r in viewer._dirty) == [
+        (3 * CELL, 2 * CELL, 7 * CELL, CELL),
+        (5 * CELL, 7 * CELL, CELL, CELL),
+    ]
+    assert pixel(viewer, 2, 3) == tuple(RAINBOW[200])
+    assert pixel(viewer, 2, 9) == tuple(RAINBOW[120])
+    assert pixel(viewer, 7, 5) == tuple(RAINBOW[255])
+    assert pixel(viewer, 2, 6) == tuple(RAINBOW[0])
+    viewer.present()
+
+    # 第二帧：一个格子不变，一个变化，一个清零，另加一个新格子
+    second = make_map({(2, 3): 200, (2, 9): 60, (12, 0): 90})
+    assert viewer.update_map(second) == 3
+    assert sorted(tuple(r) for r in viewer._dirty) == [
+        (0, 12 * CELL, CELL, CELL),
+        (5 * CELL, 7 * CELL, CELL, CELL),
+        (9 * CELL, 2 * CELL, CELL, CELL),
+    ]
+    assert pixel(viewer, 2, 9) == tuple(RAINBOW[60])
+    assert pixel(viewer, 7, 5) == tuple(RAINBOW[0])
+    assert pixel(viewer, 12, 0) == tuple(RAINBOW[90])
+    assert viewer.cells_drawn == 6
+    viewer.present()
+
+    # 相同的一帧什么都不画
+    assert viewer.update_map(second) == 0
+    assert viewer._dirty == []
+
+
+def test_update_map_full_redraw(viewer):
+    # 超过一半的格子变化时整块重画
+    assert viewer.update_map(make_map({}, base=100)) == GRID * GRID
+    assert viewer._dirty == [viewer.map_rect]
+    assert pixel(viewer, 0, 0) == tuple(RAINBOW[100])
+    assert pixel(viewer, GRID - 1, GRID - 1) == tuple(RAINBOW[100])
+
+
+def test_update_polar_skips_unchanged(viewer):
+    directions = [10, 20, 300, 40, 10, 10, 10, 10, 10, 10, 10, 10]
+    viewer.update_polar(directions, 60.0)
+    assert viewer._dirty == [viewer.polar_rect]
+    viewer.present()
+    # 方向强度和角度都没变：不重画
+    viewer.update_polar(list(directions), 60.0)
+    assert viewer._dirty == []
+    # 只有角度变化
+    viewer.update_polar(directions, 75.0)
+    assert viewer._dirty == [viewer.polar_rect]
+    viewer.present()
+    directions[0] = 11
+    viewer.update_polar(directions, 75.0)
+    assert viewer._dirty == [viewer.polar_rect]
+
+
+def test_detection_draws_latest():
+    view = HeatmapViewer(cell=CELL, fps=1, headless=True)
+    try:
+        events = [DetectionEvent(i, i, 0, 10, 0, [10 + i] * 12,
+                                 audio_map=make_map({(0, 0): i + 1})) for i in range(5)]
+        for event in events:
+            view.on_detection(event)
+        # 第一个事件立即画出，后面的在 1 秒内只保留最新一个
+        assert view.frames == 1 and view.skipped == 3
+        view.idle()
+        assert view.frames == 2 and view._pending is None
+        assert view.values[0, 0] == 5
+        assert view._directions == tuple([14] * 12)
+    finally:
+        view.close()
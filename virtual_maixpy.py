@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+虚拟MaixPy设备
+在 pty 上模拟开发板的 REPL 和麦克风阵列输出，没有硬件时测试主机端程序
+
+用法: python virtual_maixpy.py [--rate N] [--binary] [--compress] [--baud N|0]
+                               [--autostart] [--link 路径] [--replay 录制文件]
+                               [--garble P] [--truncate P] [--burst 秒,个数]
+                               [--link-baud N] [--strict-baud]
+
+然后另开终端: python raspberry_pi_receiver.py <打印出的串口路径>
+"""
+
+import argparse
+import time
+
+from maix_audio.simulator import VirtualDevice
+
+def main():
+    """主函数"""
+    ap = argparse.ArgumentParser(description='虚拟MaixPy设备')
+    ap.add_argument('--rate', type=float, default=5.0, help='每秒检测事件数')
+    ap.add_argument('--binary', action='store_true', help='发送二进制帧')
+    ap.add_argument('--compress', action='store_true', help='二进制帧压缩热力图')
+    ap.add_argument('--baud', type=int, default=115200, help='模拟波特率，0 表示不限速')
+    ap.add_argument('--autostart', action='store_true', help='启动后直接发送数据')
+    ap.add_argument('--link', help='指向 pty 的符号链接路径，如 /tmp/ttyMAIX')
+    ap.add_argument('--replay', help='回放 Receiver(record=...) 录制的原始数据')
+    ap.add_argument('--garble', type=float, default=0.0, help='事件被破坏的概率')
+    ap.add_argument('--truncate', type=float, default=0.0, help='RAW_AUDIO 被截断的概率')
+    ap.add_argument('--burst', help='突发: 间隔秒数,事件数，如 5,20')
+    ap.add_argument('--link-baud', type=int, help='脚本启动时请求协商的波特率，如 921600')
+    ap.add_argument('--strict-baud', action='store_true',
+                    help='主机端串口波特率与设备不一致时收发乱码')
+    ap.add_argument('--clock-drift', type=float, default=0.0,
+                    help='设备时钟漂移（ppm），用于检验时钟同步')
+    args = ap.parse_args()
+
+    burst_every, burst_size = None, 10
+    if args.burst:
+        every, size = args.burst.split(',')
+        burst_every, burst_size = float(every), int(size)
+
+    device = VirtualDevice(rate=args.rate, binary=args.binary, compress=args.compress,
+                           baudrate=args.baud or None, recording=args.replay,
+                           autostart=args.autostart, garble=args.garble,
+                           truncate=args.truncate, burst_every=burst_every,
+                           burst_size=burst_size, link_baudrate=args.link_baud,
+                           strict_baud=args.strict_baud, clock_drift=args.clock_drift,
+                           link=args.link)
+    device.start()
+
+    print("🎯 虚拟MaixPy设备")
+    print(f"串口设备: {device.port}")
+    print(f"协议: {'二进制帧' if args.binary else '文本'} | 事件率: {args.rate}/秒 | "
+          f"波特率: {args.baud or '不限'}")
+    print("按 Ctrl+C 停止")
+    print("=" * 50)
+
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📈 {device.stats()}")
+    except KeyboardInterrupt:
+        print("\n\n⏹️ 模拟停止")
+    finally:
+        print(f"📈 {device.stats()}")
+        device.stop()
+
+if __name__ == "__main__":
+    main()